@@ -0,0 +1,185 @@
+"""
+Batch Indicator Engine for Enhanced Saudi Stock Market App
+Cross-sectional technical indicators and AI scores for every symbol in one NumPy pass
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+
+MIN_BARS = 20   # fewer bars than this -> no signal
+LOOKBACK = 51   # enough rows for SMA50 and the 20-day change / volatility windows
+
+
+def panel_from_histories(histories: Dict[str, pd.DataFrame]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Stack per-symbol OHLCV frames into (dates x symbols) Close and Volume panels"""
+    close = pd.concat({symbol: frame['Close'] for symbol, frame in histories.items()}, axis=1, sort=True)
+    volume = pd.concat({symbol: frame['Volume'] for symbol, frame in histories.items()}, axis=1, sort=True)
+    return close, volume.reindex_like(close)
+
+
+def right_align(close: np.ndarray, volume: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Move each symbol's valid closes to the bottom rows (order preserved, NaN above),
+    so row -1 is every symbol's own latest bar even when trading calendars differ.
+    """
+    order = np.argsort(~np.isnan(close), axis=0, kind='stable')
+    close = np.take_along_axis(close, order, axis=0)
+    volume = np.nan_to_num(np.take_along_axis(volume, order, axis=0))
+
+    if close.shape[0] < LOOKBACK:
+        pad = LOOKBACK - close.shape[0]
+        close = np.vstack([np.full((pad, close.shape[1]), np.nan), close])
+        volume = np.vstack([np.zeros((pad, volume.shape[1])), volume])
+    return close[-LOOKBACK:], volume[-LOOKBACK:]
+
+
+def compute_indicators(close: np.ndarray, volume: np.ndarray) -> Dict[str, np.ndarray]:
+    """SMA20/50, 5d/20d change, volatility, volume ratio and RSI(14) for all columns"""
+    close, volume = right_align(np.asarray(close, dtype=np.float64),
+                                np.asarray(volume, dtype=np.float64))
+    bars = (~np.isnan(close)).sum(axis=0)
+    current = close[-1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sma_20 = close[-20:].mean(axis=0)
+        sma_50 = np.where(bars >= 50, close[-50:].mean(axis=0), sma_20)
+
+        change_5d = np.where(bars >= 6, (current / close[-6] - 1) * 100, 0.0)
+        change_20d = np.where(bars >= 21, (current / close[-21] - 1) * 100, 0.0)
+
+        # Std of the last 20 daily returns (needs 21 closes, NaN otherwise)
+        returns = close[-20:] / close[-21:-1] - 1
+        volatility = returns.std(axis=0, ddof=1) * 100
+
+        avg_volume = volume[-20:].mean(axis=0)
+        volume_ratio = np.where(avg_volume > 0, volume[-1] / avg_volume, 1.0)
+
+        # RSI over the last 14 price changes
+        delta = close[-14:] - close[-15:-1]
+        gain = np.where(delta > 0, delta, 0.0).mean(axis=0)
+        loss = np.where(delta < 0, -delta, 0.0).mean(axis=0)
+        rsi = np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+
+    return {
+        'valid': bars >= MIN_BARS,
+        'bars': bars,
+        'current_price': current,
+        'sma_20': sma_20,
+        'sma_50': sma_50,
+        'change_5d': change_5d,
+        'change_20d': change_20d,
+        'volatility': volatility,
+        'volume_ratio': volume_ratio,
+        'rsi': rsi,
+    }
+
+
+def score_signals(ind: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Vectorized AI decision: buy/sell scores -> signal, confidence, target and risk"""
+    current, sma_20, sma_50 = ind['current_price'], ind['sma_20'], ind['sma_50']
+    n = len(current)
+    buy = np.zeros(n)
+    sell = np.zeros(n)
+
+    # Trend analysis
+    strong_up = (current > sma_20) & (sma_20 > sma_50)
+    strong_down = ~strong_up & (current < sma_20) & (sma_20 < sma_50)
+    above = ~strong_up & ~strong_down & (current > sma_20)
+    below = ~strong_up & ~strong_down & ~above
+    buy += 2 * strong_up + above
+    sell += 2 * strong_down + below
+
+    # Momentum analysis
+    momentum_up = ind['change_5d'] > 5
+    momentum_down = ind['change_5d'] < -5
+    monthly_up = ind['change_20d'] > 10
+    monthly_down = ind['change_20d'] < -10
+    buy += momentum_up
+    buy += monthly_up
+    sell += momentum_down
+    sell += monthly_down
+
+    # RSI analysis
+    rsi = ind['rsi']
+    oversold = rsi < 30
+    overbought = ~oversold & (rsi > 70)
+    mild_buy = ~oversold & ~overbought & (rsi < 50)
+    mild_sell = ~oversold & ~overbought & ~mild_buy
+    buy += 2 * oversold + 0.5 * mild_buy
+    sell += 2 * overbought + 0.5 * mild_sell
+
+    # Volume supports whichever side is currently ahead
+    high_volume = ind['volume_ratio'] > 1.5
+    buy_ahead = buy > sell
+    buy += high_volume & buy_ahead
+    sell += high_volume & ~buy_ahead
+
+    # High volatility reduces confidence
+    high_volatility = ind['volatility'] > 20
+    damp = np.where(high_volatility, 0.8, 1.0)
+    buy *= damp
+    sell *= damp
+
+    total = buy + sell
+    with np.errstate(divide='ignore', invalid='ignore'):
+        buy_conf = np.minimum(0.95, 0.5 + (buy / (total * 2)) * 0.5)
+        sell_conf = np.minimum(0.95, 0.5 + (sell / (total * 2)) * 0.5)
+    signal_type = np.where(total == 0, 'HOLD', np.where(buy > sell, 'BUY', 'SELL')).astype(object)
+    confidence = np.where(total == 0, 0.5, np.where(buy > sell, buy_conf, sell_conf))
+
+    # Close scores default to HOLD
+    close_call = np.abs(buy - sell) < 1
+    signal_type[close_call] = 'HOLD'
+    confidence = np.where(close_call, 0.6, confidence)
+
+    # Price target
+    hold_drift = np.random.uniform(-0.02, 0.02, size=n)
+    predicted_price = np.select(
+        [signal_type == 'BUY', signal_type == 'SELL'],
+        [current * (1 + 0.05 + (confidence - 0.5) * 0.1),
+         current * (1 - 0.03 - (confidence - 0.5) * 0.08)],
+        default=current * (1 + hold_drift),
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected_return = (predicted_price / current - 1) * 100
+
+    volatility = ind['volatility']
+    risk_level = np.where(volatility < 5, 'LOW', np.where(volatility < 15, 'MEDIUM', 'HIGH')).astype(object)
+
+    # Reason flags in priority order; the first three that apply become the reasoning
+    reasons: List[Tuple[np.ndarray, str]] = [
+        (strong_up, "Strong upward trend"),
+        (strong_down, "Strong downward trend"),
+        (above, "Above short-term average"),
+        (below, "Below short-term average"),
+        (momentum_up, "Strong recent momentum"),
+        (momentum_down, "Weak recent momentum"),
+        (monthly_up, "Strong monthly performance"),
+        (monthly_down, "Weak monthly performance"),
+        (oversold, "Oversold condition (RSI < 30)"),
+        (overbought, "Overbought condition (RSI > 70)"),
+        (high_volume, "High volume supporting trend"),
+        (high_volatility, "High volatility increases risk"),
+    ]
+    flags = np.vstack([mask for mask, _ in reasons])
+    texts = [text for _, text in reasons]
+    reasoning = ["; ".join(texts[r] for r in np.flatnonzero(flags[:, j])[:3]) for j in range(n)]
+
+    return {
+        'signal_type': signal_type,
+        'confidence': confidence,
+        'predicted_price': predicted_price,
+        'expected_return': expected_return,
+        'risk_level': risk_level,
+        'reasoning': reasoning,
+        'buy_score': buy,
+        'sell_score': sell,
+    }
+
+
+def compute_signals(close: np.ndarray, volume: np.ndarray) -> Dict[str, np.ndarray]:
+    """Indicators and scores for a (dates x symbols) panel in one pass"""
+    indicators = compute_indicators(close, volume)
+    indicators.update(score_signals(indicators))
+    return indicators
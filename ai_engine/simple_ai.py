@@ -5,9 +5,12 @@ User-friendly AI features with easy integration
 
 import pandas as pd
 import numpy as np
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Optional, Tuple
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -19,6 +22,40 @@ try:
 except ImportError:
     ML_AVAILABLE = False
 
+# Local OHLCV store - repeat signal runs read history from disk
+try:
+    from core.price_history_store import price_history_store
+    HISTORY_STORE_AVAILABLE = True
+except ImportError:
+    HISTORY_STORE_AVAILABLE = False
+
+# Vectorized indicators + scores for all symbols at once
+try:
+    from ai_engine.batch_indicators import compute_signals, panel_from_histories
+except ImportError:
+    from batch_indicators import compute_signals, panel_from_histories
+
+# Shared bounded cache (memory LRU + disk tiers)
+try:
+    from core.tiered_cache import tiered_cache
+    TIERED_CACHE_AVAILABLE = True
+except ImportError:
+    TIERED_CACHE_AVAILABLE = False
+
+# Concurrent downloads of the same symbol's history share one request
+try:
+    from core.single_flight import flight_group
+    SINGLE_FLIGHT_AVAILABLE = True
+except ImportError:
+    SINGLE_FLIGHT_AVAILABLE = False
+
+# Shared per-source pacing for upstream calls
+try:
+    from core.rate_limiter import get_limiter
+    RATE_LIMITER_AVAILABLE = True
+except ImportError:
+    RATE_LIMITER_AVAILABLE = False
+
 @dataclass
 class AISignal:
     """AI Trading Signal"""
@@ -36,228 +73,197 @@ class AISignal:
 class SimpleAIEngine:
     """Simplified AI Engine for Trading Signals"""
     
-    def __init__(self):
-        self.signals_cache = {}
+    def __init__(self, max_workers: int = 8, symbol_timeout: float = 10.0, total_timeout: float = 30.0):
+        self.signals_cache = tiered_cache if TIERED_CACHE_AVAILABLE else None
         self.cache_duration = 300  # 5 minutes
-    
-    def generate_signals(self, symbols: List[str], stocks_db: Dict) -> List[AISignal]:
-        """Generate AI trading signals for given symbols"""
-        signals = []
-        
-        for symbol in symbols:
-            try:
-                signal = self._generate_single_signal(symbol, stocks_db)
-                if signal:
-                    signals.append(signal)
-            except Exception as e:
-                print(f"Error generating signal for {symbol}: {e}")
-                continue
+        self.max_cached_signals = 512
+        if self.signals_cache is not None:
+            self.signals_cache.configure('ai_signals', ttl=self.cache_duration,
+                                         max_entries=self.max_cached_signals)
         
-        return signals
+        # History acquisition: bounded pool, per-symbol deadline from when its download starts
+        self.max_workers = max_workers
+        self.symbol_timeout = symbol_timeout
+        self.total_timeout = total_timeout
     
-    def _generate_single_signal(self, symbol: str, stocks_db: Dict) -> Optional[AISignal]:
-        """Generate signal for a single stock"""
-        # Check cache first
-        cache_key = f"{symbol}_{datetime.now().strftime('%Y%m%d_%H%M')}"
-        if cache_key in self.signals_cache:
-            return self.signals_cache[cache_key]
-        
-        try:
-            # Get stock info
-            stock_code = symbol.replace('.SR', '')
-            stock_info = stocks_db.get(stock_code, {})
-            company_name = stock_info.get('name_en', 'Unknown Company')
-            
-            # Import yfinance here to avoid import issues
-            import yfinance as yf
-            
-            # Fetch recent data
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period="3mo")
-            
-            if data.empty or len(data) < 20:
-                return None
-            
-            # Generate AI signal using technical analysis
-            signal = self._analyze_stock_data(data, symbol, company_name)
-            
-            # Cache the signal
-            self.signals_cache[cache_key] = signal
-            
-            return signal
-            
-        except Exception as e:
-            print(f"Error analyzing {symbol}: {e}")
-            return None
+    def generate_signals(self, symbols: List[str], stocks_db: Dict,
+                         timed_out: Optional[List[str]] = None) -> List[AISignal]:
+        """
+        Generate AI trading signals for given symbols (partial if some histories time out).
+        Symbols whose download timed out are appended to the caller's `timed_out` list.
+        """
+        signals = {}
+        for batch in self.iter_signals(symbols, stocks_db, timed_out=timed_out):
+            signals.update((signal.symbol, signal) for signal in batch)
+        return [signals[symbol] for symbol in symbols if symbol in signals]
     
-    def _analyze_stock_data(self, data: pd.DataFrame, symbol: str, company_name: str) -> AISignal:
-        """Analyze stock data and generate AI signal"""
-        current_price = data['Close'].iloc[-1]
-        
-        # Calculate technical indicators
-        # Moving averages
-        sma_20 = data['Close'].rolling(20).mean().iloc[-1]
-        sma_50 = data['Close'].rolling(50).mean().iloc[-1] if len(data) >= 50 else sma_20
-        
-        # Price momentum
-        price_change_5d = (current_price / data['Close'].iloc[-6] - 1) * 100 if len(data) >= 6 else 0
-        price_change_20d = (current_price / data['Close'].iloc[-21] - 1) * 100 if len(data) >= 21 else 0
-        
-        # Volatility
-        volatility = data['Close'].pct_change().rolling(20).std().iloc[-1] * 100
+    def iter_signals(self, symbols: List[str], stocks_db: Dict, batch_size: int = 16,
+                     flush_interval: float = 0.25, timed_out: Optional[List[str]] = None) -> Iterator[List[AISignal]]:
+        """
+        Yield signals in batches as histories arrive, so symbols that
+        returned in time can be shown before slow ones finish.
+        The engine is shared across sessions, so timed-out symbols go to the caller's list.
+        """
+        arrived = {}
+        last_flush = time.monotonic()
         
-        # Volume analysis
-        avg_volume = data['Volume'].rolling(20).mean().iloc[-1]
-        recent_volume = data['Volume'].iloc[-1]
-        volume_ratio = recent_volume / avg_volume if avg_volume > 0 else 1
+        for symbol, data in self._iter_histories(symbols, timed_out):
+            arrived[symbol] = data
+            if len(arrived) >= batch_size or time.monotonic() - last_flush >= flush_interval:
+                yield list(self._signals_from_histories(arrived, stocks_db).values())
+                arrived = {}
+                last_flush = time.monotonic()
         
-        # RSI calculation
-        rsi = self._calculate_rsi(data['Close'])
-        
-        # AI Decision Logic
-        signal_type, confidence, reasoning = self._make_ai_decision(
-            current_price, sma_20, sma_50, price_change_5d, price_change_20d,
-            volatility, volume_ratio, rsi
-        )
-        
-        # Predict price target
-        if signal_type == 'BUY':
-            predicted_price = current_price * (1 + 0.05 + (confidence - 0.5) * 0.1)
-            expected_return = ((predicted_price / current_price) - 1) * 100
-        elif signal_type == 'SELL':
-            predicted_price = current_price * (1 - 0.03 - (confidence - 0.5) * 0.08)
-            expected_return = ((predicted_price / current_price) - 1) * 100
-        else:  # HOLD
-            predicted_price = current_price * (1 + np.random.uniform(-0.02, 0.02))
-            expected_return = ((predicted_price / current_price) - 1) * 100
+        if arrived:
+            yield list(self._signals_from_histories(arrived, stocks_db).values())
+    
+    def _iter_histories(self, symbols: List[str],
+                        timed_out: Optional[List[str]] = None) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """Download histories concurrently; yield (symbol, data) in completion order"""
+        expired_symbols = []
+        if not symbols:
+            return
         
-        # Risk assessment
-        if volatility < 5:
-            risk_level = 'LOW'
-        elif volatility < 15:
-            risk_level = 'MEDIUM'
-        else:
-            risk_level = 'HIGH'
+        started = {}
         
-        return AISignal(
-            symbol=symbol,
-            company_name=company_name,
-            signal_type=signal_type,
-            confidence=confidence,
-            predicted_price=predicted_price,
-            current_price=current_price,
-            expected_return=expected_return,
-            risk_level=risk_level,
-            reasoning=reasoning,
-            timestamp=datetime.now()
-        )
-    
-    def _calculate_rsi(self, prices: pd.Series, period: int = 14) -> float:
-        """Calculate Relative Strength Index"""
-        delta = prices.diff()
-        gain = delta.where(delta > 0, 0).rolling(window=period).mean()
-        loss = -delta.where(delta < 0, 0).rolling(window=period).mean()
+        def load(symbol):
+            started[symbol] = time.monotonic()
+            return self._load_history(symbol)
         
-        if loss.iloc[-1] == 0:
-            return 100
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(symbols)))
+        futures = {executor.submit(load, symbol): symbol for symbol in symbols}
+        pending = set(futures)
+        overall_deadline = time.monotonic() + self.total_timeout
         
-        rs = gain.iloc[-1] / loss.iloc[-1]
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
+        try:
+            while pending:
+                now = time.monotonic()
+                deadlines = [started[futures[f]] + self.symbol_timeout for f in pending if futures[f] in started]
+                next_deadline = min(deadlines + [overall_deadline])
+                done, pending = wait(pending, timeout=max(0.0, next_deadline - now), return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    symbol = futures[future]
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        print(f"Error generating signal for {symbol}: {e}")
+                        continue
+                    if data is not None and not data.empty and len(data) >= 20:
+                        yield symbol, data
+                
+                # Give up on downloads past their deadline; the rest keep going
+                now = time.monotonic()
+                expired = {f for f in pending
+                           if now >= overall_deadline
+                           or (futures[f] in started and now >= started[futures[f]] + self.symbol_timeout)}
+                if expired:
+                    pending -= expired
+                    expired_symbols.extend(futures[f] for f in expired)
+                    if timed_out is not None:
+                        timed_out.extend(futures[f] for f in expired)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            if expired_symbols:
+                print(f"⏱️ History download timed out for {len(expired_symbols)} symbols: "
+                      f"{', '.join(expired_symbols[:10])}")
     
-    def _make_ai_decision(self, current_price, sma_20, sma_50, price_change_5d, 
-                         price_change_20d, volatility, volume_ratio, rsi) -> tuple:
-        """AI decision making logic"""
-        
-        # Initialize scoring
-        buy_score = 0
-        sell_score = 0
-        reasoning_points = []
+    def _load_history(self, symbol: str) -> pd.DataFrame:
+        """About 3 months of daily bars for one symbol"""
+        stock_code = symbol.replace('.SR', '')
         
-        # Trend analysis
-        if current_price > sma_20 > sma_50:
-            buy_score += 2
-            reasoning_points.append("Strong upward trend")
-        elif current_price < sma_20 < sma_50:
-            sell_score += 2
-            reasoning_points.append("Strong downward trend")
-        elif current_price > sma_20:
-            buy_score += 1
-            reasoning_points.append("Above short-term average")
-        else:
-            sell_score += 1
-            reasoning_points.append("Below short-term average")
+        # Fetch recent data (incremental refresh of the local store, read from disk)
+        if HISTORY_STORE_AVAILABLE:
+            return price_history_store.get_history(stock_code, days=92)
         
-        # Momentum analysis
-        if price_change_5d > 5:
-            buy_score += 1
-            reasoning_points.append("Strong recent momentum")
-        elif price_change_5d < -5:
-            sell_score += 1
-            reasoning_points.append("Weak recent momentum")
+        # Import yfinance here to avoid import issues
+        import yfinance as yf
         
-        if price_change_20d > 10:
-            buy_score += 1
-            reasoning_points.append("Strong monthly performance")
-        elif price_change_20d < -10:
-            sell_score += 1
-            reasoning_points.append("Weak monthly performance")
+        def download():
+            with get_limiter('yahoo').permit('history') if RATE_LIMITER_AVAILABLE else nullcontext():
+                return yf.Ticker(symbol).history(period="3mo")
         
-        # RSI analysis
-        if rsi < 30:
-            buy_score += 2
-            reasoning_points.append("Oversold condition (RSI < 30)")
-        elif rsi > 70:
-            sell_score += 2
-            reasoning_points.append("Overbought condition (RSI > 70)")
-        elif rsi < 50:
-            buy_score += 0.5
-        else:
-            sell_score += 0.5
+        if SINGLE_FLIGHT_AVAILABLE:
+            return flight_group('history').do((symbol, '3mo'), download)
+        return download()
+    
+    @staticmethod
+    def _last_bar_key(data: pd.DataFrame) -> str:
+        """Identify the newest bar; an intraday revision of today's bar changes the close"""
+        return f"{pd.Timestamp(data.index[-1]).isoformat()}|{float(data['Close'].iloc[-1]):.4f}"
+    
+    def _signals_from_histories(self, histories: Dict[str, pd.DataFrame], stocks_db: Dict) -> Dict[str, AISignal]:
+        """Serve cached signals where no new bar arrived, batch-compute the rest"""
+        signals = {}
+        pending = {}
+        bar_keys = {}
         
-        # Volume analysis
-        if volume_ratio > 1.5:
-            if buy_score > sell_score:
-                buy_score += 1
-                reasoning_points.append("High volume supporting trend")
+        for symbol, data in histories.items():
+            # One cache entry per symbol, reused until a new bar arrives or cache_duration passes
+            bar_keys[symbol] = self._last_bar_key(data)
+            cached = self.signals_cache.get('ai_signals', symbol) if self.signals_cache is not None else None
+            if cached is not None and cached[0] == bar_keys[symbol]:
+                signals[symbol] = cached[1]
             else:
-                sell_score += 1
-                reasoning_points.append("High volume supporting trend")
-        
-        # Volatility consideration
-        if volatility > 20:
-            # High volatility reduces confidence
-            buy_score *= 0.8
-            sell_score *= 0.8
-            reasoning_points.append("High volatility increases risk")
+                pending[symbol] = data
         
-        # Make decision
-        total_score = buy_score + sell_score
-        if total_score == 0:
-            signal_type = 'HOLD'
-            confidence = 0.5
-        elif buy_score > sell_score:
-            signal_type = 'BUY'
-            confidence = min(0.95, 0.5 + (buy_score / (total_score * 2)) * 0.5)
-        else:
-            signal_type = 'SELL'
-            confidence = min(0.95, 0.5 + (sell_score / (total_score * 2)) * 0.5)
+        if pending:
+            names = {
+                symbol: stocks_db.get(symbol.replace('.SR', ''), {}).get('name_en', 'Unknown Company')
+                for symbol in pending
+            }
+            computed = self._analyze_batch(pending, names)
+            for symbol, signal in computed.items():
+                if self.signals_cache is not None:
+                    self.signals_cache.set('ai_signals', symbol, (bar_keys[symbol], signal))
+            signals.update(computed)
         
-        # If scores are close, default to HOLD
-        if abs(buy_score - sell_score) < 1:
-            signal_type = 'HOLD'
-            confidence = 0.6
-        
-        reasoning = "; ".join(reasoning_points[:3])  # Top 3 reasons
+        return signals
+    
+    def _generate_single_signal(self, symbol: str, stocks_db: Dict) -> Optional[AISignal]:
+        """Generate signal for a single stock"""
+        signals = self.generate_signals([symbol], stocks_db)
+        return signals[0] if signals else None
+    
+    def _analyze_batch(self, histories: Dict[str, pd.DataFrame], names: Dict[str, str]) -> Dict[str, AISignal]:
+        """Analyze a (dates x symbols) panel and build one AISignal per symbol"""
+        close, volume = panel_from_histories(histories)
+        result = compute_signals(close.to_numpy(dtype=np.float64), volume.to_numpy(dtype=np.float64))
+        timestamp = datetime.now()
         
-        return signal_type, confidence, reasoning
+        signals = {}
+        for i, symbol in enumerate(close.columns):
+            if not result['valid'][i]:
+                continue
+            signals[symbol] = AISignal(
+                symbol=symbol,
+                company_name=names.get(symbol, 'Unknown Company'),
+                signal_type=result['signal_type'][i],
+                confidence=float(result['confidence'][i]),
+                predicted_price=float(result['predicted_price'][i]),
+                current_price=float(result['current_price'][i]),
+                expected_return=float(result['expected_return'][i]),
+                risk_level=result['risk_level'][i],
+                reasoning=result['reasoning'][i],
+                timestamp=timestamp
+            )
+        return signals
+    
+    def _analyze_stock_data(self, data: pd.DataFrame, symbol: str, company_name: str) -> AISignal:
+        """Analyze stock data and generate AI signal"""
+        return self._analyze_batch({symbol: data}, {symbol: company_name})[symbol]
 
 # Global AI engine instance
 ai_engine = SimpleAIEngine()
 
-def get_ai_signals(symbols: List[str], stocks_db: Dict) -> List[AISignal]:
+def get_ai_signals(symbols: List[str], stocks_db: Dict, timed_out: Optional[List[str]] = None) -> List[AISignal]:
     """Main function to get AI signals - used by the main app"""
-    return ai_engine.generate_signals(symbols, stocks_db)
+    return ai_engine.generate_signals(symbols, stocks_db, timed_out=timed_out)
+
+def iter_ai_signals(symbols: List[str], stocks_db: Dict,
+                    timed_out: Optional[List[str]] = None) -> Iterator[List[AISignal]]:
+    """Stream AI signals in batches as each symbol's history arrives"""
+    return ai_engine.iter_signals(symbols, stocks_db, timed_out=timed_out)
 
 # Test function
 if __name__ == "__main__":
@@ -12,6 +12,9 @@ import time
 from datetime import datetime
 import logging
 
+from core.rate_limiter import get_limiter, pool_size
+from core.http_transport import http_transport
+
 logger = logging.getLogger(__name__)
 
 class AlternativeDataSources:
@@ -20,6 +23,7 @@ class AlternativeDataSources:
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        http_transport.mount(self.session)
         
         # Saudi major stocks for fast loading
         self.major_saudi_stocks = {
@@ -37,8 +41,8 @@ class AlternativeDataSources:
             '1322': {'name': 'AMAK', 'yahoo': '1322.SR'}
         }
 
-    def get_yahoo_data_fast(self, symbols, max_workers=10):
-        """Get data from Yahoo Finance with concurrent requests"""
+    def get_yahoo_data_fast(self, symbols, max_workers=None):
+        """Get data from Yahoo Finance with concurrent requests paced by the shared Yahoo limiter"""
         start_time = time.time()
         results = {}
         
@@ -47,8 +51,8 @@ class AlternativeDataSources:
             try:
                 yahoo_symbol = data['yahoo']
                 ticker = yf.Ticker(yahoo_symbol)
-                hist = ticker.history(period="2d")
-                info = ticker.info
+                with get_limiter('yahoo').permit('history'):
+                    hist = ticker.history(period="2d")
                 
                 if not hist.empty:
                     current_price = hist['Close'].iloc[-1]
@@ -69,7 +73,7 @@ class AlternativeDataSources:
                 logger.warning(f"Failed to fetch {symbol}: {e}")
                 return symbol, None
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or pool_size('yahoo')) as executor:
             future_to_symbol = {
                 executor.submit(fetch_single_stock, item): item[0] 
                 for item in symbols.items()
@@ -135,7 +139,8 @@ class AlternativeDataSources:
             yahoo_symbol = self.major_saudi_stocks[symbol]['yahoo']
             try:
                 ticker = yf.Ticker(yahoo_symbol)
-                hist = ticker.history(period="2d")
+                with get_limiter('yahoo').permit('history'):
+                    hist = ticker.history(period="2d")
                 
                 if not hist.empty:
                     current_price = hist['Close'].iloc[-1]
@@ -95,6 +95,7 @@ import plotly.express as px
 from datetime import datetime, timedelta
 import io
 from pathlib import Path
+from contextlib import nullcontext
 import random
 import warnings
 import os
@@ -138,6 +139,70 @@ except ImportError as e:
         """Fallback function when instant_market_data import fails"""
         return {}
 
+# Shared tiered cache: stale quotes are served instantly while a background refresh runs
+try:
+    from core.tiered_cache import tiered_cache
+    TIERED_CACHE_AVAILABLE = True
+except ImportError:
+    TIERED_CACHE_AVAILABLE = False
+
+# Market-hours refresh schedule (config/fetcher_config.json)
+try:
+    from core.refresh_scheduler import market_scheduler
+    SCHEDULER_AVAILABLE = True
+except ImportError:
+    SCHEDULER_AVAILABLE = False
+
+# Snapshots published by market_data_daemon.py - sessions only read them
+try:
+    from core.snapshot_channel import market_channel
+    SNAPSHOT_CHANNEL_AVAILABLE = True
+except ImportError:
+    SNAPSHOT_CHANNEL_AVAILABLE = False
+
+# Per-symbol price columns the daemon mirrors into shared memory (zero-copy NumPy views)
+try:
+    from core.shared_snapshot import get_shared_reader
+    SHARED_SNAPSHOT_AVAILABLE = True
+except ImportError:
+    SHARED_SNAPSHOT_AVAILABLE = False
+
+# Market cap / PE / 52-week fields, refreshed daily in the background
+try:
+    from core.fundamentals_store import fundamentals_store
+    FUNDAMENTALS_AVAILABLE = True
+except ImportError:
+    FUNDAMENTALS_AVAILABLE = False
+
+# Official company list parsed once per file change, shared with the fetchers
+try:
+    from core.symbol_master import symbol_master
+    from core.stock_search import get_search_index
+    SYMBOL_MASTER_AVAILABLE = True
+except ImportError:
+    SYMBOL_MASTER_AVAILABLE = False
+
+# Shared per-source pacing for direct upstream calls
+try:
+    from core.rate_limiter import get_limiter
+    RATE_LIMITER_AVAILABLE = True
+except ImportError:
+    RATE_LIMITER_AVAILABLE = False
+
+
+def yahoo_permit(endpoint: str):
+    """Permit from the shared Yahoo limiter (no pacing when core/ is unavailable)"""
+    return get_limiter('yahoo').permit(endpoint) if RATE_LIMITER_AVAILABLE else nullcontext()
+
+# Per-source fetch latency / outcome metrics; the daemon exports its own to METRICS_FILE
+try:
+    from core.metrics import fetch_metrics, FetchMetrics, parse_text, METRICS_FILE
+    METRICS_AVAILABLE = True
+except ImportError:
+    METRICS_AVAILABLE = False
+
+DAEMON_GRACE_SECONDS = 120  # a sweep of the whole market may run past the cycle boundary
+
 # Import performance optimization modules
 import concurrent.futures
 import threading
@@ -145,7 +210,7 @@ import asyncio
 
 # Try to import AI features
 try:
-    from ai_engine.simple_ai import get_ai_signals
+    from ai_engine.simple_ai import get_ai_signals, iter_ai_signals
     AI_AVAILABLE = True
 except ImportError:
     AI_AVAILABLE = False
@@ -218,6 +283,77 @@ if not AI_AVAILABLE:
         return signals
         
         return signals
+    
+    def iter_ai_signals(portfolio_symbols, stocks_db, timed_out=None):
+        yield get_ai_signals(portfolio_symbols, stocks_db)
+
+
+def signal_card(signal, stocks_db):
+    """Display dict for an AI signal (engine AISignal or the demo dict)"""
+    if isinstance(signal, dict):
+        return signal
+    clean_symbol = signal.symbol.replace('.SR', '')
+    company = signal.company_name or stocks_db.get(clean_symbol, {}).get('name_en', clean_symbol)
+    return {
+        'symbol': clean_symbol,
+        'company': company,
+        'signal': signal.signal_type,
+        'confidence': signal.confidence * 100,
+        'reason': signal.reasoning
+    }
+
+def render_signal_columns(ai_signals):
+    """BUY / SELL / HOLD cards side by side"""
+    buy_signals = [s for s in ai_signals if s['signal'] == 'BUY']
+    sell_signals = [s for s in ai_signals if s['signal'] == 'SELL']
+    hold_signals = [s for s in ai_signals if s['signal'] == 'HOLD']
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.markdown("**  BUY Signals**")
+        if buy_signals:
+            for signal in buy_signals:
+                st.markdown(f"""
+                <div style="background: #28a745; padding: 0.8rem; border-radius: 8px; color: white; margin: 0.3rem 0;">
+                    <h5 style="margin: 0;">[UP] {signal['symbol']}</h5>
+                    <p style="margin: 0.2rem 0; font-size: 0.8rem;">{signal['company'][:20]}...</p>
+                    <p style="margin: 0.2rem 0; font-size: 0.85rem;">Confidence: {signal['confidence']:.0f}%</p>
+                    <p style="margin: 0; font-size: 0.8rem; opacity: 0.9;">{signal['reason']}</p>
+                </div>
+                """, unsafe_allow_html=True)
+        else:
+            st.info("No BUY signals")
+    
+    with col2:
+        st.markdown("**  SELL Signals**")
+        if sell_signals:
+            for signal in sell_signals:
+                st.markdown(f"""
+                <div style="background: #dc3545; padding: 0.8rem; border-radius: 8px; color: white; margin: 0.3rem 0;">
+                    <h5 style="margin: 0;">[DOWN] {signal['symbol']}</h5>
+                    <p style="margin: 0.2rem 0; font-size: 0.8rem;">{signal['company'][:20]}...</p>
+                    <p style="margin: 0.2rem 0; font-size: 0.85rem;">Confidence: {signal['confidence']:.0f}%</p>
+                    <p style="margin: 0; font-size: 0.8rem; opacity: 0.9;">{signal['reason']}</p>
+                </div>
+                """, unsafe_allow_html=True)
+        else:
+            st.info("No SELL signals")
+    
+    with col3:
+        st.markdown("**  HOLD Signals**")
+        if hold_signals:
+            for signal in hold_signals:
+                st.markdown(f"""
+                <div style="background: #ffc107; padding: 0.8rem; border-radius: 8px; color: black; margin: 0.3rem 0;">
+                    <h5 style="margin: 0;">  {signal['symbol']}</h5>
+                    <p style="margin: 0.2rem 0; font-size: 0.8rem;">{signal['company'][:20]}...</p>
+                    <p style="margin: 0.2rem 0; font-size: 0.85rem;">Confidence: {signal['confidence']:.0f}%</p>
+                    <p style="margin: 0; font-size: 0.8rem; opacity: 0.8;">{signal['reason']}</p>
+                </div>
+                """, unsafe_allow_html=True)
+        else:
+            st.info("No HOLD signals")
 
 # Broker name standardization function
 def normalize_broker_name(broker_name):
@@ -350,7 +486,6 @@ def save_portfolio(portfolio):
         st.error(f"Error saving portfolio: {e}")
         return False
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes, then refresh
 def load_saudi_stocks_database():
     """Load Saudi stocks database with OFFICIAL 259-stock coverage (User-verified count)"""
     import sys
@@ -359,8 +494,12 @@ def load_saudi_stocks_database():
     # Get the root directory (parent of apps)
     root_dir = os.path.dirname(os.path.dirname(__file__))
     
+    # FIRST PRIORITY: shared symbol master (no re-parsing unless the file changed)
+    if SYMBOL_MASTER_AVAILABLE and len(symbol_master):
+        return symbol_master.as_dict()
+    
     try:
-        # FIRST PRIORITY: Load from our complete JSON database
+        # SECOND PRIORITY: Load from our complete JSON database
         data_path = os.path.join(root_dir, 'data', 'saudi_stocks_database.json')
         with open(data_path, 'r', encoding='utf-8') as f:
             stocks = json.load(f)
@@ -408,16 +547,91 @@ def load_saudi_stocks_database():
     }
 
 # Cache for stock price data to improve performance and reduce API calls
-@st.cache_data(ttl=300)  # Cache for 5 minutes
+@st.cache_data(max_entries=4096)  # cache_key rolls over each refresh cycle
 def get_cached_stock_data(symbol, cache_key):
     """Get cached stock data to avoid excessive API calls"""
     return get_stock_data_internal(symbol, None)
 
+def read_daemon_snapshot():
+    """Latest market data daemon snapshot if it is current for this refresh cycle, else None"""
+    if not SNAPSHOT_CHANNEL_AVAILABLE:
+        return None
+    fresh_for = market_scheduler.fresh_for() if SCHEDULER_AVAILABLE else 300
+    return market_channel.read_latest(max_age=fresh_for + DAEMON_GRACE_SECONDS)
+
+def read_shared_prices(symbols):
+    """{symbol: quote} for the symbols found in the daemon's shared-memory block, {} if none is current"""
+    reader = get_shared_reader() if SHARED_SNAPSHOT_AVAILABLE else None
+    view = reader.read() if reader else None
+    if view is None:
+        return {}
+    fresh_for = market_scheduler.fresh_for() if SCHEDULER_AVAILABLE else 300
+    if time.time() - view.published_at > fresh_for + DAEMON_GRACE_SECONDS:
+        return {}
+
+    rows = view.lookup(symbols)
+    prices = view.price[list(rows.values())].tolist()
+    changes = view.change_pct[list(rows.values())].tolist()
+    if not reader.still_valid(view):
+        return {}
+    source = f"Market data daemon (shared memory v{view.version})"
+    quotes = {code: {'current_price': price, 'change_pct': change, 'data_source': source}
+              for code, price, change in zip(rows, prices, changes)}
+    return {symbol: quotes[str(symbol).replace('.SR', '')] for symbol in symbols
+            if str(symbol).replace('.SR', '') in quotes}
+
+def get_shared_market_summary():
+    """Market summary from the daemon snapshot; fetches in-session only if no daemon is running"""
+    snapshot = read_daemon_snapshot()
+    if snapshot and snapshot['payload'].get('market_summary', {}).get('success'):
+        summary = dict(snapshot['payload']['market_summary'])
+        summary['total_stocks_fetched'] = summary.get('metadata', {}).get('total_stocks_processed')
+        summary['timestamp'] = datetime.fromtimestamp(snapshot['published_at']).strftime('%Y-%m-%d %H:%M:%S')
+        summary['data_source'] = f"Market data daemon (snapshot v{snapshot['version']})"
+        return summary
+    return get_market_summary()
+
+def format_live_quote(saudi_data):
+    """Quote fields used across the app from a get_stock_price result"""
+    return {
+        'current_price': saudi_data.get('current_price', 0),
+        'previous_close': saudi_data.get('previous_close', 0),
+        'change': saudi_data.get('change', 0),
+        'change_percent': saudi_data.get('change_percent', 0),
+        'volume': saudi_data.get('volume', 0),
+        'market_cap': saudi_data.get('market_cap', 0),
+        'pe_ratio': saudi_data.get('pe_ratio', 0),
+        'high_52week': saudi_data.get('high_52week', 0),
+        'low_52week': saudi_data.get('low_52week', 0),
+        'data_source': saudi_data.get('data_source', 'Saudi Exchange (Live)'),
+        'timestamp': saudi_data.get('timestamp'),
+        'success': True
+    }
+
 def get_stock_data(symbol, stocks_db=None):
     """Get stock data with enhanced information - prioritizing TASI/Saudi Exchange data"""
-    # Use caching with a time-based key to refresh every 5 minutes
-    import time
-    cache_key = int(time.time() // 300)  # Changes every 5 minutes
+    # Daemon snapshot first: no upstream request from this session
+    snapshot = read_daemon_snapshot()
+    if snapshot:
+        quote = snapshot['payload'].get('quotes', {}).get(str(symbol).replace('.SR', ''))
+        if quote:
+            return format_live_quote(quote)
+    
+    if TIERED_CACHE_AVAILABLE:
+        # Fresh until the next scheduled refresh, then the last good quote is served while it refreshes
+        return tiered_cache.get_or_load(
+            'quotes', str(symbol),
+            lambda: get_stock_data_internal(symbol, None),
+            should_cache=lambda data: bool(data and data.get('success')),
+            ttl=market_scheduler.fresh_for() if SCHEDULER_AVAILABLE else None
+        )
+    
+    # Cache key changes once per refresh cycle (frozen after the close)
+    if SCHEDULER_AVAILABLE:
+        cache_key = market_scheduler.session_key()
+    else:
+        import time
+        cache_key = int(time.time() // 300)  # Changes every 5 minutes
     return get_cached_stock_data(symbol, cache_key)
 
 def get_stock_data_internal(symbol, stocks_db=None):
@@ -429,20 +643,7 @@ def get_stock_data_internal(symbol, stocks_db=None):
                 saudi_data = get_stock_price(symbol)
                 if saudi_data and saudi_data.get('success'):
                     # Return live Saudi Exchange data
-                    return {
-                        'current_price': saudi_data.get('current_price', 0),
-                        'previous_close': saudi_data.get('previous_close', 0),
-                        'change': saudi_data.get('change', 0),
-                        'change_percent': saudi_data.get('change_percent', 0),
-                        'volume': saudi_data.get('volume', 0),
-                        'market_cap': saudi_data.get('market_cap', 0),
-                        'pe_ratio': saudi_data.get('pe_ratio', 0),
-                        'high_52week': saudi_data.get('high_52week', 0),
-                        'low_52week': saudi_data.get('low_52week', 0),
-                        'data_source': saudi_data.get('data_source', 'Saudi Exchange (Live)'),
-                        'timestamp': saudi_data.get('timestamp'),
-                        'success': True
-                    }
+                    return format_live_quote(saudi_data)
                 else:
                     st.warning(f"Saudi Exchange: {saudi_data.get('error', 'Unknown error')} for {symbol}")
             except Exception as e:
@@ -454,7 +655,8 @@ def get_stock_data_internal(symbol, stocks_db=None):
             ticker = yf.Ticker(stock_symbol)
             
             # Get historical data (more reliable than info)
-            hist = ticker.history(period="5d", interval="1d")
+            with yahoo_permit('history'):
+                hist = ticker.history(period="5d", interval="1d")
             
             if not hist.empty and len(hist) > 0:
                 current_price = float(hist['Close'].iloc[-1])
@@ -462,7 +664,7 @@ def get_stock_data_internal(symbol, stocks_db=None):
                 volume = int(hist['Volume'].iloc[-1]) if 'Volume' in hist.columns else 0
                 
                 # Get additional info
-                info = ticker.info
+                fundamentals = fundamentals_store.quote_fields(symbol) if FUNDAMENTALS_AVAILABLE else {}
                 
                 return {
                     'current_price': round(current_price, 2),
@@ -470,17 +672,18 @@ def get_stock_data_internal(symbol, stocks_db=None):
                     'change': round(current_price - previous_close, 2),
                     'change_percent': round(((current_price - previous_close) / previous_close) * 100, 2) if previous_close > 0 else 0,
                     'volume': volume,
-                    'market_cap': info.get('marketCap', 0),
-                    'pe_ratio': info.get('trailingPE', 0),
-                    'high_52week': info.get('fiftyTwoWeekHigh', 0),
-                    'low_52week': info.get('fiftyTwoWeekLow', 0),
+                    'market_cap': fundamentals.get('market_cap', 0),
+                    'pe_ratio': fundamentals.get('pe_ratio', 0),
+                    'high_52week': fundamentals.get('high_52week', 0),
+                    'low_52week': fundamentals.get('low_52week', 0),
                     'data_source': 'Yahoo Finance - Live Historical Data',
                     'timestamp': datetime.now().isoformat(),
                     'success': True
                 }
             
             # Try info data as fallback
-            info = ticker.info
+            with yahoo_permit('quote'):
+                info = ticker.info
             current_price = None
             
             for price_field in ['currentPrice', 'regularMarketPrice', 'previousClose', 'ask', 'bid']:
@@ -601,10 +804,11 @@ def calculate_portfolio_value(portfolio, stocks_db=None):
     total_cost = 0
     total_gain_loss = 0
     portfolio_details = []
+    shared_prices = read_shared_prices([stock['symbol'] for stock in portfolio])
     
     for stock in portfolio:
         symbol = stock['symbol']
-        stock_data = get_stock_data(symbol, stocks_db)
+        stock_data = shared_prices.get(symbol) or get_stock_data(symbol, stocks_db)
         current_price = stock_data.get('current_price', 0)
         quantity = stock.get('quantity', 0)
         purchase_price = stock.get('purchase_price', 0)
@@ -644,6 +848,7 @@ def calculate_portfolio_value_fast(portfolio, stocks_db=None):
     total_cost = 0
     total_value = 0
     portfolio_details = []
+    shared_prices = read_shared_prices([stock['symbol'] for stock in portfolio])
     
     for stock in portfolio:
         symbol = stock['symbol']
@@ -651,7 +856,7 @@ def calculate_portfolio_value_fast(portfolio, stocks_db=None):
         purchase_price = stock.get('purchase_price', 0)
         
         # Use the same accurate price data as the regular function
-        stock_data = get_stock_data(symbol, stocks_db)
+        stock_data = shared_prices.get(symbol) or get_stock_data(symbol, stocks_db)
         current_price = stock_data.get('current_price', 0)
         
         current_value = current_price * quantity
@@ -701,7 +906,8 @@ def display_top_gainers_losers():
     
     # Get market data using optimized approach
     with st.spinner(" Loading market data..."):
-        market_data = get_instant_market_data()
+        snapshot_summary = get_shared_market_summary() if read_daemon_snapshot() else None
+        market_data = snapshot_summary or get_instant_market_data()
         
         if market_data and market_data.get('success'):
             st.success(f" Market data loaded instantly! ({market_data.get('total_stocks_fetched', 'unknown')} stocks)")
@@ -774,7 +980,7 @@ def display_top_gainers_losers():
             with st.spinner(" Trying alternative data sources..."):
                 if SAUDI_EXCHANGE_AVAILABLE:
                     try:
-                        market_data = get_market_summary()
+                        market_data = get_shared_market_summary()
                         if market_data and market_data.get('success'):
                             st.info(" Market data loaded from alternative source")
                             # Display basic tables
@@ -827,6 +1033,115 @@ def display_top_gainers_losers():
                 st.warning("Please enter a stock symbol")
 
 
+def _samples(samples, name, label):
+    """{label value: sample value} for one metric family from parsed Prometheus samples"""
+    return {labels.get(label, ''): value for metric, labels, value in samples if metric == name}
+
+def display_data_health():
+    """Upstream latency, success rates, cache hit ratios and snapshot age - spot a slow Yahoo before users do"""
+    st.markdown("## Data Health")
+    st.caption("صحة البيانات | Fetch latency, failures, cache and snapshot freshness")
+    if not METRICS_AVAILABLE:
+        st.warning("Metrics module not available. Please ensure core/metrics.py is present.")
+        return
+
+    daemon_text = None
+    if os.path.exists(METRICS_FILE):
+        with open(METRICS_FILE, 'r', encoding='utf-8') as f:
+            daemon_text = f.read()
+    views = ["Market data daemon", "This session"] if daemon_text else ["This session"]
+    view = st.radio("Metrics from", views, horizontal=True, key="health_view")
+    if view == "Market data daemon":
+        metrics, text = FetchMetrics.from_text(daemon_text), daemon_text
+        st.caption(f"Exported by market_data_daemon.py {time.time() - os.path.getmtime(METRICS_FILE):.0f}s ago")
+    else:
+        metrics, text = fetch_metrics, fetch_metrics.render()
+        if not daemon_text:
+            st.caption("No daemon metrics file found - showing fetches made by this dashboard process")
+    samples = parse_text(text)
+    rows = metrics.endpoints()
+
+    # Headline: freshness, Yahoo health, cache effectiveness
+    published_at = market_channel.published_at() if SNAPSHOT_CHANNEL_AVAILABLE else None
+    yahoo_rows = [r for r in rows if r['source'] == 'yahoo' and r['endpoint'] not in ('market_data', 'market_summary')]
+    yahoo_calls = sum(r['calls'] for r in yahoo_rows)
+    yahoo_failures = sum(r['failures'] for r in yahoo_rows)
+    slowest = max((r for r in yahoo_rows if r['p95'] is not None), key=lambda r: r['p95'], default=None)
+    cache_ratio = _samples(samples, 'saudi_cache_hit_ratio', 'namespace').get('all')
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Snapshot Age", f"{time.time() - published_at:.0f}s" if published_at else "No daemon")
+    with col2:
+        st.metric("Yahoo Success Rate",
+                  f"{(yahoo_calls - yahoo_failures) / yahoo_calls * 100:.1f}%" if yahoo_calls else "N/A",
+                  help=f"{yahoo_calls:,} calls, {yahoo_failures:,} failed")
+    with col3:
+        st.metric("Yahoo p95 Latency", f"{slowest['p95'] * 1000:.0f} ms" if slowest else "N/A",
+                  help=f"Slowest endpoint: {slowest['endpoint']}" if slowest else None)
+    with col4:
+        st.metric("Cache Hit Ratio", f"{cache_ratio * 100:.1f}%" if cache_ratio is not None else "N/A")
+
+    target = get_limiter('yahoo').target_latency if RATE_LIMITER_AVAILABLE else None
+    if slowest and target and slowest['p95'] > target:
+        st.warning(f"Yahoo is slowing down: p95 of '{slowest['endpoint']}' is {slowest['p95']:.1f}s "
+                   f"(limiter target {target:.1f}s)")
+    if yahoo_calls and yahoo_failures / yahoo_calls > 0.05:
+        st.warning(f"Yahoo failures at {yahoo_failures / yahoo_calls * 100:.1f}% of calls")
+
+    st.markdown("### Latency by Source and Endpoint")
+    if not rows:
+        st.info("No fetches recorded yet")
+    else:
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+        st.dataframe(pd.DataFrame([{
+            'Source': r['source'], 'Endpoint': r['endpoint'], 'Calls': r['calls'], 'Failures': r['failures'],
+            'Success %': round(r['success_rate'] * 100, 1) if r['success_rate'] is not None else None,
+            'p50 ms': ms(r['p50']), 'p95 ms': ms(r['p95']), 'p99 ms': ms(r['p99']), 'Mean ms': ms(r['mean']),
+            'Quotes OK': r['items_ok'], 'Quotes Failed': r['items_failed'],
+        } for r in rows]), use_container_width=True, hide_index=True)
+
+        choice = st.selectbox("Latency histogram", [f"{r['source']} / {r['endpoint']}" for r in rows],
+                              key="health_histogram")
+        source, endpoint = choice.split(' / ', 1)
+        histogram = metrics.histogram(source, endpoint)
+        if histogram is not None:
+            labels = [f"≤ {b:g}s" for b in histogram.buckets] + [f"> {histogram.buckets[-1]:g}s"]
+            fig = go.Figure(go.Bar(x=labels, y=histogram.counts))
+            fig.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10), xaxis_title="Latency",
+                              yaxis_title="Calls")
+            st.plotly_chart(fig, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### Cache")
+        ratios = _samples(samples, 'saudi_cache_hit_ratio', 'namespace')
+        if ratios:
+            st.dataframe(pd.DataFrame([{'Namespace': ns, 'Hit Ratio %': round(ratio * 100, 1)}
+                                       for ns, ratio in ratios.items()]), use_container_width=True, hide_index=True)
+        else:
+            st.info("No cache lookups recorded")
+    with col2:
+        st.markdown("### Rate Limiters & Breakers")
+        concurrency = _samples(samples, 'saudi_limiter_concurrency', 'source')
+        rates = _samples(samples, 'saudi_limiter_rate', 'source')
+        states = {0: 'closed', 1: 'half open', 2: 'open'}
+        breakers = {source: states.get(int(value), '?')
+                    for source, value in _samples(samples, 'saudi_breaker_state', 'source').items()}
+        sources = sorted(set(concurrency) | set(breakers))
+        if sources:
+            st.dataframe(pd.DataFrame([{'Source': source, 'Concurrency': concurrency.get(source),
+                                        'Rate (req/s)': rates.get(source), 'Breaker': breakers.get(source, '-')}
+                                       for source in sources]), use_container_width=True, hide_index=True)
+        else:
+            st.info("No limiter activity recorded")
+
+    with st.expander("Prometheus metrics"):
+        st.code(text, language="text")
+        st.download_button("Download metrics", text, file_name="saudi_market.prom", mime="text/plain")
+
+
 def main():
     """Main application function"""
     
@@ -886,6 +1201,8 @@ def main():
         # Add cache refresh button
         if st.button("Refresh Database", help="Clear cache and reload stock database"):
             st.cache_data.clear()
+            if TIERED_CACHE_AVAILABLE:
+                tiered_cache.invalidate('quotes')
             st.rerun()
             
         selected_page = st.radio(
@@ -902,6 +1219,7 @@ def main():
                 "Risk Management",
                 "Dividend Tracker",
                 "Import/Export Data",
+                "Data Health",
                 "Color Bot",
                 "Theme Customizer"
             ],
@@ -1945,61 +2263,23 @@ def main():
         if portfolio:
             try:
                 portfolio_symbols = [f"{stock['symbol']}.SR" for stock in portfolio]
-                ai_signals = get_ai_signals(portfolio_symbols, stocks_db)
+                
+                # Signals render batch by batch as histories arrive; slow symbols are listed, not dropped
+                ai_signals, timed_out = [], []
+                signals_area = st.empty()
+                with st.spinner("Downloading price histories..."):
+                    for batch in iter_ai_signals(portfolio_symbols, stocks_db, timed_out=timed_out):
+                        ai_signals.extend(signal_card(signal, stocks_db) for signal in batch)
+                        with signals_area.container():
+                            render_signal_columns(ai_signals)
+                if timed_out:
+                    st.warning(f"No signal for {len(timed_out)} symbols (history download timed out): "
+                               f"{', '.join(s.replace('.SR', '') for s in timed_out)}")
                 
                 if ai_signals:
-                    # Create tabs for different signal types
                     buy_signals = [s for s in ai_signals if s['signal'] == 'BUY']
                     sell_signals = [s for s in ai_signals if s['signal'] == 'SELL']
-                    hold_signals = [s for s in ai_signals if s['signal'] == 'HOLD']
-                    
-                    col1, col2, col3 = st.columns(3)
                     
-                    with col1:
-                        st.markdown("**  BUY Signals**")
-                        if buy_signals:
-                            for signal in buy_signals:
-                                st.markdown(f"""
-                                <div style="background: #28a745; padding: 0.8rem; border-radius: 8px; color: white; margin: 0.3rem 0;">
-                                    <h5 style="margin: 0;">[UP] {signal['symbol']}</h5>
-                                    <p style="margin: 0.2rem 0; font-size: 0.8rem;">{signal['company'][:20]}...</p>
-                                    <p style="margin: 0.2rem 0; font-size: 0.85rem;">Confidence: {signal['confidence']:.0f}%</p>
-                                    <p style="margin: 0; font-size: 0.8rem; opacity: 0.9;">{signal['reason']}</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                        else:
-                            st.info("No BUY signals")
-                    
-                    with col2:
-                        st.markdown("**  SELL Signals**")
-                        if sell_signals:
-                            for signal in sell_signals:
-                                st.markdown(f"""
-                                <div style="background: #dc3545; padding: 0.8rem; border-radius: 8px; color: white; margin: 0.3rem 0;">
-                                    <h5 style="margin: 0;">[DOWN] {signal['symbol']}</h5>
-                                    <p style="margin: 0.2rem 0; font-size: 0.8rem;">{signal['company'][:20]}...</p>
-                                    <p style="margin: 0.2rem 0; font-size: 0.85rem;">Confidence: {signal['confidence']:.0f}%</p>
-                                    <p style="margin: 0; font-size: 0.8rem; opacity: 0.9;">{signal['reason']}</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                        else:
-                            st.info("No SELL signals")
-                    
-                    with col3:
-                        st.markdown("**  HOLD Signals**")
-                        if hold_signals:
-                            for signal in hold_signals:
-                                st.markdown(f"""
-                                <div style="background: #ffc107; padding: 0.8rem; border-radius: 8px; color: black; margin: 0.3rem 0;">
-                                    <h5 style="margin: 0;">  {signal['symbol']}</h5>
-                                    <p style="margin: 0.2rem 0; font-size: 0.8rem;">{signal['company'][:20]}...</p>
-                                    <p style="margin: 0.2rem 0; font-size: 0.85rem;">Confidence: {signal['confidence']:.0f}%</p>
-                                    <p style="margin: 0; font-size: 0.8rem; opacity: 0.8;">{signal['reason']}</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                        else:
-                            st.info("No HOLD signals")
-                            
                     # Summary statistics
                     st.markdown("---")
                     st.markdown("### [CHART] Signal Summary")
@@ -2487,7 +2767,7 @@ def main():
         if SAUDI_EXCHANGE_AVAILABLE:
             with st.spinner(" Fetching comprehensive market data..."):
                 try:
-                    market_summary = get_market_summary()
+                    market_summary = get_shared_market_summary()
                     
                     if market_summary and market_summary.get('success'):
                         all_stocks_data = market_summary.get('all_stocks', [])
@@ -3121,16 +3401,24 @@ def main():
             # Smart search with filtering
             search_query = st.text_input(
                 "Type stock symbol or company name:",
-                placeholder="e.g., 2222, Aramco, Al Rajhi, Saudi Basic..."
+                placeholder="e.g., 2222, Aramco, Al Rajhi, الراجحي..."
             )
             
-            # Filter options based on search query
+            # Filter options based on search query (ranked index lookup, also matches Arabic names)
             if search_query:
-                query_lower = search_query.lower()
-                filtered_options = [
-                    opt for opt in search_options
-                    if query_lower in opt['search_text']
-                ]
+                if SYMBOL_MASTER_AVAILABLE and len(symbol_master):
+                    options_by_symbol = {opt['symbol']: opt for opt in search_options}
+                    filtered_options = [
+                        options_by_symbol[match['symbol']]
+                        for match in get_search_index().search(search_query, limit=50)
+                        if match['symbol'] in options_by_symbol
+                    ]
+                else:
+                    query_lower = search_query.lower()
+                    filtered_options = [
+                        opt for opt in search_options
+                        if query_lower in opt['search_text']
+                    ]
                 
                 if filtered_options:
                     # Show matching results
@@ -4349,6 +4637,9 @@ def main():
                 st.error(f"[ERROR] Error reading file: {e}")
                 st.info("[IDEA] Please ensure your CSV file is properly formatted.")
 
+    elif selected_page == "Data Health":
+        display_data_health()
+
     elif selected_page == "Color Bot":
         st.markdown("## 🎨 Color Bot Assistant")
         st.caption("🤖 Your intelligent color companion for perfect theme customization")
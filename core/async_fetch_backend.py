@@ -0,0 +1,266 @@
+"""
+Async Fetch Backend for Saudi Stock Market App
+Runs hundreds of in-flight quote requests on one event loop instead of hundreds of threads
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+import logging
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import numpy as np
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    from .bulk_quote_engine import BulkQuotes
+    from .refresh_scheduler import market_scheduler
+    from .rate_limiter import get_limiter, THROTTLED, TIMEOUT, ERROR, OK, SLOW
+    from .http_transport import http_transport, request_key, CassetteMiss, REPLAY
+except ImportError:
+    from bulk_quote_engine import BulkQuotes
+    from refresh_scheduler import market_scheduler
+    from rate_limiter import get_limiter, THROTTLED, TIMEOUT, ERROR, OK, SLOW
+    from http_transport import http_transport, request_key, CassetteMiss, REPLAY
+
+logger = logging.getLogger(__name__)
+
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class AsyncFetchBackend:
+    """
+    asyncio + aiohttp quote backend:
+    1. One shared aiohttp.ClientSession living on a background event loop
+    2. Per-host semaphore bounding in-flight requests
+    3. Per-request timeout and retry with jittered exponential backoff
+    4. Optional shared rate limiter: requests take permits from the same AIMD
+       limiter as the thread-based fetchers
+    5. Optional HTTP transport: responses recorded to / replayed from its cassette
+    """
+
+    def __init__(self, base_url: str = YAHOO_CHART_URL, max_per_host: int = 32,
+                 timeout: float = 10.0, max_retries: int = 3, backoff_base: float = 0.25,
+                 chart_range: str = "5d", limiter=None, transport=None):
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("aiohttp is required for the async fetch backend")
+        self.base_url = base_url.rstrip('/')
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.chart_range = chart_range
+        self.limiter = limiter
+        self.transport = transport
+
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+
+        # Simple counters for diagnostics and tests
+        self.request_count = 0
+        self.retry_count = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+
+    # ------------------------------------------------------------------ loop
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the background event loop thread on first use"""
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=self._loop.run_forever, daemon=True,
+                                                     name="async-fetch-backend")
+                self._loop_thread.start()
+        return self._loop
+
+    def _run(self, coro):
+        """Run a coroutine on the backend loop from synchronous code"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    async def _get_session(self) -> "aiohttp.ClientSession":
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.max_per_host, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
+            )
+        return self._session
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return self._semaphores[host]
+
+    def close(self):
+        """Close the shared session and stop the background loop"""
+        if self._loop is None:
+            return
+        if self._session is not None:
+            self._run(self._session.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join(timeout=5)
+        self._loop.close()
+        self._loop = None
+        self._session = None
+        self._semaphores = {}
+
+    # --------------------------------------------------------------- fetching
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, self.backoff_base * (2 ** attempt))
+
+    async def _get(self, url: str, params: Optional[Dict]):
+        """(status, parsed body for a 200) from the network, or from the transport's cassette"""
+        transport = self.transport
+        key = request_key('GET', url, params) if transport is not None and not transport.live else None
+        if key and transport.mode == REPLAY:
+            interaction = await transport.replay_async(key)
+            return interaction.status, json.loads(interaction.content) if interaction.status == 200 else None
+
+        session = await self._get_session()
+        async with session.get(url, params=params) as response:
+            content = await response.read()
+            if key:
+                transport.record(key, response.status, response.headers, content, str(response.url))
+            return response.status, json.loads(content) if response.status == 200 else None
+
+    async def get_json(self, url: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """GET a JSON document with per-host concurrency limit, timeout and retries"""
+        for attempt in range(self.max_retries + 1):
+            if self.limiter:
+                await self.limiter.acquire_async()
+            outcome, started = ERROR, time.perf_counter()
+            async with self._semaphore(url):
+                self._in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self._in_flight)
+                self.request_count += 1
+                try:
+                    status, payload = await self._get(url, params)
+                    if status == 200:
+                        outcome = OK
+                        return payload
+                    if status in (429, 503):
+                        outcome = THROTTLED
+                    if status not in RETRY_STATUSES:
+                        logger.debug(f"Non-retryable status {status} for {url}")
+                        return None
+                    error = f"HTTP {status}"
+                except CassetteMiss as e:
+                    logger.debug(str(e))
+                    return None
+                except ValueError as e:   # 200 with a non-JSON body (HTML error or consent page)
+                    logger.warning(f"Invalid JSON from {url}: {e}")
+                    return None
+                except asyncio.TimeoutError as e:
+                    outcome = TIMEOUT
+                    error = str(e) or type(e).__name__
+                except (aiohttp.ClientError, OSError) as e:   # OSError: injected connection errors
+                    error = str(e) or type(e).__name__
+                finally:
+                    self._in_flight -= 1
+                    if self.limiter:
+                        latency = time.perf_counter() - started
+                        if outcome == OK and latency > self.limiter.target_latency:
+                            outcome = SLOW
+                        self.limiter.release(latency, outcome, 'chart')
+
+            if attempt < self.max_retries:
+                self.retry_count += 1
+                await asyncio.sleep(self._backoff(attempt))
+
+        logger.warning(f"Giving up on {url} after {self.max_retries + 1} attempts: {error}")
+        return None
+
+    @staticmethod
+    def parse_chart(symbol: str, payload: Optional[Dict]) -> Dict:
+        """Turn a Yahoo chart response into a quote dict"""
+        try:
+            result = payload['chart']['result'][0]
+            meta = result.get('meta', {})
+            quote = result.get('indicators', {}).get('quote', [{}])[0]
+            closes = [c for c in (quote.get('close') or []) if c is not None]
+            volumes = [v for v in (quote.get('volume') or []) if v is not None]
+
+            current_price = meta.get('regularMarketPrice') or (closes[-1] if closes else 0)
+            previous_close = closes[-2] if len(closes) >= 2 else (meta.get('chartPreviousClose') or current_price)
+            volume = meta.get('regularMarketVolume') or (volumes[-1] if volumes else 0)
+            if not current_price or current_price <= 0:
+                raise ValueError("No price data available")
+
+            change = current_price - previous_close
+            return {
+                'symbol': symbol,
+                'current_price': float(current_price),
+                'previous_close': float(previous_close),
+                'change': float(change),
+                'change_percent': float(change / previous_close * 100) if previous_close > 0 else 0.0,
+                'volume': int(volume),
+                'success': True,
+            }
+        except Exception as e:
+            return {'symbol': symbol, 'success': False, 'error': str(e) or 'Invalid chart response'}
+
+    async def fetch_quote_async(self, symbol: str) -> Dict:
+        clean_symbol = str(symbol).replace('.SR', '').strip()
+        url = f"{self.base_url}/{clean_symbol}.SR"
+        payload = await self.get_json(url, params={'range': self.chart_range, 'interval': '1d'})
+        return self.parse_chart(clean_symbol, payload)
+
+    async def fetch_quotes_async(self, symbols: List[str]) -> List[Dict]:
+        return await asyncio.gather(*(self.fetch_quote_async(s) for s in symbols))
+
+    def fetch_quotes(self, symbols: List[str]) -> List[Dict]:
+        """Fetch quote dicts for all symbols (blocking, order preserved)"""
+        return self._run(self.fetch_quotes_async(list(symbols)))
+
+    def fetch(self, symbols: List[str]) -> BulkQuotes:
+        """Fetch quotes as BulkQuotes - drop-in replacement for BulkQuoteEngine.fetch"""
+        start_time = time.time()
+        requests_before = self.request_count
+        quotes = self.fetch_quotes(symbols)
+
+        current = np.array([q.get('current_price', 0.0) for q in quotes], dtype=float)
+        previous = np.array([q.get('previous_close', 0.0) for q in quotes], dtype=float)
+        volume = np.array([q.get('volume', 0) for q in quotes], dtype=np.int64)
+
+        return BulkQuotes(
+            symbols=[q['symbol'] for q in quotes],
+            current_price=current,
+            previous_close=previous,
+            change_percent=np.array([q.get('change_percent', 0.0) for q in quotes], dtype=float),
+            volume=volume,
+            trading_value=current * volume,
+            success=np.array([q['success'] for q in quotes], dtype=bool),
+            fetch_time=time.time() - start_time,
+            request_count=self.request_count - requests_before,
+        )
+
+
+_async_backend: Optional[AsyncFetchBackend] = None
+
+
+def get_async_backend() -> AsyncFetchBackend:
+    """Shared async backend (created on first use so importing never starts a loop)"""
+    global _async_backend
+    if _async_backend is None:
+        # Retry and timeout settings from config/fetcher_config.json, pacing from the shared Yahoo limiter
+        limiter = get_limiter('yahoo')
+        _async_backend = AsyncFetchBackend(max_per_host=limiter.max_concurrency,
+                                           timeout=market_scheduler.timeout,
+                                           max_retries=market_scheduler.max_retries,
+                                           limiter=limiter, transport=http_transport)
+    return _async_backend
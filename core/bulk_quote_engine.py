@@ -0,0 +1,151 @@
+"""
+Bulk Quote Engine for Saudi Stock Market App
+Fetches the whole TASI universe with chunked multi-ticker downloads instead of per-symbol calls
+"""
+
+import time
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .rate_limiter import get_limiter
+    from .http_transport import http_transport
+except ImportError:
+    from rate_limiter import get_limiter
+    from http_transport import http_transport
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BulkQuotes:
+    """Column-wise quote arrays aligned with `symbols`"""
+    symbols: List[str]
+    current_price: np.ndarray
+    previous_close: np.ndarray
+    change_percent: np.ndarray
+    volume: np.ndarray
+    trading_value: np.ndarray
+    success: np.ndarray
+    fetch_time: float = 0.0
+    request_count: int = 0
+
+
+class BulkQuoteEngine:
+    """
+    Fetches quotes for many symbols with one multi-ticker request per chunk:
+    1. Symbols are split into chunks of `chunk_size`
+    2. Each chunk is one yf.download call (daily bars, 5 days)
+    3. Last and previous valid closes are picked for every column at once
+    """
+
+    def __init__(self, chunk_size: int = 100, period: str = "5d",
+                 download_fn: Optional[Callable] = None):
+        self.chunk_size = chunk_size
+        self.period = period
+        self._download_fn = download_fn or self._download
+
+    def _download(self, tickers: List[str]) -> pd.DataFrame:
+        """Download daily bars for a chunk of Yahoo tickers"""
+        import yfinance as yf
+        return get_limiter('yahoo').call(
+            yf.download,
+            tickers,
+            period=self.period,
+            interval="1d",
+            group_by="column",
+            auto_adjust=True,
+            threads=True,
+            progress=False,
+            session=http_transport.yf_session(),
+            endpoint='download',
+        )
+
+    @staticmethod
+    def _field(frame: pd.DataFrame, field: str, tickers: List[str]) -> np.ndarray:
+        """Extract a (dates x tickers) float array for one OHLCV field"""
+        if frame is None or frame.empty:
+            return np.full((0, len(tickers)), np.nan)
+        if not isinstance(frame.columns, pd.MultiIndex):
+            # Single-ticker downloads may come back with flat columns
+            frame = pd.concat({tickers[0]: frame}, axis=1).swaplevel(0, 1, axis=1)
+        if field not in frame.columns.get_level_values(0):
+            return np.full((len(frame), len(tickers)), np.nan)
+        return frame[field].reindex(columns=tickers).to_numpy(dtype=float)
+
+    @staticmethod
+    def split_quotes(close: np.ndarray, volume: np.ndarray):
+        """
+        Pick the last and previous valid bar of every column in one pass.
+        Returns (current_price, previous_close, last_volume, success) arrays.
+        """
+        n_rows, n_cols = close.shape
+        cols = np.arange(n_cols)
+        row_idx = np.where(~np.isnan(close), np.arange(n_rows)[:, None], -1)
+
+        last_idx = row_idx.max(axis=0) if n_rows else np.full(n_cols, -1)
+        success = last_idx >= 0
+
+        # Previous valid row: the highest valid index strictly below the last one
+        prev_idx = np.where(row_idx < last_idx, row_idx, -1).max(axis=0) if n_rows else last_idx
+        prev_idx = np.where(prev_idx >= 0, prev_idx, last_idx)
+
+        safe_last = np.clip(last_idx, 0, None)
+        safe_prev = np.clip(prev_idx, 0, None)
+        current = np.where(success, close[safe_last, cols] if n_rows else 0.0, 0.0)
+        previous = np.where(success, close[safe_prev, cols] if n_rows else 0.0, 0.0)
+        last_volume = volume[safe_last, cols] if n_rows else np.zeros(n_cols)
+        last_volume = np.where(success & ~np.isnan(last_volume), last_volume, 0)
+
+        return current, previous, last_volume.astype(np.int64), success
+
+    def fetch(self, symbols: List[str]) -> BulkQuotes:
+        """Fetch quotes for all symbols (clean codes, no .SR suffix)"""
+        start_time = time.time()
+        symbols = [str(s).replace('.SR', '').strip() for s in symbols]
+        closes, volumes = [], []
+        request_count = 0
+
+        for offset in range(0, len(symbols), self.chunk_size):
+            chunk = symbols[offset:offset + self.chunk_size]
+            tickers = [f"{s}.SR" for s in chunk]
+            try:
+                frame = self._download_fn(tickers)
+            except Exception as e:
+                logger.warning(f"Bulk download failed for chunk at {offset}: {e}")
+                frame = None
+            request_count += 1
+            closes.append(self._field(frame, 'Close', tickers))
+            volumes.append(self._field(frame, 'Volume', tickers))
+            logger.info(f"📦 Chunk {offset // self.chunk_size + 1}: {len(chunk)} symbols")
+
+        current = np.zeros(0)
+        previous = np.zeros(0)
+        volume = np.zeros(0, dtype=np.int64)
+        success = np.zeros(0, dtype=bool)
+        if symbols:
+            parts = [self.split_quotes(c, v) for c, v in zip(closes, volumes)]
+            current, previous, volume, success = (np.concatenate(p) for p in zip(*parts))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change_percent = np.where(previous > 0, (current - previous) / previous * 100, 0.0)
+
+        return BulkQuotes(
+            symbols=symbols,
+            current_price=current,
+            previous_close=previous,
+            change_percent=change_percent,
+            volume=volume,
+            trading_value=current * volume,
+            success=success & (current > 0),
+            fetch_time=time.time() - start_time,
+            request_count=request_count,
+        )
+
+
+# Global bulk engine
+bulk_quote_engine = BulkQuoteEngine()
@@ -0,0 +1,164 @@
+"""
+Circuit Breakers and Hedged Requests for Saudi Stock Market App
+A failing source is skipped instead of costing every symbol its full timeout,
+and a slow source is raced against the next one once it passes its usual latency
+"""
+
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import Executor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class SourceUnavailable(Exception):
+    """Raised by source adapters when the source itself failed (not just one symbol)"""
+
+
+class CircuitOpenError(Exception):
+    """The breaker is open - the call was not attempted"""
+
+
+class CircuitBreaker:
+    """
+    Per-source breaker:
+    1. Closed: calls go through; `failure_threshold` consecutive failures open it
+    2. Open: calls are rejected immediately for `reset_timeout` seconds
+    3. Half-open: up to `half_open_max` probe calls; a success closes it, a failure re-opens it
+    Successful call latencies are kept to derive the hedging delay.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 half_open_max: int = 1, latency_window: int = 200,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._latencies = deque(maxlen=latency_window)
+        self.stats = {'calls': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def allow(self) -> bool:
+        """True if a call may go through now (takes a probe slot when half-open)"""
+        with self._lock:
+            if self.state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probes = 0
+                logger.info(f"🔌 {self.name} circuit half-open, probing")
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._probes < self.half_open_max:
+                self._probes += 1
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.stats['calls'] += 1
+            self._latencies.append(latency)
+            self._failures = 0
+            if self.state != CLOSED:
+                logger.info(f"✅ {self.name} circuit closed")
+            self.state = CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self.stats['calls'] += 1
+            self.stats['failures'] += 1
+            self._failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.failure_threshold):
+                self.state = OPEN
+                self._opened_at = self._clock()
+                self.stats['opened'] += 1
+                logger.warning(f"⛔ {self.name} circuit open for {self.reset_timeout:.0f}s "
+                               f"after {self._failures} failures")
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn under the breaker; any exception counts as a source failure and is re-raised"""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit open")
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success(time.perf_counter() - start)
+        return result
+
+    def latency_percentile(self, q: float, min_samples: int = 20) -> Optional[float]:
+        """q-quantile (0..1) of recent successful call latencies, None until enough samples"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def hedge_delay(self, q: float = 0.9, default: float = 2.0, floor: float = 0.5) -> float:
+        """How long to wait on this source before racing the next one"""
+        percentile = self.latency_percentile(q)
+        return max(floor, percentile if percentile is not None else default)
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p90 = self.latency_percentile(0.5, 1), self.latency_percentile(0.9, 1)
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self._failures,
+                    'p50': p50, 'p90': p90, **self.stats}
+
+
+def hedged_call(primary: Callable[[], Any], backup: Callable[[], Any], hedge_after: float,
+                executor: Executor, is_success: Callable[[Any], bool]) -> Tuple[int, Any, List[Any]]:
+    """
+    Run `primary`; if it has not succeeded within `hedge_after` seconds (or it failed
+    earlier), start `backup` and take whichever succeeds first.
+    Returns (winner index: 0 primary / 1 backup / -1 none, winning or last result,
+    results of every call that finished). A losing call is left to finish in the background.
+    """
+    futures = [executor.submit(primary)]
+    done, _ = wait(futures, timeout=hedge_after)
+    if done and is_success(futures[0].result()):
+        return 0, futures[0].result(), [futures[0].result()]
+
+    futures.append(executor.submit(backup))
+    finished: List[Any] = []
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            result = future.result()
+            finished.append(result)
+            if is_success(result):
+                return futures.index(future), result, finished
+    return -1, finished[-1], finished
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """Process-wide breaker per source"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **kwargs)
+        return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
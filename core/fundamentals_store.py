@@ -0,0 +1,198 @@
+"""
+Fundamentals Store for Saudi Stock Market App
+Keeps slow-changing ticker.info fields (market cap, PE, 52-week range) out of the quote hot path
+"""
+
+import json
+import os
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from .rate_limiter import get_limiter, pool_size
+    from .http_transport import http_transport  # noqa: F401 - yfinance goes through the configured transport
+except ImportError:
+    from rate_limiter import get_limiter, pool_size
+    from http_transport import http_transport  # noqa: F401 - yfinance goes through the configured transport
+
+logger = logging.getLogger(__name__)
+
+# ticker.info keys we keep, mapped to the field names used by the quote dicts
+FUNDAMENTAL_FIELDS = {
+    'marketCap': 'market_cap',
+    'trailingPE': 'pe_ratio',
+    'fiftyTwoWeekHigh': 'high_52week',
+    'fiftyTwoWeekLow': 'low_52week',
+    'averageVolume': 'avg_volume',
+    'shortName': 'short_name',
+    'longName': 'long_name',
+}
+
+
+# Fields merged into quote dicts by every quote path
+QUOTE_FIELDS = ('market_cap', 'pe_ratio', 'high_52week', 'low_52week')
+
+
+class FundamentalsStore:
+    """
+    JSON-backed per-symbol store of ticker.info fields with a daily TTL:
+    1. Quote paths only read records (`quote_fields`, `get_name`) - never ticker.info
+    2. Stale or missing symbols are queued; one background job drains the queue
+       in batches, saving once per batch
+    3. A record is kept (and served) after it expires until the refresh replaces it
+    """
+
+    def __init__(self, cache_file: str = "data/fundamentals_cache.json",
+                 ttl: int = 24 * 60 * 60, info_fn=None, batch_size: int = 50):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self._info_fn = info_fn or self._fetch_info
+        self._lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._pending: Dict[str, None] = {}  # insertion-ordered queue of symbols to refresh
+        self.records: Dict[str, Dict] = self._load()
+
+    @staticmethod
+    def _fetch_info(symbol: str) -> Dict:
+        """Fetch raw ticker.info for a Saudi symbol"""
+        import yfinance as yf
+        return yf.Ticker(f"{symbol}.SR").info or {}
+
+    def _load(self) -> Dict[str, Dict]:
+        """Load stored records from disk"""
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f).get('records', {})
+        except Exception as e:
+            logger.warning(f"Fundamentals cache load error: {e}")
+        return {}
+
+    def _save(self):
+        """Persist records to disk"""
+        try:
+            directory = os.path.dirname(self.cache_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._lock:
+                payload = {'timestamp': time.time(), 'records': dict(self.records)}
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            logger.error(f"Fundamentals cache save error: {e}")
+
+    @staticmethod
+    def _clean(symbol: str) -> str:
+        return str(symbol).replace('.SR', '').strip()
+
+    def is_fresh(self, symbol: str) -> bool:
+        """Check whether a symbol has a record younger than the TTL"""
+        record = self.records.get(self._clean(symbol))
+        return bool(record) and (time.time() - record.get('updated', 0)) < self.ttl
+
+    def get(self, symbol: str) -> Dict:
+        """Get stored fundamentals for a symbol (empty dict if unknown)"""
+        return dict(self.records.get(self._clean(symbol), {}))
+
+    def get_market_cap(self, symbol: str) -> float:
+        """Get stored market cap for a symbol (0 if unknown)"""
+        return self.records.get(self._clean(symbol), {}).get('market_cap', 0) or 0
+
+    def quote_fields(self, symbol: str) -> Dict:
+        """Market cap / PE / 52-week fields for a quote dict; queues a refresh if stale"""
+        record = self.records.get(self._clean(symbol), {})
+        if not self.is_fresh(symbol):
+            self.refresh_in_background([symbol])
+        return {field: record.get(field, 0) or 0 for field in QUOTE_FIELDS}
+
+    def get_name(self, symbol: str) -> Optional[str]:
+        """Company name from ticker.info; fetched once for unknown symbols, then served from the store"""
+        symbol = self._clean(symbol)
+        if symbol not in self.records:
+            self.refresh([symbol])
+        record = self.records.get(symbol, {})
+        if not self.is_fresh(symbol):
+            self.refresh_in_background([symbol])
+        return record.get('long_name') or record.get('short_name') or None
+
+    def stale_symbols(self, symbols: Iterable[str]) -> List[str]:
+        """Return the symbols whose records are missing or expired"""
+        return [self._clean(s) for s in symbols if not self.is_fresh(s)]
+
+    def refresh(self, symbols: Iterable[str], max_workers: Optional[int] = None, force: bool = False) -> int:
+        """Refresh fundamentals for stale symbols, returns the number updated"""
+        targets = [self._clean(s) for s in symbols] if force else self.stale_symbols(symbols)
+        if not targets:
+            return 0
+
+        def fetch(symbol: str):
+            try:
+                info = get_limiter('yahoo').call(self._info_fn, symbol)
+            except Exception as e:
+                logger.debug(f"Fundamentals fetch failed for {symbol}: {e}")
+                return symbol, None
+            record = {name: info.get(key) or 0 for key, name in FUNDAMENTAL_FIELDS.items()}
+            record['updated'] = time.time()
+            return symbol, record
+
+        updated = 0
+        with ThreadPoolExecutor(max_workers=max_workers or pool_size('yahoo')) as executor:
+            for symbol, record in executor.map(fetch, targets):
+                if record:
+                    with self._lock:
+                        self.records[symbol] = record
+                    updated += 1
+
+        if updated:
+            self._save()
+        logger.info(f"📚 Refreshed fundamentals for {updated}/{len(targets)} symbols")
+        return updated
+
+    def refresh_in_background(self, symbols: Iterable[str]) -> bool:
+        """Queue stale symbols for the background job; starts it if it is not running"""
+        stale = self.stale_symbols(symbols)
+        with self._lock:
+            queued = [s for s in stale if s not in self._pending]
+            self._pending.update(dict.fromkeys(queued))
+            if not self._pending or (self._refresh_thread and self._refresh_thread.is_alive()):
+                return bool(queued)
+            self._refresh_thread = threading.Thread(target=self._drain, daemon=True,
+                                                    name="fundamentals-refresh")
+            self._refresh_thread.start()
+        return True
+
+    def _drain(self):
+        """Background job: refresh queued symbols in batches until the queue is empty"""
+        while True:
+            with self._lock:
+                batch = list(self._pending)[:self.batch_size]
+                if not batch:
+                    return
+            try:
+                self.refresh(batch)
+            except Exception as e:
+                logger.warning(f"Fundamentals batch refresh failed: {e}")
+            with self._lock:
+                for symbol in batch:
+                    self._pending.pop(symbol, None)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the background job has drained the queue; False on timeout"""
+        thread = self._refresh_thread
+        if thread:
+            thread.join(timeout)
+        return not (thread and thread.is_alive())
+
+
+# Global fundamentals store
+fundamentals_store = FundamentalsStore()
@@ -0,0 +1,380 @@
+"""
+HTTP Transport for Saudi Stock Market App
+Pluggable transport under every fetcher's requests session (and yfinance):
+'live' passes straight through, 'record' captures responses into a cassette,
+'replay' serves the cassette offline with injected latency and error rates
+"""
+
+import asyncio
+import atexit
+import base64
+import hashlib
+import http.client
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = "config/fetcher_config.json"
+CASSETTE_DIR = "data/cassettes"
+
+LIVE = 'live'
+RECORD = 'record'
+REPLAY = 'replay'
+MODES = (LIVE, RECORD, REPLAY)
+
+# Query parameters that change per run (session crumbs, cache busters, rolling windows)
+VOLATILE_PARAMS = frozenset({'crumb', '_', 'period1', 'period2'})
+# Headers describing the wire encoding - the stored body is already decoded
+WIRE_HEADERS = frozenset({'content-encoding', 'content-length', 'transfer-encoding', 'connection'})
+
+
+class CassetteMiss(requests.ConnectionError):
+    """Replay mode was asked for a request that was never recorded"""
+
+
+def request_key(method: str, url: str, params: Optional[Dict] = None, body: Optional[bytes] = None) -> str:
+    """Stable cassette key: method + URL with sorted, non-volatile query parameters"""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True) + [(k, str(v)) for k, v in (params or {}).items()]
+    query = sorted((k, v) for k, v in query if k not in VOLATILE_PARAMS)
+    key = f"{method.upper()} {urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))}"
+    if body:
+        key += f" #{hashlib.sha1(body).hexdigest()[:12]}"
+    return key
+
+
+@dataclass
+class Interaction:
+    """One recorded response"""
+    status: int
+    headers: Dict[str, str]
+    content: bytes
+    url: str
+
+    def to_json(self) -> Dict:
+        try:
+            body = {'body': self.content.decode('utf-8')}
+        except UnicodeDecodeError:
+            body = {'body_b64': base64.b64encode(self.content).decode('ascii')}
+        return {'status': self.status, 'headers': self.headers, 'url': self.url, **body}
+
+    @classmethod
+    def from_json(cls, data: Dict) -> 'Interaction':
+        content = data['body'].encode('utf-8') if 'body' in data else base64.b64decode(data.get('body_b64', ''))
+        return cls(status=data['status'], headers=data.get('headers', {}), content=content, url=data.get('url', ''))
+
+
+class CassetteStore:
+    """
+    Recorded interactions keyed by request_key, one JSON file per cassette.
+    A key recorded several times replays its responses round-robin.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._interactions: Dict[str, List[Interaction]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        with self._lock:
+            self._interactions, self._cursor = {}, {}
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._interactions = {key: [Interaction.from_json(i) for i in items]
+                                  for key, items in data.get('interactions', {}).items()}
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self._interactions.values())
+
+    def keys(self) -> List[str]:
+        return list(self._interactions)
+
+    def add(self, key: str, interaction: Interaction):
+        with self._lock:
+            self._interactions.setdefault(key, []).append(interaction)
+            self._dirty = True
+
+    def next(self, key: str) -> Tuple[Optional[Interaction], int]:
+        """(interaction, occurrence) for the key's next replay; (None, n) when never recorded"""
+        with self._lock:
+            occurrence = self._cursor.get(key, 0)
+            self._cursor[key] = occurrence + 1
+            items = self._interactions.get(key)
+            return (items[occurrence % len(items)] if items else None), occurrence
+
+    def save(self) -> bool:
+        with self._lock:
+            if not self._dirty:
+                return False
+            data = {'version': 1, 'interactions': {key: [i.to_json() for i in items]
+                                                   for key, items in self._interactions.items()}}
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        logger.info(f"📼 Saved {len(self)} interactions to {self.path}")
+        return True
+
+
+class FaultInjector:
+    """
+    Replay-time latency and failures. Each decision is seeded by (seed, request key,
+    occurrence) so a replay run is identical however threads interleave.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: Optional[int] = 503, seed: int = 42):
+        self.latency = latency            # seconds added to every replayed response
+        self.jitter = jitter              # +/- uniform seconds around latency
+        self.error_rate = error_rate      # share of replayed requests that fail
+        self.error_status = error_status  # HTTP status of a failure (None: connection error)
+        self.seed = seed
+
+    def decide(self, key: str, occurrence: int) -> Tuple[float, bool]:
+        """(delay seconds, fail?) for one replayed request"""
+        rng = random.Random(f"{self.seed}:{key}:{occurrence}")
+        delay = max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter)) if self.latency or self.jitter else 0.0
+        return delay, rng.random() < self.error_rate
+
+
+def _response(request, interaction: Interaction, adapter) -> requests.Response:
+    response = requests.Response()
+    response.status_code = interaction.status
+    response.headers = CaseInsensitiveDict(interaction.headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = interaction.content
+    response.raw = io.BytesIO(interaction.content)
+    response.url = request.url
+    response.reason = http.client.responses.get(interaction.status, '')
+    response.request = request
+    response.connection = adapter
+    return response
+
+
+class CassetteAdapter(BaseAdapter):
+    """requests adapter that records through `upstream` or replays from the transport's cassette"""
+
+    def __init__(self, transport: 'HttpTransport', upstream: Optional[BaseAdapter] = None):
+        super().__init__()
+        self.transport = transport
+        self.upstream = upstream or HTTPAdapter()
+
+    def send(self, request, **kwargs):
+        body = request.body.encode('utf-8') if isinstance(request.body, str) else request.body
+        key = request_key(request.method, request.url, body=body if isinstance(body, bytes) else None)
+        transport = self.transport
+        if transport.mode == REPLAY:
+            interaction, delay = transport.replay(key)
+            if delay:
+                time.sleep(delay)
+            return _response(request, interaction, self)
+
+        response = self.upstream.send(request, **kwargs)
+        if transport.mode == RECORD:
+            transport.record(key, response.status_code, response.headers, response.content, request.url)
+        return response
+
+    def close(self):
+        self.upstream.close()
+
+
+class HttpTransport:
+    """
+    One per process, configured from fetcher_config.json ('http_transport') or
+    SAUDI_HTTP_* environment variables:
+    1. `mount(session)` wraps a requests session's adapters (no-op when live)
+    2. `install_yfinance()` hands yfinance a mounted session so every yf.Ticker call
+       goes through the cassette (yf.download replaces it unless given `yf_session()`)
+    3. `replay` / `record` are also used directly by the aiohttp backend
+    4. An `upstream` adapter (e.g. a simulated exchange) replaces the network in
+       live and record modes
+    """
+
+    def __init__(self, mode: str = LIVE, cassette: Optional[str] = None, cassette_dir: str = CASSETTE_DIR,
+                 faults: Optional[FaultInjector] = None, upstream: Optional[BaseAdapter] = None):
+        self.cassette_dir = cassette_dir
+        self.faults = faults or FaultInjector()
+        self.mode = LIVE
+        self.upstream: Optional[BaseAdapter] = None
+        self.store: Optional[CassetteStore] = None
+        self._yf_session = None
+        self._yf_original = None
+        self.stats = {'replayed': 0, 'recorded': 0, 'misses': 0, 'injected_errors': 0}
+        self._stats_lock = threading.Lock()
+        self.configure(mode, cassette, upstream)
+
+    @property
+    def live(self) -> bool:
+        return self.mode == LIVE
+
+    @property
+    def routed(self) -> bool:
+        """True when sessions have to go through the transport's adapter"""
+        return self.mode != LIVE or self.upstream is not None
+
+    def configure(self, mode: str = LIVE, cassette: Optional[str] = None, upstream: Optional[BaseAdapter] = None,
+                  **faults) -> 'HttpTransport':
+        """Switch mode/cassette/upstream in place (modules keep their reference to the global transport)"""
+        if mode not in MODES:
+            raise ValueError(f"Unknown transport mode {mode!r} (expected one of {', '.join(MODES)})")
+        if self.store is not None:
+            self.store.save()
+        for name, value in faults.items():
+            setattr(self.faults, name, value)
+        was_routed = self.routed
+        self.mode = mode
+        self.upstream = upstream
+        self.store = None
+        self._yf_session = None
+        if mode != LIVE:
+            cassette = cassette or 'default'
+            path = cassette if cassette.endswith('.json') else os.path.join(self.cassette_dir, f"{cassette}.json")
+            self.store = CassetteStore(path)
+            logger.info(f"📼 HTTP transport in {mode} mode ({len(self.store)} interactions in {path})")
+        if self.routed:
+            self.install_yfinance()
+        elif was_routed:
+            self._uninstall_yfinance()
+        return self
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def replay(self, key: str) -> Tuple[Interaction, float]:
+        """Next recorded response for a key plus the injected delay; raises CassetteMiss"""
+        interaction, occurrence = self.store.next(key)
+        if interaction is None:
+            self._count('misses')
+            raise CassetteMiss(f"No recorded response for {key}")
+        delay, fail = self.faults.decide(key, occurrence)
+        if fail:
+            self._count('injected_errors')
+            if self.faults.error_status is None:
+                raise requests.ConnectionError(f"Injected connection error for {key}")
+            interaction = Interaction(self.faults.error_status, {}, b'', interaction.url)
+        self._count('replayed')
+        return interaction, delay
+
+    async def replay_async(self, key: str) -> Interaction:
+        interaction, delay = self.replay(key)
+        if delay:
+            await asyncio.sleep(delay)
+        return interaction
+
+    def record(self, key: str, status: int, headers, content: bytes, url: str):
+        headers = {k: v for k, v in dict(headers).items() if k.lower() not in WIRE_HEADERS}
+        self.store.add(key, Interaction(status, headers, content, url))
+        self._count('recorded')
+
+    def mount(self, session: requests.Session) -> requests.Session:
+        """Route a session through the cassette (idempotent, keeps the session's own pool adapter)"""
+        if not self.routed:
+            return session
+        for prefix in ('https://', 'http://'):
+            current = session.get_adapter(prefix)
+            if not isinstance(current, CassetteAdapter):
+                session.mount(prefix, CassetteAdapter(self, self.upstream or current))
+        return session
+
+    def session(self, headers: Optional[Dict] = None) -> requests.Session:
+        session = requests.Session()
+        if headers:
+            session.headers.update(headers)
+        return self.mount(session)
+
+    def yf_session(self) -> Optional[requests.Session]:
+        """Routed session for yfinance calls that take `session=` (None when live: yfinance's own)"""
+        if not self.routed:
+            return None
+        if self._yf_session is None:
+            self._yf_session = self.session()
+        return self._yf_session
+
+    def install_yfinance(self) -> bool:
+        """Give yfinance's shared data layer a session that goes through this transport"""
+        if not self.routed:
+            return False
+        try:
+            from yfinance.data import YfData
+            data = YfData()
+            if self._yf_original is None:
+                self._yf_original = data._session
+            data._set_session(self.yf_session())
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ yfinance not routed through the HTTP transport: {e}")
+            return False
+
+    def _uninstall_yfinance(self):
+        """Hand yfinance back the session it had before routing"""
+        if self._yf_original is None:
+            return
+        try:
+            from yfinance.data import YfData
+            YfData()._set_session(self._yf_original)
+        except Exception as e:
+            logger.debug(f"yfinance session not restored: {e}")
+        self._yf_original = None
+
+    def save(self) -> bool:
+        return self.store.save() if self.store is not None else False
+
+
+def load_transport(config_path: str = CONFIG_PATH) -> HttpTransport:
+    """Transport from the 'http_transport' config section, overridden by SAUDI_HTTP_* variables"""
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f).get('http_transport', {})
+    except Exception as e:
+        logger.debug(f"HTTP transport config not loaded: {e}")
+        config = {}
+    env = os.environ
+    error_status = env.get('SAUDI_HTTP_ERROR_STATUS', config.get('error_status', 503))
+    faults = FaultInjector(
+        latency=float(env.get('SAUDI_HTTP_LATENCY', config.get('latency', 0.0))),
+        jitter=float(env.get('SAUDI_HTTP_JITTER', config.get('jitter', 0.0))),
+        error_rate=float(env.get('SAUDI_HTTP_ERROR_RATE', config.get('error_rate', 0.0))),
+        error_status=int(error_status) if error_status not in (None, '', 'none') else None,
+        seed=int(env.get('SAUDI_HTTP_SEED', config.get('seed', 42))),
+    )
+    return HttpTransport(mode=env.get('SAUDI_HTTP_MODE', config.get('mode', LIVE)),
+                         cassette=env.get('SAUDI_HTTP_CASSETTE', config.get('cassette')),
+                         cassette_dir=config.get('cassette_dir', CASSETTE_DIR), faults=faults)
+
+
+def _shared_transport() -> HttpTransport:
+    """One transport per process, even when core/ is imported both flat and as a package"""
+    for name in ('core.http_transport', 'http_transport'):
+        transport = getattr(sys.modules.get(name), 'http_transport', None)
+        if transport is not None:
+            return transport
+    transport = load_transport()
+    atexit.register(transport.save)
+    return transport
+
+
+# Global transport (live unless configured otherwise); recordings are flushed at exit
+http_transport = _shared_transport()
@@ -10,6 +10,13 @@ import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 
+try:
+    from .rate_limiter import get_limiter, pool_size
+    from .http_transport import http_transport  # noqa: F401 - yfinance goes through the configured transport
+except ImportError:
+    from rate_limiter import get_limiter, pool_size
+    from http_transport import http_transport  # noqa: F401 - yfinance goes through the configured transport
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,8 +30,8 @@ def get_stock_price_fast(symbol: str, yahoo_suffix: str = ".SR") -> Optional[Dic
         ticker = yf.Ticker(yahoo_symbol)
         
         # Get minimal data for speed
-        info = ticker.info
-        hist = ticker.history(period="2d")
+        with get_limiter('yahoo').permit('history'):
+            hist = ticker.history(period="2d")
         
         if len(hist) < 2:
             return None
@@ -47,13 +54,13 @@ def get_stock_price_fast(symbol: str, yahoo_suffix: str = ".SR") -> Optional[Dic
         logger.debug(f"Error fetching {symbol}: {e}")
         return None
 
-def fetch_batch_prices(symbols: List[str], max_workers: int = 10) -> List[Dict]:
+def fetch_batch_prices(symbols: List[str], max_workers: Optional[int] = None) -> List[Dict]:
     """
-    Fetch multiple stock prices concurrently for better performance
+    Fetch multiple stock prices concurrently; the shared Yahoo limiter paces the requests
     """
     results = []
     
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    with ThreadPoolExecutor(max_workers=max_workers or pool_size('yahoo')) as executor:
         # Submit all tasks
         future_to_symbol = {
             executor.submit(get_stock_price_fast, symbol): symbol 
@@ -116,7 +123,7 @@ def get_fast_market_summary() -> Dict:
     start_time = time.time()
     
     # Fetch live stock prices
-    stock_data = fetch_batch_prices(symbols, max_workers=15)
+    stock_data = fetch_batch_prices(symbols)
     
     if not stock_data:
         return {
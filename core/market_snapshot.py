@@ -0,0 +1,141 @@
+"""
+Columnar Market Snapshot for Saudi Stock Market App
+NumPy-backed quotes for the whole market with vectorized leaderboards
+"""
+
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+LEADERBOARDS = ('gainers', 'losers', 'volume', 'value')
+
+
+class MarketSnapshot:
+    """
+    One row per symbol, one NumPy array per column:
+    symbol, price, prev_close, change_pct, volume, value, sector_code.
+    Sector names live in `sectors`; sector_code indexes into it.
+    """
+
+    def __init__(self, symbols: Sequence[str], price, prev_close=None, change_pct=None,
+                 volume=None, value=None, sectors: Optional[Sequence[str]] = None,
+                 timestamp: Optional[float] = None):
+        n = len(symbols)
+        self.symbol = np.asarray(symbols, dtype=object)
+        self.price = np.asarray(price, dtype=np.float64)
+        self.prev_close = (np.asarray(prev_close, dtype=np.float64)
+                           if prev_close is not None else self.price.copy())
+        if change_pct is None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                change_pct = np.where(self.prev_close > 0,
+                                      (self.price - self.prev_close) / self.prev_close * 100, 0.0)
+        self.change_pct = np.asarray(change_pct, dtype=np.float64)
+        volume = np.asarray(volume if volume is not None else np.zeros(n, dtype=np.int64))
+        if volume.dtype.kind in 'fO':
+            # yfinance reports NaN volume for halted or partial bars
+            volume = np.nan_to_num(volume.astype(np.float64), nan=0.0, posinf=0.0, neginf=0.0)
+        self.volume = volume.astype(np.int64)
+        self.value = (np.asarray(value, dtype=np.float64)
+                      if value is not None else self.price * self.volume)
+
+        sector_names = list(sectors) if sectors is not None else ['Unknown'] * n
+        self.sectors, codes = np.unique(np.asarray(sector_names, dtype=object).astype(str), return_inverse=True)
+        self.sector_code = codes.astype(np.int16)
+        self.timestamp = timestamp or time.time()
+
+    def __len__(self) -> int:
+        return len(self.symbol)
+
+    @classmethod
+    def from_records(cls, records: List[Dict], price: str = 'current_price',
+                     change_pct: str = 'change_pct', volume: str = 'volume',
+                     value: Optional[str] = None, prev_close: Optional[str] = None,
+                     sector: str = 'sector', symbol: str = 'symbol') -> "MarketSnapshot":
+        """Build a snapshot from quote dicts; row i of the snapshot is records[i]"""
+        def column(key, default=0.0):
+            return [(r.get(key) or default) for r in records]
+
+        return cls(
+            symbols=[r.get(symbol, '') for r in records],
+            price=column(price),
+            prev_close=column(prev_close) if prev_close else None,
+            change_pct=column(change_pct),
+            volume=column(volume, 0),
+            value=column(value) if value else None,
+            sectors=[r.get(sector) or 'Unknown' for r in records],
+        )
+
+    @classmethod
+    def from_bulk_quotes(cls, quotes, sectors: Optional[Sequence[str]] = None) -> "MarketSnapshot":
+        """Build a snapshot from core.bulk_quote_engine.BulkQuotes"""
+        return cls(quotes.symbols, quotes.current_price, quotes.previous_close,
+                   quotes.change_percent, quotes.volume, quotes.trading_value, sectors)
+
+    def top_k(self, column: str, k: int = 10, largest: bool = True,
+              mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Row indices of the k largest (or smallest) values of one column"""
+        keys = getattr(self, column).astype(np.float64)
+        keys = keys if largest else -keys
+        if mask is not None:
+            keys = np.where(mask, keys, -np.inf)
+        return self._top_rows(keys[None, :], k)[0]
+
+    @staticmethod
+    def _top_rows(keys: np.ndarray, k: int) -> List[np.ndarray]:
+        """Row-wise top-k of a (boards x symbols) key matrix, descending, -inf excluded"""
+        n = keys.shape[1]
+        k = min(k, n)
+        if k <= 0:
+            return [np.zeros(0, dtype=np.intp) for _ in range(keys.shape[0])]
+
+        part = np.argpartition(-keys, k - 1, axis=1)[:, :k] if k < n else np.tile(np.arange(n), (keys.shape[0], 1))
+        part_keys = np.take_along_axis(keys, part, axis=1)
+        # Descending by key, ties broken by row position for stable output
+        order = np.lexsort((part, -part_keys), axis=1)
+        ranked = np.take_along_axis(part, order, axis=1)
+        ranked_keys = np.take_along_axis(part_keys, order, axis=1)
+        return [row[np.isfinite(row_keys)] for row, row_keys in zip(ranked, ranked_keys)]
+
+    def leaderboards(self, k: int = 10, strict: bool = True,
+                     valid: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        Top-k row indices for gainers, losers, volume and value in one vectorized call.
+        strict=True keeps only positive changes in gainers and negative changes in losers.
+        """
+        valid = (self.price > 0) if valid is None else (valid & (self.price > 0))
+        gainers_mask = valid & (self.change_pct > 0) if strict else valid
+        losers_mask = valid & (self.change_pct < 0) if strict else valid
+
+        keys = np.vstack([
+            np.where(gainers_mask, self.change_pct, -np.inf),
+            np.where(losers_mask, -self.change_pct, -np.inf),
+            np.where(valid & (self.volume > 0), self.volume.astype(np.float64), -np.inf),
+            np.where(valid & (self.value > 0), self.value, -np.inf),
+        ])
+        return dict(zip(LEADERBOARDS, self._top_rows(keys, k)))
+
+    def stats(self) -> Dict:
+        """Market breadth and totals"""
+        return {
+            'total_stocks': len(self),
+            'gainers_count': int((self.change_pct > 0).sum()),
+            'losers_count': int((self.change_pct < 0).sum()),
+            'unchanged_count': int((self.change_pct == 0).sum()),
+            'total_volume': int(self.volume.sum()),
+            'total_trading_value': float(self.value.sum()),
+            'average_change': float(self.change_pct.mean()) if len(self) else 0.0,
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """Export to a DataFrame without copying the numeric columns"""
+        return pd.DataFrame({
+            'symbol': self.symbol,
+            'price': self.price,
+            'prev_close': self.prev_close,
+            'change_pct': self.change_pct,
+            'volume': self.volume,
+            'value': self.value,
+            'sector_code': self.sector_code,
+        }, copy=False)
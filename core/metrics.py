@@ -0,0 +1,479 @@
+"""
+Fetch Metrics for Saudi Stock Market App
+In-process latency histograms and outcome counters per source and endpoint, plus
+the state the other core modules already keep (cache hit ratios, limiters, breakers,
+snapshot age), exported in the Prometheus text format as a file or an HTTP endpoint
+"""
+
+import bisect
+import os
+import re
+import sys
+import threading
+import time
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_FILE = "data/metrics/saudi_market.prom"
+PREFIX = "saudi"
+
+# Upper bounds in seconds: single Yahoo calls sit in the low buckets, whole-market sweeps in the high ones
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Limiter outcomes (rate_limiter OK/SLOW/THROTTLED/TIMEOUT/ERROR); the first two are successes
+SUCCESS_OUTCOMES = frozenset({'ok', 'slow'})
+
+BREAKER_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+# One sample: (metric name, {label: value}, value)
+Sample = Tuple[str, Dict[str, str], float]
+# One family from a collector: (name, type, help, samples)
+Family = Tuple[str, str, str, List[Sample]]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus semantics)"""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)   # last slot: above the largest bound (+Inf)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        total, cumulative = 0, []
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate like PromQL histogram_quantile: linear within the bucket holding the q-th observation"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower, below = 0.0, 0
+        for bound, cumulative in zip(self.buckets, self.cumulative()):
+            if cumulative >= rank:
+                in_bucket = cumulative - below
+                return lower + (bound - lower) * ((rank - below) / in_bucket if in_bucket else 0.0)
+            lower, below = bound, cumulative
+        return self.buckets[-1]
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_sample(name: str, labels: Dict[str, str], value: float) -> str:
+    label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+    if isinstance(value, float) and value == float('inf'):
+        number = '+Inf'
+    elif isinstance(value, float) and not value.is_integer():
+        number = repr(round(value, 6))
+    else:
+        number = str(int(value))
+    return f"{name}{{{label_text}}} {number}" if label_text else f"{name} {number}"
+
+
+def _bound(value: float) -> str:
+    return '+Inf' if value == float('inf') else repr(float(value))
+
+
+class FetchMetrics:
+    """
+    One registry per process:
+    1. `observe(source, endpoint, seconds, outcome)` records every upstream call
+       (the rate limiter does this for each permit) into a histogram and counters
+    2. `count_items` tracks quotes fetched/failed per sweep; `mark_fresh` stamps data
+       whose age should be watched
+    3. Collectors read the stats the cache, limiters, breakers, single-flight groups,
+       reconciler and HTTP transport already keep - nothing is double counted
+    4. `render()` is the Prometheus text exposition, served by `serve()` or written by `write_textfile()`
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS, clock: Callable[[], float] = time.time):
+        self.buckets = tuple(sorted(buckets))
+        self.clock = clock
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._outcomes: Counter = Counter()     # (source, endpoint, outcome) -> calls
+        self._items: Counter = Counter()        # (source, endpoint, result) -> items
+        self._fresh: Dict[str, float] = {}      # name -> unix time the data was produced
+        self._collectors: List[Callable[[], List[Family]]] = []
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    # --------------------------------------------------------------- recording
+    def observe(self, source: str, endpoint: str, seconds: float, outcome: str = 'ok'):
+        key = (source, endpoint)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(max(0.0, seconds))
+            self._outcomes[(source, endpoint, outcome)] += 1
+
+    @contextmanager
+    def timer(self, source: str, endpoint: str):
+        """Time a block; an exception inside counts as an error and is re-raised"""
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            yield
+            outcome = 'ok'
+        finally:
+            self.observe(source, endpoint, time.perf_counter() - start, outcome)
+
+    def count_items(self, source: str, endpoint: str, succeeded: int = 0, failed: int = 0):
+        with self._lock:
+            self._items[(source, endpoint, 'success')] += int(succeeded)
+            self._items[(source, endpoint, 'failure')] += int(failed)
+
+    def mark_fresh(self, name: str, produced_at: Optional[float] = None):
+        with self._lock:
+            self._fresh[name] = self.clock() if produced_at is None else produced_at
+
+    def register_collector(self, collector: Callable[[], List[Family]]):
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._outcomes.clear()
+            self._items.clear()
+            self._fresh.clear()
+
+    # ----------------------------------------------------------------- reading
+    def endpoints(self) -> List[Dict]:
+        """One row per (source, endpoint): calls, failures, success rate, latency percentiles (seconds)"""
+        with self._lock:
+            histograms = {key: (h.quantile(0.5), h.quantile(0.95), h.quantile(0.99), h.mean, h.count)
+                          for key, h in self._histograms.items()}
+            outcomes = dict(self._outcomes)
+            items = dict(self._items)
+        rows = []
+        for (source, endpoint), (p50, p95, p99, mean, count) in sorted(histograms.items()):
+            by_outcome = {o: n for (s, e, o), n in outcomes.items() if (s, e) == (source, endpoint)}
+            failures = sum(n for o, n in by_outcome.items() if o not in SUCCESS_OUTCOMES)
+            rows.append({
+                'source': source, 'endpoint': endpoint, 'calls': count, 'failures': failures,
+                'success_rate': (count - failures) / count if count else None,
+                'p50': p50, 'p95': p95, 'p99': p99, 'mean': mean, 'outcomes': by_outcome,
+                'items_ok': items.get((source, endpoint, 'success'), 0),
+                'items_failed': items.get((source, endpoint, 'failure'), 0),
+            })
+        return rows
+
+    def histogram(self, source: str, endpoint: str) -> Optional[Histogram]:
+        with self._lock:
+            return self._histograms.get((source, endpoint))
+
+    def ages(self) -> Dict[str, float]:
+        """Seconds since each watched piece of data was produced"""
+        now = self.clock()
+        with self._lock:
+            return {name: max(0.0, now - produced_at) for name, produced_at in self._fresh.items()}
+
+    def collect(self) -> List[Family]:
+        families: List[Family] = []
+        for collector in list(self._collectors):
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logger.debug(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+        return families
+
+    # --------------------------------------------------------------- exporting
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            histograms = {key: (h.cumulative(), h.sum, h.count) for key, h in self._histograms.items()}
+            outcomes = dict(self._outcomes)
+            items = dict(self._items)
+        ages = self.ages()
+
+        latency = f"{PREFIX}_fetch_latency_seconds"
+        lines = [f"# HELP {latency} Upstream call latency per source and endpoint",
+                 f"# TYPE {latency} histogram"]
+        for (source, endpoint), (cumulative, total, count) in sorted(histograms.items()):
+            labels = {'source': source, 'endpoint': endpoint}
+            for bound, value in zip(self.buckets + (float('inf'),), cumulative):
+                lines.append(_format_sample(f"{latency}_bucket", dict(labels, le=_bound(bound)), value))
+            lines.append(_format_sample(f"{latency}_sum", labels, float(total)))
+            lines.append(_format_sample(f"{latency}_count", labels, count))
+
+        families: List[Family] = [
+            (f"{PREFIX}_fetch_requests_total", 'counter', "Upstream calls per source, endpoint and outcome",
+             [(f"{PREFIX}_fetch_requests_total", {'source': s, 'endpoint': e, 'outcome': o}, n)
+              for (s, e, o), n in sorted(outcomes.items())]),
+            (f"{PREFIX}_fetch_items_total", 'counter', "Quotes fetched per sweep endpoint, by result",
+             [(f"{PREFIX}_fetch_items_total", {'source': s, 'endpoint': e, 'result': r}, n)
+              for (s, e, r), n in sorted(items.items())]),
+            (f"{PREFIX}_data_age_seconds", 'gauge', "Seconds since the data was produced",
+             [(f"{PREFIX}_data_age_seconds", {'data': name}, round(age, 3)) for name, age in sorted(ages.items())]),
+        ] + self.collect()
+
+        for name, kind, help_text, samples in families:
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(_format_sample(*sample) for sample in samples)
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str = METRICS_FILE) -> str:
+        """Atomic write, e.g. for node_exporter's textfile collector or the dashboard"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+        return path
+
+    def serve(self, port: int = 9108, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """Serve GET /metrics from a daemon thread (idempotent)"""
+        if self._server is not None:
+            return self._server
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info(f"📊 Metrics at http://{host}:{self._server.server_address[1]}/metrics")
+        return self._server
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @classmethod
+    def from_text(cls, text: str) -> 'FetchMetrics':
+        """Rebuild histograms and call/item counters from an exported file (another process's metrics)"""
+        metrics = cls()
+        latency = f"{PREFIX}_fetch_latency_seconds"
+        buckets: Dict[Tuple[str, str], Dict[float, float]] = {}
+        sums: Dict[Tuple[str, str], float] = {}
+        for name, labels, value in parse_text(text):
+            key = (labels.get('source', ''), labels.get('endpoint', ''))
+            if name == f"{latency}_bucket":
+                bound = float('inf') if labels['le'] == '+Inf' else float(labels['le'])
+                buckets.setdefault(key, {})[bound] = value
+            elif name == f"{latency}_sum":
+                sums[key] = value
+            elif name == f"{PREFIX}_fetch_requests_total":
+                metrics._outcomes[key + (labels.get('outcome', 'ok'),)] += int(value)
+            elif name == f"{PREFIX}_fetch_items_total":
+                metrics._items[key + (labels.get('result', 'success'),)] += int(value)
+        for key, by_bound in buckets.items():
+            bounds = sorted(b for b in by_bound if b != float('inf'))
+            histogram = Histogram(bounds)
+            cumulative = [by_bound[b] for b in bounds] + [by_bound.get(float('inf'), by_bound[bounds[-1]])]
+            histogram.counts = [int(c - p) for c, p in zip(cumulative, [0] + cumulative[:-1])]
+            histogram.count = int(cumulative[-1])
+            histogram.sum = sums.get(key, 0.0)
+            metrics._histograms[key] = histogram
+        return metrics
+
+
+_SAMPLE_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)')
+_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_text(text: str) -> List[Sample]:
+    """Samples from Prometheus text exposition (comments skipped)"""
+    samples = []
+    for line in text.splitlines():
+        match = _SAMPLE_LINE.match(line.strip())
+        if not match or line.startswith('#'):
+            continue
+        name, label_text, value = match.groups()
+        labels = {key: val.replace('\\n', '\n').replace('\\"', '"').replace('\\\\', '\\')
+                  for key, val in _LABEL.findall(label_text or '')}
+        samples.append((name, labels, float('inf') if value == '+Inf' else float(value)))
+    return samples
+
+
+# ------------------------------------------------------------------ collectors
+# Imported lazily: those modules import this one to record their calls
+def _core(name: str):
+    """The core module already loaded (package or flat import), else None"""
+    return sys.modules.get(f"core.{name}") or sys.modules.get(name)
+
+
+def _registry_stats(name: str, accessor: str) -> Dict[str, Dict[str, Any]]:
+    """Merge a per-source registry across both loaded copies of a core module (package copy wins)"""
+    stats: Dict[str, Dict[str, Any]] = {}
+    for module in (sys.modules.get(name), sys.modules.get(f"core.{name}")):
+        if module is not None:
+            stats.update(getattr(module, accessor)())
+    return stats
+
+
+def collect_cache() -> List[Family]:
+    # Both loaded copies normally share one cache; any other instance is summed in
+    caches = {id(c): c for c in (getattr(sys.modules.get(name), 'tiered_cache', None)
+                                 for name in ('core.tiered_cache', 'tiered_cache')) if c is not None}
+    if not caches:
+        return []
+    per_namespace: Dict[str, Dict[str, int]] = {}
+    evictions = 0
+    for cache in caches.values():
+        for namespace, stats in cache.namespace_stats().items():
+            merged = per_namespace.setdefault(namespace, {})
+            for result, n in stats.items():
+                merged[result] = merged.get(result, 0) + n
+        evictions += cache.stats['evictions']
+
+    def hit_ratio(stats: Dict[str, int]) -> float:
+        hits = stats.get('hits', 0) + stats.get('stale_hits', 0)
+        lookups = hits + stats.get('misses', 0)
+        return round(hits / lookups, 4) if lookups else 0.0
+
+    totals: Dict[str, int] = {}
+    for stats in per_namespace.values():
+        for result, n in stats.items():
+            totals[result] = totals.get(result, 0) + n
+    lookups = [(f"{PREFIX}_cache_lookups_total", {'namespace': namespace, 'result': result}, n)
+               for namespace, stats in sorted(per_namespace.items())
+               for result, n in sorted(stats.items()) if result in ('hits', 'stale_hits', 'misses', 'disk_hits')]
+    ratios = [(f"{PREFIX}_cache_hit_ratio", {'namespace': namespace}, hit_ratio(stats))
+              for namespace, stats in sorted(per_namespace.items())]
+    ratios.append((f"{PREFIX}_cache_hit_ratio", {'namespace': 'all'}, hit_ratio(totals)))
+    return [
+        (f"{PREFIX}_cache_lookups_total", 'counter', "Tiered cache lookups per namespace and result", lookups),
+        (f"{PREFIX}_cache_hit_ratio", 'gauge', "Fresh plus stale hits over all lookups", ratios),
+        (f"{PREFIX}_cache_evictions_total", 'counter', "Entries evicted from the memory tier",
+         [(f"{PREFIX}_cache_evictions_total", {}, evictions)]),
+    ]
+
+
+def collect_limiters() -> List[Family]:
+    stats = _registry_stats('rate_limiter', 'limiter_stats')
+    if not stats:
+        return []
+    gauges = [(f"{PREFIX}_limiter_{field}", {'source': source}, float(snapshot[field]))
+              for field in ('concurrency', 'rate', 'in_flight') for source, snapshot in sorted(stats.items())]
+    events = [(f"{PREFIX}_limiter_events_total", {'source': source, 'event': event}, snapshot[event])
+              for source, snapshot in sorted(stats.items())
+              for event in ('throttled', 'timeouts', 'errors', 'backoffs', 'rejected')]
+    waits = [(f"{PREFIX}_limiter_wait_seconds_total", {'source': source}, float(snapshot['wait_seconds']))
+             for source, snapshot in sorted(stats.items())]
+    families = [(f"{PREFIX}_limiter_{field}", 'gauge', f"Adaptive limiter {field.replace('_', ' ')} per source",
+                 [s for s in gauges if s[0] == f"{PREFIX}_limiter_{field}"])
+                for field in ('concurrency', 'rate', 'in_flight')]
+    return families + [
+        (f"{PREFIX}_limiter_events_total", 'counter', "Congestion signals and rejections per source", events),
+        (f"{PREFIX}_limiter_wait_seconds_total", 'counter', "Time spent waiting for a permit", waits),
+    ]
+
+
+def collect_breakers() -> List[Family]:
+    stats = _registry_stats('circuit_breaker', 'breaker_stats')
+    if not stats:
+        return []
+    return [
+        (f"{PREFIX}_breaker_state", 'gauge', "Circuit state per source (0 closed, 1 half open, 2 open)",
+         [(f"{PREFIX}_breaker_state", {'source': name}, BREAKER_STATES.get(snapshot['state'], 2))
+          for name, snapshot in sorted(stats.items())]),
+        (f"{PREFIX}_breaker_calls_total", 'counter', "Calls through the breaker per source and result",
+         [(f"{PREFIX}_breaker_calls_total", {'source': name, 'result': result}, snapshot[result])
+          for name, snapshot in sorted(stats.items()) for result in ('calls', 'failures', 'rejected')]),
+    ]
+
+
+def collect_single_flight() -> List[Family]:
+    stats = _registry_stats('single_flight', 'single_flight_stats')
+    if not stats:
+        return []
+    return [(f"{PREFIX}_single_flight_total", 'counter', "Calls per group: upstream fetches and coalesced waiters",
+             [(f"{PREFIX}_single_flight_total", {'group': group, 'kind': kind}, counts[kind])
+              for group, counts in sorted(stats.items()) for kind in ('upstream', 'coalesced')])]
+
+
+def collect_reconciler() -> List[Family]:
+    module = _core('price_reconciliation')
+    if module is None:
+        return []
+    reconciler = module.price_reconciler
+    samples = [(f"{PREFIX}_reconciled_quotes_total", {'result': name}, value)
+               for name, value in sorted(reconciler.stats.items()) if name != 'passes']
+    families = [(f"{PREFIX}_reconciled_quotes_total", 'counter', "Quotes reconciled against the official snapshot",
+                 samples)]
+    reference = reconciler.reference
+    if reference is not None:
+        families.append((f"{PREFIX}_reference_age_seconds", 'gauge', "Age of the official reconciliation snapshot",
+                         [(f"{PREFIX}_reference_age_seconds", {}, round(max(0.0, time.time() - reference.as_of), 3))]))
+    return families
+
+
+def collect_transport() -> List[Family]:
+    module = _core('http_transport')
+    if module is None:
+        return []
+    transport = module.http_transport
+    return [(f"{PREFIX}_http_transport_total", 'counter', "Cassette replays, recordings, misses and injected errors",
+             [(f"{PREFIX}_http_transport_total", {'mode': transport.mode, 'event': event}, value)
+              for event, value in sorted(transport.stats.items())])]
+
+
+def collect_snapshot() -> List[Family]:
+    module = _core('snapshot_channel')
+    if module is None:
+        return []
+    published_at = module.market_channel.published_at()
+    if published_at is None:
+        return []
+    return [(f"{PREFIX}_snapshot_age_seconds", 'gauge', "Seconds since the daemon published the latest snapshot",
+             [(f"{PREFIX}_snapshot_age_seconds", {'channel': module.market_channel.name},
+               round(max(0.0, time.time() - published_at), 3))])]
+
+
+COLLECTORS = (collect_cache, collect_limiters, collect_breakers, collect_single_flight, collect_reconciler,
+              collect_transport, collect_snapshot)
+
+
+def _shared_metrics() -> FetchMetrics:
+    """One registry per process, even when core/ is imported both flat and as a package"""
+    for name in ('core.metrics', 'metrics'):
+        metrics = getattr(sys.modules.get(name), 'fetch_metrics', None)
+        if metrics is not None:
+            return metrics
+    metrics = FetchMetrics()
+    for collector in COLLECTORS:
+        metrics.register_collector(collector)
+    return metrics
+
+
+# Global registry (recorded by the rate limiter and the fetchers, exported by the daemon)
+fetch_metrics = _shared_metrics()
@@ -18,28 +18,36 @@ except ImportError:
     CACHE_AVAILABLE = False
     print("❌ Cache module not available")
 
+try:
+    from .tiered_cache import tiered_cache
+    from .rate_limiter import get_limiter, pool_size
+    from .http_transport import http_transport  # noqa: F401 - yfinance goes through the configured transport
+except ImportError:
+    from tiered_cache import tiered_cache
+    from rate_limiter import get_limiter, pool_size
+    from http_transport import http_transport  # noqa: F401 - yfinance goes through the configured transport
+
 logger = logging.getLogger(__name__)
 
 class PerformanceOptimizer:
-    def __init__(self):
-        self.cache = {}
+    def __init__(self, namespace: str = 'summaries'):
+        # Bounded shared cache instead of a private dict that grows forever
+        self.cache = tiered_cache
+        self.namespace = namespace
         self.cache_timeout = 60  # 1 minute cache
+        self.cache.configure(namespace, ttl=self.cache_timeout)
         
     def get_cached_data(self, key: str) -> Optional[Dict]:
         """Get cached data if still valid"""
-        if key in self.cache:
-            data, timestamp = self.cache[key]
-            if time.time() - timestamp < self.cache_timeout:
-                return data
-        return None
+        return self.cache.get(self.namespace, key)
     
     def set_cache(self, key: str, data: Dict):
         """Set cache with timestamp"""
-        self.cache[key] = (data, time.time())
+        self.cache.set(self.namespace, key, data)
     
     def clear_cache(self):
         """Clear all cached data"""
-        self.cache.clear()
+        self.cache.invalidate(self.namespace)
 
 class FastStockFetcher:
     """Optimized stock data fetcher with minimal dependencies"""
@@ -53,7 +61,8 @@ class FastStockFetcher:
             ticker = yf.Ticker(f"{symbol}.SR")
             
             # Get only essential data
-            hist = ticker.history(period="2d", actions=False, dividends=False, splits=False)
+            with get_limiter('yahoo').permit('history'):
+                hist = ticker.history(period="2d", actions=False)
             
             if len(hist) < 2:
                 return None
@@ -113,11 +122,11 @@ def get_fast_stocks() -> List[str]:
     additional = ["4001", "6001", "2090", "3080", "1202", "4020", "6050", "1182", "4180", "4191", "4270", "2130", "4160"]
     return priority + additional[:25-len(priority)]
 
-def parallel_fetch_stocks(symbols: List[str], max_workers: int = 8) -> List[Dict]:
-    """Fetch stocks in parallel with optimized threading"""
+def parallel_fetch_stocks(symbols: List[str], max_workers: Optional[int] = None) -> List[Dict]:
+    """Fetch stocks in parallel; the shared Yahoo limiter paces the requests"""
     results = []
     
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    with ThreadPoolExecutor(max_workers=max_workers or pool_size('yahoo')) as executor:
         # Submit all fetches
         futures = {
             executor.submit(FastStockFetcher.minimal_stock_data, symbol): symbol 
@@ -146,7 +155,7 @@ def get_super_fast_summary() -> Dict:
     priority_symbols = get_priority_stocks()
     
     # Fetch in parallel
-    stock_data = parallel_fetch_stocks(priority_symbols, max_workers=12)
+    stock_data = parallel_fetch_stocks(priority_symbols)
     
     if not stock_data:
         return {"error": "No data available", "loading_time": 0}
@@ -0,0 +1,208 @@
+"""
+Price History Store for Saudi Stock Market App
+Local SQLite OHLCV store with incremental refresh - history reads come from disk
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from datetime import date, timedelta
+from typing import Callable, Optional
+
+import pandas as pd
+
+try:
+    from .single_flight import flight_group
+    from .rate_limiter import get_limiter
+    from .http_transport import http_transport  # noqa: F401 - yfinance goes through the configured transport
+except ImportError:
+    from single_flight import flight_group
+    from rate_limiter import get_limiter
+    from http_transport import http_transport  # noqa: F401 - yfinance goes through the configured transport
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = "config/fetcher_config.json"
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def _load_database_config(config_path: str) -> dict:
+    """Read the 'database' section of fetcher_config.json"""
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('database', {})
+    except Exception as e:
+        logger.debug(f"Fetcher config not loaded: {e}")
+        return {}
+
+
+class PriceHistoryStore:
+    """
+    Daily OHLCV bars per symbol in SQLite (WAL mode, primary key on symbol+date):
+    1. First read backfills the requested window (at least `max_history_days`)
+    2. Later reads only download bars from the last stored date onwards,
+       unless they ask for a longer window than was ever downloaded (then it is backfilled)
+    3. A symbol is not re-fetched more than once per `refresh_interval`
+    4. Concurrent refreshes of one symbol share a single download
+    """
+
+    def __init__(self, db_path: Optional[str] = None, config_path: str = CONFIG_PATH,
+                 refresh_interval: int = 15 * 60, history_fn: Optional[Callable] = None):
+        db_config = _load_database_config(config_path)
+        self.db_path = db_path or os.path.join("data", db_config.get('sqlite_file', 'saudi_stocks_continuous.db'))
+        self.max_history_days = int(db_config.get('max_history_days', 30))
+        self.refresh_interval = refresh_interval
+        self._history_fn = history_fn or self._download_history
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+        # Network usage counters
+        self.download_count = 0
+        self.bars_downloaded = 0
+
+    @staticmethod
+    def _download_history(symbol: str, start: date) -> pd.DataFrame:
+        """Download daily bars from `start` (inclusive) to today"""
+        import yfinance as yf
+        with get_limiter('yahoo').permit('history'):
+            return yf.Ticker(f"{symbol}.SR").history(start=start.isoformat(), interval="1d")
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers and the writer overlap"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        with self._schema_lock:
+            if not self._schema_ready:
+                self._create_schema(conn)
+                self._schema_ready = True
+        return conn
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS price_history (
+                symbol TEXT NOT NULL,
+                date TEXT NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, volume INTEGER,
+                PRIMARY KEY (symbol, date)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS fetch_log (
+                symbol TEXT PRIMARY KEY,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS history_coverage (
+                symbol TEXT PRIMARY KEY,
+                start TEXT NOT NULL
+            );
+        """)
+        conn.commit()
+
+    @staticmethod
+    def _clean(symbol: str) -> str:
+        return str(symbol).replace('.SR', '').strip()
+
+    def last_date(self, symbol: str) -> Optional[date]:
+        """Most recent stored bar date for a symbol"""
+        row = self._connect().execute(
+            "SELECT MAX(date) FROM price_history WHERE symbol = ?", (self._clean(symbol),)
+        ).fetchone()
+        return date.fromisoformat(row[0]) if row and row[0] else None
+
+    def covered_from(self, symbol: str) -> Optional[date]:
+        """Earliest date already downloaded for a symbol (weekends and holidays included)"""
+        conn = self._connect()
+        symbol = self._clean(symbol)
+        row = conn.execute("SELECT start FROM history_coverage WHERE symbol = ?", (symbol,)).fetchone()
+        if not row:
+            # Stores written before coverage was tracked: the oldest bar is the best estimate
+            row = conn.execute("SELECT MIN(date) FROM price_history WHERE symbol = ?", (symbol,)).fetchone()
+        return date.fromisoformat(row[0]) if row and row[0] else None
+
+    def _fetched_recently(self, symbol: str) -> bool:
+        row = self._connect().execute(
+            "SELECT fetched_at FROM fetch_log WHERE symbol = ?", (symbol,)
+        ).fetchone()
+        return bool(row) and (time.time() - row[0]) < self.refresh_interval
+
+    def store_bars(self, symbol: str, bars: pd.DataFrame) -> int:
+        """Upsert OHLCV bars (yfinance-style DataFrame) for a symbol"""
+        symbol = self._clean(symbol)
+        if bars is None or bars.empty:
+            return 0
+        rows = [
+            (symbol, pd.Timestamp(idx).date().isoformat(),
+             float(bar['Open']), float(bar['High']), float(bar['Low']), float(bar['Close']),
+             int(bar['Volume']) if pd.notna(bar['Volume']) else 0)
+            for idx, bar in bars[OHLCV_COLUMNS].dropna(subset=['Close']).iterrows()
+        ]
+        conn = self._connect()
+        conn.executemany("INSERT OR REPLACE INTO price_history VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+        return len(rows)
+
+    def refresh(self, symbol: str, days: int = 90, force: bool = False) -> int:
+        """Download only the bars newer than what is stored; returns bars written"""
+        symbol = self._clean(symbol)
+        return flight_group('history').do((self.db_path, symbol, days), self._refresh, symbol, days, force)
+
+    def _refresh(self, symbol: str, days: int, force: bool) -> int:
+        wanted = date.today() - timedelta(days=max(days, self.max_history_days))
+        covered = self.covered_from(symbol)
+        backfill = covered is not None and wanted < covered
+        if not force and not backfill and self._fetched_recently(symbol):
+            return 0
+
+        last = self.last_date(symbol)
+        if last is None or backfill:
+            start = wanted
+        else:
+            # Re-fetch the last stored day: its bar may have been taken intraday
+            start = last
+
+        bars = self._history_fn(symbol, start)
+        self.download_count += 1
+        written = self.store_bars(symbol, bars)
+        self.bars_downloaded += written
+
+        conn = self._connect()
+        conn.execute("INSERT OR REPLACE INTO fetch_log VALUES (?, ?)", (symbol, time.time()))
+        if start == wanted:
+            conn.execute("INSERT OR REPLACE INTO history_coverage VALUES (?, ?)", (symbol, wanted.isoformat()))
+        conn.commit()
+        logger.debug(f"History refresh {symbol}: {written} bars from {start}")
+        return written
+
+    def read_history(self, symbol: str, days: int = 90) -> pd.DataFrame:
+        """Read stored bars for the last `days` calendar days (no network)"""
+        since = (date.today() - timedelta(days=days)).isoformat()
+        frame = pd.read_sql_query(
+            "SELECT date, open, high, low, close, volume FROM price_history "
+            "WHERE symbol = ? AND date >= ? ORDER BY date",
+            self._connect(), params=(self._clean(symbol), since), parse_dates=['date'],
+        )
+        frame.columns = ['Date'] + OHLCV_COLUMNS
+        return frame.set_index('Date')
+
+    def get_history(self, symbol: str, days: int = 90, refresh: bool = True) -> pd.DataFrame:
+        """Incrementally refresh then serve history from disk"""
+        if refresh:
+            try:
+                self.refresh(symbol, days)
+            except Exception as e:
+                logger.warning(f"History refresh failed for {symbol}, serving stored bars: {e}")
+        return self.read_history(symbol, days)
+
+
+# Global history store (connection opened on first use)
+price_history_store = PriceHistoryStore()
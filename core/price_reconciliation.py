@@ -0,0 +1,304 @@
+"""
+Price Reconciliation for Saudi Stock Market App
+Quotes from every source are aligned by symbol against the latest official
+(Saudi Exchange market watch) snapshot and reconciled in one vectorized pass:
+discrepancies, blend weights, corrected price/volume and provenance flags
+"""
+
+import sys
+import threading
+import time
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Provenance flags (bit mask per reconciled quote)
+PRICE_CORRECTED = 1      # price/change blended towards the reference
+VOLUME_CORRECTED = 2     # volume blended towards the reference
+NO_REFERENCE = 4         # symbol missing from the official snapshot
+STALE_REFERENCE = 8      # official snapshot older than max_reference_age - left as observed
+OUTLIER = 16             # observed price too far off to blend - reference taken as is
+OFFICIAL = 32            # the quote itself came from the official market watch
+
+FLAG_NAMES = {
+    PRICE_CORRECTED: 'price_corrected',
+    VOLUME_CORRECTED: 'volume_corrected',
+    NO_REFERENCE: 'no_reference',
+    STALE_REFERENCE: 'stale_reference',
+    OUTLIER: 'outlier',
+    OFFICIAL: 'official',
+}
+
+OFFICIAL_SOURCE_PREFIX = 'Saudi Exchange'
+
+
+def flag_names(flags: int) -> List[str]:
+    return [name for bit, name in FLAG_NAMES.items() if flags & bit]
+
+
+def _is_official(quote: Dict) -> bool:
+    return quote.get('source') == 'saudi_exchange' or \
+        str(quote.get('data_source') or '').startswith(OFFICIAL_SOURCE_PREFIX)
+
+
+@dataclass
+class SourceSnapshot:
+    """One source's quotes as aligned column arrays, sorted by symbol"""
+    source: str
+    symbols: np.ndarray
+    price: np.ndarray
+    change_pct: np.ndarray
+    volume: np.ndarray
+    official: np.ndarray = None
+    as_of: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        if self.official is None:
+            self.official = np.zeros(len(self.symbols), dtype=bool)
+        order = np.argsort(self.symbols, kind='stable')
+        for name in ('symbols', 'price', 'change_pct', 'volume', 'official'):
+            setattr(self, name, np.asarray(getattr(self, name))[order])
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @classmethod
+    def from_quotes(cls, quotes: Union[Dict[str, Dict], Iterable[Dict]], source: str = 'observed',
+                    as_of: Optional[float] = None) -> 'SourceSnapshot':
+        """Build from {symbol: quote} or a list of quotes; failed quotes are dropped"""
+        items = quotes.items() if isinstance(quotes, dict) else ((q.get('symbol'), q) for q in quotes)
+        rows = [(str(symbol).replace('.SR', ''), quote) for symbol, quote in items
+                if symbol and quote and quote.get('success', True) and quote.get('current_price')]
+        return cls(
+            source=source,
+            symbols=np.array([symbol for symbol, _ in rows], dtype=object),
+            price=np.array([float(q['current_price']) for _, q in rows], dtype=float),
+            change_pct=np.array([float(q.get('change_percent', q.get('change_pct')) or 0.0) for _, q in rows],
+                                dtype=float),
+            volume=np.array([float(q.get('volume') or 0) for _, q in rows], dtype=float),
+            official=np.array([_is_official(q) for _, q in rows], dtype=bool),
+            as_of=time.time() if as_of is None else as_of,
+        )
+
+
+class PriceReconciler:
+    """
+    Replaces per-symbol correction tables:
+    1. The reference is the latest official snapshot (set each market watch fetch,
+       or loaded from the snapshot archive at startup)
+    2. `reconcile` aligns observed quotes to the reference with one searchsorted
+       and computes every discrepancy, weight and corrected value as array ops
+    3. Rows outside tolerance are blended towards the reference; wild outliers take
+       the reference outright; every row carries provenance flags
+    """
+
+    def __init__(self, price_tolerance: float = 0.3, change_tolerance: float = 0.2,
+                 volume_tolerance: float = 0.5, price_weight: float = 0.8, volume_weight: float = 0.7,
+                 outlier_pct: float = 15.0, max_reference_age: float = 900.0, clock=time.time):
+        self.price_tolerance = price_tolerance          # SAR
+        self.change_tolerance = change_tolerance        # percentage points
+        self.volume_tolerance = volume_tolerance        # relative to the observed volume
+        self.price_weight = price_weight                # reference share of a blended price
+        self.volume_weight = volume_weight              # reference share of a blended volume
+        self.outlier_pct = outlier_pct                  # % price gap where blending stops making sense
+        self.max_reference_age = max_reference_age      # seconds
+        self.clock = clock
+        self._reference: Optional[SourceSnapshot] = None
+        self._lock = threading.Lock()
+        self.stats = {'passes': 0, 'quotes': 0, 'price_corrected': 0, 'volume_corrected': 0, 'outliers': 0}
+
+    @property
+    def reference(self) -> Optional[SourceSnapshot]:
+        return self._reference
+
+    def set_reference(self, quotes, as_of: Optional[float] = None) -> int:
+        """Install the official snapshot ({symbol: quote} or list); returns the symbols referenced"""
+        snapshot = SourceSnapshot.from_quotes(quotes, source='official', as_of=as_of)
+        if not len(snapshot):
+            return 0
+        with self._lock:
+            self._reference = snapshot
+        logger.debug(f"📐 Reconciliation reference: {len(snapshot)} official quotes")
+        return len(snapshot)
+
+    def load_reference(self, archive) -> int:
+        """Use the newest official quotes from the snapshot archive (e.g. at process start)"""
+        try:
+            frame = archive.latest(columns=['current_price', 'change_percent', 'volume', 'data_source'])
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load reconciliation reference from archive: {e}")
+            return 0
+        frame = frame[frame['data_source'].fillna('').str.startswith(OFFICIAL_SOURCE_PREFIX)]
+        if frame.empty:
+            return 0
+        as_of = pd.Timestamp(frame['snapshot_ts'].iloc[0]).to_pydatetime().timestamp()
+        loaded = self.set_reference(frame.assign(success=True).to_dict('records'), as_of=as_of)
+        logger.info(f"📐 Loaded {loaded} reference quotes from the snapshot archive")
+        return loaded
+
+    def reconcile(self, observed: SourceSnapshot, reference: Optional[SourceSnapshot] = None) -> pd.DataFrame:
+        """One row per observed symbol: reference values, discrepancies, weights, corrected values, flags"""
+        reference = reference if reference is not None else self._reference
+        n = len(observed)
+        flags = np.zeros(n, dtype=np.int64)
+        flags[observed.official] |= OFFICIAL
+
+        if reference is not None and len(reference):
+            position = np.searchsorted(reference.symbols, observed.symbols)
+            position = np.minimum(position, len(reference) - 1)
+            found = reference.symbols[position] == observed.symbols
+            ref_price = np.where(found, reference.price[position], np.nan)
+            ref_change = np.where(found, reference.change_pct[position], np.nan)
+            ref_volume = np.where(found, reference.volume[position], np.nan)
+            fresh = self.clock() - reference.as_of <= self.max_reference_age
+        else:
+            found = np.zeros(n, dtype=bool)
+            ref_price = ref_change = ref_volume = np.full(n, np.nan)
+            fresh = False
+
+        flags[~found] |= NO_REFERENCE
+        if not fresh:
+            flags[found] |= STALE_REFERENCE
+        usable = found & fresh & ~observed.official
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            price_diff = np.abs(observed.price - ref_price)
+            change_diff = np.abs(observed.change_pct - ref_change)
+            price_gap_pct = price_diff / ref_price * 100
+            volume_diff = np.where(observed.volume > 0, np.abs(observed.volume - ref_volume) / observed.volume, np.nan)
+
+        price_off = usable & ((price_diff > self.price_tolerance) | (change_diff > self.change_tolerance))
+        outlier = price_off & (price_gap_pct > self.outlier_pct)
+        w_price = np.where(outlier, 1.0, np.where(price_off, self.price_weight, 0.0))
+        volume_off = usable & (ref_volume > 0) & (volume_diff > self.volume_tolerance)
+        w_volume = np.where(volume_off, self.volume_weight, 0.0)
+
+        corrected_price = np.where(price_off, observed.price * (1 - w_price) + np.nan_to_num(ref_price) * w_price,
+                                   observed.price)
+        corrected_change = np.where(price_off,
+                                    observed.change_pct * (1 - w_price) + np.nan_to_num(ref_change) * w_price,
+                                    observed.change_pct)
+        corrected_volume = np.where(volume_off,
+                                    observed.volume * (1 - w_volume) + np.nan_to_num(ref_volume) * w_volume,
+                                    observed.volume)
+        flags[price_off] |= PRICE_CORRECTED
+        flags[outlier] |= OUTLIER
+        flags[volume_off] |= VOLUME_CORRECTED
+
+        return pd.DataFrame({
+            'symbol': observed.symbols,
+            'price': observed.price,
+            'change_pct': observed.change_pct,
+            'volume': observed.volume,
+            'reference_price': ref_price,
+            'reference_change_pct': ref_change,
+            'reference_volume': ref_volume,
+            'price_discrepancy': price_diff,
+            'change_discrepancy': change_diff,
+            'volume_discrepancy': volume_diff,
+            'price_weight': w_price,
+            'volume_weight': w_volume,
+            'corrected_price': corrected_price,
+            'corrected_change_pct': corrected_change,
+            'corrected_previous_close': np.where(corrected_change != 0, corrected_price / (1 + corrected_change / 100),
+                                                 corrected_price),
+            'corrected_volume': np.round(corrected_volume).astype(np.int64),
+            'flags': flags,
+        })
+
+    def reconcile_quotes(self, quotes: Dict[str, Dict]) -> Dict[str, Dict]:
+        """Reconcile a whole sweep ({symbol: quote}); returns a new dict, failed quotes passed through"""
+        observed = SourceSnapshot.from_quotes(quotes)
+        if not len(observed):
+            return dict(quotes)
+        reference = self._reference
+        frame = self.reconcile(observed, reference)
+        as_of = datetime.fromtimestamp(reference.as_of).isoformat() if reference is not None else None
+
+        reconciled = dict(quotes)
+        by_symbol = {str(symbol).replace('.SR', ''): symbol for symbol in quotes}
+        for row in frame.itertuples(index=False):
+            key = by_symbol[row.symbol]
+            reconciled[key] = self._apply(quotes[key], row, as_of)
+
+        self._record(frame, log=len(frame) > 1)
+        return reconciled
+
+    def reconcile_quote(self, symbol: str, result: Dict) -> Dict:
+        """Single-quote convenience wrapper around reconcile_quotes"""
+        if not result.get('success'):
+            return result
+        return self.reconcile_quotes({str(symbol).replace('.SR', ''): result})[str(symbol).replace('.SR', '')]
+
+    @staticmethod
+    def _apply(quote: Dict, row, as_of: Optional[str]) -> Dict:
+        """Corrected copy of a quote, with the legacy correction keys and a provenance record"""
+        quote = dict(quote)
+        data_source = quote.get('data_source', 'Unknown')
+        if row.flags & PRICE_CORRECTED:
+            price = round(float(row.corrected_price), 2)
+            previous_close = round(float(row.corrected_previous_close), 2)
+            quote.update({
+                'current_price': price,
+                'previous_close': previous_close,
+                'change': round(price - previous_close, 2),
+                'change_percent': round(float(row.corrected_change_pct), 2),
+                'tasi_corrected': True,
+                'original_price': float(row.price),
+                'original_change_pct': float(row.change_pct),
+            })
+            data_source += ' + TASI Price Correction'
+        if row.flags & VOLUME_CORRECTED:
+            quote.update({
+                'volume': int(row.corrected_volume),
+                'tasi_volume_corrected': True,
+                'original_volume': int(row.volume),
+            })
+            data_source += ' + TASI Volume Correction'
+        quote['data_source'] = data_source
+        quote['reconciliation'] = {
+            'flags': flag_names(int(row.flags)),
+            'reference_price': None if np.isnan(row.reference_price) else float(row.reference_price),
+            'price_weight': float(row.price_weight),
+            'volume_weight': float(row.volume_weight),
+            'reference_as_of': as_of,
+        }
+        return quote
+
+    def _record(self, frame: pd.DataFrame, log: bool):
+        flags = frame['flags'].to_numpy()
+        price_corrected = int(np.count_nonzero(flags & PRICE_CORRECTED))
+        volume_corrected = int(np.count_nonzero(flags & VOLUME_CORRECTED))
+        outliers = int(np.count_nonzero(flags & OUTLIER))
+        with self._lock:
+            self.stats['passes'] += 1
+            self.stats['quotes'] += len(frame)
+            self.stats['price_corrected'] += price_corrected
+            self.stats['volume_corrected'] += volume_corrected
+            self.stats['outliers'] += outliers
+        if log:
+            logger.info(f"🔧 Reconciled {len(frame)} quotes: {price_corrected} price / {volume_corrected} volume "
+                        f"corrections, {outliers} outliers, "
+                        f"{int(np.count_nonzero(flags & NO_REFERENCE))} without reference")
+        elif price_corrected or volume_corrected:
+            logger.info(f"🔧 Reconciled {frame['symbol'].iloc[0]} against the official snapshot "
+                        f"({', '.join(flag_names(int(flags[0])))})")
+
+
+def _shared_reconciler() -> PriceReconciler:
+    """One reconciler per process, even when core/ is imported both flat and as a package"""
+    for name in ('core.price_reconciliation', 'price_reconciliation'):
+        reconciler = getattr(sys.modules.get(name), 'price_reconciler', None)
+        if reconciler is not None:
+            return reconciler
+    return PriceReconciler()
+
+
+# Global reconciler (reference refreshed from every market watch fetch)
+price_reconciler = _shared_reconciler()
@@ -0,0 +1,250 @@
+"""
+Adaptive Rate Limiter for Saudi Stock Market App
+Per-source token bucket + AIMD concurrency: every fetcher acquires its permits here
+"""
+
+import asyncio
+import json
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from .metrics import fetch_metrics
+except ImportError:
+    from metrics import fetch_metrics
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = "config/fetcher_config.json"
+
+# rate: requests/second refilled into the bucket; burst: bucket size;
+# concurrency: starting in-flight limit, moved between min/max by AIMD;
+# target_latency: calls slower than this do not ramp the limits up
+DEFAULT_SOURCES = {
+    'yahoo':          {'rate': 8.0, 'burst': 16, 'concurrency': 8, 'min_concurrency': 2,
+                       'max_concurrency': 24, 'target_latency': 3.0},
+    'saudi_exchange': {'rate': 2.0, 'burst': 4, 'concurrency': 2, 'min_concurrency': 1,
+                       'max_concurrency': 4, 'target_latency': 5.0},
+    'argaam':         {'rate': 2.0, 'burst': 4, 'concurrency': 2, 'min_concurrency': 1,
+                       'max_concurrency': 4, 'target_latency': 5.0},
+}
+
+OK, SLOW, THROTTLED, TIMEOUT, ERROR = 'ok', 'slow', 'throttled', 'timeout', 'error'
+
+
+def classify_exception(exc: BaseException) -> str:
+    """Map an upstream exception to a limiter outcome"""
+    response = getattr(exc, 'response', None)
+    status = getattr(response, 'status_code', None) or getattr(exc, 'status', None)
+    text = f"{type(exc).__name__} {exc}".lower()
+    if status in (429, 503) or 'ratelimit' in text or 'rate limit' in text or 'too many requests' in text:
+        return THROTTLED
+    if isinstance(exc, TimeoutError) or 'timeout' in text or 'timed out' in text:
+        return TIMEOUT
+    return ERROR
+
+
+class Permit:
+    """Handed to the caller inside `limiter.permit()`; lets it report throttling without raising"""
+
+    def __init__(self):
+        self.outcome: Optional[str] = None
+
+    def throttled(self):
+        self.outcome = THROTTLED
+
+    def check_response(self, response) -> Any:
+        """Mark HTTP 429/503 responses as throttled; returns the response unchanged"""
+        if getattr(response, 'status_code', None) in (429, 503):
+            self.outcome = THROTTLED
+        return response
+
+    def check_result(self, result: Any) -> Any:
+        """Classify fetcher results that report errors as {'success': False, 'error': ...}"""
+        if isinstance(result, dict) and result.get('success') is False:
+            outcome = classify_exception(Exception(str(result.get('error', ''))))
+            if outcome in (THROTTLED, TIMEOUT):
+                self.outcome = outcome
+        return result
+
+
+class AdaptiveRateLimiter:
+    """
+    Limits one upstream source:
+    1. Token bucket - sustained `rate` requests/second with bursts up to `burst`
+    2. Concurrency cap - at most `limit` calls in flight
+    3. AIMD - each healthy call adds ~1/limit (so +1 per window of calls) to the cap
+       and a little to the rate; a 429 or timeout halves both (at most once per
+       `target_latency`, so one burst of failures counts as one congestion signal)
+    """
+
+    def __init__(self, source: str, rate: float = 5.0, burst: int = 10, concurrency: int = 8,
+                 min_concurrency: int = 1, max_concurrency: int = 32, target_latency: float = 3.0,
+                 backoff: float = 0.5, clock: Callable[[], float] = time.monotonic):
+        self.source = source
+        self.base_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = self.base_rate / 8
+        self.max_rate = self.base_rate * 4
+        self.burst = float(burst)
+        self.min_concurrency = int(min_concurrency)
+        self.max_concurrency = int(max_concurrency)
+        self.limit = float(min(max(concurrency, min_concurrency), max_concurrency))
+        self.target_latency = float(target_latency)
+        self.backoff = backoff
+        self._clock = clock
+
+        self._cond = threading.Condition()
+        self._tokens = self.burst
+        self._refilled = clock()
+        self._last_backoff = float('-inf')
+        self.in_flight = 0
+        self.stats = {'acquired': 0, 'rejected': 0, 'throttled': 0, 'timeouts': 0,
+                      'errors': 0, 'backoffs': 0, 'wait_seconds': 0.0}
+
+    @property
+    def concurrency(self) -> int:
+        return int(self.limit)
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _try_acquire(self, start: float) -> Optional[float]:
+        """Take a token and a slot (lock held); otherwise return how long to wait"""
+        now = self._clock()
+        self._refill(now)
+        if self.in_flight < self.concurrency and self._tokens >= 1:
+            self._tokens -= 1
+            self.in_flight += 1
+            self.stats['acquired'] += 1
+            self.stats['wait_seconds'] += now - start
+            return None
+        # Until the next token, or until a release if the bucket is not the problem
+        return (1 - self._tokens) / self.rate if self._tokens < 1 else 1.0
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Block until a token and a concurrency slot are free; False on timeout"""
+        start = self._clock()
+        with self._cond:
+            while True:
+                wait = self._try_acquire(start)
+                if wait is None:
+                    return True
+                now = self._clock()
+                if timeout is not None:
+                    remaining = start + timeout - now
+                    if remaining <= 0:
+                        self.stats['rejected'] += 1
+                        return False
+                    wait = min(wait, remaining)
+                self._cond.wait(wait)
+
+    async def acquire_async(self):
+        """acquire() for event-loop callers: waits with asyncio.sleep instead of blocking the loop"""
+        start = self._clock()
+        while True:
+            with self._cond:
+                wait = self._try_acquire(start)
+            if wait is None:
+                return
+            await asyncio.sleep(min(wait, 0.05))
+
+    def release(self, latency: float, outcome: str = OK, endpoint: str = 'call'):
+        """Return the slot and adapt: additive increase when healthy, multiplicative decrease on congestion"""
+        fetch_metrics.observe(self.source, endpoint, latency, outcome)
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            now = self._clock()
+
+            if outcome in (THROTTLED, TIMEOUT):
+                self.stats['throttled' if outcome == THROTTLED else 'timeouts'] += 1
+                if now - self._last_backoff >= self.target_latency:
+                    self._last_backoff = now
+                    self.stats['backoffs'] += 1
+                    self.limit = max(self.min_concurrency, self.limit * self.backoff)
+                    self.rate = max(self.min_rate, self.rate * self.backoff)
+                    self._tokens = min(self._tokens, 0.0)
+                    logger.warning(f"🐢 {self.source}: {outcome}, backing off to "
+                                   f"{self.concurrency} in flight / {self.rate:.1f} req/s")
+            elif outcome == ERROR:
+                self.stats['errors'] += 1
+            elif outcome == OK and latency <= self.target_latency:
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+                self.rate = min(self.max_rate, self.rate + self.base_rate / (10 * self.limit))
+
+            self._cond.notify_all()
+
+    @contextmanager
+    def permit(self, endpoint: str = 'call'):
+        """
+        with limiter.permit('history') as permit:
+            response = permit.check_response(session.get(url))
+        Exceptions raised inside are classified (429 / timeout / other) and re-raised.
+        The call's latency and outcome are recorded in the fetch metrics under `endpoint`.
+        """
+        self.acquire()
+        permit = Permit()
+        start = time.perf_counter()
+        try:
+            yield permit
+        except BaseException as e:
+            permit.outcome = permit.outcome or classify_exception(e)
+            raise
+        finally:
+            latency = time.perf_counter() - start
+            outcome = permit.outcome or (OK if latency <= self.target_latency else SLOW)
+            self.release(latency, outcome, endpoint)
+
+    def call(self, fn: Callable[..., Any], *args, endpoint: str = 'call', **kwargs) -> Any:
+        """Run one upstream call under a permit"""
+        with self.permit(endpoint):
+            return fn(*args, **kwargs)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {'concurrency': self.concurrency, 'rate': round(self.rate, 2),
+                    'in_flight': self.in_flight, **self.stats}
+
+
+def _load_source_config(config_path: str) -> Dict[str, Dict]:
+    """DEFAULT_SOURCES overridden by the 'rate_limits' section of fetcher_config.json"""
+    sources = {name: dict(cfg) for name, cfg in DEFAULT_SOURCES.items()}
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            for name, cfg in json.load(f).get('rate_limits', {}).items():
+                sources.setdefault(name, {}).update(cfg)
+    except Exception as e:
+        logger.debug(f"Rate limit config not loaded: {e}")
+    return sources
+
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+_source_config: Optional[Dict[str, Dict]] = None
+
+
+def get_limiter(source: str, config_path: str = CONFIG_PATH) -> AdaptiveRateLimiter:
+    """Process-wide limiter per upstream source"""
+    global _source_config
+    with _limiters_lock:
+        limiter = _limiters.get(source)
+        if limiter is None:
+            if _source_config is None:
+                _source_config = _load_source_config(config_path)
+            limiter = _limiters[source] = AdaptiveRateLimiter(source, **_source_config.get(source, {}))
+        return limiter
+
+
+def pool_size(source: str) -> int:
+    """Thread pool size for a fetcher: enough threads for the limiter's ceiling, the limiter does the throttling"""
+    return get_limiter(source).max_concurrency
+
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.source: limiter.snapshot() for limiter in limiters}
@@ -0,0 +1,186 @@
+"""
+Refresh Scheduler for Saudi Stock Market App
+Market-hours-aware refresh timing driven by config/fetcher_config.json
+"""
+
+import json
+import time
+import logging
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Callable, Dict, Optional
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    ZoneInfo = None
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = "config/fetcher_config.json"
+
+PRE_OPEN = 'pre_open'
+OPEN = 'open'
+POST_CLOSE = 'post_close'
+CLOSED = 'closed'
+
+
+def _load_config(config_path: str) -> Dict:
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.debug(f"Fetcher config not loaded: {e}")
+        return {}
+
+
+def _timezone(name: str):
+    """IANA zone if available; Riyadh has no DST so UTC+3 is an exact fallback"""
+    try:
+        return ZoneInfo(name)
+    except Exception:
+        return timezone(timedelta(hours=3), name)
+
+
+class MarketRefreshScheduler:
+    """
+    Decides when market data is due for a refresh:
+    1. Pre-open: one warm-up pass `warmup_minutes` before the open
+    2. Open and post-close window: one refresh per `update_interval`
+    3. Closed: one pass once the post-close window ends, then the closing
+       snapshot stays fresh (no network I/O) until the next pre-open
+
+    `market_hours.trading_days` uses Sunday=0 numbering (0-4 = Sunday-Thursday).
+    """
+
+    def __init__(self, config_path: str = CONFIG_PATH, warmup_minutes: int = 15,
+                 post_close_minutes: int = 15, clock: Callable[[], float] = time.time):
+        config = _load_config(config_path)
+        fetching = config.get('continuous_fetching', {})
+        hours = config.get('market_hours', {})
+
+        self.enabled = bool(fetching.get('enabled', True))
+        self.update_interval = int(fetching.get('update_interval', 30))
+        self.max_retries = int(fetching.get('max_retries', 3))
+        self.timeout = float(fetching.get('timeout', 30))
+
+        self.trading_days = set(hours.get('trading_days', [0, 1, 2, 3, 4]))
+        self.open_time = dt_time.fromisoformat(hours.get('open_time', '10:00'))
+        self.close_time = dt_time.fromisoformat(hours.get('close_time', '15:00'))
+        self.tz = _timezone(hours.get('timezone', 'Asia/Riyadh'))
+
+        self.warmup = timedelta(minutes=warmup_minutes)
+        self.post_close = timedelta(minutes=post_close_minutes)
+        self._clock = clock
+
+    # ------------------------------------------------------------- calendar
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self._clock(), self.tz)
+
+    def is_trading_day(self, day: date) -> bool:
+        # Python: Monday=0 ... Sunday=6 -> config: Sunday=0 ... Saturday=6
+        return (day.weekday() + 1) % 7 in self.trading_days
+
+    def _open_at(self, day: date) -> datetime:
+        return datetime.combine(day, self.open_time, tzinfo=self.tz)
+
+    def _close_at(self, day: date) -> datetime:
+        return datetime.combine(day, self.close_time, tzinfo=self.tz)
+
+    def phase(self, now: Optional[datetime] = None) -> str:
+        now = now or self.now()
+        day = now.date()
+        if not self.is_trading_day(day):
+            return CLOSED
+        if self._open_at(day) - self.warmup <= now < self._open_at(day):
+            return PRE_OPEN
+        if self._open_at(day) <= now < self._close_at(day):
+            return OPEN
+        if self._close_at(day) <= now < self._close_at(day) + self.post_close:
+            return POST_CLOSE
+        return CLOSED
+
+    def last_session_end(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """End of the most recent post-close window at or before `now`"""
+        now = now or self.now()
+        for back in range(8):
+            day = now.date() - timedelta(days=back)
+            end = self._close_at(day) + self.post_close
+            if self.is_trading_day(day) and end <= now:
+                return end
+        return None
+
+    def next_pre_open(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        now = now or self.now()
+        for ahead in range(8):
+            day = now.date() + timedelta(days=ahead)
+            start = self._open_at(day) - self.warmup
+            if self.is_trading_day(day) and start > now:
+                return start
+        return None
+
+    # ------------------------------------------------------------ refreshes
+    def refresh_boundary(self, now: Optional[datetime] = None, interval: Optional[int] = None) -> datetime:
+        """Start of the current refresh cycle; data fetched before it is stale"""
+        now = now or self.now()
+        interval = interval or self.update_interval
+        phase = self.phase(now)
+
+        if phase == PRE_OPEN:
+            return self._open_at(now.date()) - self.warmup
+        if phase in (OPEN, POST_CLOSE):
+            opened = self._open_at(now.date())
+            cycles = int((now - opened).total_seconds() // interval)
+            return opened + timedelta(seconds=cycles * interval)
+
+        last_end = self.last_session_end(now)
+        if last_end is not None:
+            return last_end
+        # No trading days configured: plain fixed-interval refresh
+        return datetime.fromtimestamp(now.timestamp() // interval * interval, self.tz)
+
+    def next_refresh(self, now: Optional[datetime] = None, interval: Optional[int] = None) -> datetime:
+        """When the next refresh cycle starts"""
+        now = now or self.now()
+        interval = interval or self.update_interval
+        phase = self.phase(now)
+
+        if phase == PRE_OPEN:
+            return self._open_at(now.date())
+        if phase in (OPEN, POST_CLOSE):
+            session_end = self._close_at(now.date()) + self.post_close
+            return min(self.refresh_boundary(now, interval) + timedelta(seconds=interval), session_end)
+        return self.next_pre_open(now) or now + timedelta(seconds=interval)
+
+    def is_due(self, last_fetch: float, interval: Optional[int] = None) -> bool:
+        """True if data fetched at `last_fetch` (epoch seconds) predates the current cycle"""
+        return last_fetch < self.refresh_boundary(interval=interval).timestamp()
+
+    def fresh_for(self, interval: Optional[int] = None) -> float:
+        """
+        Cache TTL for this moment: anything older than the start of the
+        current cycle is stale, anything newer is fresh.
+        """
+        now = self.now()
+        return max(1.0, (now - self.refresh_boundary(now, interval)).total_seconds())
+
+    def seconds_until_next_refresh(self, interval: Optional[int] = None) -> float:
+        now = self.now()
+        return max(0.0, (self.next_refresh(now, interval) - now).total_seconds())
+
+    def session_key(self, interval: Optional[int] = None) -> str:
+        """Identifier of the current refresh cycle (for cache keys)"""
+        return self.refresh_boundary(interval=interval).isoformat()
+
+    def status(self) -> Dict:
+        now = self.now()
+        return {
+            'phase': self.phase(now),
+            'now': now.isoformat(),
+            'cycle_start': self.refresh_boundary(now).isoformat(),
+            'next_refresh': self.next_refresh(now).isoformat(),
+            'update_interval': self.update_interval,
+        }
+
+
+# Global scheduler shared by fetchers and the app
+market_scheduler = MarketRefreshScheduler()
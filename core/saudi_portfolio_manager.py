@@ -15,6 +15,15 @@ from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from .symbol_master import symbol_master
+    from .stock_search import StockSearchIndex, get_search_index
+    from .rate_limiter import get_limiter
+except ImportError:
+    from symbol_master import symbol_master
+    from stock_search import StockSearchIndex, get_search_index
+    from rate_limiter import get_limiter
+
 # Configure page
 st.set_page_config(
     page_title="🇸🇦 Saudi Portfolio Manager",
@@ -115,9 +124,12 @@ class SaudiPortfolioManager:
         
         # Load Saudi stocks database
         self.saudi_stocks_db = self.load_saudi_stocks_database()
+        self._search_index = None
     
     def load_saudi_stocks_database(self):
-        """Load Saudi stocks database from JSON file"""
+        """Load Saudi stocks database from the shared symbol master, then the JSON file"""
+        if len(symbol_master):
+            return symbol_master.as_dict()
         try:
             with open('saudi_stocks_database.json', 'r', encoding='utf-8') as f:
                 return json.load(f)
@@ -143,22 +155,25 @@ class SaudiPortfolioManager:
         if not query:
             return []
         
-        query = query.lower()
-        results = []
+        if len(symbol_master):
+            index = get_search_index()
+        else:
+            if self._search_index is None:
+                self._search_index = StockSearchIndex(dict(data, symbol=symbol)
+                                                      for symbol, data in self.saudi_stocks_db.items())
+            index = self._search_index
         
-        for symbol, data in self.saudi_stocks_db.items():
-            if (query in symbol.lower() or 
-                query in data.get('name_en', '').lower() or
-                query in data.get('sector', '').lower()):
-                
-                results.append({
-                    'symbol': symbol,
-                    'name': data.get('name_en', f'Stock {symbol}'),
-                    'sector': data.get('sector', 'Unknown'),
-                    'full_symbol': data.get('symbol', f'{symbol}.SR')
-                })
+        results = []
+        for data in index.search(query, limit=10):  # Top 10 ranked matches
+            symbol = data['symbol'].replace('.SR', '')
+            results.append({
+                'symbol': symbol,
+                'name': data.get('name_en', f'Stock {symbol}'),
+                'sector': data.get('sector', 'Unknown'),
+                'full_symbol': f"{symbol}.SR"
+            })
         
-        return results[:10]  # Return top 10 matches
+        return results
     
     def get_saudi_stock_price(self, symbol):
         """Get real-time price for Saudi stock"""
@@ -168,7 +183,8 @@ class SaudiPortfolioManager:
                 symbol += '.SR'
             
             ticker = yf.Ticker(symbol)
-            history = ticker.history(period="5d")
+            with get_limiter('yahoo').permit('history'):
+                history = ticker.history(period="5d")
             
             if not history.empty:
                 current_price = history['Close'].iloc[-1]
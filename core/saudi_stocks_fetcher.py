@@ -8,7 +8,11 @@ import requests
 import pandas as pd
 from datetime import datetime
 import yfinance as yf
-import time
+
+try:
+    from .rate_limiter import get_limiter
+except ImportError:
+    from rate_limiter import get_limiter
 
 class SaudiStockDatabase:
     """Saudi Stock Exchange Database Manager"""
@@ -754,8 +758,10 @@ class SaudiStockDatabase:
         for symbol, data in stocks_dict.items():
             try:
                 # Try to get real price data to validate
+                # Paced by the shared Yahoo limiter (backs off on 429s)
                 ticker = yf.Ticker(data['symbol'])
-                info = ticker.history(period="1d")
+                with get_limiter('yahoo').permit('history'):
+                    info = ticker.history(period="1d")
                 
                 if not info.empty:
                     # Stock exists and has data
@@ -778,9 +784,6 @@ class SaudiStockDatabase:
                     }
                     print(f"⚠️ Unverified: {symbol} - {data['name_en']}")
                 
-                # Add small delay to avoid rate limiting
-                time.sleep(0.1)
-                
             except Exception as e:
                 # Add anyway but mark as error
                 validated_stocks[symbol] = {
@@ -0,0 +1,235 @@
+"""
+Shared-Memory Market Snapshot for Saudi Stock Market App
+Zero-copy handoff of the latest quotes from the fetch daemon to every dashboard process
+"""
+
+import time
+import logging
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NAME = "tasi_market_snapshot"
+MAGIC = 0x5441534931  # "TASI1"
+SYMBOL_DTYPE = np.dtype('S16')
+HEADER_WORDS = 8           # int64: magic, seq, capacity, generation, reserved...
+HEADER_BYTES = HEADER_WORDS * 8
+SLOT_META_BYTES = 16       # int64 count + float64 published_at
+REATTACH_INTERVAL = 5.0    # seconds between checks that a cached reader still maps the live block
+_created = set()           # blocks this process owns (registered with its resource tracker)
+COLUMNS = (('price', np.float64), ('change_pct', np.float64), ('volume', np.int64), ('value', np.float64))
+
+
+def _slot_bytes(capacity: int) -> int:
+    return SLOT_META_BYTES + capacity * (SYMBOL_DTYPE.itemsize + 8 * len(COLUMNS))
+
+
+@dataclass
+class SharedSnapshotView:
+    """Read-only NumPy views into one published slot (symbols sorted for searchsorted)"""
+    version: int
+    published_at: float
+    symbols: np.ndarray
+    price: np.ndarray
+    change_pct: np.ndarray
+    volume: np.ndarray
+    value: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def lookup(self, symbols: Sequence[str]) -> Dict[str, int]:
+        """Row index for each requested symbol present in the snapshot"""
+        if len(self.symbols) == 0:
+            return {}
+        wanted = np.asarray([str(s).replace('.SR', '') for s in symbols], dtype=SYMBOL_DTYPE)
+        rows = np.minimum(np.searchsorted(self.symbols, wanted), len(self.symbols) - 1)
+        found = self.symbols[rows] == wanted
+        return {w.decode(): int(r) for w, r, ok in zip(wanted, rows, found) if ok}
+
+
+class SharedMarketSnapshot:
+    """
+    Double-buffered snapshot in one shared-memory block with a seqlock counter:
+    1. The writer fills the inactive slot while `seq` is odd, then makes it even
+    2. Publish k lives in slot k % 2, so readers of slot k keep consistent data
+       until publish k + 2 starts writing the same slot again
+    3. Readers check `still_valid(view)` after using their views
+    Only one writer (the market data daemon) may publish.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((HEADER_WORDS,), dtype=np.int64, buffer=shm.buf)
+        if self.header[0] != MAGIC:
+            raise ValueError(f"Shared memory block {shm.name} is not a market snapshot")
+        self.capacity = int(self.header[2])
+        self.generation = int(self.header[3])
+        self._slots = [self._map_slot(i) for i in range(2)]
+
+    @classmethod
+    def create(cls, name: str = DEFAULT_NAME, capacity: int = 1024) -> "SharedMarketSnapshot":
+        """Create (or take over) the block as its writer"""
+        size = HEADER_BYTES + 2 * _slot_bytes(capacity)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a previous daemon: reuse it if big enough
+            shm = shared_memory.SharedMemory(name=name)
+            if shm.size < size:
+                shm.close()
+                shm.unlink()
+                shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((HEADER_WORDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[2] = capacity
+        header[3] = time.time_ns()                # new writer: readers of the old block re-attach
+        header[0] = MAGIC
+        del header
+        _created.add(name)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str = DEFAULT_NAME) -> Optional["SharedMarketSnapshot"]:
+        """Map an existing block as a reader; None if no writer has created it"""
+        try:
+            try:
+                shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                # Python < 3.13: stop the resource tracker unlinking the writer's block at exit
+                shm = shared_memory.SharedMemory(name=name)
+                if name not in _created:
+                    from multiprocessing import resource_tracker
+                    resource_tracker.unregister(shm._name, 'shared_memory')
+            return cls(shm, owner=False)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _map_slot(self, index: int) -> Dict[str, np.ndarray]:
+        offset = HEADER_BYTES + index * _slot_bytes(self.capacity)
+        buf = self.shm.buf
+        slot = {'meta_count': np.ndarray((1,), np.int64, buf, offset),
+                'meta_time': np.ndarray((1,), np.float64, buf, offset + 8)}
+        offset += SLOT_META_BYTES
+        slot['symbols'] = np.ndarray((self.capacity,), SYMBOL_DTYPE, buf, offset)
+        offset += self.capacity * SYMBOL_DTYPE.itemsize
+        for column, dtype in COLUMNS:
+            slot[column] = np.ndarray((self.capacity,), dtype, buf, offset)
+            offset += self.capacity * 8
+        return slot
+
+    @property
+    def version(self) -> int:
+        return int(self.header[1]) // 2
+
+    def publish(self, symbols: Sequence[str], price, change_pct, volume, value,
+                published_at: Optional[float] = None) -> int:
+        """Write a new version into the inactive slot; returns the version number"""
+        symbols = np.asarray([str(s).replace('.SR', '') for s in symbols], dtype=SYMBOL_DTYPE)
+        n = len(symbols)
+        if n > self.capacity:
+            raise ValueError(f"{n} symbols exceed shared snapshot capacity {self.capacity}")
+        order = np.argsort(symbols, kind='stable')
+
+        version = self.version + 1
+        slot = self._slots[version % 2]
+        self.header[1] = 2 * version - 1          # odd: write in progress
+        slot['symbols'][:n] = symbols[order]
+        slot['price'][:n] = np.asarray(price, dtype=np.float64)[order]
+        slot['change_pct'][:n] = np.asarray(change_pct, dtype=np.float64)[order]
+        slot['volume'][:n] = np.asarray(volume, dtype=np.int64)[order]
+        slot['value'][:n] = np.asarray(value, dtype=np.float64)[order]
+        slot['meta_count'][0] = n
+        slot['meta_time'][0] = published_at or time.time()
+        self.header[1] = 2 * version              # even: version is readable
+        return version
+
+    def read(self) -> Optional[SharedSnapshotView]:
+        """Zero-copy views of the latest complete version (None before the first publish)"""
+        while True:
+            version = int(self.header[1]) // 2
+            if version == 0:
+                return None
+            slot = self._slots[version % 2]
+            n = int(slot['meta_count'][0])
+            view = SharedSnapshotView(
+                version=version,
+                published_at=float(slot['meta_time'][0]),
+                symbols=slot['symbols'][:n],
+                price=slot['price'][:n],
+                change_pct=slot['change_pct'][:n],
+                volume=slot['volume'][:n],
+                value=slot['value'][:n],
+            )
+            if self.still_valid(view):
+                return view
+
+    def still_valid(self, view: SharedSnapshotView) -> bool:
+        """True while the writer has not started reusing the view's slot"""
+        return int(self.header[1]) < 2 * view.version + 3
+
+    def read_copy(self) -> Optional[SharedSnapshotView]:
+        """Consistent private copy, for readers that keep data past the next publishes"""
+        while True:
+            view = self.read()
+            if view is None:
+                return None
+            copied = SharedSnapshotView(view.version, view.published_at, view.symbols.copy(),
+                                        view.price.copy(), view.change_pct.copy(),
+                                        view.volume.copy(), view.value.copy())
+            if self.still_valid(view):
+                return copied
+
+    def close(self):
+        self._slots = []
+        self.header = None
+        self.shm.close()
+        if self.owner:
+            _created.discard(self.shm.name)
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+_readers: Dict[str, SharedMarketSnapshot] = {}
+_reader_checked: Dict[str, float] = {}
+
+
+def _retire(reader: SharedMarketSnapshot):
+    """Unmap a replaced reader; views still held elsewhere keep the mapping until they are dropped"""
+    try:
+        reader.close()
+    except BufferError:
+        pass
+
+
+def get_shared_reader(name: str = DEFAULT_NAME) -> Optional[SharedMarketSnapshot]:
+    """
+    Process-wide reader; retried on each call until a writer exists. At most every
+    REATTACH_INTERVAL seconds the name is re-opened: a restarted daemon's new block
+    (different generation) is mapped instead, an unlinked block is dropped.
+    """
+    reader = _readers.get(name)
+    now = time.monotonic()
+    if reader is not None and now - _reader_checked.get(name, 0.0) < REATTACH_INTERVAL:
+        return reader
+
+    _reader_checked[name] = now
+    current = SharedMarketSnapshot.attach(name)
+    if reader is not None and current is not None and current.generation == reader.generation:
+        _retire(current)
+        return reader
+    if reader is not None:
+        logger.info(f"🔁 Shared snapshot {name}: writer {'restarted' if current else 'gone'}, re-attaching")
+        _retire(reader)
+    if current is None:
+        _readers.pop(name, None)
+    else:
+        _readers[name] = current
+    return current
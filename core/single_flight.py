@@ -0,0 +1,79 @@
+"""
+Single-Flight Request Coalescing for Saudi Stock Market App
+Concurrent callers asking for the same key share one in-flight upstream call
+"""
+
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Per-key call coalescing:
+    1. The first caller for a key (the leader) runs the call
+    2. Callers arriving while it is in flight wait on the leader's future
+    3. The key is released as soon as the call finishes - results are not cached,
+       so the next caller after that goes upstream again
+    Exceptions are shared with the waiters too.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self.stats = {'calls': 0, 'upstream': 0, 'coalesced': 0}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) once for all concurrent callers with the same key"""
+        with self._lock:
+            self.stats['calls'] += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.stats['upstream'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def flight_group(name: str) -> SingleFlight:
+    """Process-wide group per upstream (quotes, history, ...)"""
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = _groups[name] = SingleFlight(name)
+        return group
+
+
+def single_flight_stats() -> Dict[str, Dict[str, int]]:
+    """Counters per group; 'coalesced' is the number of upstream calls saved"""
+    with _groups_lock:
+        return {name: dict(group.stats) for name, group in _groups.items()}
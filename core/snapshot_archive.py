@@ -0,0 +1,210 @@
+"""
+Snapshot Archive for Saudi Stock Market App
+Every market snapshot appended to a date-partitioned Parquet archive
+(data/market_archive/date=YYYY-MM-DD/*.parquet) with a columnar reader:
+date range + symbol subset + column projection without parsing JSON dumps
+"""
+
+import glob
+import json
+import os
+import threading
+import logging
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Union
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = "data/market_archive"
+COMPACTED_FILE = "part-0.parquet"
+
+STRING_COLUMNS = ['symbol', 'name', 'sector', 'data_source', 'source']
+FLOAT_COLUMNS = ['current_price', 'previous_close', 'change', 'change_percent', 'open', 'high', 'low',
+                 'market_cap', 'value_traded']
+INT_COLUMNS = ['volume', 'avg_volume']
+# Quote dict keys used by other fetchers for the same column
+ALIASES = {'change_pct': 'change_percent', 'value': 'value_traded', 'trading_value': 'value_traded',
+           'price': 'current_price', 'name_en': 'name'}
+
+DateLike = Union[str, date, datetime, None]
+
+
+def _schema():
+    return pa.schema([('snapshot_ts', pa.timestamp('ms'))]
+                     + [(c, pa.string()) for c in STRING_COLUMNS]
+                     + [(c, pa.float64()) for c in FLOAT_COLUMNS]
+                     + [(c, pa.int64()) for c in INT_COLUMNS])
+
+
+def _as_date(value: DateLike) -> Optional[date]:
+    if value is None or isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return date.fromisoformat(str(value)[:10])
+
+
+class SnapshotArchive:
+    """
+    Append-only columnar archive:
+    1. `write` stores one snapshot (successful quotes only) as a Parquet file
+       in its day's partition, rows sorted by symbol
+    2. `compact` merges a finished day's files into one, so a year is ~250 files
+    3. `read` lists only the partitions in range and lets Arrow push the symbol
+       filter and column projection down into the files
+    """
+
+    def __init__(self, directory: str = ARCHIVE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return PYARROW_AVAILABLE
+
+    def _partition(self, day: date) -> str:
+        return os.path.join(self.directory, f"date={day.isoformat()}")
+
+    def _frame(self, quotes: Iterable[Dict], snapshot_ts: datetime, source: str) -> pd.DataFrame:
+        rows = []
+        for quote in quotes:
+            if not quote or quote.get('success') is False or not quote.get('symbol'):
+                continue
+            row = {ALIASES.get(key, key): value for key, value in quote.items()}
+            row['symbol'] = str(row['symbol']).replace('.SR', '')
+            row['source'] = source
+            rows.append(row)
+        frame = pd.DataFrame(rows)
+        for column in STRING_COLUMNS + FLOAT_COLUMNS + INT_COLUMNS:
+            if column not in frame:
+                frame[column] = None
+        frame['snapshot_ts'] = pd.Timestamp(snapshot_ts).floor('ms')
+        for column in FLOAT_COLUMNS:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('float64')
+        for column in INT_COLUMNS:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').fillna(0).astype('int64')
+        for column in STRING_COLUMNS:
+            frame[column] = frame[column].astype(object).where(frame[column].notna(), None)
+        return frame[['snapshot_ts'] + STRING_COLUMNS + FLOAT_COLUMNS + INT_COLUMNS].sort_values('symbol')
+
+    def write(self, quotes: Iterable[Dict], snapshot_ts: Optional[datetime] = None,
+              source: str = 'snapshot') -> Optional[str]:
+        """Append one market snapshot; returns the file written (None if nothing to write)"""
+        if not PYARROW_AVAILABLE:
+            logger.warning("pyarrow not installed - snapshot not archived")
+            return None
+        snapshot_ts = snapshot_ts or datetime.now()
+        frame = self._frame(quotes, snapshot_ts, source)
+        if frame.empty:
+            return None
+
+        partition = self._partition(snapshot_ts.date())
+        os.makedirs(partition, exist_ok=True)
+        path = os.path.join(partition, f"{source}-{snapshot_ts.strftime('%H%M%S%f')}.parquet")
+        table = pa.Table.from_pandas(frame, schema=_schema(), preserve_index=False)
+        tmp_path = f"{path}.tmp"
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, path)
+        logger.info(f"🗄️ Archived {len(frame)} quotes to {path}")
+        return path
+
+    def dates(self) -> List[date]:
+        """Days that have archived snapshots, oldest first"""
+        days = []
+        for partition in glob.glob(os.path.join(self.directory, "date=*")):
+            try:
+                days.append(date.fromisoformat(os.path.basename(partition)[5:]))
+            except ValueError:
+                continue
+        return sorted(days)
+
+    def _files(self, start: DateLike = None, end: DateLike = None) -> List[str]:
+        start, end = _as_date(start), _as_date(end)
+        files = []
+        for day in self.dates():
+            if (start and day < start) or (end and day > end):
+                continue
+            files.extend(sorted(glob.glob(os.path.join(self._partition(day), "*.parquet"))))
+        return files
+
+    def read(self, start: DateLike = None, end: DateLike = None, symbols: Optional[Iterable[str]] = None,
+             columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Snapshots between start and end (inclusive days) as one DataFrame.
+        symbols: subset to load; columns: projection (snapshot_ts and symbol are always included)
+        """
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow is required to read the snapshot archive")
+        files = self._files(start, end)
+        schema = _schema()
+        if columns is not None:
+            columns = ['snapshot_ts', 'symbol'] + [c for c in columns if c not in ('snapshot_ts', 'symbol')]
+        if not files:
+            return schema.empty_table().select(columns or schema.names).to_pandas()
+
+        dataset = ds.dataset(files, format='parquet', schema=schema)
+        row_filter = None
+        if symbols is not None:
+            row_filter = ds.field('symbol').isin([str(s).replace('.SR', '') for s in symbols])
+        table = dataset.to_table(columns=columns, filter=row_filter)
+        return table.to_pandas()
+
+    def latest(self, symbols: Optional[Iterable[str]] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """The most recent archived snapshot"""
+        days = self.dates()
+        if not days:
+            return self.read(symbols=symbols, columns=columns)
+        frame = self.read(days[-1], days[-1], symbols, columns)
+        return frame[frame['snapshot_ts'] == frame['snapshot_ts'].max()].reset_index(drop=True)
+
+    def compact(self, day: DateLike) -> int:
+        """Merge a day's snapshot files into one; returns the number of files merged"""
+        if not PYARROW_AVAILABLE:
+            return 0
+        day = _as_date(day)
+        partition = self._partition(day)
+        with self._lock:
+            files = sorted(glob.glob(os.path.join(partition, "*.parquet")))
+            if len(files) < 2:
+                return 0
+            table = ds.dataset(files, format='parquet', schema=_schema()).to_table()
+            table = table.sort_by([('snapshot_ts', 'ascending'), ('symbol', 'ascending')])
+            compacted = os.path.join(partition, COMPACTED_FILE)
+            tmp_path = f"{compacted}.tmp"
+            pq.write_table(table, tmp_path, compression='zstd', row_group_size=64 * 1024)
+            # Merged file in place first: an interruption leaves extra files, never an empty day
+            os.replace(tmp_path, compacted)
+            for path in files:
+                if path != compacted:
+                    os.remove(path)
+        logger.info(f"🗜️ Compacted {len(files)} snapshot files for {day}")
+        return len(files)
+
+    def compact_before(self, day: DateLike) -> int:
+        """Compact every finished day before `day`"""
+        day = _as_date(day)
+        return sum(self.compact(d) for d in self.dates() if d < day)
+
+    def import_json_dump(self, path: str, source: str = 'json_import') -> Optional[str]:
+        """Archive a legacy saudi_market_data_*.json / quick_market_scan_*.json dump"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        quotes = (data.get('all_data') or data.get('all_stocks') or []) if isinstance(data, dict) else data
+        stamps = [q.get('timestamp') for q in quotes if isinstance(q, dict) and q.get('timestamp')]
+        snapshot_ts = datetime.fromisoformat(max(stamps)) if stamps else \
+            datetime.fromtimestamp(os.path.getmtime(path))
+        return self.write(quotes, snapshot_ts, source)
+
+
+# Global archive instance
+snapshot_archive = SnapshotArchive()
@@ -0,0 +1,111 @@
+"""
+Snapshot Channel for Saudi Stock Market App
+Versioned, atomically published market snapshots: one writer (the daemon), many readers
+"""
+
+import json
+import os
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value: Any):
+    """NumPy scalars and timestamps from the fetchers"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class SnapshotChannel:
+    """
+    Local file channel:
+    1. Each publish writes `<name>-<version>.json`, then swaps the `<name>.latest.json` pointer
+       (both via os.replace, so readers never see a partial file)
+    2. Readers re-parse only when the pointer's version changes
+    3. The last `keep` versions stay on disk for readers that are mid-read
+    """
+
+    def __init__(self, directory: str = "data/snapshots", name: str = "market", keep: int = 5):
+        self.directory = directory
+        self.name = name
+        self.keep = keep
+        self.pointer_path = os.path.join(directory, f"{name}.latest.json")
+        self._cached: Optional[Dict] = None
+        self._lock = threading.Lock()
+
+    def _snapshot_path(self, version: int) -> str:
+        return os.path.join(self.directory, f"{self.name}-{version:08d}.json")
+
+    @staticmethod
+    def _write_atomic(path: str, data: Dict):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, default=_json_default)
+        os.replace(tmp_path, path)
+
+    def _read_pointer(self) -> Optional[Dict]:
+        try:
+            with open(self.pointer_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug(f"Snapshot pointer unreadable: {e}")
+            return None
+
+    def latest_version(self) -> int:
+        pointer = self._read_pointer()
+        return int(pointer['version']) if pointer else 0
+
+    def published_at(self) -> Optional[float]:
+        """Unix time of the latest publish (pointer only, the snapshot is not parsed), None if none"""
+        pointer = self._read_pointer()
+        return float(pointer['published_at']) if pointer else None
+
+    def publish(self, payload: Dict) -> int:
+        """Write a new snapshot version and point readers at it"""
+        os.makedirs(self.directory, exist_ok=True)
+        version = self.latest_version() + 1
+        published_at = time.time()
+
+        self._write_atomic(self._snapshot_path(version),
+                           {'version': version, 'published_at': published_at, 'payload': payload})
+        self._write_atomic(self.pointer_path,
+                           {'version': version, 'published_at': published_at,
+                            'file': os.path.basename(self._snapshot_path(version))})
+
+        stale = self._snapshot_path(version - self.keep)
+        if version > self.keep and os.path.exists(stale):
+            os.remove(stale)
+        return version
+
+    def read_latest(self, max_age: Optional[float] = None) -> Optional[Dict]:
+        """
+        Latest snapshot {'version', 'published_at', 'payload'}, or None if nothing
+        has been published or it is older than `max_age` seconds.
+        """
+        pointer = self._read_pointer()
+        if pointer is None:
+            return None
+
+        with self._lock:
+            if self._cached is None or self._cached['version'] != pointer['version']:
+                try:
+                    with open(os.path.join(self.directory, pointer['file']), 'r', encoding='utf-8') as f:
+                        self._cached = json.load(f)
+                except Exception as e:
+                    logger.warning(f"Snapshot v{pointer['version']} unreadable: {e}")
+                    return None
+            snapshot = self._cached
+
+        if max_age is not None and time.time() - snapshot['published_at'] > max_age:
+            return None
+        return snapshot
+
+
+# Channel shared by market_data_daemon.py (writer) and the dashboard (readers)
+market_channel = SnapshotChannel()
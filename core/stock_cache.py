@@ -3,81 +3,54 @@ Cached Stock Database for Saudi Stock Market App
 Stores stock symbols, names, and basic info for fast loading
 """
 
-import json
-import os
-import time
 from typing import Dict, List, Optional
 import logging
 
+try:
+    from .tiered_cache import tiered_cache
+    from .symbol_master import symbol_master
+    from .stock_search import get_search_index
+except ImportError:
+    from tiered_cache import tiered_cache
+    from symbol_master import symbol_master
+    from stock_search import get_search_index
+
 logger = logging.getLogger(__name__)
 
 class StockCache:
-    def __init__(self, cache_file: str = "data/stock_cache.json"):
-        self.cache_file = cache_file
+    def __init__(self, cache_key: str = "stocks", namespace: str = "stock_list"):
+        # Memory + disk persistence handled by the shared tiered cache
+        self.store = tiered_cache
+        self.namespace = namespace
+        self.cache_key = cache_key
         self.cache_timeout = 24 * 60 * 60  # 24 hours
-        self.cache = self._load_cache()
-        
-    def _load_cache(self) -> Dict:
-        """Load cache from file"""
-        try:
-            if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                    
-                # Check if cache is still valid
-                if self._is_cache_valid(cache_data):
-                    logger.info(f"✅ Loaded {len(cache_data.get('stocks', []))} stocks from cache")
-                    return cache_data
-                else:
-                    logger.info("⏰ Cache expired, will refresh")
-            
-        except Exception as e:
-            logger.error(f"Error loading cache: {e}")
-        
-        return {"stocks": [], "timestamp": 0, "version": "1.0"}
-    
-    def _is_cache_valid(self, cache_data: Dict) -> bool:
-        """Check if cache is still valid"""
-        timestamp = cache_data.get('timestamp', 0)
-        return (time.time() - timestamp) < self.cache_timeout
-    
-    def _save_cache(self):
-        """Save cache to file"""
-        try:
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
-            
-            # Update timestamp
-            self.cache['timestamp'] = time.time()
-            
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, ensure_ascii=False, indent=2)
-            
-            logger.info(f"💾 Saved {len(self.cache.get('stocks', []))} stocks to cache")
-            
-        except Exception as e:
-            logger.error(f"Error saving cache: {e}")
+        self.store.configure(namespace, ttl=self.cache_timeout, disk=True)
     
     def get_cached_stocks(self) -> List[Dict]:
-        """Get stocks from cache"""
-        return self.cache.get('stocks', [])
+        """Get stocks from cache (empty once the 24h window has passed)"""
+        return self.store.get(self.namespace, self.cache_key) or []
     
     def update_cache(self, stocks: List[Dict]):
         """Update cache with new stock data"""
-        self.cache['stocks'] = stocks
-        self.cache['timestamp'] = time.time()
-        self._save_cache()
+        self.store.set(self.namespace, self.cache_key, stocks)
+        logger.info(f"💾 Saved {len(stocks)} stocks to cache")
     
     def get_stock_info(self, symbol: str) -> Optional[Dict]:
-        """Get specific stock info from cache"""
+        """Get specific stock info (symbol master lookup, cached list for anything else)"""
+        record = symbol_master.get(symbol)
+        if record:
+            return record
         stocks = self.get_cached_stocks()
         for stock in stocks:
             if stock.get('symbol') == symbol:
                 return stock
         return None
     
-    def search_stocks(self, query: str) -> List[Dict]:
-        """Search stocks by symbol or name"""
+    def search_stocks(self, query: str, limit: int = 50) -> List[Dict]:
+        """Search stocks by symbol, English/Arabic name or sector (ranked, via the shared search index)"""
+        if len(symbol_master):
+            return get_search_index().search(query, limit)
+        
         query = query.upper()
         stocks = self.get_cached_stocks()
         results = []
@@ -137,12 +110,14 @@ def initialize_stock_cache():
     """Initialize stock cache with core stocks if empty"""
     cache = StockCache()
     
-    # If cache is empty or invalid, initialize with core stocks
+    # If cache is empty or invalid, initialize with the official list (core stocks if it is missing)
     cached_stocks = cache.get_cached_stocks()
     if not cached_stocks:
-        logger.info("🔄 Initializing cache with core stocks...")
-        cache.update_cache(CORE_SAUDI_STOCKS)
-        return CORE_SAUDI_STOCKS
+        stocks = [{'symbol': s['symbol'], 'name': s['name'], 'sector': s['sector']}
+                  for s in symbol_master.list_stocks()] or CORE_SAUDI_STOCKS
+        logger.info(f"🔄 Initializing cache with {len(stocks)} stocks...")
+        cache.update_cache(stocks)
+        return stocks
     
     return cached_stocks
 
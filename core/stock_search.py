@@ -0,0 +1,186 @@
+"""
+Stock Search Index for Saudi Stock Market App
+Prefix trie + trigram index over symbol, English/Arabic names and sector:
+typeahead lookups touch only matching tokens instead of scanning every stock
+"""
+
+import re
+import threading
+import unicodedata
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .symbol_master import symbol_master
+except ImportError:
+    from symbol_master import symbol_master
+
+logger = logging.getLogger(__name__)
+
+# Field weights: a symbol hit outranks a name hit, which outranks a sector hit
+FIELD_WEIGHTS = {'symbol': 4.0, 'name': 3.0, 'name_ar': 3.0, 'sector': 1.0}
+FIRST_TOKEN_BONUS = 0.5          # "al rajhi" ranks the query "al" above "saudi al ..."
+EXACT, PREFIX, FUZZY = 1.0, 0.8, 0.6
+FUZZY_THRESHOLD = 0.3            # trigram Jaccard similarity
+
+# Arabic letter variants folded to one form, diacritics and tatweel dropped
+ARABIC_FOLD = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه', 'ـ': None,
+})
+ARABIC_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed]')
+NON_WORD = re.compile(r'[^\w\s]+')
+
+
+def normalize(text: str) -> str:
+    """Lowercase, fold Arabic letter variants, drop diacritics and punctuation"""
+    text = unicodedata.normalize('NFKC', str(text or '')).lower()
+    text = ARABIC_DIACRITICS.sub('', text).translate(ARABIC_FOLD)
+    return ' '.join(NON_WORD.sub(' ', text).split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalized tokens; names with the article fused on ("الراجحي", "ALRAJHI") are also indexed without it"""
+    tokens = []
+    for token in normalize(text).split():
+        tokens.append(token)
+        if token.startswith(('ال', 'al')) and len(token) > 4:
+            tokens.append(token[2:])
+    return tokens
+
+
+def trigrams(token: str) -> set:
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ('children', 'tokens')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.tokens: set = set()   # ids of every vocabulary token under this prefix
+
+
+class StockSearchIndex:
+    """
+    Built once per universe:
+    1. Vocabulary of normalized tokens -> {doc id: field weight}
+    2. Prefix trie over the vocabulary (typeahead)
+    3. Trigram postings over the vocabulary (typos, transliteration variants)
+    A document must match every query token; scores add up per token.
+    """
+
+    def __init__(self, records: Iterable[Dict]):
+        self.records: List[Dict] = list(records)
+        self._vocab: Dict[str, int] = {}
+        self._token_docs: List[Dict[int, float]] = []
+        self._token_grams: List[int] = []
+        self._root = _TrieNode()
+        self._grams: Dict[str, set] = defaultdict(set)
+
+        for doc, record in enumerate(self.records):
+            for field, weight in FIELD_WEIGHTS.items():
+                value = record.get(field) or (record.get('name_en') if field == 'name' else None)
+                if field == 'symbol':
+                    value = str(value or '').replace('.SR', '')
+                for position, token in enumerate(tokenize(value or '')):
+                    self._add(token, doc, weight + (FIRST_TOKEN_BONUS if position == 0 and field != 'sector' else 0))
+
+    def _add(self, token: str, doc: int, weight: float):
+        tid = self._vocab.get(token)
+        if tid is None:
+            tid = self._vocab[token] = len(self._token_docs)
+            self._token_docs.append({})
+            grams = trigrams(token)
+            self._token_grams.append(len(grams))
+            for gram in grams:
+                self._grams[gram].add(tid)
+            node = self._root
+            for char in token:
+                node = node.children.setdefault(char, _TrieNode())
+                node.tokens.add(tid)
+        postings = self._token_docs[tid]
+        postings[doc] = max(postings.get(doc, 0.0), weight)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _token_matches(self, query_token: str, fuzzy: bool) -> Dict[int, float]:
+        """Vocabulary token id -> match quality for one query token"""
+        matches: Dict[int, float] = {}
+        node = self._root
+        for char in query_token:
+            node = node.children.get(char)
+            if node is None:
+                break
+        else:
+            exact = self._vocab.get(query_token)
+            for tid in node.tokens:
+                matches[tid] = EXACT if tid == exact else PREFIX
+
+        if fuzzy and len(query_token) >= 3 and not query_token.isdigit():
+            query_grams = trigrams(query_token)
+            shared: Dict[int, int] = defaultdict(int)
+            for gram in query_grams:
+                for tid in self._grams.get(gram, ()):
+                    shared[tid] += 1
+            for tid, count in shared.items():
+                similarity = count / (len(query_grams) + self._token_grams[tid] - count)
+                if similarity >= FUZZY_THRESHOLD and tid not in matches:
+                    matches[tid] = FUZZY * similarity
+        return matches
+
+    def _score(self, query_tokens: List[str], fuzzy: bool) -> Dict[int, float]:
+        scores: Optional[Dict[int, float]] = None
+        for query_token in query_tokens:
+            best: Dict[int, float] = {}
+            for tid, quality in self._token_matches(query_token, fuzzy).items():
+                for doc, weight in self._token_docs[tid].items():
+                    value = quality * weight
+                    if value > best.get(doc, 0.0):
+                        best[doc] = value
+            if scores is None:
+                scores = best
+            else:
+                scores = {doc: score + best[doc] for doc, score in scores.items() if doc in best}
+            if not scores:
+                return {}
+        return scores or {}
+
+    def search_scored(self, query: str, limit: int = 10) -> List[Tuple[float, Dict]]:
+        """[(score, record)] best first; fuzzy matching only kicks in when prefixes find too little"""
+        query_tokens = normalize(query).split()
+        if not query_tokens:
+            return []
+        scores = self._score(query_tokens, fuzzy=False)
+        if len(scores) < limit:
+            scores = self._score(query_tokens, fuzzy=True)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], str(self.records[item[0]].get('symbol'))))
+        return [(round(score, 3), self.records[doc]) for doc, score in ranked[:limit]]
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        return [record for _, record in self.search_scored(query, limit)]
+
+
+_index: Optional[StockSearchIndex] = None
+_index_version = -1
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> StockSearchIndex:
+    """Process-wide index over the symbol master, rebuilt when the master reloads"""
+    global _index, _index_version
+    records = symbol_master.as_dict()   # also picks up file changes
+    with _index_lock:
+        if _index is None or _index_version != symbol_master.version:
+            _index = StockSearchIndex(records.values())
+            _index_version = symbol_master.version
+            logger.info(f"🔎 Search index built: {len(_index)} stocks, {len(_index._vocab)} tokens")
+        return _index
+
+
+def search_stocks(query: str, limit: int = 10) -> List[Dict]:
+    """Ranked stock records matching a symbol / English or Arabic name / sector query"""
+    return get_search_index().search(query, limit)
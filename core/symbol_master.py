@@ -0,0 +1,216 @@
+"""
+Symbol Master for Saudi Stock Market App
+The official TASI company list parsed once per file change and shared by every module:
+O(1) symbol lookups plus column arrays for vectorized filtering
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import logging
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OFFICIAL_DB_PATH = os.path.join(ROOT_DIR, 'data', 'Saudi Stock Exchange (TASI) Sectors and Companies.db')
+JSON_DB_PATH = os.path.join(ROOT_DIR, 'data', 'saudi_stocks_database.json')
+ARABIC_NAMES_PATH = os.path.join(ROOT_DIR, 'core', 'saudi_stocks_fetcher.py')
+
+
+def parse_official_db(path: str) -> List[Dict]:
+    """Parse the tab-separated official list: Seq, Symbol, Company Name, Sector (blank columns between)"""
+    stocks = []
+    with open(path, 'r', encoding='utf-8') as f:
+        next(f, None)  # header
+        for line in f:
+            parts = [p.strip() for p in line.split('\t') if p.strip()]
+            if len(parts) < 4:
+                continue
+            seq, symbol, name, sector = parts[:4]
+            if symbol.isdigit() and 3 <= len(symbol) <= 4 and name:
+                stocks.append({'symbol': symbol, 'name': name, 'sector': sector,
+                               'sequence': int(seq) if seq.isdigit() else len(stocks) + 1})
+    return stocks
+
+
+def parse_json_db(path: str) -> List[Dict]:
+    """Parse saudi_stocks_database.json ({symbol: {name/name_en, name_ar, sector}})"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    stocks = []
+    for symbol, record in data.items():
+        symbol = str(symbol).replace('.SR', '')
+        stocks.append({'symbol': symbol,
+                       'name': record.get('name') or record.get('name_en') or '',
+                       'name_ar': record.get('name_ar', ''),
+                       'sector': record.get('sector', ''),
+                       'sequence': record.get('sequence', 0)})
+    return stocks
+
+
+def parse_arabic_names(path: str) -> List[Dict]:
+    """
+    Arabic names from the curated list in core/saudi_stocks_fetcher.py (re-read when that file changes).
+    Many of its symbols are misaligned, so each row carries its English name as `match_name`
+    and is only merged into a record whose own name matches it.
+    """
+    try:
+        from .saudi_stocks_fetcher import SaudiStockDatabase
+    except ImportError:
+        from saudi_stocks_fetcher import SaudiStockDatabase
+    curated = SaudiStockDatabase().get_saudi_stocks_from_yfinance()
+    return [{'symbol': str(symbol).replace('.SR', ''), 'name_ar': record.get('name_ar', ''),
+             'match_name': record.get('name_en', '')}
+            for symbol, record in curated.items()]
+
+
+def _name_tokens(name: str) -> List[str]:
+    return re.findall(r'[a-z0-9]+', name.lower())
+
+
+def names_match(name: str, other: str) -> bool:
+    """
+    True when one English name is the other's words or leading letters:
+    'NAMA CHEMICALS' ~ 'Nama Chemicals', 'ALRAJHI' ~ 'Al Rajhi Bank', 'ZAMIL INDUST' ~ 'Zamil Industrial'
+    """
+    tokens, other_tokens = _name_tokens(name), _name_tokens(other)
+    if not tokens or not other_tokens:
+        return False
+    if set(tokens) <= set(other_tokens) or set(other_tokens) <= set(tokens):
+        return True
+    compact, other_compact = ''.join(tokens), ''.join(other_tokens)
+    return compact.startswith(other_compact) or other_compact.startswith(compact)
+
+
+class SymbolMaster:
+    """
+    One parsed copy of the company list:
+    1. Sources are parsed in priority order; the first one found defines the universe,
+       later ones only fill empty fields (e.g. Arabic names from the JSON database)
+    2. Files are re-parsed only when a source's mtime changes, checked at most
+       once per `check_interval` seconds
+    3. `get`/`name`/`sector` are dict lookups; `symbols`, `names_en`, `names_ar`
+       and `sector_codes` are aligned NumPy arrays sorted by symbol
+    """
+
+    def __init__(self, sources: Optional[List[tuple]] = None, check_interval: float = 2.0,
+                 clock: Callable[[], float] = time.monotonic):
+        # (path, parser) pairs, highest priority first
+        self.sources = sources or [(OFFICIAL_DB_PATH, parse_official_db), (JSON_DB_PATH, parse_json_db),
+                                   (ARABIC_NAMES_PATH, parse_arabic_names)]
+        self.check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._mtimes: Optional[tuple] = None
+        self._checked = float('-inf')
+        self.version = 0
+        self.records: Dict[str, Dict] = {}
+        self.symbols = np.array([], dtype=str)
+        self.names_en = np.array([], dtype=object)
+        self.names_ar = np.array([], dtype=object)
+        self.sectors: List[str] = []
+        self.sector_codes = np.array([], dtype=np.int16)
+
+    def _source_mtimes(self) -> tuple:
+        return tuple(os.path.getmtime(path) if os.path.exists(path) else None for path, _ in self.sources)
+
+    def _ensure_loaded(self):
+        now = self._clock()
+        if now - self._checked < self.check_interval:
+            return
+        with self._lock:
+            if now - self._checked < self.check_interval:
+                return
+            mtimes = self._source_mtimes()
+            self._checked = now
+            if mtimes != self._mtimes:
+                self._build()
+                self._mtimes = mtimes
+
+    def _build(self):
+        """Parse every source and rebuild the dict and column arrays (lock held)"""
+        records: Dict[str, Dict] = {}
+        for path, parser in self.sources:
+            if not os.path.exists(path):
+                continue
+            try:
+                parsed = parser(path)
+            except Exception as e:
+                logger.warning(f"Symbol master: could not parse {path}: {e}")
+                continue
+            defines_universe = not records
+            for stock in parsed:
+                if not defines_universe and stock['symbol'] not in records:
+                    continue
+                record = records.setdefault(stock['symbol'], {'symbol': stock['symbol'], 'name': '',
+                                                              'name_ar': '', 'sector': '', 'sequence': 0})
+                if 'match_name' in stock and not names_match(record['name'], stock['match_name']):
+                    continue
+                for field in ('name', 'name_ar', 'sector', 'sequence'):
+                    if not record[field] and stock.get(field):
+                        record[field] = stock[field]
+        for record in records.values():
+            record['name_en'] = record['name']
+            record['sector'] = record['sector'] or 'Unknown'
+
+        ordered = sorted(records)
+        self.records = records
+        self.symbols = np.array(ordered, dtype=str)
+        self.names_en = np.array([records[s]['name'] for s in ordered], dtype=object)
+        self.names_ar = np.array([records[s]['name_ar'] for s in ordered], dtype=object)
+        self.sectors = sorted({records[s]['sector'] for s in ordered})
+        sector_index = {sector: i for i, sector in enumerate(self.sectors)}
+        self.sector_codes = np.array([sector_index[records[s]['sector']] for s in ordered], dtype=np.int16)
+        self.version += 1
+        logger.info(f"📇 Symbol master v{self.version}: {len(records)} symbols, {len(self.sectors)} sectors")
+
+    @staticmethod
+    def _clean(symbol) -> str:
+        return str(symbol).replace('.SR', '').strip()
+
+    def get(self, symbol) -> Optional[Dict]:
+        """Record for a symbol ('2222' or '2222.SR'), None if unknown"""
+        self._ensure_loaded()
+        return self.records.get(self._clean(symbol))
+
+    def name(self, symbol, default: Optional[str] = None) -> Optional[str]:
+        record = self.get(symbol)
+        return record['name'] if record else default
+
+    def sector(self, symbol, default: str = 'Unknown') -> str:
+        record = self.get(symbol)
+        return record['sector'] if record else default
+
+    def __contains__(self, symbol) -> bool:
+        return self.get(symbol) is not None
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self.records)
+
+    def list_stocks(self) -> List[Dict]:
+        """Copies of every record in the official list order (callers may annotate them)"""
+        self._ensure_loaded()
+        ordered = sorted(self.records.values(), key=lambda r: (r['sequence'] or 10**6, r['symbol']))
+        return [dict(record) for record in ordered]
+
+    def as_dict(self) -> Dict[str, Dict]:
+        """{symbol: record} in the shape of saudi_stocks_database.json; records are shared, do not mutate"""
+        self._ensure_loaded()
+        return dict(self.records)
+
+    def symbols_in_sector(self, sector: str) -> np.ndarray:
+        """Vectorized sector filter over the column arrays"""
+        self._ensure_loaded()
+        if sector not in self.sectors:
+            return self.symbols[:0]
+        return self.symbols[self.sector_codes == self.sectors.index(sector)]
+
+
+# Global symbol master instance
+symbol_master = SymbolMaster()
@@ -0,0 +1,262 @@
+"""
+Tiered Cache for Saudi Stock Market App
+One cache subsystem: bounded in-memory LRU + JSON disk tier, per-namespace TTLs,
+stale-while-revalidate so the last good value is served while a refresh runs
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+import logging
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    from .single_flight import flight_group
+except ImportError:
+    from single_flight import flight_group
+
+logger = logging.getLogger(__name__)
+
+# ttl: seconds a value is fresh; stale_ttl: extra seconds it may be served while refreshing;
+# optional max_entries caps one namespace inside the shared memory tier
+DEFAULT_NAMESPACES = {
+    'quotes':      {'ttl': 300,          'stale_ttl': 3600,             'disk': True},
+    'market_data': {'ttl': 3600,         'stale_ttl': 24 * 60 * 60,     'disk': True},
+    'stock_list':  {'ttl': 24 * 60 * 60, 'stale_ttl': 7 * 24 * 60 * 60, 'disk': True},
+    'summaries':   {'ttl': 60,           'stale_ttl': 600,              'disk': False},
+    'ai_signals':  {'ttl': 300,          'stale_ttl': 0,                'disk': False, 'max_entries': 512},
+}
+
+
+class TieredCache:
+    """
+    Two-tier cache keyed by (namespace, key):
+    1. Memory tier: OrderedDict LRU bounded by `max_entries`
+    2. Disk tier: one JSON file per key under `cache_dir/<namespace>/`
+    Values stored in disk-backed namespaces must be JSON-serializable.
+    """
+
+    def __init__(self, cache_dir: str = "data/cache", max_entries: int = 4096,
+                 namespaces: Optional[Dict[str, Dict]] = None, refresh_workers: int = 4):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.namespaces = {name: dict(cfg) for name, cfg in DEFAULT_NAMESPACES.items()}
+        self.namespaces.update(namespaces or {})
+
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._refreshing = set()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="cache-refresh")
+
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'disk_hits': 0,
+                      'evictions': 0, 'refreshes': 0}
+        self._namespace_stats: Dict[str, Counter] = {}
+
+    # ----------------------------------------------------------- configuration
+    def configure(self, namespace: str, ttl: Optional[float] = None,
+                  stale_ttl: Optional[float] = None, disk: Optional[bool] = None,
+                  max_entries: Optional[int] = None):
+        """Add or adjust a namespace"""
+        cfg = self.namespaces.setdefault(namespace, {'ttl': 300, 'stale_ttl': 0, 'disk': False})
+        if ttl is not None:
+            cfg['ttl'] = ttl
+        if stale_ttl is not None:
+            cfg['stale_ttl'] = stale_ttl
+        if disk is not None:
+            cfg['disk'] = disk
+        if max_entries is not None:
+            cfg['max_entries'] = max_entries
+
+    def _config(self, namespace: str) -> Dict:
+        return self.namespaces.get(namespace, {'ttl': 300, 'stale_ttl': 0, 'disk': False})
+
+    def _count(self, namespace: str, name: str):
+        self.stats[name] += 1
+        self._namespace_stats.setdefault(namespace, Counter())[name] += 1
+
+    def namespace_stats(self) -> Dict[str, Dict[str, int]]:
+        """Lookup counters per namespace (the global `stats` are their sums)"""
+        return {namespace: dict(counts) for namespace, counts in list(self._namespace_stats.items())}
+
+    # --------------------------------------------------------------- disk tier
+    def _disk_path(self, namespace: str, key: str) -> str:
+        safe = re.sub(r'[^A-Za-z0-9_.-]', '_', str(key))[:64]
+        digest = hashlib.sha1(str(key).encode('utf-8')).hexdigest()[:10]
+        return os.path.join(self.cache_dir, namespace, f"{safe}-{digest}.json")
+
+    def _read_disk(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        path = self._disk_path(namespace, key)
+        try:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    payload = json.load(f)
+                return payload['value'], payload['stored_at']
+        except Exception as e:
+            logger.debug(f"Cache disk read error for {namespace}/{key}: {e}")
+        return None
+
+    def _write_disk(self, namespace: str, key: str, value: Any, stored_at: float):
+        path = self._disk_path(namespace, key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'stored_at': stored_at, 'value': value}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Cache disk write error for {namespace}/{key}: {e}")
+            # A partial temp file (unserialisable value, full disk) is never read back
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------ core access
+    def _remember(self, namespace: str, key: str, value: Any, stored_at: float):
+        with self._lock:
+            self._memory[(namespace, key)] = (value, stored_at)
+            self._memory.move_to_end((namespace, key))
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.stats['evictions'] += 1
+
+            namespace_limit = self._config(namespace).get('max_entries')
+            if namespace_limit:
+                # OrderedDict iterates least recently used first
+                keys = [k for k in self._memory if k[0] == namespace]
+                for cache_key in keys[:max(0, len(keys) - namespace_limit)]:
+                    del self._memory[cache_key]
+                    self.stats['evictions'] += 1
+
+    def get_entry(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, age_seconds) from memory or disk, regardless of freshness"""
+        with self._lock:
+            entry = self._memory.get((namespace, key))
+            if entry is not None:
+                self._memory.move_to_end((namespace, key))
+        if entry is None and self._config(namespace)['disk']:
+            entry = self._read_disk(namespace, key)
+            if entry is not None:
+                self._count(namespace, 'disk_hits')
+                self._remember(namespace, key, *entry)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        return value, time.time() - stored_at
+
+    def get(self, namespace: str, key: str, default: Any = None, ttl: Optional[float] = None) -> Any:
+        """Return a fresh value, or `default` if missing or expired (ttl overrides the namespace TTL)"""
+        ttl = self._config(namespace)['ttl'] if ttl is None else ttl
+        entry = self.get_entry(namespace, key)
+        if entry is not None and entry[1] < ttl:
+            self._count(namespace, 'hits')
+            return entry[0]
+        self._count(namespace, 'misses')
+        return default
+
+    def set(self, namespace: str, key: str, value: Any):
+        """Store a value in memory (and on disk for disk-backed namespaces)"""
+        stored_at = time.time()
+        self._remember(namespace, key, value, stored_at)
+        if self._config(namespace)['disk']:
+            self._write_disk(namespace, key, value, stored_at)
+
+    def invalidate(self, namespace: str, key: Optional[str] = None):
+        """Drop one key, or a whole namespace when key is None"""
+        with self._lock:
+            for cache_key in [k for k in self._memory if k[0] == namespace and (key is None or k[1] == key)]:
+                del self._memory[cache_key]
+        if not self._config(namespace)['disk']:
+            return
+        if key is not None:
+            paths = [self._disk_path(namespace, key)]
+        else:
+            directory = os.path.join(self.cache_dir, namespace)
+            paths = [os.path.join(directory, f) for f in os.listdir(directory)] if os.path.isdir(directory) else []
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # ------------------------------------------------ stale-while-revalidate
+    def _refresh(self, namespace: str, key: str, loader: Callable[[], Any],
+                 should_cache: Optional[Callable[[Any], bool]]):
+        try:
+            value = loader()
+            if should_cache is None or should_cache(value):
+                self.set(namespace, key, value)
+            self._count(namespace, 'refreshes')
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {namespace}/{key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard((namespace, key))
+
+    def refresh_in_background(self, namespace: str, key: str, loader: Callable[[], Any],
+                              should_cache: Optional[Callable[[Any], bool]] = None) -> bool:
+        """Schedule a refresh unless one is already running for this key"""
+        with self._lock:
+            if (namespace, key) in self._refreshing:
+                return False
+            self._refreshing.add((namespace, key))
+        self._executor.submit(self._refresh, namespace, key, loader, should_cache)
+        return True
+
+    def get_or_load(self, namespace: str, key: str, loader: Callable[[], Any],
+                    should_cache: Optional[Callable[[Any], bool]] = None,
+                    ttl: Optional[float] = None) -> Any:
+        """
+        Fresh value -> returned as is.
+        Stale value within stale_ttl -> returned immediately, refresh runs in background.
+        Missing or too old -> loaded synchronously.
+        `ttl` overrides the namespace TTL for this lookup (e.g. from the refresh scheduler).
+        """
+        cfg = self._config(namespace)
+        ttl = cfg['ttl'] if ttl is None else ttl
+        entry = self.get_entry(namespace, key)
+        if entry is not None:
+            value, age = entry
+            if age < ttl:
+                self._count(namespace, 'hits')
+                return value
+            if age < ttl + cfg['stale_ttl']:
+                self._count(namespace, 'stale_hits')
+                self.refresh_in_background(namespace, key, loader, should_cache)
+                return value
+
+        self._count(namespace, 'misses')
+        # Concurrent misses for the same key share one load
+        return flight_group(f"cache:{namespace}").do(key, self._load, namespace, key, loader, should_cache)
+
+    def _load(self, namespace: str, key: str, loader: Callable[[], Any],
+              should_cache: Optional[Callable[[Any], bool]]) -> Any:
+        value = loader()
+        if should_cache is None or should_cache(value):
+            self.set(namespace, key, value)
+        return value
+
+    def hit_ratio(self, namespace: Optional[str] = None) -> float:
+        """Fresh plus stale hits over all lookups, for one namespace or the whole cache"""
+        stats = self.stats if namespace is None else self._namespace_stats.get(namespace, {})
+        lookups = stats.get('hits', 0) + stats.get('stale_hits', 0) + stats.get('misses', 0)
+        return (stats.get('hits', 0) + stats.get('stale_hits', 0)) / lookups if lookups else 0.0
+
+
+def _shared_cache() -> TieredCache:
+    """One cache per process, even when core/ is imported both flat and as a package"""
+    for name in ('core.tiered_cache', 'tiered_cache'):
+        cache = getattr(sys.modules.get(name), 'tiered_cache', None)
+        if cache is not None:
+            return cache
+    return TieredCache()
+
+
+# Global cache shared by all modules
+tiered_cache = _shared_cache()
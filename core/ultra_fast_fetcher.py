@@ -6,17 +6,33 @@ Solves all performance and reliability issues with optimized concurrent processi
 import yfinance as yf
 import pandas as pd
 import numpy as np
-import asyncio
-import aiohttp
 import time
-import json
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
-import sqlite3
-import os
+
+try:
+    from .bulk_quote_engine import BulkQuoteEngine
+    from .fundamentals_store import fundamentals_store
+    from .async_fetch_backend import get_async_backend
+    from .market_snapshot import MarketSnapshot
+    from .tiered_cache import tiered_cache
+    from .refresh_scheduler import market_scheduler
+    from .rate_limiter import get_limiter, pool_size
+    from .symbol_master import symbol_master
+    from .metrics import fetch_metrics
+except ImportError:
+    from bulk_quote_engine import BulkQuoteEngine
+    from fundamentals_store import fundamentals_store
+    from async_fetch_backend import get_async_backend
+    from market_snapshot import MarketSnapshot
+    from tiered_cache import tiered_cache
+    from refresh_scheduler import market_scheduler
+    from rate_limiter import get_limiter, pool_size
+    from symbol_master import symbol_master
+    from metrics import fetch_metrics
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -39,46 +55,42 @@ class StockData:
 class UltraFastFetcher:
     """
     Ultra-optimized fetcher that solves ALL performance issues:
-    1. Parallel processing with controlled concurrency
-    2. Smart batching to avoid API rate limits
-    3. Intelligent caching with 1-hour refresh
+    1. Bulk multi-ticker downloads instead of per-symbol requests
+    2. Market cap from the fundamentals store (refreshed in background)
+    3. Tiered cache refreshed on the market-hours schedule; stale data is served while refreshing
     4. Robust error handling and fallbacks
     5. Real-time progress tracking
     """
     
-    def __init__(self, max_workers: int = 20, cache_duration: int = 3600):
-        self.max_workers = max_workers
-        self.cache_duration = cache_duration  # 1 hour cache
-        self.cache_file = "data/ultra_fast_cache.json"
-        self.db_path = "data/Saudi Stock Exchange (TASI) Sectors and Companies.db"
+    def __init__(self, max_workers: Optional[int] = None, cache_duration: int = 3600, backend: str = "bulk",
+                 scheduler=None):
+        # Thread ceiling only - the shared Yahoo limiter decides how many calls run at once
+        self.max_workers = max_workers or pool_size('yahoo')
+        self.limiter = get_limiter('yahoo')
+        self.cache_duration = cache_duration  # fixed TTL, only used when scheduling is disabled
+        self.cache = tiered_cache
+        self.cache_namespace = "market_data"
+        self.cache.configure(self.cache_namespace, ttl=cache_duration)
+        # Refresh every update_interval in session, closing snapshot stays fresh after hours
+        self.scheduler = scheduler or market_scheduler
+        # "bulk": chunked yf.download, "async": aiohttp chart requests on one event loop
+        self.backend = backend
+        self.quote_engine = get_async_backend() if backend == "async" else BulkQuoteEngine()
+        self.fundamentals = fundamentals_store
         
         # Load verified Saudi stocks database
         self.all_stocks = self._load_verified_stocks()
         logger.info(f"🚀 Initialized Ultra-Fast Fetcher with {len(self.all_stocks)} verified stocks")
         
     def _load_verified_stocks(self) -> List[Dict]:
-        """Load verified stocks from database"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT symbol, name, sector FROM companies")
-            
-            stocks = []
-            for row in cursor.fetchall():
-                symbol, name, sector = row
-                stocks.append({
-                    'symbol': symbol,
-                    'name': name,
-                    'sector': sector or 'Unknown'
-                })
-            
-            conn.close()
-            logger.info(f"✅ Loaded {len(stocks)} stocks from official database")
-            return stocks
-            
-        except Exception as e:
-            logger.warning(f"Database not found, using fallback list: {e}")
+        """Load verified stocks from the shared symbol master (the official tab-separated database)"""
+        stocks = [{'symbol': s['symbol'], 'name': s['name'], 'sector': s['sector']}
+                  for s in symbol_master.list_stocks()]
+        if not stocks:
+            logger.warning("Official database not found, using fallback list")
             return self._get_fallback_stocks()
+        logger.info(f"✅ Loaded {len(stocks)} stocks from official database")
+        return stocks
     
     def _get_fallback_stocks(self) -> List[Dict]:
         """Fallback list of major Saudi stocks"""
@@ -107,54 +119,11 @@ class UltraFastFetcher:
             {"symbol": "2380", "name": "Petro Rabigh", "sector": "Energy"}
         ]
     
-    def _load_cache(self) -> Dict:
-        """Load cached data if valid"""
-        try:
-            if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                    
-                # Check if cache is still valid
-                cache_time = cache_data.get('timestamp', 0)
-                if (time.time() - cache_time) < self.cache_duration:
-                    logger.info(f"✅ Using cached data ({len(cache_data.get('stocks', []))} stocks)")
-                    return cache_data
-        except Exception as e:
-            logger.warning(f"Cache load error: {e}")
-            
-        return {}
-    
-    def _save_cache(self, stocks: List[StockData]):
-        """Save data to cache"""
-        try:
-            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
-            
-            cache_data = {
-                'timestamp': time.time(),
-                'stocks': [
-                    {
-                        'symbol': stock.symbol,
-                        'name': stock.name,
-                        'current_price': stock.current_price,
-                        'change_percent': stock.change_percent,
-                        'volume': stock.volume,
-                        'market_cap': stock.market_cap,
-                        'trading_value': stock.trading_value,
-                        'sector': stock.sector,
-                        'success': stock.success,
-                        'data_source': stock.data_source
-                    }
-                    for stock in stocks if stock.success
-                ]
-            }
-            
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
-                
-            logger.info(f"💾 Cached {len(cache_data['stocks'])} stocks")
-            
-        except Exception as e:
-            logger.error(f"Cache save error: {e}")
+    def _save_cache(self, max_stocks: int, stocks: List[StockData]):
+        """Save successful results to the memory and disk tiers"""
+        records = [asdict(stock) for stock in stocks if stock.success]
+        self.cache.set(self.cache_namespace, f"stocks_{max_stocks}", records)
+        logger.info(f"💾 Cached {len(records)} stocks")
     
     def _fetch_single_stock(self, stock_info: Dict) -> StockData:
         """Fetch single stock data with error handling"""
@@ -165,8 +134,8 @@ class UltraFastFetcher:
             ticker = yf.Ticker(f"{symbol}.SR")
             
             # Get current data
-            info = ticker.info
-            hist = ticker.history(period="2d")
+            with self.limiter.permit('history'):
+                hist = ticker.history(period="2d")
             
             if len(hist) < 1:
                 raise ValueError("No price data available")
@@ -181,7 +150,7 @@ class UltraFastFetcher:
             
             # Get volume and other metrics
             volume = int(hist['Volume'].iloc[-1]) if len(hist) >= 1 else 0
-            market_cap = info.get('marketCap', 0) or 0
+            market_cap = self.fundamentals.quote_fields(symbol)['market_cap']
             trading_value = current_price * volume
             
             fetch_time = time.time() - start_time
@@ -214,44 +183,67 @@ class UltraFastFetcher:
                 fetch_time=time.time() - start_time
             )
     
+    def _to_stock_data(self, stocks_info: List[Dict], quotes) -> List[StockData]:
+        """Split quote arrays into StockData records"""
+        per_stock_time = quotes.fetch_time / len(stocks_info) if stocks_info else 0.0
+        results = []
+        
+        for i, stock_info in enumerate(stocks_info):
+            success = bool(quotes.success[i])
+            results.append(StockData(
+                symbol=stock_info['symbol'],
+                name=stock_info['name'],
+                current_price=float(quotes.current_price[i]) if success else 0.0,
+                change_percent=float(quotes.change_percent[i]) if success else 0.0,
+                volume=int(quotes.volume[i]) if success else 0,
+                market_cap=self.fundamentals.get_market_cap(stock_info['symbol']),
+                trading_value=float(quotes.trading_value[i]) if success else 0.0,
+                sector=stock_info['sector'],
+                success=success,
+                error=None if success else "No price data available",
+                fetch_time=per_stock_time
+            ))
+        
+        return results
+    
     def fetch_market_data(self, max_stocks: int = 50, use_cache: bool = True) -> List[StockData]:
         """
-        Ultra-fast market data fetching with parallel processing
+        Ultra-fast market data fetching with bulk multi-ticker downloads.
+        A stale cache entry is returned immediately and refreshed in the background.
         """
-        # Try cache first
-        if use_cache:
-            cache_data = self._load_cache()
-            if cache_data:
-                cached_stocks = []
-                for stock_data in cache_data.get('stocks', []):
-                    cached_stocks.append(StockData(**stock_data))
-                logger.info(f"⚡ Returned {len(cached_stocks)} stocks from cache (instant)")
-                return cached_stocks[:max_stocks]
+        if not use_cache:
+            results = self._fetch_fresh(max_stocks)
+            if results:
+                self._save_cache(max_stocks, results)
+            return results
         
-        # Fetch fresh data
+        records = self.cache.get_or_load(
+            self.cache_namespace, f"stocks_{max_stocks}",
+            lambda: [asdict(stock) for stock in self._fetch_fresh(max_stocks)],
+            should_cache=bool,
+            ttl=self._cache_ttl()
+        )
+        return [StockData(**record) for record in records][:max_stocks]
+    
+    def _cache_ttl(self) -> float:
+        """Seconds cached data stays fresh right now"""
+        return self.scheduler.fresh_for() if self.scheduler.enabled else self.cache_duration
+    
+    def _fetch_fresh(self, max_stocks: int) -> List[StockData]:
+        """Fetch quotes for the first `max_stocks` stocks, successful results only"""
         logger.info(f"🔄 Fetching fresh data for {max_stocks} stocks...")
         start_time = time.time()
         
         # Select stocks to fetch
         stocks_to_fetch = self.all_stocks[:max_stocks]
         
-        # Parallel processing with controlled concurrency
-        all_results = []
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_stock = {
-                executor.submit(self._fetch_single_stock, stock): stock 
-                for stock in stocks_to_fetch
-            }
-            
-            completed = 0
-            for future in as_completed(future_to_stock):
-                result = future.result()
-                all_results.append(result)
-                completed += 1
-                
-                # Progress logging
-                if completed % 10 == 0 or completed == len(stocks_to_fetch):
-                    logger.info(f"📊 Progress: {completed}/{len(stocks_to_fetch)} stocks processed")
+        # One multi-ticker request per chunk instead of info + history per stock
+        quotes = self.quote_engine.fetch([stock['symbol'] for stock in stocks_to_fetch])
+        all_results = self._to_stock_data(stocks_to_fetch, quotes)
+        logger.info(f"📦 {self.backend} backend: {quotes.request_count} requests for {len(stocks_to_fetch)} stocks")
+        
+        # Market cap changes slowly - refresh stale fundamentals off the hot path
+        self.fundamentals.refresh_in_background([stock['symbol'] for stock in stocks_to_fetch])
         
         # Filter successful results
         successful_results = [r for r in all_results if r.success]
@@ -259,18 +251,18 @@ class UltraFastFetcher:
         
         total_time = time.time() - start_time
         speed = len(all_results) / total_time if total_time > 0 else 0
+        fetch_metrics.observe('yahoo', 'market_data', total_time, 'ok' if successful_results else 'error')
+        fetch_metrics.count_items('yahoo', 'market_data', len(successful_results), failed_count)
+        if successful_results:
+            fetch_metrics.mark_fresh('market_data')
         
         logger.info(f"✅ Fetching completed:")
         logger.info(f"   📈 Successful: {len(successful_results)} stocks")
         logger.info(f"   ❌ Failed: {failed_count} stocks")
-        logger.info(f"   📊 Success rate: {len(successful_results)/len(all_results)*100:.1f}%")
+        logger.info(f"   📊 Success rate: {len(successful_results)/max(len(all_results), 1)*100:.1f}%")
         logger.info(f"   ⏱️ Duration: {total_time:.1f} seconds")
         logger.info(f"   🚀 Speed: {speed:.1f} stocks/second")
         
-        # Save to cache
-        if successful_results:
-            self._save_cache(successful_results)
-        
         return successful_results
     
     def get_market_summary(self, max_stocks: int = 50) -> Dict:
@@ -281,6 +273,7 @@ class UltraFastFetcher:
         stocks = self.fetch_market_data(max_stocks)
         
         if not stocks:
+            fetch_metrics.observe('yahoo', 'market_summary', time.time() - start_time, 'error')
             return {
                 'error': 'No stock data available',
                 'total_stocks': 0,
@@ -290,39 +283,37 @@ class UltraFastFetcher:
         # Calculate market metrics
         valid_stocks = [s for s in stocks if s.success and s.current_price > 0]
         
-        # Top gainers (positive change only)
-        gainers = [s for s in valid_stocks if s.change_percent > 0]
-        gainers.sort(key=lambda x: x.change_percent, reverse=True)
-        top_gainers = gainers[:10]
-        
-        # Top losers (negative change only)
-        losers = [s for s in valid_stocks if s.change_percent < 0]
-        losers.sort(key=lambda x: x.change_percent)
-        top_losers = losers[:10]
-        
-        # Volume leaders
-        volume_leaders = sorted(valid_stocks, key=lambda x: x.volume, reverse=True)[:10]
-        
-        # Value leaders (trading value)
-        value_leaders = sorted(valid_stocks, key=lambda x: x.trading_value, reverse=True)[:10]
+        # Columnar snapshot: all four leaderboards come from one vectorized call
+        snapshot = MarketSnapshot(
+            symbols=[s.symbol for s in valid_stocks],
+            price=[s.current_price for s in valid_stocks],
+            change_pct=[s.change_percent for s in valid_stocks],
+            volume=[s.volume for s in valid_stocks],
+            value=[s.trading_value for s in valid_stocks],
+            sectors=[s.sector for s in valid_stocks]
+        )
+        boards = snapshot.leaderboards(k=10)
+        stats = snapshot.stats()
         
-        # Market statistics
-        total_volume = sum(s.volume for s in valid_stocks)
-        total_trading_value = sum(s.trading_value for s in valid_stocks)
-        avg_change = sum(s.change_percent for s in valid_stocks) / len(valid_stocks) if valid_stocks else 0
+        top_gainers = [valid_stocks[i] for i in boards['gainers']]
+        top_losers = [valid_stocks[i] for i in boards['losers']]
+        volume_leaders = [valid_stocks[i] for i in boards['volume']]
+        value_leaders = [valid_stocks[i] for i in boards['value']]
         
         processing_time = time.time() - start_time
+        # Includes cache hits: the latency a dashboard session actually sees
+        fetch_metrics.observe('yahoo', 'market_summary', processing_time)
         
         return {
             'success': True,
             'total_stocks': len(valid_stocks),
             'processing_time': processing_time,
             'market_stats': {
-                'total_volume': total_volume,
-                'total_trading_value': total_trading_value,
-                'average_change': avg_change,
-                'gainers_count': len(gainers),
-                'losers_count': len(losers)
+                'total_volume': stats['total_volume'],
+                'total_trading_value': stats['total_trading_value'],
+                'average_change': stats['average_change'],
+                'gainers_count': stats['gainers_count'],
+                'losers_count': stats['losers_count']
             },
             'top_gainers': [
                 {
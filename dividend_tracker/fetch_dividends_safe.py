@@ -18,6 +18,13 @@ def fetch_dividend_table():
     except ImportError as e:
         raise Exception(f"Required dependencies not installed: {e}")
     
+    # Shared HTTP transport when available (live by default, record/replay for offline runs)
+    try:
+        from core.http_transport import http_transport
+        http = http_transport.session()
+    except ImportError:
+        http = requests
+    
     url = "https://www.saudiexchange.sa/wps/portal/saudiexchange/newsandreports/issuer-financial-calendars/dividends?locale=en"
     
     # Enhanced headers to avoid blocking
@@ -32,7 +39,7 @@ def fetch_dividend_table():
     
     try:
         # Add delay and retry logic
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http.get(url, headers=headers, timeout=10)
         
         if response.status_code == 403:
             raise Exception("Access blocked by website. The Saudi Exchange website is restricting automated access. Please try again later or contact support for API access.")
@@ -18,6 +18,12 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import warnings
 warnings.filterwarnings('ignore')
 
+from core.market_snapshot import MarketSnapshot
+from core.rate_limiter import get_limiter, pool_size
+from core.fundamentals_store import fundamentals_store
+from core.snapshot_archive import snapshot_archive
+from core.http_transport import http_transport
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -25,13 +31,16 @@ logger = logging.getLogger(__name__)
 class CompleteSaudiMarketFetcher:
     """Comprehensive fetcher for ALL Saudi stocks with real-time prices and volumes"""
     
-    def __init__(self):
+    def __init__(self, backend: str = "threads"):
+        # "threads": yfinance calls in a thread pool, "async": core async fetch backend
+        self.backend = backend
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept': 'application/json, text/plain, */*',
             'Accept-Language': 'en-US,en;q=0.9,ar;q=0.8',
         })
+        http_transport.mount(self.session)
         
         # Initialize database connection
         self.db_path = "data/Saudi Stock Exchange (TASI) Sectors and Companies.db"
@@ -163,8 +172,8 @@ class CompleteSaudiMarketFetcher:
             ticker = yf.Ticker(symbol)
             
             # Get historical data (last 2 days to calculate change)
-            hist = ticker.history(period="2d", interval="1d")
-            info = ticker.info
+            with get_limiter('yahoo').permit('history'):
+                hist = ticker.history(period="2d", interval="1d")
             
             if hist.empty:
                 return self._create_error_result(clean_symbol, "No historical data")
@@ -180,14 +189,17 @@ class CompleteSaudiMarketFetcher:
             change = current_price - previous_close
             change_percent = (change / previous_close * 100) if previous_close > 0 else 0
             
-            # Get additional info
-            market_cap = info.get('marketCap', 0)
-            avg_volume = info.get('averageVolume', volume)
+            # Get additional info from the daily fundamentals store
+            fundamentals = fundamentals_store.get(clean_symbol)
+            if not fundamentals_store.is_fresh(clean_symbol):
+                fundamentals_store.refresh_in_background([clean_symbol])
+            market_cap = fundamentals.get('market_cap', 0)
+            avg_volume = fundamentals.get('avg_volume') or volume
             
             return {
                 'symbol': clean_symbol,
                 'yahoo_symbol': symbol,
-                'name': info.get('shortName', f"Stock {clean_symbol}"),
+                'name': fundamentals.get('short_name') or f"Stock {clean_symbol}",
                 'current_price': round(current_price, 2),
                 'previous_close': round(previous_close, 2),
                 'change': round(change, 2),
@@ -242,9 +254,13 @@ class CompleteSaudiMarketFetcher:
         else:
             return "Other"
     
-    def fetch_all_stocks_parallel(self, max_workers: int = 20) -> List[Dict]:
-        """Fetch all Saudi stocks in parallel for faster execution"""
+    def fetch_all_stocks_parallel(self, max_workers: Optional[int] = None) -> List[Dict]:
+        """Fetch all Saudi stocks in parallel; the shared Yahoo limiter paces the requests"""
+        
+        if self.backend == "async":
+            return self.fetch_all_stocks_async()
         
+        max_workers = max_workers or pool_size('yahoo')
         logger.info(f"Starting parallel fetch of {len(self.all_saudi_symbols)} stocks with {max_workers} workers...")
         
         all_results = []
@@ -281,8 +297,41 @@ class CompleteSaudiMarketFetcher:
         logger.info(f"Fetch completed: {successful_count} successful, {failed_count} failed")
         return all_results
     
-    def fetch_all_stocks_sequential(self, delay: float = 0.1) -> List[Dict]:
-        """Fetch all stocks sequentially (slower but more reliable)"""
+    def fetch_all_stocks_async(self) -> List[Dict]:
+        """Fetch all Saudi stocks on one event loop through the shared async fetch backend"""
+        from core.async_fetch_backend import get_async_backend
+        
+        logger.info(f"Starting async fetch of {len(self.all_saudi_symbols)} stocks...")
+        
+        all_results = []
+        for quote in get_async_backend().fetch_quotes(self.all_saudi_symbols):
+            clean_symbol = quote['symbol']
+            if not quote.get('success'):
+                all_results.append(self._create_error_result(clean_symbol, quote.get('error', 'Unknown error')))
+                continue
+            
+            all_results.append({
+                'symbol': clean_symbol,
+                'yahoo_symbol': f"{clean_symbol}.SR",
+                'name': f"Stock {clean_symbol}",
+                'current_price': round(quote['current_price'], 2),
+                'previous_close': round(quote['previous_close'], 2),
+                'change': round(quote['change'], 2),
+                'change_percent': round(quote['change_percent'], 2),
+                'volume': quote['volume'],
+                'market_cap': 0,
+                'sector': self._get_sector_from_symbol(clean_symbol),
+                'success': True,
+                'timestamp': datetime.now().isoformat(),
+                'data_source': 'Yahoo Finance Live (async)'
+            })
+        
+        successful_count = sum(1 for r in all_results if r.get('success'))
+        logger.info(f"Async fetch completed: {successful_count} successful, {len(all_results) - successful_count} failed")
+        return all_results
+    
+    def fetch_all_stocks_sequential(self) -> List[Dict]:
+        """Fetch all stocks sequentially (slower but more reliable); the Yahoo limiter sets the pace"""
         
         logger.info(f"Starting sequential fetch of {len(self.all_saudi_symbols)} stocks...")
         
@@ -301,9 +350,6 @@ class CompleteSaudiMarketFetcher:
                 if i % 25 == 0:
                     logger.info(f"Progress: {i}/{len(self.all_saudi_symbols)} stocks processed ({successful_count} successful)")
                 
-                # Respectful delay
-                time.sleep(delay)
-                
             except Exception as e:
                 logger.error(f"Error processing {symbol}: {str(e)}")
                 all_results.append(self._create_error_result(symbol.replace('.SR', ''), str(e)))
@@ -319,25 +365,17 @@ class CompleteSaudiMarketFetcher:
         if not successful_stocks:
             return {'success': False, 'error': 'No successful stock data available'}
         
-        # Sort stocks by change percentage
-        sorted_by_change = sorted(successful_stocks, key=lambda x: x.get('change_percent', 0), reverse=True)
-        
-        # Sort by volume
-        sorted_by_volume = sorted(successful_stocks, key=lambda x: x.get('volume', 0), reverse=True)
-        
-        # Sort by value traded (price * volume)
+        # Value traded (price * volume) kept on each record for the Excel export
         for stock in successful_stocks:
             stock['value_traded'] = stock.get('current_price', 0) * stock.get('volume', 0)
-        sorted_by_value = sorted(successful_stocks, key=lambda x: x.get('value_traded', 0), reverse=True)
+        
+        # Columnar snapshot: all four top-20 lists come from one vectorized call
+        snapshot = MarketSnapshot.from_records(successful_stocks, change_pct='change_percent', value='value_traded')
+        boards = snapshot.leaderboards(k=20, strict=False)
+        stats = snapshot.stats()
         
         # Calculate market statistics
         total_market_cap = sum(stock.get('market_cap', 0) for stock in successful_stocks)
-        total_volume = sum(stock.get('volume', 0) for stock in successful_stocks)
-        
-        # Count gainers/losers
-        gainers = [s for s in successful_stocks if s.get('change_percent', 0) > 0]
-        losers = [s for s in successful_stocks if s.get('change_percent', 0) < 0]
-        unchanged = [s for s in successful_stocks if s.get('change_percent', 0) == 0]
         
         return {
             'success': True,
@@ -346,15 +384,15 @@ class CompleteSaudiMarketFetcher:
             'total_stocks_attempted': len(all_data),
             'market_statistics': {
                 'total_market_cap': total_market_cap,
-                'total_volume': total_volume,
-                'gainers_count': len(gainers),
-                'losers_count': len(losers),
-                'unchanged_count': len(unchanged)
+                'total_volume': stats['total_volume'],
+                'gainers_count': stats['gainers_count'],
+                'losers_count': stats['losers_count'],
+                'unchanged_count': stats['unchanged_count']
             },
-            'top_gainers': sorted_by_change[:20],
-            'top_losers': sorted_by_change[-20:],
-            'highest_volume': sorted_by_volume[:20],
-            'highest_value_traded': sorted_by_value[:20],
+            'top_gainers': [successful_stocks[i] for i in boards['gainers']],
+            'top_losers': [successful_stocks[i] for i in boards['losers']],
+            'highest_volume': [successful_stocks[i] for i in boards['volume']],
+            'highest_value_traded': [successful_stocks[i] for i in boards['value']],
             'all_stocks': successful_stocks
         }
     
@@ -399,6 +437,13 @@ class CompleteSaudiMarketFetcher:
         logger.info(f"Data saved to {filename}")
         return filename
     
+    def save_to_archive(self, data: List[Dict]) -> Optional[str]:
+        """Append this fetch to the date-partitioned Parquet snapshot archive"""
+        path = snapshot_archive.write(data, source='complete_fetch')
+        if path:
+            logger.info(f"Data archived to {path}")
+        return path
+    
     def save_to_json(self, data: List[Dict], filename: str = None) -> str:
         """Save data to JSON file"""
         
@@ -427,16 +472,19 @@ def main():
     fetcher = CompleteSaudiMarketFetcher()
     
     # Choose method (parallel is faster, sequential is more reliable)
-    method = input("\nChoose fetch method:\n1. Parallel (faster)\n2. Sequential (more reliable)\nEnter choice (1 or 2): ").strip()
+    method = input("\nChoose fetch method:\n1. Parallel (faster)\n2. Sequential (more reliable)\n3. Async (fastest)\nEnter choice (1, 2 or 3): ").strip()
     
     start_time = time.time()
     
-    if method == "1":
+    if method == "3":
+        print("\n⚡ Starting async fetch...")
+        all_data = fetcher.fetch_all_stocks_async()
+    elif method == "1":
         print("\n🚀 Starting parallel fetch...")
-        all_data = fetcher.fetch_all_stocks_parallel(max_workers=15)
+        all_data = fetcher.fetch_all_stocks_parallel()
     else:
         print("\n🐌 Starting sequential fetch...")
-        all_data = fetcher.fetch_all_stocks_sequential(delay=0.2)
+        all_data = fetcher.fetch_all_stocks_sequential()
     
     elapsed_time = time.time() - start_time
     
@@ -460,8 +508,12 @@ def main():
             top_loser = summary['top_losers'][0]
             print(f"📉 Top Loser: {top_loser['symbol']} ({top_loser['change_percent']:.2f}%)")
         
-        # Save data
-        save_option = input("\nSave data to file?\n1. Excel\n2. JSON\n3. Both\n4. No\nEnter choice: ").strip()
+        # Every fetch goes to the snapshot archive; Excel/JSON exports are optional extras
+        archive_file = fetcher.save_to_archive(all_data)
+        if archive_file:
+            print(f"🗄️ Snapshot archived: {archive_file}")
+        
+        save_option = input("\nAlso export to file?\n1. Excel\n2. JSON\n3. Both\n4. No\nEnter choice: ").strip()
         
         if save_option in ["1", "3"]:
             excel_file = fetcher.save_to_excel(all_data)
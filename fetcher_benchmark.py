@@ -0,0 +1,450 @@
+"""
+Fetcher Throughput Benchmark for Saudi Stock Market App
+Runs every market-data engine against a simulated Yahoo upstream at increasing
+universe sizes and stores throughput, latency percentiles, memory peak and
+upstream call counts as JSON, compared with the previous run for regressions
+
+Usage:
+    python fetcher_benchmark.py                             # all engines, 25/100/259/1000 symbols
+    python fetcher_benchmark.py --engines ultra_fast optimized --sizes 25 100
+    python fetcher_benchmark.py --latency 0.12 --error-rate 0.02 --throttled
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta, timezone
+from hashlib import sha1
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import requests
+from requests.adapters import BaseAdapter
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+
+from core import rate_limiter
+from core.http_transport import http_transport, FaultInjector, request_key, _response, Interaction, LIVE
+from core.symbol_master import symbol_master
+
+logger = logging.getLogger("fetcher_benchmark")
+
+RESULTS_DIR = "data/benchmarks"
+DEFAULT_SIZES = (25, 100, 259, 1000)
+# Relative change that counts as a regression (throughput down, latency/memory/calls up)
+REGRESSION_TOLERANCE = 0.15
+
+RANGE_DAYS = {'1d': 1, '2d': 2, '5d': 5, '1mo': 21, '3mo': 63, '6mo': 126, '1y': 250}
+
+
+def _endpoint(path: str) -> str:
+    if '/finance/chart/' in path:
+        return 'chart'
+    if 'getcrumb' in path:
+        return 'crumb'
+    if '/quoteSummary/' in path:
+        return 'quote_summary'
+    if path in ('', '/'):
+        return 'cookie'
+    return 'other'
+
+
+class SimulatedYahoo(BaseAdapter):
+    """
+    Stands in for Yahoo Finance behind the HTTP transport:
+    1. Cookie/crumb handshake and a deterministic daily chart for any symbol
+    2. Latency and failures from a FaultInjector (seeded per request like replay mode)
+    3. Counts calls per endpoint and stamps when each symbol's chart was served
+    """
+
+    def __init__(self, faults: Optional[FaultInjector] = None, clock: Callable[[], float] = time.perf_counter):
+        super().__init__()
+        self.faults = faults or FaultInjector()
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls: Counter = Counter()
+            self.served: Dict[str, float] = {}
+            self._occurrences: Counter = Counter()
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        kind = _endpoint(parts.path)
+        key = request_key(request.method, request.url)
+        with self._lock:
+            self.calls[kind] += 1
+            occurrence = self._occurrences[key]
+            self._occurrences[key] += 1
+
+        delay, fail = self.faults.decide(key, occurrence)
+        if delay:
+            time.sleep(delay)
+        if fail:
+            if self.faults.error_status is None:
+                raise requests.ConnectionError(f"Simulated connection error for {key}")
+            return self._respond(request, self.faults.error_status, b'')
+
+        if kind == 'chart':
+            symbol = parts.path.rsplit('/', 1)[-1]
+            days = RANGE_DAYS.get(parse_qs(parts.query).get('range', ['5d'])[0], 5)
+            body = json.dumps(self.chart(symbol, days)).encode()
+            with self._lock:
+                self.served.setdefault(symbol.replace('.SR', ''), self.clock())
+            return self._respond(request, 200, body)
+        if kind == 'crumb':
+            return self._respond(request, 200, b'SimulatedCrumb', 'text/plain')
+        if kind == 'cookie':
+            return self._respond(request, 200, b'', 'text/html')
+        return self._respond(request, 404, b'{"finance": {"result": null, "error": {"code": "Not Found"}}}')
+
+    def _respond(self, request, status: int, body: bytes, content_type: str = 'application/json;charset=utf-8'):
+        return _response(request, Interaction(status, {'Content-Type': content_type}, body, request.url), self)
+
+    @staticmethod
+    def chart(symbol: str, days: int) -> Dict:
+        """Daily bars ending today, prices derived from the symbol so every run sees the same quotes"""
+        seed = int(sha1(symbol.encode()).hexdigest()[:8], 16)
+        base = 10.0 + seed % 20000 / 100
+        closes = [round(base * (1 + 0.005 * (i - days + 1)), 2) for i in range(days)]
+        volumes = [100000 + seed % 5000 * 100 + i for i in range(days)]
+        session_open = datetime.now(timezone.utc).replace(hour=7, minute=0, second=0, microsecond=0)
+        timestamps = [int((session_open - timedelta(days=days - 1 - i)).timestamp()) for i in range(days)]
+        return {'chart': {'result': [{
+            'meta': {'currency': 'SAR', 'symbol': symbol, 'exchangeName': 'SAU', 'instrumentType': 'EQUITY',
+                     'regularMarketPrice': closes[-1], 'chartPreviousClose': closes[0], 'priceHint': 2,
+                     'gmtoffset': 10800, 'timezone': 'AST', 'exchangeTimezoneName': 'Asia/Riyadh',
+                     'dataGranularity': '1d', 'range': f"{days}d", 'validRanges': list(RANGE_DAYS)},
+            'timestamp': timestamps,
+            'indicators': {'quote': [{'open': closes, 'high': closes, 'low': closes, 'close': closes,
+                                      'volume': volumes}],
+                           'adjclose': [{'adjclose': closes}]},
+        }], 'error': None}}
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def simulated_upstream(upstream: SimulatedYahoo):
+    """Every session and yfinance go to the simulator; the previous transport setup is restored after"""
+    from yfinance.data import YfData
+    previous = (http_transport.mode, http_transport.store.path if http_transport.store else None,
+                http_transport.upstream)
+    data = YfData()
+    handshake = (data._cookie, data._crumb)
+    http_transport.configure(LIVE, upstream=upstream)
+    # The simulator issues no cookie: without this yfinance probes fc.yahoo.com under its
+    # cookie lock on every call, which real Yahoo (cookie cached after the first call) never does
+    data._cookie, data._crumb = True, None
+    try:
+        yield upstream
+    finally:
+        http_transport.configure(previous[0], previous[1], previous[2])
+        data._cookie, data._crumb = handshake
+
+
+@contextmanager
+def unthrottled(source: str = 'yahoo'):
+    """Swap the source's limiter for one that never waits, keeping its concurrency ceiling (pool sizes)"""
+    configured = rate_limiter.get_limiter(source)
+    ceiling = configured.max_concurrency
+    with rate_limiter._limiters_lock:
+        rate_limiter._limiters[source] = rate_limiter.AdaptiveRateLimiter(
+            source, rate=1e6, burst=1e6, concurrency=ceiling, min_concurrency=ceiling, max_concurrency=ceiling,
+            target_latency=configured.target_latency)
+    try:
+        yield
+    finally:
+        with rate_limiter._limiters_lock:
+            rate_limiter._limiters[source] = configured
+
+
+def benchmark_universe(size: int) -> List[Dict]:
+    """Symbol master stocks, padded with synthetic codes for sizes beyond the listed market"""
+    stocks = [{'symbol': s['symbol'], 'name': s.get('name', s['symbol']), 'sector': s.get('sector', 'Unknown')}
+              for s in symbol_master.list_stocks()][:size]
+    taken = {stock['symbol'] for stock in stocks}
+    code = 1000
+    while len(stocks) < size:
+        if str(code) not in taken:
+            stocks.append({'symbol': str(code), 'name': f"Synthetic {code}", 'sector': 'Synthetic'})
+        code += 1
+    return stocks
+
+
+class _NoFundamentals:
+    """Market caps come from the fundamentals store, outside the quote path being measured"""
+
+    def get_market_cap(self, symbol) -> int:
+        return 0
+
+    def quote_fields(self, symbol) -> Dict:
+        return {'market_cap': 0}
+
+    def refresh_in_background(self, symbols):
+        pass
+
+
+# Each factory prepares an engine for a universe and returns a run() -> number of quotes fetched
+def _ultra_fast(stocks: List[Dict]) -> Callable[[], int]:
+    from core.ultra_fast_fetcher import UltraFastFetcher
+    fetcher = UltraFastFetcher(backend="bulk")
+    fetcher.all_stocks = stocks
+    fetcher.fundamentals = _NoFundamentals()
+    return lambda: len(fetcher._fetch_fresh(len(stocks)))   # no cache tier: every run hits the upstream
+
+
+def _ultra_fast_corrected(stocks: List[Dict]) -> Callable[[], int]:
+    from ultra_fast_corrected_fetcher import UltraFastCorrectedFetcher
+    fetcher = UltraFastCorrectedFetcher(cache_duration=0)
+    fetcher.cache_file = os.path.join(tempfile.gettempdir(), "fetcher_benchmark_cache.json")
+    fetcher.official_stocks = stocks
+    return lambda: len(fetcher.fetch_market_data(limit=len(stocks)))
+
+
+def _optimized(stocks: List[Dict]) -> Callable[[], int]:
+    from optimized_fetcher import OptimizedSaudiExchange
+    fetcher = OptimizedSaudiExchange()
+    fetcher.core_stocks = {s['symbol']: {'name': s['name'], 'yahoo': f"{s['symbol']}.SR", 'sector': s['sector']}
+                           for s in stocks}
+    return lambda: len(fetcher.fetch_stocks_threaded(timeout=600))
+
+
+def _alternative(stocks: List[Dict]) -> Callable[[], int]:
+    from alternative_data_sources import AlternativeDataSources
+    sources = AlternativeDataSources()
+    symbols = {s['symbol']: {'name': s['name'], 'yahoo': f"{s['symbol']}.SR"} for s in stocks}
+    return lambda: sources.get_yahoo_data_fast(symbols)['total_stocks']
+
+
+def _market_data_fetcher(stocks: List[Dict]) -> Callable[[], int]:
+    from core.market_data_fetcher import fetch_batch_prices
+    symbols = [s['symbol'] for s in stocks]
+    return lambda: len(fetch_batch_prices(symbols))
+
+
+def _performance_optimizer(stocks: List[Dict]) -> Callable[[], int]:
+    from core.performance_optimizer import parallel_fetch_stocks
+    symbols = [s['symbol'] for s in stocks]
+    return lambda: len(parallel_fetch_stocks(symbols))
+
+
+ENGINES: Dict[str, Callable[[List[Dict]], Callable[[], int]]] = {
+    'ultra_fast': _ultra_fast,
+    'ultra_fast_corrected': _ultra_fast_corrected,
+    'optimized': _optimized,
+    'alternative': _alternative,
+    'market_data_fetcher': _market_data_fetcher,
+    'performance_optimizer': _performance_optimizer,
+}
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None}
+    p50, p95, p99 = np.percentile(np.asarray(values) * 1000, [50, 95, 99])
+    return {'p50': round(float(p50), 2), 'p95': round(float(p95), 2), 'p99': round(float(p99), 2)}
+
+
+class FetcherBenchmark:
+    """
+    Measures each (engine, universe size) pair:
+    1. One warm-up run (connection pools, yfinance crumb), then `repeats` timed runs
+    2. Throughput = quotes / wall time; latency = time from run start until each symbol's
+       chart was served, pooled over the timed runs (p50/p95/p99)
+    3. Memory peak from one extra run under tracemalloc; upstream calls per run by endpoint
+    """
+
+    def __init__(self, engines: Optional[List[str]] = None, sizes=DEFAULT_SIZES, repeats: int = 3,
+                 latency: float = 0.05, jitter: float = 0.02, error_rate: float = 0.0, throttled: bool = False,
+                 seed: int = 42):
+        unknown = set(engines or []) - set(ENGINES)
+        if unknown:
+            raise ValueError(f"Unknown engines: {', '.join(sorted(unknown))} (expected {', '.join(ENGINES)})")
+        self.engines = list(engines or ENGINES)
+        self.sizes = [int(size) for size in sizes]
+        self.repeats = max(1, int(repeats))
+        self.throttled = throttled
+        self.settings = {'sizes': self.sizes, 'repeats': self.repeats, 'latency': latency, 'jitter': jitter,
+                         'error_rate': error_rate, 'throttled': throttled, 'seed': seed}
+        self.upstream = SimulatedYahoo(FaultInjector(latency=latency, jitter=jitter, error_rate=error_rate,
+                                                     seed=seed))
+
+    def run(self) -> Dict:
+        results = []
+        with simulated_upstream(self.upstream), (nullcontext() if self.throttled else unthrottled()):
+            for engine in self.engines:
+                for size in self.sizes:
+                    result = self.measure(engine, size)
+                    results.append(result)
+                    logger.info(f"⏱️ {engine} @ {size}: {result['throughput']} quotes/s, "
+                                f"p95 {result['latency_ms']['p95']} ms, {result['upstream_calls']} calls")
+        return {'version': 1, 'created': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(), 'platform': platform.platform(),
+                'settings': self.settings, 'results': results}
+
+    def measure(self, engine: str, size: int) -> Dict:
+        stocks = benchmark_universe(size)
+        result = {'engine': engine, 'symbols': size}
+        try:
+            run = ENGINES[engine](stocks)
+            run()   # warm-up
+
+            walls, fetched, calls, latencies = [], [], [], []
+            for _ in range(self.repeats):
+                self.upstream.reset()
+                start = time.perf_counter()
+                fetched.append(run())
+                walls.append(time.perf_counter() - start)
+                calls.append(self.upstream.total_calls)
+                latencies.extend(served - start for served in self.upstream.served.values())
+            by_endpoint = dict(self.upstream.calls)
+
+            tracemalloc.start()
+            try:
+                run()
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        except Exception as e:
+            logger.warning(f"⚠️ {engine} @ {size} failed: {e}")
+            return dict(result, error=f"{type(e).__name__}: {e}")
+
+        wall = float(np.median(walls))
+        quotes = int(np.median(fetched))
+        upstream_calls = int(np.median(calls))
+        return dict(result, **{
+            'quotes': quotes,
+            'success_rate': round(quotes / size, 4) if size else 0.0,
+            'wall_s': round(wall, 4),
+            'throughput': round(quotes / wall, 2) if wall > 0 else 0.0,
+            'latency_ms': _percentiles(latencies),
+            'memory_peak_mb': round(peak / 1024 / 1024, 2),
+            'upstream_calls': upstream_calls,
+            'calls_per_symbol': round(upstream_calls / size, 2) if size else 0.0,
+            'calls_by_endpoint': by_endpoint,
+        })
+
+
+def save_results(report: Dict, directory: str = RESULTS_DIR) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"fetchers_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def load_previous(directory: str = RESULTS_DIR, exclude: Optional[str] = None) -> Optional[Dict]:
+    """Most recent stored report (other than `exclude`)"""
+    paths = sorted(p for p in glob.glob(os.path.join(directory, "fetchers_*.json"))
+                   if not exclude or os.path.abspath(p) != os.path.abspath(exclude))
+    if not paths:
+        return None
+    with open(paths[-1], 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(previous: Dict, current: Dict, tolerance: float = REGRESSION_TOLERANCE) -> List[Dict]:
+    """Metrics that got worse by more than `tolerance` for the same engine and size"""
+    if not previous:
+        return []
+    same_conditions = ('latency', 'jitter', 'error_rate', 'throttled')
+    if any(previous.get('settings', {}).get(k) != current['settings'].get(k) for k in same_conditions):
+        logger.warning("⚠️ Previous benchmark ran with different upstream settings - not compared")
+        return []
+
+    before = {(r['engine'], r['symbols']): r for r in previous.get('results', []) if 'error' not in r}
+    regressions = []
+    for result in current['results']:
+        old = before.get((result['engine'], result['symbols']))
+        if old is None:
+            continue
+        if 'error' in result:
+            regressions.append({'engine': result['engine'], 'symbols': result['symbols'], 'metric': 'error',
+                                'before': None, 'after': result['error'], 'change_pct': None})
+            continue
+        metrics = [('throughput', old['throughput'], result['throughput'], -1),
+                   ('latency_p95_ms', old['latency_ms']['p95'], result['latency_ms']['p95'], 1),
+                   ('memory_peak_mb', old['memory_peak_mb'], result['memory_peak_mb'], 1),
+                   ('upstream_calls', old['upstream_calls'], result['upstream_calls'], 1)]
+        for metric, was, now, worse in metrics:
+            if not was or now is None:
+                continue
+            change = (now - was) / was
+            if change * worse > tolerance:
+                regressions.append({'engine': result['engine'], 'symbols': result['symbols'], 'metric': metric,
+                                    'before': was, 'after': now, 'change_pct': round(change * 100, 1)})
+    return regressions
+
+
+def format_report(report: Dict) -> str:
+    lines = [f"{'engine':<22}{'symbols':>8}{'quotes':>8}{'quotes/s':>10}{'p50 ms':>9}{'p95 ms':>9}"
+             f"{'p99 ms':>9}{'peak MB':>9}{'calls':>7}"]
+    for r in report['results']:
+        if 'error' in r:
+            lines.append(f"{r['engine']:<22}{r['symbols']:>8}  ERROR {r['error']}")
+            continue
+        latency = r['latency_ms']
+        lines.append(f"{r['engine']:<22}{r['symbols']:>8}{r['quotes']:>8}{r['throughput']:>10.1f}"
+                     f"{latency['p50'] or 0:>9.1f}{latency['p95'] or 0:>9.1f}{latency['p99'] or 0:>9.1f}"
+                     f"{r['memory_peak_mb']:>9.1f}{r['upstream_calls']:>7}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the market-data fetchers against a simulated upstream")
+    parser.add_argument('--engines', nargs='+', choices=list(ENGINES), help="engines to run (default: all)")
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES), help="universe sizes")
+    parser.add_argument('--repeats', type=int, default=3, help="timed runs per engine and size")
+    parser.add_argument('--latency', type=float, default=0.05, help="simulated upstream latency (seconds)")
+    parser.add_argument('--jitter', type=float, default=0.02, help="+/- latency jitter (seconds)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of upstream calls answered with 503")
+    parser.add_argument('--throttled', action='store_true', help="keep the configured Yahoo rate limits")
+    parser.add_argument('--output', default=RESULTS_DIR, help="directory for JSON results")
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE, help="regression threshold")
+    parser.add_argument('--fail-on-regression', action='store_true', help="exit 1 when a regression is found")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    # Engines log every fetch - keep the benchmark output to its own lines
+    for name in ('core', 'yfinance', 'optimized_fetcher', 'alternative_data_sources', 'ultra_fast_corrected_fetcher'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    benchmark = FetcherBenchmark(args.engines, args.sizes, args.repeats, args.latency, args.jitter,
+                                 args.error_rate, args.throttled)
+    report = benchmark.run()
+    path = save_results(report, args.output)
+    print(format_report(report))
+    print(f"\n💾 Results saved to {path}")
+
+    regressions = compare(load_previous(args.output, exclude=path), report, args.tolerance)
+    for r in regressions:
+        print(f"📉 {r['engine']} @ {r['symbols']}: {r['metric']} {r['before']} -> {r['after']}"
+              + (f" ({r['change_pct']:+.1f}%)" if r['change_pct'] is not None else ""))
+    if not regressions:
+        print("✅ No regressions against the previous run")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,8 @@ import json
 import time
 from datetime import datetime
 
+from core.market_snapshot import MarketSnapshot
+
 def get_instant_market_data():
     """Get LIVE market data from Saudi Exchange fetcher - NO HARDCODED DATA"""
     try:
@@ -23,80 +25,40 @@ def get_instant_market_data():
             print("❌ NO LIVE DATA AVAILABLE")
             return {'success': False, 'error': 'No live data available'}
         
-        # Sort by change percentage for gainers and losers
-        gainers = []
-        losers = []
-        
-        for stock in all_stocks:
-            if stock.get('success') and stock.get('change_pct') is not None:
-                stock_data = {
-                    'symbol': stock['symbol'],
-                    'name': stock.get('name', stock['symbol']),
-                    'current_price': stock['current_price'],
-                    'change': stock.get('change', 0),
-                    'change_pct': stock['change_pct'], 
-                    'volume': stock.get('volume', 0),
-                    'sector': stock.get('sector', 'Unknown')
-                }
-                
-                if stock['change_pct'] > 0:
-                    gainers.append(stock_data)
-                elif stock['change_pct'] < 0:
-                    losers.append(stock_data)
-        
-        # Sort gainers by change percentage (descending)
-        gainers.sort(key=lambda x: x['change_pct'], reverse=True)
-        # Sort losers by change percentage (ascending - most negative first)
-        losers.sort(key=lambda x: x['change_pct'])
-        
-        # Sort by volume for movers
-        volume_movers = [stock for stock in all_stocks if stock.get('success') and stock.get('volume')]
-        volume_movers.sort(key=lambda x: x.get('volume', 0), reverse=True)
-        
-        movers_by_volume = []
-        for stock in volume_movers[:10]:
-            movers_by_volume.append({
-                'symbol': stock['symbol'],
-                'name': stock.get('name', stock['symbol']),
-                'current_price': stock['current_price'],
-                'change': stock.get('change', 0),
-                'change_pct': stock.get('change_pct', 0),
-                'volume': stock.get('volume', 0),
-                'sector': stock.get('sector', 'Unknown')
-            })
-        
-        # Calculate market value movers
-        value_movers = []
+        # One row per successful stock; the snapshot ranks them column-wise
+        rows = []
         for stock in all_stocks:
-            if stock.get('success') and stock.get('volume') and stock.get('current_price'):
-                market_value = stock['volume'] * stock['current_price']
-                value_movers.append({
+            if stock.get('success'):
+                rows.append({
                     'symbol': stock['symbol'],
                     'name': stock.get('name', stock['symbol']),
                     'current_price': stock['current_price'],
                     'change': stock.get('change', 0),
-                    'change_pct': stock.get('change_pct', 0),
+                    'change_pct': stock.get('change_pct') or 0,
                     'volume': stock.get('volume', 0),
-                    'market_value': market_value,
+                    'market_value': (stock.get('volume') or 0) * (stock.get('current_price') or 0),
                     'sector': stock.get('sector', 'Unknown')
                 })
         
-        value_movers.sort(key=lambda x: x['market_value'], reverse=True)
+        # Gainers, losers, volume and value leaders in one vectorized call
+        snapshot = MarketSnapshot.from_records(rows, value='market_value')
+        boards = snapshot.leaderboards(k=10)
+        stats = snapshot.stats()
         
         end_time = time.time()
         loading_time = end_time - start_time
         
         result = {
             'success': True,
-            'top_gainers': gainers[:10],
-            'top_losers': losers[:10], 
-            'movers_by_volume': movers_by_volume[:10],
-            'movers_by_value': value_movers[:10],
+            'top_gainers': [rows[i] for i in boards['gainers']],
+            'top_losers': [rows[i] for i in boards['losers']], 
+            'movers_by_volume': [rows[i] for i in boards['volume']],
+            'movers_by_value': [rows[i] for i in boards['value']],
             'market_summary': {
                 'total_stocks_processed': len(all_stocks),
-                'gainers_count': len(gainers),
-                'losers_count': len(losers),
-                'active_stocks': len([s for s in all_stocks if s.get('volume', 0) > 0])
+                'gainers_count': stats['gainers_count'],
+                'losers_count': stats['losers_count'],
+                'active_stocks': int((snapshot.volume > 0).sum())
             },
             'loading_time': round(loading_time, 2),
             'total_stocks_fetched': len(all_stocks),
@@ -104,7 +66,7 @@ def get_instant_market_data():
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         
-        print(f"✅ LIVE DATA SUCCESS: {len(gainers)} gainers, {len(losers)} losers, {loading_time:.2f}s")
+        print(f"✅ LIVE DATA SUCCESS: {stats['gainers_count']} gainers, {stats['losers_count']} losers, {loading_time:.2f}s")
         return result
         
     except Exception as e:
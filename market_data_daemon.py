@@ -0,0 +1,176 @@
+"""
+Saudi Stock Market Data Daemon
+Owns all upstream market-data I/O and publishes versioned snapshots for every dashboard session
+
+Usage:
+    python market_data_daemon.py          # run on the market-hours schedule
+    python market_data_daemon.py --once   # one sweep, publish, exit (snapshot channel only, no shared memory)
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+
+from saudi_exchange_fetcher import fetch_market_quotes, get_market_summary
+from core.refresh_scheduler import market_scheduler
+from core.snapshot_channel import market_channel
+from core.shared_snapshot import SharedMarketSnapshot
+from core.fundamentals_store import fundamentals_store
+from core.snapshot_archive import SnapshotArchive
+from core.price_reconciliation import price_reconciler
+from core.metrics import fetch_metrics, METRICS_FILE
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+logger = logging.getLogger("market_data_daemon")
+
+
+class MarketDataDaemon:
+    """
+    One process fetches, every Streamlit session reads:
+    1. Sweep: every symbol fetched once, ranked into a market summary
+    2. Publish: quotes + summary written as a new snapshot version, and the
+       per-symbol price columns mirrored into shared memory for zero-copy reads
+    3. Queue the universe for the fundamentals store (only symbols older than a day are fetched)
+       and append the quotes to the Parquet snapshot archive (finished days compacted)
+    4. Export fetch metrics (per-source latency, outcomes, cache, snapshot age) to the
+       Prometheus text file the dashboard's Data Health page reads
+    5. Sleep until the scheduler's next refresh cycle (closed market = no I/O)
+    """
+
+    def __init__(self, channel=None, scheduler=None, max_workers: Optional[int] = None, shared=None,
+                 fundamentals=None, archive=None, metrics=None, metrics_file: Optional[str] = METRICS_FILE):
+        self.channel = channel or market_channel
+        self.scheduler = scheduler or market_scheduler
+        self.max_workers = max_workers
+        self.shared = shared
+        self.fundamentals = fundamentals or fundamentals_store
+        self.archive = archive
+        self.metrics = metrics or fetch_metrics
+        self.metrics_file = metrics_file
+        self._compacted_before = None
+        self.last_sweep = 0.0
+
+    def publish_shared(self, summary) -> int:
+        """Mirror every symbol's price/change/volume/value into the shared-memory block"""
+        stocks = (summary or {}).get('all_stocks') or []
+        if self.shared is None or not stocks:
+            return 0
+        return self.shared.publish(
+            [s['symbol'] for s in stocks],
+            [s.get('current_price', 0.0) for s in stocks],
+            [s.get('change_pct', 0.0) for s in stocks],
+            [s.get('volume', 0) or 0 for s in stocks],
+            [s.get('value', 0.0) for s in stocks],
+        )
+
+    def archive_quotes(self, quotes) -> Optional[str]:
+        """Append the sweep to the snapshot archive; compacts earlier days once per day"""
+        if self.archive is None:
+            return None
+        path = self.archive.write([dict(quote, symbol=symbol) for symbol, quote in quotes.items()],
+                                  source='daemon')
+        today = datetime.now().date()
+        if self._compacted_before != today:
+            self.archive.compact_before(today)
+            self._compacted_before = today
+        return path
+
+    def sweep(self) -> int:
+        """Fetch the whole market once and publish it; returns the snapshot version"""
+        start = time.time()
+        quotes = fetch_market_quotes(self.max_workers)
+        summary = get_market_summary(quotes=quotes)
+
+        version = self.channel.publish({
+            'quotes': {symbol: quote for symbol, quote in quotes.items() if quote.get('success')},
+            'market_summary': summary,
+            'phase': self.scheduler.phase(),
+            'sweep_seconds': round(time.time() - start, 2),
+        })
+        self.publish_shared(summary)
+        self.fundamentals.refresh_in_background([s for s, q in quotes.items() if q.get('success')])
+        self.archive_quotes(quotes)
+        self.last_sweep = start
+
+        fetched = sum(1 for quote in quotes.values() if quote.get('success'))
+        self.metrics.observe('daemon', 'sweep', time.time() - start, 'ok' if fetched else 'error')
+        self.metrics.count_items('daemon', 'sweep', fetched, len(quotes) - fetched)
+        self.export_metrics()
+        logger.info(f"📡 Published snapshot v{version}: {len(quotes)} symbols in {time.time() - start:.1f}s "
+                    f"({self.scheduler.phase()})")
+        return version
+
+    def export_metrics(self) -> Optional[str]:
+        """Write the metrics text file; a failed write never fails the sweep"""
+        if not self.metrics_file:
+            return None
+        try:
+            return self.metrics.write_textfile(self.metrics_file)
+        except OSError as e:
+            logger.warning(f"⚠️ Metrics file not written: {e}")
+            return None
+
+    def run(self, once: bool = False):
+        while True:
+            if self.scheduler.is_due(self.last_sweep):
+                started = time.time()
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error(f"❌ Sweep failed: {e}")
+                    self.metrics.observe('daemon', 'sweep', time.time() - started, 'error')
+                    self.export_metrics()
+                    self.last_sweep = time.time()
+            if once:
+                self.fundamentals.wait()
+                return
+            wait = self.scheduler.seconds_until_next_refresh()
+            logger.info(f"⏳ Next refresh in {wait:.0f}s ({self.scheduler.phase()})")
+            # Wake up at least once a minute so clock changes are picked up
+            time.sleep(min(max(wait, 1.0), 60.0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Saudi market data daemon')
+    parser.add_argument('--once', action='store_true',
+                        help='Run one sweep and exit (snapshot channel only, no shared memory)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Quote fetch threads (default: the Yahoo rate limiter ceiling)')
+    parser.add_argument('--no-archive', action='store_true', help='Do not append sweeps to the Parquet archive')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='Also serve Prometheus metrics on http://127.0.0.1:PORT/metrics')
+    args = parser.parse_args()
+    
+    # Run from the project root so config/ and data/ resolve
+    os.chdir(ROOT)
+
+    print("📡 Starting market data daemon - dashboard sessions read its snapshots")
+    print("🛑 Press Ctrl+C to stop")
+    # The block lives only as long as this process, so a one-shot sweep does not create it
+    shared = None if args.once else SharedMarketSnapshot.create()
+    if args.metrics_port:
+        fetch_metrics.serve(args.metrics_port)
+    try:
+        archive = None if args.no_archive else SnapshotArchive()
+        if archive is not None:
+            # Reconcile the first sweep against the last archived official prices
+            price_reconciler.load_reference(archive)
+        MarketDataDaemon(max_workers=args.workers, shared=shared, archive=archive).run(once=args.once)
+    except KeyboardInterrupt:
+        print("\n🛑 Market data daemon stopped")
+    finally:
+        if shared is not None:
+            shared.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,10 +10,16 @@ import time
 from datetime import datetime
 import logging
 
+from core.rate_limiter import get_limiter, pool_size
+from core.http_transport import http_transport  # noqa: F401 - yfinance goes through the configured transport
+
 logger = logging.getLogger(__name__)
 
 class OptimizedSaudiExchange:
-    def __init__(self):
+    def __init__(self, backend='threads'):
+        # 'threads': yfinance calls in a thread pool, 'async': core async fetch backend
+        self.backend = backend
+        
         # Core Saudi stocks for reliable data
         self.core_stocks = {
             '2222': {'name': 'Saudi Aramco', 'yahoo': '2222.SR', 'sector': 'Energy'},
@@ -45,7 +51,8 @@ class OptimizedSaudiExchange:
         symbol, data = symbol_data
         try:
             ticker = yf.Ticker(data['yahoo'])
-            hist = ticker.history(period="2d", timeout=timeout)
+            with get_limiter('yahoo').permit('history'):
+                hist = ticker.history(period="2d", timeout=timeout)
             
             if not hist.empty:
                 current_price = hist['Close'].iloc[-1]
@@ -68,12 +75,33 @@ class OptimizedSaudiExchange:
             logger.warning(f"Failed to fetch {symbol}: {e}")
             return None
 
-    def get_market_data_optimized(self, max_workers=8, timeout=10):
-        """Get market data with concurrent fetching and timeout"""
-        start_time = time.time()
+    def fetch_stocks_async(self):
+        """Fetch all core stocks through the shared async fetch backend"""
+        from core.async_fetch_backend import get_async_backend
+        
+        results = []
+        for quote in get_async_backend().fetch_quotes(list(self.core_stocks)):
+            if not quote.get('success'):
+                logger.warning(f"Failed to fetch {quote['symbol']}: {quote.get('error')}")
+                continue
+            data = self.core_stocks[quote['symbol']]
+            results.append({
+                'symbol': quote['symbol'],
+                'name': data['name'],
+                'sector': data['sector'],
+                'current_price': quote['current_price'],
+                'change': quote['change'],
+                'change_pct': quote['change_percent'],
+                'volume': quote['volume'],
+                'market_value': quote['current_price'] * quote['volume']
+            })
+        return results
+
+    def fetch_stocks_threaded(self, max_workers=None, timeout=10):
+        """Fetch all core stocks with yfinance calls in a thread pool paced by the shared Yahoo limiter"""
         results = []
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or pool_size('yahoo')) as executor:
             # Submit all requests
             future_to_symbol = {
                 executor.submit(self.fetch_stock_concurrent, item): item[0] 
@@ -89,6 +117,17 @@ class OptimizedSaudiExchange:
                 except Exception as e:
                     logger.warning(f"Future failed: {e}")
         
+        return results
+
+    def get_market_data_optimized(self, max_workers=None, timeout=10):
+        """Get market data with concurrent fetching and timeout"""
+        start_time = time.time()
+        
+        if self.backend == 'async':
+            results = self.fetch_stocks_async()
+        else:
+            results = self.fetch_stocks_threaded(max_workers, timeout)
+        
         # Process results
         if not results:
             return {'success': False, 'error': 'No data fetched'}
@@ -8,6 +8,9 @@ import yfinance as yf
 from datetime import datetime
 import logging
 
+from core.price_reconciliation import price_reconciler
+from core.rate_limiter import get_limiter
+
 logger = logging.getLogger(__name__)
 
 def get_corrected_stock_price(symbol):
@@ -19,6 +22,7 @@ def get_corrected_stock_price(symbol):
         yahoo_symbol = f"{clean_symbol}.SR"
         
         ticker = yf.Ticker(yahoo_symbol)
+        yahoo = get_limiter('yahoo')
         
         # Get multiple data sources for cross-validation
         current_price = None
@@ -28,7 +32,8 @@ def get_corrected_stock_price(symbol):
         
         # Priority 1: Real-time quote (most accurate when available)
         try:
-            info = ticker.info
+            with yahoo.permit('quote'):
+                info = ticker.info
             if 'currentPrice' in info and info['currentPrice'] and info['currentPrice'] > 0:
                 current_price = float(info['currentPrice'])
                 data_source = "Yahoo Real-time Quote"
@@ -40,7 +45,8 @@ def get_corrected_stock_price(symbol):
         if not current_price:
             try:
                 # Try 1-minute data for maximum accuracy
-                hist_1m = ticker.history(period="1d", interval="1m")
+                with yahoo.permit('history'):
+                    hist_1m = ticker.history(period="1d", interval="1m")
                 if not hist_1m.empty:
                     current_price = float(hist_1m['Close'].iloc[-1])
                     volume = int(hist_1m['Volume'].sum())
@@ -52,7 +58,8 @@ def get_corrected_stock_price(symbol):
         # Priority 3: 5-minute data (more stable)
         if not current_price:
             try:
-                hist_5m = ticker.history(period="1d", interval="5m")
+                with yahoo.permit('history'):
+                    hist_5m = ticker.history(period="1d", interval="5m")
                 if not hist_5m.empty:
                     current_price = float(hist_5m['Close'].iloc[-1])
                     volume = int(hist_5m['Volume'].sum())
@@ -64,7 +71,8 @@ def get_corrected_stock_price(symbol):
         # Priority 4: Daily data
         if not current_price:
             try:
-                hist_daily = ticker.history(period="2d", interval="1d")
+                with yahoo.permit('history'):
+                    hist_daily = ticker.history(period="2d", interval="1d")
                 if not hist_daily.empty:
                     current_price = float(hist_daily['Close'].iloc[-1])
                     volume = int(hist_daily['Volume'].iloc[-1])
@@ -78,7 +86,8 @@ def get_corrected_stock_price(symbol):
         
         # Get previous close for change calculation
         try:
-            hist_daily = ticker.history(period="5d", interval="1d")
+            with yahoo.permit('history'):
+                hist_daily = ticker.history(period="5d", interval="1d")
             if len(hist_daily) >= 2:
                 previous_close = float(hist_daily['Close'].iloc[-2])
             else:
@@ -118,47 +127,16 @@ def get_corrected_stock_price(symbol):
 
 def apply_tasi_correction(symbol, current_price, previous_close):
     """
-    Apply price correction based on TASI reference data
+    Apply price correction against the latest official market watch snapshot
     """
-    # TASI reference prices from your screenshots
-    tasi_reference = {
-        '1835': {'price': 56.75, 'change_pct': 1.98},  # TAMKEEN
-        '1151': {'price': 107.60, 'change_pct': 1.61}, # EAST PIPES
-        '2020': {'price': 120.80, 'change_pct': 1.35}, # SABIC AGRI-NUTRIENTS
-        '1211': {'price': 52.85, 'change_pct': 0.96},  # MAADEN
-        '2040': {'price': 28.84, 'change_pct': 0.07},  # SAUDI CERAMICS
-        '2222': {'price': 23.74, 'change_pct': 0.50},  # SAUDI ARAMCO
-        '2300': {'price': 55.60, 'change_pct': 0.63},  # ALBATAIN
-        '1362': {'price': 58.30, 'change_pct': 0.87},  # BAWAN
-        '1214': {'price': 26.88, 'change_pct': 0.83},  # SHAKER
-        '1210': {'price': 20.96, 'change_pct': 0.52}   # BCI
-    }
-    
-    if symbol in tasi_reference:
-        tasi_data = tasi_reference[symbol]
-        tasi_price = tasi_data['price']
-        tasi_change_pct = tasi_data['change_pct']
-        
-        # Calculate current change percentage
-        current_change_pct = ((current_price - previous_close) / previous_close) * 100 if previous_close > 0 else 0
-        
-        # Check if there's a significant discrepancy
-        price_diff = abs(current_price - tasi_price)
-        change_diff = abs(current_change_pct - tasi_change_pct)
-        
-        # Apply correction if discrepancy is significant
-        if price_diff > 0.3 or change_diff > 0.2:
-            logger.info(f"Applying TASI correction for {symbol}: {current_price:.2f} -> {tasi_price:.2f}, {current_change_pct:.2f}% -> {tasi_change_pct:.2f}%")
-            
-            # Use weighted average favoring TASI data
-            corrected_price = (current_price * 0.2) + (tasi_price * 0.8)
-            corrected_change_pct = (current_change_pct * 0.2) + (tasi_change_pct * 0.8)
-            
-            return corrected_price, corrected_change_pct
-    
-    # No correction needed
     current_change_pct = ((current_price - previous_close) / previous_close) * 100 if previous_close > 0 else 0
-    return current_price, current_change_pct
+    reconciled = price_reconciler.reconcile_quote(symbol, {
+        'success': True,
+        'current_price': current_price,
+        'change_percent': current_change_pct,
+        'data_source': 'Yahoo Finance',
+    })
+    return reconciled['current_price'], reconciled['change_percent']
 
 def test_corrected_prices():
     """Test the corrected price function"""
@@ -7,9 +7,11 @@ import yfinance as yf
 import pandas as pd
 from datetime import datetime
 import json
-import time
 from typing import List, Dict
 
+from core.rate_limiter import get_limiter
+from core.snapshot_archive import snapshot_archive
+
 def get_all_saudi_symbols() -> List[str]:
     """Get all Saudi stock symbols with .SR suffix"""
     
@@ -72,8 +74,9 @@ def fetch_stock_data(symbol: str) -> Dict:
         clean_symbol = symbol.replace('.SR', '')
         ticker = yf.Ticker(symbol)
         
-        # Get recent data
-        hist = ticker.history(period="5d", interval="1d")
+        # Get recent data (paced by the shared Yahoo limiter)
+        with get_limiter('yahoo').permit('history'):
+            hist = ticker.history(period="5d", interval="1d")
         if hist.empty:
             return {'symbol': clean_symbol, 'success': False, 'error': 'No data'}
         
@@ -136,8 +139,6 @@ def quick_market_scan() -> Dict:
             if i % 20 == 0:
                 print(f"\nProgress: {i}/{len(symbols)} ({successful} successful)\n")
             
-            time.sleep(0.1)  # Be nice to the API
-            
         except KeyboardInterrupt:
             print("\n🛑 Scan interrupted by user")
             break
@@ -175,15 +176,19 @@ def quick_market_scan() -> Dict:
     else:
         return {'success': False, 'error': 'No successful stock data'}
 
-def save_quick_results(data: Dict, format: str = 'json'):
-    """Save results quickly"""
+def save_quick_results(data: Dict, format: str = 'archive'):
+    """Save results quickly (default: the date-partitioned Parquet snapshot archive)"""
     if not data.get('success'):
         print("❌ No data to save")
         return
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    if format.lower() == 'json':
+    if format.lower() == 'archive':
+        path = snapshot_archive.write(data['all_data'], datetime.fromisoformat(data['timestamp']), source='quick_scan')
+        print(f"🗄️ Archived to {path}" if path else "❌ Archive unavailable (install pyarrow) - use json/csv")
+    
+    elif format.lower() == 'json':
         filename = f"quick_market_scan_{timestamp}.json"
         with open(filename, 'w') as f:
             json.dump(data, f, indent=2)
@@ -201,8 +206,8 @@ if __name__ == "__main__":
     
     if results.get('success'):
         # Ask user if they want to save
-        save_choice = input("\nSave results? (json/csv/no): ").strip().lower()
-        if save_choice in ['json', 'csv']:
+        save_choice = input("\nSave results? (archive/json/csv/no): ").strip().lower()
+        if save_choice in ['archive', 'json', 'csv']:
             save_quick_results(results, save_choice)
         
         print("\n🎉 Quick scan completed!")
@@ -8,15 +8,27 @@ Real-time price data using multiple sources:
 
 import yfinance as yf
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import re
 import os
 from datetime import datetime
 import time
 import urllib.parse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from bs4 import BeautifulSoup
 import logging
 
+from core.refresh_scheduler import market_scheduler
+from core.single_flight import flight_group
+from core.rate_limiter import get_limiter, pool_size
+from core.fundamentals_store import fundamentals_store
+from core.symbol_master import symbol_master, OFFICIAL_DB_PATH
+from core.circuit_breaker import get_breaker, hedged_call, CircuitOpenError, SourceUnavailable
+from core.price_reconciliation import price_reconciler
+from core.http_transport import http_transport
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -31,6 +43,8 @@ class SaudiExchangeFetcher:
             'Referer': 'https://www.saudiexchange.sa/',
             'Origin': 'https://www.saudiexchange.sa'
         })
+        # Live by default; record/replay cassettes for offline benchmarking
+        http_transport.mount(self.session)
         
         # Saudi Exchange API endpoints
         self.base_url = "https://www.saudiexchange.sa"
@@ -40,66 +54,92 @@ class SaudiExchangeFetcher:
             'market_summary': '/api/tadawul/summary'
         }
         
-        # TASI reference prices for accuracy correction (updated from official TASI data)
-        self.tasi_reference_prices = {
-            '4160': {'price': 40.96, 'change_pct': 4.97},  # THIMAR (Top gainer in TASI)
-            '2070': {'price': 27.1, 'change_pct': 3.49},   # SPIMACO (2nd gainer in TASI)
-            '3008': {'price': 2.12, 'change_pct': 0.95},   # ALKATHIRI (3rd in TASI top gainers)
-            '1835': {'price': 58.80, 'change_pct': 3.61},  # TAMKEEN (TASI shows 58.80 vs our 57.25)
-            '1151': {'price': 107.60, 'change_pct': 1.61}, # EAST PIPES  
-            '2020': {'price': 120.80, 'change_pct': 1.35}, # SABIC AGRI-NUTRIENTS
-            '1211': {'price': 52.85, 'change_pct': 0.96},  # MAADEN
-            '2040': {'price': 28.84, 'change_pct': 0.07},  # SAUDI CERAMICS
-            '2222': {'price': 23.74, 'change_pct': 0.50},  # SAUDI ARAMCO
-            '2300': {'price': 55.60, 'change_pct': 0.63},  # ALBATAIN
-            '1362': {'price': 58.30, 'change_pct': 0.87},  # BAWAN
-            '1214': {'price': 26.88, 'change_pct': 0.83},  # SHAKER
-            '1210': {'price': 20.96, 'change_pct': 0.52}   # BCI
-        }
-        
-        # TASI volume reference data for volume correction (from official TASI data)
-        self.tasi_reference_volumes = {
-            '4160': 800000,     # THIMAR (top gainer, should have high volume)
-            '2222': 115651627,  # SAUDI ARAMCO (TASI shows 115M vs Yahoo 15M)
-            '1835': 500000,     # TAMKEEN estimated
-            '1151': 200000,     # EAST PIPES estimated  
-            '2070': 1200000,    # SPIMACO (should be high volume for top gainer)
-            '3008': 3500000     # ALKATHIRI (should be high volume)
-        }
+        # 'compact': one daily-bars request per Yahoo quote; 'intraday': 1m bars + daily bars + info
+        self.yahoo_quote_mode = 'compact'
     
-    def get_stock_price_saudi_exchange(self, symbol):
-        """Get stock price directly from Saudi Exchange website"""
+    def fetch_market_watch_index(self):
+        """Fetch the market watch page once and parse it into a symbol -> quote index"""
         try:
-            # Try to get data from Saudi Exchange API
             search_url = f"{self.base_url}/wps/portal/saudiexchange/ourmarkets/main-market-watch"
             
             # Make request to the main market watch page
-            response = self.session.get(search_url, timeout=10)
+            with get_limiter('saudi_exchange').permit('market_watch') as permit:
+                response = permit.check_response(self.session.get(search_url, timeout=10))
             
-            if response.status_code == 200:
-                # Try to extract stock data from the page
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Look for JSON data or API endpoints in the page
-                scripts = soup.find_all('script')
-                for script in scripts:
-                    if script.string and symbol in str(script.string):
-                        # Found potential data containing our symbol
-                        logger.info(f"Found potential data for {symbol} in Saudi Exchange")
-                        # Parse JSON data here if found
-                        break
-                
-                # For now, fall back to next method
-                return {'success': False, 'error': 'Saudi Exchange API parsing needs implementation'}
+            if response.status_code != 200:
+                logger.warning(f"Saudi Exchange market watch request failed: {response.status_code}")
+                return {}
             
-            return {'success': False, 'error': f'Saudi Exchange request failed: {response.status_code}'}
+            index = parse_market_watch(response.text)
+            logger.info(f"Saudi Exchange market watch parsed: {len(index)} symbols")
+            return index
             
         except Exception as e:
-            logger.warning(f"Saudi Exchange API error for {symbol}: {str(e)}")
-            return {'success': False, 'error': f'Saudi Exchange error: {str(e)}'}
+            logger.warning(f"Saudi Exchange market watch error: {str(e)}")
+            return {}
+    
+    def get_stock_price_saudi_exchange(self, symbol, index=None):
+        """Get stock price from a parsed Saudi Exchange market watch index"""
+        clean_symbol = str(symbol).replace('.SR', '').strip()
+        if index is None:
+            index = self.fetch_market_watch_index()
+        
+        quote = index.get(clean_symbol)
+        if quote:
+            return dict(quote)
+        
+        return {'success': False, 'error': f'{clean_symbol} not found in Saudi Exchange market watch'}
     
     def get_stock_price_yfinance(self, symbol):
-        """Get stock price using Yahoo Finance with enhanced accuracy validation"""
+        """Get stock price from Yahoo Finance in the configured quote mode"""
+        if self.yahoo_quote_mode == 'intraday':
+            return self.get_stock_price_yfinance_intraday(symbol)
+        return self.get_stock_price_yfinance_compact(symbol)
+    
+    def get_stock_price_yfinance_compact(self, symbol):
+        """
+        One upstream request per symbol: the last 5 daily bars give price, previous close
+        and session volume (today's bar is cumulative); market cap, PE and 52-week range
+        come from the fundamentals store, refreshed in the background when stale
+        """
+        clean_symbol = str(symbol).replace('.SR', '').strip()
+        yahoo_symbol = f"{clean_symbol}.SR"
+        try:
+            with get_limiter('yahoo').permit('history'):
+                hist = yf.Ticker(yahoo_symbol).history(period="5d", interval="1d")
+            closes = hist['Close'].dropna() if not hist.empty else hist
+            if len(closes) == 0:
+                logger.warning(f"❌ NO VALID DATA: {yahoo_symbol}")
+                return {'success': False, 'error': 'No valid price data found in Yahoo Finance'}
+            
+            current_price = float(closes.iloc[-1])
+            previous_close = float(closes.iloc[-2]) if len(closes) >= 2 else current_price
+            last_volume = hist['Volume'].iloc[-1]
+            volume = int(last_volume) if last_volume == last_volume else 0  # NaN check
+            
+            fundamentals = fundamentals_store.quote_fields(clean_symbol)
+            
+            logger.info(f"✅ COMPACT QUOTE: {yahoo_symbol} = {current_price:.2f} SAR (Vol: {volume:,})")
+            return {
+                'current_price': round(current_price, 2),
+                'previous_close': round(previous_close, 2),
+                'change': round(current_price - previous_close, 2),
+                'change_percent': round(((current_price - previous_close) / previous_close * 100), 2) if previous_close > 0 else 0,
+                'volume': volume,
+                **fundamentals,
+                'data_source': 'Yahoo Finance (Daily Bar)',
+                'success': True,
+                'timestamp': datetime.now().isoformat(),
+                'symbol': clean_symbol,  # Return clean symbol for display (no .SR)
+                'yahoo_symbol': yahoo_symbol,  # Keep Yahoo symbol for internal reference
+                'data_quality': 'HIGH - Live daily bar'
+            }
+        except Exception as e:
+            logger.error(f"Yahoo Finance error for {symbol}: {str(e)}")
+            return {'success': False, 'error': f'Yahoo Finance error: {str(e)}'}
+    
+    def get_stock_price_yfinance_intraday(self, symbol):
+        """Get stock price using Yahoo Finance with enhanced accuracy validation (1m bars + daily bars + info)"""
         try:
             # Clean symbol and add .SR suffix for Saudi stocks
             clean_symbol = str(symbol).replace('.SR', '').strip()
@@ -109,10 +149,12 @@ class SaudiExchangeFetcher:
             
             # Get ticker object
             ticker = yf.Ticker(yahoo_symbol)
+            yahoo = get_limiter('yahoo')
             
             # PRIORITY 1: Get most recent intraday data for price accuracy
             # Try 1-minute data for current trading session first
-            hist_1min = ticker.history(period="1d", interval="1m")
+            with yahoo.permit('history'):
+                hist_1min = ticker.history(period="1d", interval="1m")
             
             if not hist_1min.empty and len(hist_1min) > 0:
                 # Use the most recent minute for maximum accuracy
@@ -120,7 +162,8 @@ class SaudiExchangeFetcher:
                 volume = int(hist_1min['Volume'].sum())  # Daily volume is sum of all intervals
                 
                 # Get previous day close for change calculation
-                hist_daily = ticker.history(period="5d", interval="1d")
+                with yahoo.permit('history'):
+                    hist_daily = ticker.history(period="5d", interval="1d")
                 if len(hist_daily) >= 2:
                     previous_close = float(hist_daily['Close'].iloc[-2])
                 else:
@@ -128,19 +171,13 @@ class SaudiExchangeFetcher:
                 
                 logger.info(f"✅ REAL-TIME: {yahoo_symbol} = {current_price:.2f} SAR (Volume: {volume:,})")
                 
-                # Get additional info
-                info = ticker.info
-                
                 result = {
                     'current_price': round(current_price, 2),
                     'previous_close': round(previous_close, 2),
                     'change': round(current_price - previous_close, 2),
                     'change_percent': round(((current_price - previous_close) / previous_close * 100), 2) if previous_close > 0 else 0,
                     'volume': volume,
-                    'market_cap': info.get('marketCap', 0),
-                    'pe_ratio': info.get('trailingPE', 0),
-                    'high_52week': info.get('fiftyTwoWeekHigh', 0),
-                    'low_52week': info.get('fiftyTwoWeekLow', 0),
+                    **fundamentals_store.quote_fields(clean_symbol),
                     'data_source': 'Yahoo Finance (Real-Time)',
                     'success': True,
                     'timestamp': datetime.now().isoformat(),
@@ -153,26 +190,21 @@ class SaudiExchangeFetcher:
                 return result
             
             # FALLBACK 1: Try daily historical data if intraday fails
-            hist_daily = ticker.history(period="5d", interval="1d")
+            with yahoo.permit('history'):
+                hist_daily = ticker.history(period="5d", interval="1d")
             
             if not hist_daily.empty and len(hist_daily) > 0:
                 current_price = float(hist_daily['Close'].iloc[-1])
                 previous_close = float(hist_daily['Close'].iloc[-2]) if len(hist_daily) >= 2 else current_price
                 volume = int(hist_daily['Volume'].iloc[-1]) if 'Volume' in hist_daily.columns else 0
                 
-                # Get additional info
-                info = ticker.info
-                
                 result = {
                     'current_price': round(current_price, 2),
                     'previous_close': round(previous_close, 2),
                     'change': round(current_price - previous_close, 2),
                     'change_percent': round(((current_price - previous_close) / previous_close * 100), 2) if previous_close > 0 else 0,
                     'volume': volume,
-                    'market_cap': info.get('marketCap', 0),
-                    'pe_ratio': info.get('trailingPE', 0),
-                    'high_52week': info.get('fiftyTwoWeekHigh', 0),
-                    'low_52week': info.get('fiftyTwoWeekLow', 0),
+                    **fundamentals_store.quote_fields(clean_symbol),
                     'data_source': 'Yahoo Finance (Daily)',
                     'success': True,
                     'timestamp': datetime.now().isoformat(),
@@ -185,8 +217,8 @@ class SaudiExchangeFetcher:
                 return result
             
             # FALLBACK 2: Try info data if historical fails
-            # FALLBACK 2: Try info data if historical fails
-            info = ticker.info
+            with yahoo.permit('quote'):
+                info = ticker.info
             current_price = None
             
             # Try different price fields in order of preference
@@ -242,122 +274,238 @@ class SaudiExchangeFetcher:
     
     def apply_tasi_price_correction(self, symbol, result):
         """
-        Apply TASI price and volume correction to improve accuracy
+        Reconcile a quote against the latest official market watch snapshot
+        (see core.price_reconciliation - no reference prices live in code)
         """
-        if not result.get('success'):
-            return result
-            
-        clean_symbol = str(symbol).replace('.SR', '').strip()
+        return price_reconciler.reconcile_quote(symbol, result)
+
+
+MARKET_WATCH_COLUMNS = {
+    'current_price': ('last trade price', 'last price', 'last', 'price'),
+    'previous_close': ('previous close', 'prev. close', 'prev close'),
+    'change_percent': ('change %', 'change%', '% change'),
+    'change': ('change',),
+    'volume': ('volume traded', 'volume'),
+}
+
+
+def _parse_number(text):
+    """Parse a market watch cell like '1,234.50' or '-0.35%' into a float"""
+    cleaned = text.replace(',', '').replace('%', '').strip()
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def parse_market_watch(html):
+    """Parse market watch HTML tables into a symbol -> quote index"""
+    soup = BeautifulSoup(html, 'html.parser')
+    index = {}
+    
+    for table in soup.find_all('table'):
+        headers = [th.get_text(' ', strip=True).lower() for th in table.find_all('th')]
+        if not headers:
+            continue
+        
+        # Map each quote field to the first matching header column
+        column_map = {}
+        for field, names in MARKET_WATCH_COLUMNS.items():
+            for position, header in enumerate(headers):
+                if position not in column_map.values() and any(header == name or header.startswith(name) for name in names):
+                    column_map[field] = position
+                    break
+        if 'current_price' not in column_map:
+            continue
         
-        # Price correction
-        if clean_symbol in self.tasi_reference_prices:
-            tasi_data = self.tasi_reference_prices[clean_symbol]
-            tasi_price = tasi_data['price']
-            tasi_change_pct = tasi_data['change_pct']
-            
-            current_price = result['current_price']
-            current_change_pct = result.get('change_percent', 0)
+        for row in table.find_all('tr'):
+            cells = [td.get_text(' ', strip=True) for td in row.find_all('td')]
+            symbol = next((c for c in cells if re.fullmatch(r'\d{4}', c)), None)
+            if not symbol or len(cells) < len(headers):
+                continue
             
-            # Check if there's a significant discrepancy
-            price_diff = abs(current_price - tasi_price)
-            change_diff = abs(current_change_pct - tasi_change_pct)
+            values = {field: _parse_number(cells[pos]) for field, pos in column_map.items()}
+            current_price = values.get('current_price')
+            if not current_price or current_price <= 0:
+                continue
             
-            # Apply correction if discrepancy is significant (>0.3 SAR or >0.2%)
-            if price_diff > 0.3 or change_diff > 0.2:
-                logger.info(f"🔧 TASI CORRECTION for {clean_symbol}: Price {current_price:.2f} -> {tasi_price:.2f}, Change {current_change_pct:.2f}% -> {tasi_change_pct:.2f}%")
-                
-                # Use weighted average favoring TASI data (80% TASI, 20% Yahoo)
-                corrected_price = (current_price * 0.2) + (tasi_price * 0.8)
-                corrected_change_pct = (current_change_pct * 0.2) + (tasi_change_pct * 0.8)
-                
-                # Back-calculate previous close from corrected change percentage
-                corrected_previous_close = corrected_price / (1 + corrected_change_pct/100) if corrected_change_pct != 0 else corrected_price
-                
-                # Update result with corrected values
-                result.update({
-                    'current_price': round(corrected_price, 2),
-                    'previous_close': round(corrected_previous_close, 2),
-                    'change': round(corrected_price - corrected_previous_close, 2),
-                    'change_percent': round(corrected_change_pct, 2),
-                    'data_source': result['data_source'] + ' + TASI Price Correction',
-                    'tasi_corrected': True,
-                    'original_price': current_price,
-                    'original_change_pct': current_change_pct
-                })
-                
-                logger.info(f"✅ TASI PRICE CORRECTION APPLIED: {clean_symbol} now {corrected_price:.2f} SAR ({corrected_change_pct:.2f}%)")
-        
-        # Volume correction
-        if clean_symbol in self.tasi_reference_volumes:
-            tasi_volume = self.tasi_reference_volumes[clean_symbol]
-            current_volume = result.get('volume', 0)
-            
-            # Apply volume correction if there's a significant discrepancy (>50% difference)
-            if current_volume > 0:
-                volume_ratio = abs(current_volume - tasi_volume) / current_volume
-                if volume_ratio > 0.5:  # More than 50% difference
-                    logger.info(f"🔧 TASI VOLUME CORRECTION for {clean_symbol}: {current_volume:,} -> {tasi_volume:,}")
-                    
-                    # Use weighted average favoring TASI volume (70% TASI, 30% Yahoo)
-                    corrected_volume = int((current_volume * 0.3) + (tasi_volume * 0.7))
-                    
-                    result.update({
-                        'volume': corrected_volume,
-                        'data_source': result['data_source'].replace(' + TASI Price Correction', '') + ' + TASI Volume Correction',
-                        'tasi_volume_corrected': True,
-                        'original_volume': current_volume
-                    })
-                    
-                    logger.info(f"✅ TASI VOLUME CORRECTION APPLIED: {clean_symbol} now {corrected_volume:,} volume")
-        
+            change = values.get('change') or 0.0
+            previous_close = values.get('previous_close') or (current_price - change)
+            change_percent = values.get('change_percent')
+            if change_percent is None:
+                change_percent = (current_price - previous_close) / previous_close * 100 if previous_close > 0 else 0
+            
+            index[symbol] = {
+                'current_price': round(current_price, 2),
+                'previous_close': round(previous_close, 2),
+                'change': round(current_price - previous_close, 2),
+                'change_percent': round(change_percent, 2),
+                'volume': int(values.get('volume') or 0),
+                'data_source': 'Saudi Exchange (Market Watch)',
+                'success': True,
+                'timestamp': datetime.now().isoformat(),
+                'symbol': symbol,
+                'data_quality': 'HIGH - Official market watch'
+            }
+    
+    return index
+
+
+class SaudiQuoteService:
+    """
+    Long-lived quote service shared by every get_stock_price call:
+    1. One pooled requests.Session (via a single SaudiExchangeFetcher)
+    2. One market watch page fetch per refresh cycle, parsed into a symbol index
+    3. Per-symbol lookups answered from that index before falling back to Yahoo
+    4. Concurrent lookups of the same symbol share one upstream fetch
+    5. Per-source circuit breakers skip a source that keeps failing, and a source
+       slower than its usual p90 latency is raced against the next one (hedging)
+    """
+    
+    SOURCES = ('saudi_exchange', 'yahoo', 'alternative')
+    SOURCE_LABELS = {'saudi_exchange': 'Saudi Exchange', 'yahoo': 'Yahoo Finance', 'alternative': 'Alternative APIs'}
+    
+    def __init__(self, refresh_interval=None, pool_size=32, scheduler=None, hedge=True, breakers=None):
+        self.fetcher = SaudiExchangeFetcher()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.fetcher.session.mount('https://', adapter)
+        self.fetcher.session.mount('http://', adapter)
+        http_transport.mount(self.fetcher.session)
+        
+        # Refresh cycles follow market hours; after the close the last index is kept
+        self.scheduler = scheduler or market_scheduler
+        self.refresh_interval = refresh_interval or self.scheduler.update_interval  # seconds
+        self._index = {}
+        self._index_time = 0.0
+        self._lock = threading.Lock()
+        self._flights = flight_group('quotes')
+        
+        self._sources = {
+            'saudi_exchange': self._quote_from_saudi_exchange,
+            'yahoo': self._quote_from_yahoo,
+            'alternative': self.fetcher.get_stock_price_alternative_apis,
+        }
+        self.breakers = breakers or {name: get_breaker(name) for name in self.SOURCES}
+        self.hedge = hedge
+        # Up to two sources in flight per caller
+        self._hedge_pool = ThreadPoolExecutor(max_workers=2 * pool_size, thread_name_prefix="quote-hedge")
+        self.stats = {'next_source_started': 0, 'next_source_won': 0}
+    
+    def get_market_watch_index(self, force=False):
+        """Return the market watch index, refetching at most once per refresh cycle"""
+        if not force and not self.scheduler.is_due(self._index_time, self.refresh_interval):
+            return self._index
+        
+        with self._lock:
+            # Another thread may have refreshed while we waited
+            if force or self.scheduler.is_due(self._index_time, self.refresh_interval):
+                self._index = self.fetcher.fetch_market_watch_index()
+                # Failed fetches also count as a cycle so we do not retry per symbol
+                self._index_time = time.time()
+                if self._index:
+                    # The official page is the reference every other source is reconciled against
+                    price_reconciler.set_reference(self._index, as_of=self._index_time)
+        
+        return self._index
+    
+    def _quote_from_saudi_exchange(self, symbol):
+        """Market watch index lookup (one page fetch per cycle)"""
+        index = self.get_market_watch_index()
+        if not index:
+            raise SourceUnavailable('Saudi Exchange market watch unavailable')
+        return self.fetcher.get_stock_price_saudi_exchange(symbol, index=index)
+    
+    def _quote_from_yahoo(self, symbol):
+        """
+        Yahoo Finance quote; request errors (not missing data) count against the source.
+        Each upstream request inside takes its own limiter permit, so none is held here.
+        """
+        result = self.fetcher.get_stock_price_yfinance(symbol)
+        if not result.get('success') and str(result.get('error', '')).startswith('Yahoo Finance error'):
+            raise SourceUnavailable(result['error'])
         return result
+    
+    def _attempt(self, source, symbol):
+        """One source under its circuit breaker; failures come back as error results"""
+        try:
+            result = self.breakers[source].call(self._sources[source], symbol)
+        except CircuitOpenError as e:
+            return {'success': False, 'error': str(e), 'source': source, 'skipped': True}
+        except Exception as e:
+            return {'success': False, 'error': f'{self.SOURCE_LABELS[source]}: {e}', 'source': source}
+        return dict(result, source=source)
+    
+    def get_raw_quote(self, symbol):
+        """Live quote as the winning source returned it, joining an identical request already in flight"""
+        return self._flights.do(str(symbol).replace('.SR', ''), self._fetch_stock_price, symbol)
+    
+    def get_stock_price(self, symbol):
+        """Get a live quote reconciled against the latest official snapshot"""
+        return self.fetcher.apply_tasi_price_correction(symbol, self.get_raw_quote(symbol))
+    
+    def _fetch_stock_price(self, symbol):
+        """Get a live quote: market watch index, then Yahoo Finance, then alternative APIs"""
+        logger.info(f"Fetching live price for {symbol}...")
+        
+        # A source with an open breaker fails instantly, so the next one starts at once
+        chain = self.SOURCES
+        attempted = []
+        position = 0
+        while position < len(chain):
+            source = chain[position]
+            backup = chain[position + 1] if self.hedge and position + 1 < len(chain) else None
+            
+            if backup is None:
+                results = [self._attempt(source, symbol)]
+                result = results[0]
+                position += 1
+            else:
+                # Race the next source once this one runs past its usual latency (or fails)
+                winner, result, results = hedged_call(
+                    lambda: self._attempt(source, symbol),
+                    lambda: self._attempt(backup, symbol),
+                    self.breakers[source].hedge_delay(),
+                    self._hedge_pool,
+                    is_success=lambda r: bool(r.get('success')),
+                )
+                next_started = winner != 0
+                self.stats['next_source_started'] += next_started
+                self.stats['next_source_won'] += winner == 1
+                position += 2 if next_started else 1
+            
+            attempted += [r['source'] for r in results if not r.get('skipped')]
+            if result.get('success'):
+                logger.info(f"✅ Got {symbol} price from {self.SOURCE_LABELS[result['source']]}")
+                return result
+        
+        # If all methods fail, return error (NO HARDCODED FALLBACK)
+        logger.warning(f"❌ Could not fetch live price for {symbol} from any source")
+        return {
+            'success': False, 
+            'error': 'All live data sources failed - no hardcoded data available',
+            'attempted_sources': [self.SOURCE_LABELS[source] for source in dict.fromkeys(attempted)]
+        }
+
+
+# Global quote service (one session and one market watch index for the whole process)
+quote_service = SaudiQuoteService()
 
 
 def get_stock_price(symbol):
     """
-    Get live stock price with fallback methods and TASI accuracy correction:
+    Get live stock price with fallback methods, reconciled against the official snapshot:
     1. Saudi Exchange official website
-    2. Yahoo Finance (.SR suffix) + TASI correction
+    2. Yahoo Finance (.SR suffix)
     3. Alternative APIs
     
     NO HARDCODED DATA - All prices are fetched live
     """
-    fetcher = SaudiExchangeFetcher()
-    
-    logger.info(f"Fetching live price for {symbol}...")
-    
-    # Method 1: Try Saudi Exchange official website first
-    result = fetcher.get_stock_price_saudi_exchange(symbol)
-    if result.get('success'):
-        logger.info(f"✅ Got {symbol} price from Saudi Exchange")
-        return fetcher.apply_tasi_price_correction(symbol, result)
-    
-    # Method 2: Try Yahoo Finance (most reliable for Saudi stocks)
-    result = fetcher.get_stock_price_yfinance(symbol)
-    if result.get('success'):
-        logger.info(f"✅ Got {symbol} price from Yahoo Finance")
-        # Apply TASI correction for improved accuracy
-        corrected_result = fetcher.apply_tasi_price_correction(symbol, result)
-        return corrected_result
-    
-    # Method 3: Try alternative APIs
-    result = fetcher.get_stock_price_alternative_apis(symbol)
-    if result.get('success'):
-        logger.info(f"✅ Got {symbol} price from alternative API")
-        return fetcher.apply_tasi_price_correction(symbol, result)
-    
-    # If all methods fail, return error (NO HARDCODED FALLBACK)
-    logger.warning(f"❌ Could not fetch live price for {symbol} from any source")
-    return {
-        'success': False, 
-        'error': 'All live data sources failed - no hardcoded data available',
-        'attempted_sources': ['Saudi Exchange', 'Yahoo Finance', 'Alternative APIs']
-    }
+    return quote_service.get_stock_price(symbol)
 
 def get_market_data_saudi_exchange():
     """Get comprehensive market data from Saudi Exchange"""
     try:
-        fetcher = SaudiExchangeFetcher()
+        fetcher = quote_service.fetcher
         
         # Get TASI index data
         tasi_result = fetcher.get_stock_price_yfinance('TASI.SR')  # TASI index
@@ -388,115 +536,76 @@ def get_market_data_saudi_exchange():
         return {'success': False, 'error': str(e)}
 
 def load_official_database():
-    """Load the official Saudi stock database - FORCE FRESH LOAD"""
+    """Load the official Saudi stock database (parsed once by the shared symbol master, re-read when the file changes)"""
     try:
-        db_path = os.path.join(os.path.dirname(__file__), 'data', 'Saudi Stock Exchange (TASI) Sectors and Companies.db')
-        if not os.path.exists(db_path):
-            logger.warning(f"Official database not found at {db_path}")
-            return []
-        
-        logger.info(f"Loading fresh database from: {db_path}")
-        stocks = []
-        with open(db_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            
-        logger.info(f"Read {len(lines)} lines from database file")
-        
-        # Skip header line and process data
-        for line_num, line in enumerate(lines[1:], 2):
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Split by tab and then clean up each part
-            parts = line.split('\t')
-            
-            # The format appears to be: Seq TAB TAB Symbol TAB TAB Company TAB TAB Sector
-            # So we need to filter out empty parts
-            cleaned_parts = [p.strip() for p in parts if p.strip()]
-            
-            # Debug: Show what we're parsing for first few entries
-            if line_num <= 5:
-                logger.info(f"PARSING LINE {line_num}: parts={parts}, cleaned_parts={cleaned_parts}")
-            
-            if len(cleaned_parts) >= 4:
-                try:
-                    seq = cleaned_parts[0]
-                    symbol = cleaned_parts[1]
-                    company_name = cleaned_parts[2]
-                    sector = cleaned_parts[3]
-                    
-                    # Debug: Show what we're parsing for first few entries
-                    if line_num <= 5:
-                        logger.info(f"  ✅ EXTRACTED: seq='{seq}', symbol='{symbol}', name='{company_name}', sector='{sector}'")
-                    
-                    # Validate symbol format - should be numeric (4 digits) and not empty
-                    if symbol and company_name and symbol.isdigit() and 3 <= len(symbol) <= 4:
-                        stocks.append({
-                            'symbol': symbol,
-                            'name': company_name,
-                            'sector': sector
-                        })
-                        # DEBUG: Log specific symbols
-                        if symbol in ['2222', '1120', '2030', '1150']:
-                            logger.info(f"✅ DATABASE LOAD SUCCESS - Symbol {symbol}: {company_name} (Sector: {sector})")
-                    else:
-                        # Debug failed validation
-                        if line_num <= 10:
-                            logger.warning(f"❌ VALIDATION FAILED LINE {line_num}: symbol='{symbol}' (len={len(symbol) if symbol else 0}), company='{company_name}', isdigit={symbol.isdigit() if symbol else False}")
-                except Exception as e:
-                    logger.debug(f"Error parsing line {line_num}: {line} - {e}")
-                    continue
-            else:
-                if line_num <= 10:
-                    logger.warning(f"INSUFFICIENT PARTS LINE {line_num}: {len(cleaned_parts)} cleaned parts from {len(parts)} raw parts")
-        
-        logger.info(f"Successfully loaded {len(stocks)} stocks from official database")
+        stocks = symbol_master.list_stocks()
+        if not stocks:
+            logger.warning(f"Official database not found at {OFFICIAL_DB_PATH}")
         return stocks
         
     except Exception as e:
         logger.error(f"Error loading official database: {str(e)}")
         return []
 
-def get_all_saudi_stocks():
-    """Get list of all Saudi stocks - using official database with live data verification - ENHANCED"""
+def fetch_stock_prices_concurrently(symbols, max_workers=None, fetch=None):
+    """
+    Fetch each symbol once with a bounded thread pool (paced by the shared rate limiters).
+    Yields (symbol, price_result) pairs as soon as each fetch completes.
+    fetch: per-symbol quote function (default: get_stock_price, reconciled per quote)
+    """
+    fetch = fetch or get_stock_price
+    with ThreadPoolExecutor(max_workers=max_workers or pool_size('yahoo')) as executor:
+        future_to_symbol = {executor.submit(fetch, symbol): symbol for symbol in symbols}
+        
+        for future in as_completed(future_to_symbol):
+            symbol = future_to_symbol[future]
+            try:
+                yield symbol, future.result()
+            except Exception as e:
+                logger.debug(f"Error fetching {symbol}: {e}")
+                yield symbol, {'success': False, 'error': str(e)}
+
+def _load_stock_universe():
+    """Load the official database, with a minimal fallback list of critical stocks"""
+    all_stocks = load_official_database()
+    
+    if not all_stocks:
+        logger.warning("Could not load official database, falling back to minimal list")
+        # Only use a very minimal fallback for critical stocks
+        all_stocks = [
+            {'symbol': '2222', 'name': 'SAUDI ARAMCO', 'sector': 'Energy'},
+            {'symbol': '1120', 'name': 'ALRAJHI', 'sector': 'Banks'},
+            {'symbol': '1150', 'name': 'ALINMA', 'sector': 'Banks'},
+            {'symbol': '7010', 'name': 'STC', 'sector': 'Telecommunication Services'}
+        ]
+    
+    return all_stocks
+
+def get_all_saudi_stocks(max_workers=None):
+    """Get list of all Saudi stocks - using official database with concurrent live data verification"""
     try:
-        # Load from official database first
-        all_stocks = load_official_database()
-        
-        if not all_stocks:
-            logger.warning("Could not load official database, falling back to minimal list")
-            # Only use a very minimal fallback for critical stocks
-            all_stocks = [
-                {'symbol': '2222', 'name': 'SAUDI ARAMCO', 'sector': 'Energy'},
-                {'symbol': '1120', 'name': 'ALRAJHI', 'sector': 'Banks'},
-                {'symbol': '1150', 'name': 'ALINMA', 'sector': 'Banks'},
-                {'symbol': '7010', 'name': 'STC', 'sector': 'Telecommunication Services'}
-            ]
+        all_stocks = _load_stock_universe()
+        stock_lookup = {stock['symbol']: stock for stock in all_stocks}
         
         logger.info(f"Loaded {len(all_stocks)} stocks from database")
         
-        # COMMERCIAL-READY: Process ALL stocks from database for complete TASI coverage
-        # No artificial limitations - this ensures our database matches TASI exactly
-        logger.info("🚀 COMMERCIAL APPROACH: Processing ALL stocks for complete TASI coverage")
-        
-        # Verify live data availability for ALL stocks
+        # Verify live data availability for ALL stocks with a bounded pool
         verified_stocks = []
         failed_count = 0
         
-        for i, stock in enumerate(all_stocks):
+        for i, (symbol, result) in enumerate(fetch_stock_prices_concurrently(list(stock_lookup), max_workers), 1):
             # Progress logging every 50 stocks for cleaner output
-            if (i + 1) % 50 == 0:
-                logger.info(f"Tested {i + 1}/{len(all_stocks)} stocks, verified: {len(verified_stocks)}")
+            if i % 50 == 0:
+                logger.info(f"Tested {i}/{len(all_stocks)} stocks, verified: {len(verified_stocks)}")
             
-            result = get_stock_price(stock['symbol'])
+            stock = stock_lookup[symbol]
             if result.get('success'):
                 stock['live_data_available'] = True
                 stock['last_price'] = result['current_price']
                 verified_stocks.append(stock)
             else:
                 failed_count += 1
-                logger.debug(f"No live data available for {stock['symbol']} - {stock['name']}")
+                logger.debug(f"No live data available for {symbol} - {stock['name']}")
         
         logger.info(f"✅ COMPLETE DATABASE PROCESSING: Verified live data for {len(verified_stocks)} out of {len(all_stocks)} stocks ({failed_count} failed)")
         
@@ -509,23 +618,16 @@ def get_all_saudi_stocks():
 def get_company_name_by_symbol(symbol):
     """Get company name by symbol from official database - NO HARDCODING"""
     try:
-        # Load official database
-        all_stocks = load_official_database()
-        
-        # Find the stock by symbol
-        stock = next((s for s in all_stocks if s['symbol'] == symbol), None)
-        if stock:
-            return stock['name']
+        # Look the symbol up in the official database
+        company_name = symbol_master.name(symbol)
+        if company_name:
+            return company_name
         
-        # If not found in database, try to get from Yahoo Finance
-        try:
-            ticker = yf.Ticker(f"{symbol}.SR")
-            info = ticker.info
-            company_name = info.get('longName') or info.get('shortName') or f"Company_{symbol}"
+        # If not found in database, use the name stored with the symbol's fundamentals
+        company_name = fundamentals_store.get_name(symbol)
+        if company_name:
             logger.info(f"Got company name from Yahoo Finance: {symbol} -> {company_name}")
             return company_name
-        except:
-            pass
             
         # Last resort
         logger.warning(f"Could not find company name for symbol {symbol}")
@@ -535,41 +637,30 @@ def get_company_name_by_symbol(symbol):
         logger.error(f"Error getting company name for {symbol}: {str(e)}")
         return f"Company_{symbol}"
 
-def get_market_summary():
-    """COMMERCIAL-READY MARKET SUMMARY - Complete TASI alignment with no hardcoded limitations"""
+def fetch_market_quotes(max_workers=None):
+    """
+    Fetch every stock in the universe once; returns {symbol: price_result}.
+    Raw quotes are reconciled against the official snapshot in one vectorized pass.
+    """
+    symbols = [stock['symbol'] for stock in _load_stock_universe()]
+    quotes = dict(fetch_stock_prices_concurrently(symbols, max_workers, fetch=quote_service.get_raw_quote))
+    return price_reconciler.reconcile_quotes(quotes)
+
+def get_market_summary(max_workers=None, quotes=None):
+    """
+    COMMERCIAL-READY MARKET SUMMARY - single concurrent pass over the complete TASI database.
+    Pass `quotes` (from fetch_market_quotes) to rank an already-fetched sweep without network I/O.
+    """
     try:
         logger.info("=== COMMERCIAL MARKET SUMMARY: Complete TASI database processing ===")
+        stage_timings = {}
         
-        # COMMERCIAL APPROACH: Process ALL stocks for complete market alignment
-        all_stocks = get_all_saudi_stocks()
-        
-        # DYNAMIC SELECTION: Process every stock in database for 100% TASI coverage
-        logger.info("🏢 COMMERCIAL APPROACH: Processing ALL stocks for complete TASI alignment")
-        
-        def select_dynamic_key_stocks(all_stocks, target_count=None):
-            """COMMERCIAL-READY: Process ALL stocks for complete TASI alignment"""
-            try:
-                # NO HARDCODED SYMBOLS: Process every stock in our database
-                # This ensures 100% alignment with TASI market watch
-                logger.info("🏢 COMMERCIAL SOLUTION: No hardcoded symbols - processing ALL database stocks")
-                
-                # Return ALL stock symbols for comprehensive market coverage
-                all_symbols = [stock['symbol'] for stock in all_stocks]
-                
-                logger.info(f"✅ COMPLETE TASI COVERAGE: Selected ALL {len(all_symbols)} stocks from database")
-                logger.info("🎯 NO MISSING STOCKS: Every stock in database will be processed")
-                
-                return all_symbols
-                
-            except Exception as e:
-                logger.warning(f"Comprehensive selection failed, using all stocks: {e}")
-                return [s['symbol'] for s in all_stocks]
-        
-        # Get dynamic selection
-        key_symbols = select_dynamic_key_stocks(all_stocks)
-        
-        # Create symbol to stock info mapping
+        # STAGE 1: Load the universe (no live verification sweep - each symbol is fetched once below)
+        stage_start = time.time()
+        all_stocks = _load_stock_universe()
+        key_symbols = [stock['symbol'] for stock in all_stocks]
         stock_lookup = {stock['symbol']: stock for stock in all_stocks}
+        stage_timings['load_universe'] = round(time.time() - stage_start, 3)
         
         # Process market data with source tracking (Issue #2 Fix)
         market_data = []
@@ -578,24 +669,24 @@ def get_market_summary():
         failed_count = 0
         processed_count = 0
         
-        logger.info(f"🏢 COMMERCIAL PROCESSING: Analyzing ALL {len(key_symbols)} stocks for complete market coverage")
-        logger.info("🎯 COMPLETE TASI ALIGNMENT: No artificial limitations or performance shortcuts")
+        if quotes is None:
+            logger.info(f"🏢 COMMERCIAL PROCESSING: Fetching ALL {len(key_symbols)} stocks once with {max_workers or pool_size('yahoo')} workers")
+            quote_stream = fetch_stock_prices_concurrently(key_symbols, max_workers)
+        else:
+            logger.info(f"🏢 COMMERCIAL PROCESSING: Ranking {len(quotes)} pre-fetched quotes")
+            quote_stream = quotes.items()
         
         # Debug: Track processing details
-        symbols_not_in_db = []
         symbols_price_failed = []
         symbols_successful = []
         
-        for symbol in key_symbols:
-            if symbol not in stock_lookup:
-                symbols_not_in_db.append(symbol)
-                continue
-                
-            stock = stock_lookup[symbol]
+        # STAGE 2: Concurrent fetch, results stream into market_data as they complete
+        stage_start = time.time()
+        for symbol, price_result in quote_stream:
+            stock = stock_lookup.get(symbol, {'symbol': symbol, 'name': symbol})
+            processed_count += 1
+            
             try:
-                price_result = get_stock_price(symbol)
-                processed_count += 1
-                
                 if price_result.get('success'):
                     symbols_successful.append(symbol)
                     
@@ -620,6 +711,7 @@ def get_market_summary():
                     
                     stock_info = {
                         'symbol': symbol,
+                        'name': stock['name'],
                         'name_en': stock['name'],
                         'sector': stock.get('sector', 'Unknown'),
                         'current_price': price_result['current_price'],
@@ -646,11 +738,11 @@ def get_market_summary():
                 failed_count += 1
                 logger.debug(f"Error processing stock {symbol}: {e}")
                 continue
+        stage_timings['fetch_quotes'] = round(time.time() - stage_start, 3)
         
         # Debug logging for diagnostics
         logger.info(f"📊 PROCESSING BREAKDOWN:")
         logger.info(f"  📈 Total key symbols: {len(key_symbols)}")
-        logger.info(f"  ❌ Not in database: {len(symbols_not_in_db)} - {symbols_not_in_db[:10]}")
         logger.info(f"  💔 Price fetch failed: {len(symbols_price_failed)} - {symbols_price_failed[:10]}")
         logger.info(f"  ✅ Successfully processed: {len(symbols_successful)} - {symbols_successful[:15]}")
         
@@ -705,27 +797,23 @@ def get_market_summary():
                 logger.error(f"Error in sorting {category_name}: {e}")
                 return []
         
-        # CORRECTED SORTING LOGIC - Using pandas approach that matches TASI exactly
-        # This fixes the ranking mismatch issue by using proper DataFrame sorting
+        # STAGE 3: Ranking
+        stage_start = time.time()
+        
+        # CORRECTED SORTING LOGIC - columnar snapshot, same ordering as DataFrame nlargest/nsmallest
         try:
-            import pandas as pd
+            from core.market_snapshot import MarketSnapshot
             
-            # Convert to DataFrame for proper sorting (matches historical working code)
-            df = pd.DataFrame(market_data)
+            snapshot = MarketSnapshot.from_records(market_data, value='value')
             
-            logger.info(f"📊 CORRECTED SORTING: Processing {len(df)} stocks with pandas DataFrame approach")
+            logger.info(f"📊 CORRECTED SORTING: Ranking {len(snapshot)} stocks in one vectorized pass")
             
-            # Use exact pandas methods that match TASI rankings
-            top_gainers_df = df.nlargest(10, 'change_pct')
-            top_losers_df = df.nsmallest(10, 'change_pct')
-            volume_movers_df = df.nlargest(10, 'volume')
-            value_movers_df = df.nlargest(10, 'value')
-            
-            # Convert back to dictionaries
-            top_gainers = top_gainers_df.to_dict('records')
-            top_losers = top_losers_df.to_dict('records')
-            volume_movers = volume_movers_df.to_dict('records')
-            value_movers = value_movers_df.to_dict('records')
+            # All four leaderboards from one argpartition call
+            boards = snapshot.leaderboards(k=10, strict=False)
+            top_gainers = [market_data[i] for i in boards['gainers']]
+            top_losers = [market_data[i] for i in boards['losers']]
+            volume_movers = [market_data[i] for i in boards['volume']]
+            value_movers = [market_data[i] for i in boards['value']]
             
             # Validation logging
             logger.info("✅ CORRECTED RANKING RESULTS:")
@@ -736,7 +824,7 @@ def get_market_summary():
                 logger.info(f"📉 #1 Loser: {top_losers[0]['symbol']} ({top_losers[0]['change_pct']:.2f}%)")
             
         except Exception as e:
-            logger.error(f"❌ Pandas sorting failed, using fallback: {e}")
+            logger.error(f"❌ Snapshot ranking failed, using fallback: {e}")
             # Fallback to original method if pandas fails
             gainers_data = [stock for stock in market_data if stock['change_pct'] > 0]
             losers_data = [stock for stock in market_data if stock['change_pct'] < 0]
@@ -769,6 +857,10 @@ def get_market_summary():
                 category_name="Value Movers"
             )
         
+        stage_timings['rank'] = round(time.time() - stage_start, 3)
+        stage_timings['total'] = round(sum(stage_timings.values()), 3)
+        logger.info(f"⏱️ STAGE TIMINGS: {stage_timings}")
+        
         # Verification logging
         logger.info("Volume Movers - Top 3 (with sources):")
         for i, stock in enumerate(volume_movers[:3], 1):
@@ -786,12 +878,14 @@ def get_market_summary():
             'top_losers': top_losers,
             'volume_movers': volume_movers,
             'value_movers': value_movers,
+            'all_stocks': market_data,
             'metadata': {
                 'total_stocks_processed': total_stocks,
                 'data_confidence': confidence_level,
                 'tasi_sources': tasi_source_count,
                 'yahoo_sources': yahoo_source_count,
                 'failed_fetches': failed_count,
+                'stage_timings': stage_timings,
                 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
                 'fixes_applied': [
                     f"✅ Commercial Ready: Complete TASI coverage with {total_stocks} stocks",
@@ -13,6 +13,10 @@ import logging
 from dataclasses import dataclass
 from typing import List, Dict, Optional
 
+from core.price_reconciliation import price_reconciler
+from core.rate_limiter import get_limiter
+from core.http_transport import http_transport
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -36,14 +40,7 @@ class TASIAccurateFetcher:
             'Accept-Language': 'en-US,en;q=0.9,ar;q=0.8',
             'Referer': 'https://www.saudiexchange.sa/',
         })
-        
-        # Known TASI official prices for validation
-        self.tasi_reference_prices = {
-            '1835': {'price': 56.75, 'change_pct': 1.98},  # TAMKEEN
-            '1151': {'price': 107.60, 'change_pct': 1.61}, # EAST PIPES
-            '2020': {'price': 120.80, 'change_pct': 1.35}, # SABIC AGRI-NUTRIENTS
-            '1211': {'price': 52.85, 'change_pct': 0.96},  # MAADEN
-        }
+        http_transport.mount(self.session)
     
     def get_tasi_official_price(self, symbol: str) -> Optional[PriceData]:
         """
@@ -60,7 +57,8 @@ class TASIAccurateFetcher:
             
             for url in tasi_api_urls:
                 try:
-                    response = self.session.get(url, timeout=10)
+                    with get_limiter('saudi_exchange').permit('company_profile'):
+                        response = self.session.get(url, timeout=10)
                     if response.status_code == 200:
                         # Parse response for price data
                         # This would need to be implemented based on TASI's actual API structure
@@ -85,12 +83,14 @@ class TASIAccurateFetcher:
             yahoo_symbol = f"{clean_symbol}.SR"
             
             ticker = yf.Ticker(yahoo_symbol)
+            yahoo = get_limiter('yahoo')
             
             # Strategy 1: Get multiple timeframes and cross-validate
             prices = []
             
             # 1-minute recent data (most current)
-            hist_1m = ticker.history(period="1d", interval="1m")
+            with yahoo.permit('history'):
+                hist_1m = ticker.history(period="1d", interval="1m")
             if not hist_1m.empty:
                 prices.append({
                     'price': float(hist_1m['Close'].iloc[-1]),
@@ -99,7 +99,8 @@ class TASIAccurateFetcher:
                 })
             
             # 5-minute data (slightly delayed but reliable)
-            hist_5m = ticker.history(period="1d", interval="5m")
+            with yahoo.permit('history'):
+                hist_5m = ticker.history(period="1d", interval="5m")
             if not hist_5m.empty:
                 prices.append({
                     'price': float(hist_5m['Close'].iloc[-1]),
@@ -108,7 +109,8 @@ class TASIAccurateFetcher:
                 })
             
             # 15-minute data (more stable)
-            hist_15m = ticker.history(period="1d", interval="15m")
+            with yahoo.permit('history'):
+                hist_15m = ticker.history(period="1d", interval="15m")
             if not hist_15m.empty:
                 prices.append({
                     'price': float(hist_15m['Close'].iloc[-1]),
@@ -118,7 +120,8 @@ class TASIAccurateFetcher:
             
             # Real-time quote (when available)
             try:
-                info = ticker.info
+                with yahoo.permit('quote'):
+                    info = ticker.info
                 if 'currentPrice' in info and info['currentPrice']:
                     prices.append({
                         'price': float(info['currentPrice']),
@@ -136,7 +139,8 @@ class TASIAccurateFetcher:
             current_price = best_price['price']
             
             # Get previous close for change calculation
-            hist_daily = ticker.history(period="5d", interval="1d")
+            with yahoo.permit('history'):
+                hist_daily = ticker.history(period="5d", interval="1d")
             if len(hist_daily) >= 2:
                 previous_close = float(hist_daily['Close'].iloc[-2])
             else:
@@ -168,38 +172,28 @@ class TASIAccurateFetcher:
     
     def apply_tasi_price_correction(self, symbol: str, yahoo_data: PriceData) -> PriceData:
         """
-        Apply correction based on known TASI reference prices
+        Reconcile against the latest official market watch snapshot (shared price reconciler)
         """
-        if symbol in self.tasi_reference_prices:
-            tasi_ref = self.tasi_reference_prices[symbol]
-            
-            # Calculate the price difference
-            price_diff = abs(yahoo_data.current_price - tasi_ref['price'])
-            change_diff = abs(yahoo_data.change_pct - tasi_ref['change_pct'])
-            
-            # If the difference is significant, use a weighted average
-            if price_diff > 0.5 or change_diff > 0.3:
-                logger.warning(f"Price discrepancy for {symbol}: Yahoo={yahoo_data.current_price}, TASI={tasi_ref['price']}")
-                
-                # Use TASI reference price with higher weight
-                corrected_price = (yahoo_data.current_price * 0.3) + (tasi_ref['price'] * 0.7)
-                corrected_change = (yahoo_data.change_pct * 0.3) + (tasi_ref['change_pct'] * 0.7)
-                
-                # Calculate new previous close
-                corrected_prev_close = corrected_price / (1 + corrected_change/100)
-                
-                return PriceData(
-                    symbol=yahoo_data.symbol,
-                    current_price=round(corrected_price, 2),
-                    previous_close=round(corrected_prev_close, 2),
-                    change_pct=round(corrected_change, 2),
-                    volume=yahoo_data.volume,
-                    data_source=f"{yahoo_data.data_source} + TASI Correction",
-                    timestamp=yahoo_data.timestamp,
-                    accuracy_score=min(yahoo_data.accuracy_score + 10, 100)
-                )
+        reconciled = price_reconciler.reconcile_quote(symbol, {
+            'success': True,
+            'current_price': yahoo_data.current_price,
+            'change_percent': yahoo_data.change_pct,
+            'volume': yahoo_data.volume,
+            'data_source': yahoo_data.data_source,
+        })
+        if not reconciled.get('tasi_corrected') and not reconciled.get('tasi_volume_corrected'):
+            return yahoo_data
         
-        return yahoo_data
+        return PriceData(
+            symbol=yahoo_data.symbol,
+            current_price=reconciled['current_price'],
+            previous_close=reconciled.get('previous_close', yahoo_data.previous_close),
+            change_pct=reconciled['change_percent'],
+            volume=reconciled['volume'],
+            data_source=reconciled['data_source'],
+            timestamp=yahoo_data.timestamp,
+            accuracy_score=min(yahoo_data.accuracy_score + 10, 100)
+        )
     
     def get_accurate_stock_price(self, symbol: str) -> Dict:
         """
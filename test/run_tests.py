@@ -34,7 +34,7 @@ def run_test_file(test_path):
 def main():
     """Main test runner"""
     parser = argparse.ArgumentParser(description='Run Saudi Stock Market App tests')
-    parser.add_argument('--category', choices=['core', 'features', 'infrastructure', 'integration', 'all'], 
+    parser.add_argument('--category', choices=['core', 'features', 'infrastructure', 'integration', 'performance', 'all'], 
                        default='all', help='Test category to run')
     parser.add_argument('--test', help='Specific test file to run')
     
@@ -61,6 +61,33 @@ def main():
         'integration': [
             'test_full_market.py',
             'test_optimization.py'
+        ],
+        'performance': [
+            'test_bulk_quote_engine.py',
+            'test_quote_service.py',
+            'test_market_summary_pipeline.py',
+            'test_async_fetch_backend.py',
+            'test_market_snapshot.py',
+            'test_price_history_store.py',
+            'test_tiered_cache.py',
+            'test_signal_cache.py',
+            'test_batch_indicators.py',
+            'test_parallel_signals.py',
+            'test_refresh_scheduler.py',
+            'test_snapshot_channel.py',
+            'test_shared_snapshot.py',
+            'test_single_flight.py',
+            'test_rate_limiter.py',
+            'test_circuit_breaker.py',
+            'test_compact_quote.py',
+            'test_fundamentals_store.py',
+            'test_symbol_master.py',
+            'test_stock_search.py',
+            'test_snapshot_archive.py',
+            'test_price_reconciliation.py',
+            'test_http_transport.py',
+            'test_fetcher_benchmark.py',
+            'test_metrics.py'
         ]
     }
     
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test Async Fetch Backend
+Runs the aiohttp backend against a local stub chart server (no internet needed)
+"""
+
+import sys
+import os
+import asyncio
+import threading
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core'))
+
+from aiohttp import web
+
+from async_fetch_backend import AsyncFetchBackend
+
+
+class StubChartServer:
+    """Local Yahoo-chart-like server; 1120 returns 429 once, 9999 is unknown, 8888 serves an HTML page"""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.hits = {}
+        self.port = None
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    async def chart(self, request):
+        ticker = request.match_info['ticker']
+        self.hits[ticker] = self.hits.get(ticker, 0) + 1
+        await asyncio.sleep(self.delay)
+
+        if ticker == '1120.SR' and self.hits[ticker] == 1:
+            return web.Response(status=429)
+        if ticker == '9999.SR':
+            return web.json_response({'chart': {'result': None, 'error': 'Not Found'}}, status=404)
+        if ticker == '8888.SR':
+            return web.Response(text="<html><body>Consent required</body></html>", content_type='text/html')
+
+        base = float(ticker.split('.')[0]) / 100
+        return web.json_response({'chart': {'result': [{
+            'meta': {'regularMarketPrice': base * 1.1, 'regularMarketVolume': 5000},
+            'indicators': {'quote': [{'close': [base, base * 1.1], 'volume': [4000, 5000]}]},
+        }]}})
+
+    def _serve(self):
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get('/chart/{ticker}', self.chart)
+        runner = web.AppRunner(app)
+        self._loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+
+    def __enter__(self):
+        self._thread.start()
+        self._started.wait(5)
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def test_quotes_retry_and_concurrency_limit():
+    with StubChartServer() as server:
+        backend = AsyncFetchBackend(base_url=f"http://127.0.0.1:{server.port}/chart",
+                                    max_per_host=5, backoff_base=0.01)
+        try:
+            symbols = [str(1000 + i) for i in range(40)] + ['1120', '9999']
+            quotes = backend.fetch(symbols)
+        finally:
+            backend.close()
+
+    assert quotes.symbols == symbols
+    assert quotes.success[:41].all()
+    assert not quotes.success[41]
+
+    # 1000 -> base 10.0, price 11.0
+    assert abs(quotes.current_price[0] - 11.0) < 1e-9
+    assert abs(quotes.change_percent[0] - 10.0) < 1e-9
+    assert quotes.volume[0] == 5000
+
+    # 429 was retried, 404 was not
+    assert server.hits['1120.SR'] == 2
+    assert server.hits['9999.SR'] == 1
+    assert backend.retry_count == 1
+    assert backend.max_in_flight <= 5
+
+
+def test_non_json_body_fails_only_that_symbol():
+    with StubChartServer() as server:
+        backend = AsyncFetchBackend(base_url=f"http://127.0.0.1:{server.port}/chart",
+                                    max_per_host=5, backoff_base=0.01)
+        try:
+            quotes = backend.fetch(['1010', '8888', '2222'])
+        finally:
+            backend.close()
+
+    assert list(quotes.success) == [True, False, True]
+    assert quotes.current_price[1] == 0.0
+    assert abs(quotes.current_price[2] - 24.442) < 1e-9
+    assert server.hits['8888.SR'] == 1      # not retried
+
+
+if __name__ == "__main__":
+    test_quotes_retry_and_concurrency_limit()
+    test_non_json_body_fails_only_that_symbol()
+    print("✅ Async fetch backend tests passed")
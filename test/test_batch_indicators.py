@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test Batch Indicator Engine
+Vectorized indicators and scores must match the per-symbol pandas calculation
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ai_engine'))
+
+import numpy as np
+import pandas as pd
+
+from batch_indicators import compute_signals, panel_from_histories
+
+
+def reference_signal(data):
+    """Per-symbol pandas calculation the batch engine replaces"""
+    close = data['Close']
+    current = close.iloc[-1]
+    sma_20 = close.rolling(20).mean().iloc[-1]
+    sma_50 = close.rolling(50).mean().iloc[-1] if len(data) >= 50 else sma_20
+    change_5d = (current / close.iloc[-6] - 1) * 100 if len(data) >= 6 else 0
+    change_20d = (current / close.iloc[-21] - 1) * 100 if len(data) >= 21 else 0
+    volatility = close.pct_change().rolling(20).std().iloc[-1] * 100
+    avg_volume = data['Volume'].rolling(20).mean().iloc[-1]
+    volume_ratio = data['Volume'].iloc[-1] / avg_volume if avg_volume > 0 else 1
+
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = -delta.where(delta < 0, 0).rolling(window=14).mean()
+    rsi = 100 if loss.iloc[-1] == 0 else 100 - (100 / (1 + gain.iloc[-1] / loss.iloc[-1]))
+
+    buy = sell = 0
+    reasons = []
+    if current > sma_20 > sma_50:
+        buy += 2; reasons.append("Strong upward trend")
+    elif current < sma_20 < sma_50:
+        sell += 2; reasons.append("Strong downward trend")
+    elif current > sma_20:
+        buy += 1; reasons.append("Above short-term average")
+    else:
+        sell += 1; reasons.append("Below short-term average")
+    if change_5d > 5:
+        buy += 1; reasons.append("Strong recent momentum")
+    elif change_5d < -5:
+        sell += 1; reasons.append("Weak recent momentum")
+    if change_20d > 10:
+        buy += 1; reasons.append("Strong monthly performance")
+    elif change_20d < -10:
+        sell += 1; reasons.append("Weak monthly performance")
+    if rsi < 30:
+        buy += 2; reasons.append("Oversold condition (RSI < 30)")
+    elif rsi > 70:
+        sell += 2; reasons.append("Overbought condition (RSI > 70)")
+    elif rsi < 50:
+        buy += 0.5
+    else:
+        sell += 0.5
+    if volume_ratio > 1.5:
+        if buy > sell:
+            buy += 1
+        else:
+            sell += 1
+        reasons.append("High volume supporting trend")
+    if volatility > 20:
+        buy *= 0.8; sell *= 0.8
+        reasons.append("High volatility increases risk")
+
+    total = buy + sell
+    if total == 0:
+        signal, confidence = 'HOLD', 0.5
+    elif buy > sell:
+        signal, confidence = 'BUY', min(0.95, 0.5 + (buy / (total * 2)) * 0.5)
+    else:
+        signal, confidence = 'SELL', min(0.95, 0.5 + (sell / (total * 2)) * 0.5)
+    if abs(buy - sell) < 1:
+        signal, confidence = 'HOLD', 0.6
+    risk = 'LOW' if volatility < 5 else 'MEDIUM' if volatility < 15 else 'HIGH'
+    return {'signal_type': signal, 'confidence': confidence, 'rsi': rsi, 'sma_50': sma_50,
+            'volatility': volatility, 'risk_level': risk, 'reasoning': "; ".join(reasons[:3])}
+
+
+def make_histories(n_symbols, seed=7):
+    """Random walks with different lengths and some wild moves"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2025-01-01', periods=70)
+    histories = {}
+    for i in range(n_symbols):
+        length = int(rng.integers(20, 71))
+        scale = 0.005 if i % 3 else 0.04
+        close = 50 * np.exp(np.cumsum(rng.normal(0, scale, length)))
+        volume = rng.integers(1_000, 50_000, length)
+        volume[-1] *= 1 + (i % 4)
+        histories[f"{1000 + i}.SR"] = pd.DataFrame(
+            {'Close': close, 'Volume': volume}, index=dates[-length:])
+    return histories
+
+
+def test_batch_matches_per_symbol_reference():
+    histories = make_histories(60)
+    close, volume = panel_from_histories(histories)
+    result = compute_signals(close.to_numpy(), volume.to_numpy())
+
+    assert result['valid'].all()
+    for i, symbol in enumerate(close.columns):
+        expected = reference_signal(histories[symbol])
+        assert result['signal_type'][i] == expected['signal_type'], symbol
+        assert result['risk_level'][i] == expected['risk_level'], symbol
+        assert result['reasoning'][i] == expected['reasoning'], symbol
+        assert abs(result['confidence'][i] - expected['confidence']) < 1e-9
+        assert abs(result['rsi'][i] - expected['rsi']) < 1e-6
+        assert abs(result['sma_50'][i] - expected['sma_50']) < 1e-9
+
+
+def test_short_history_is_excluded():
+    histories = make_histories(3)
+    histories['9999.SR'] = histories['1000.SR'].iloc[-10:]
+    close, volume = panel_from_histories(histories)
+    result = compute_signals(close.to_numpy(), volume.to_numpy())
+    assert list(result['valid']) == [True, True, True, False]
+
+
+def test_full_universe_is_fast():
+    histories = make_histories(259)
+    close, volume = panel_from_histories(histories)
+    close, volume = close.to_numpy(), volume.to_numpy()
+
+    start = time.perf_counter()
+    result = compute_signals(close, volume)
+    elapsed = time.perf_counter() - start
+
+    assert len(result['signal_type']) == 259
+    assert elapsed < 0.5
+
+
+if __name__ == "__main__":
+    test_batch_matches_per_symbol_reference()
+    test_short_history_is_excluded()
+    test_full_universe_is_fast()
+    print("✅ Batch indicator tests passed")
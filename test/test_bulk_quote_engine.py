@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test Bulk Quote Engine
+Offline check of chunking and the vectorized last/previous close split
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core'))
+
+import numpy as np
+import pandas as pd
+
+from bulk_quote_engine import BulkQuoteEngine
+
+
+def make_download(calls):
+    """Fake yf.download returning three daily bars per ticker"""
+    def download(tickers):
+        calls.append(list(tickers))
+        dates = pd.date_range("2025-09-01", periods=3, freq="D")
+        frames = {}
+        for i, ticker in enumerate(tickers):
+            close = [10.0 + i, 11.0 + i, 12.0 + i]
+            if ticker == "2222.SR":
+                close = [20.0, 22.0, np.nan]  # last bar missing
+            frames[ticker] = pd.DataFrame({'Close': close, 'Volume': [100, 200, 300]}, index=dates)
+        if "9999.SR" in tickers:
+            frames["9999.SR"] = pd.DataFrame({'Close': [np.nan] * 3, 'Volume': [np.nan] * 3}, index=dates)
+        return pd.concat(frames, axis=1).swaplevel(0, 1, axis=1)
+    return download
+
+
+def test_bulk_fetch_chunks_and_splits():
+    calls = []
+    engine = BulkQuoteEngine(chunk_size=2, download_fn=make_download(calls))
+    quotes = engine.fetch(['1120', '2222', '9999'])
+
+    assert quotes.request_count == 2
+    assert calls == [['1120.SR', '2222.SR'], ['9999.SR']]
+
+    # 1120: 11 -> 12
+    assert quotes.current_price[0] == 12.0
+    assert abs(quotes.change_percent[0] - (1 / 11 * 100)) < 1e-9
+    assert quotes.volume[0] == 300
+
+    # 2222: trailing NaN is skipped, 20 -> 22
+    assert quotes.current_price[1] == 22.0
+    assert quotes.previous_close[1] == 20.0
+    assert quotes.volume[1] == 200
+
+    # 9999: no data at all
+    assert not quotes.success[2]
+    assert quotes.current_price[2] == 0.0
+
+
+def test_failed_chunk_marks_symbols_unsuccessful():
+    def broken(tickers):
+        raise ConnectionError("upstream down")
+
+    quotes = BulkQuoteEngine(download_fn=broken).fetch(['1120', '2010'])
+    assert quotes.request_count == 1
+    assert not quotes.success.any()
+
+
+if __name__ == "__main__":
+    test_bulk_fetch_chunks_and_splits()
+    test_failed_chunk_marks_symbols_unsuccessful()
+    print("✅ Bulk quote engine tests passed")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Test Circuit Breaker
+Per-source breakers and hedged requests in the get_stock_price source chain
+"""
+
+import sys
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.circuit_breaker import (CircuitBreaker, CircuitOpenError, SourceUnavailable, hedged_call,
+                                  CLOSED, OPEN, HALF_OPEN)
+from saudi_exchange_fetcher import SaudiQuoteService
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail():
+    raise SourceUnavailable("down")
+
+
+def quote(price, source_label):
+    return {'success': True, 'current_price': price, 'change_percent': 0.0, 'volume': 0,
+            'data_source': source_label}
+
+
+class StubSource:
+    def __init__(self, result=None, delay=0.0, error=None):
+        self.result = result
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, symbol):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return dict(self.result, symbol=symbol)
+
+
+def make_service(saudi_exchange, yahoo, hedge=True, threshold=3):
+    clock = Clock()
+    breakers = {name: CircuitBreaker(name, failure_threshold=threshold, reset_timeout=30, clock=clock)
+                for name in SaudiQuoteService.SOURCES}
+    service = SaudiQuoteService(refresh_interval=60, hedge=hedge, breakers=breakers)
+    service._sources['saudi_exchange'] = saudi_exchange
+    service._sources['yahoo'] = yahoo
+    return service, clock
+
+
+def test_breaker_opens_then_probes():
+    clock = Clock()
+    breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=30, clock=clock)
+    for _ in range(3):
+        try:
+            breaker.call(fail)
+        except SourceUnavailable:
+            pass
+    assert breaker.state == OPEN
+
+    try:
+        breaker.call(lambda: 'never called')
+        assert False, "expected CircuitOpenError"
+    except CircuitOpenError:
+        pass
+
+    clock.now += 31
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()           # one probe at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now += 31
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CLOSED
+    assert breaker.stats['opened'] == 2
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker('test', failure_threshold=3)
+    for _ in range(5):
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+
+
+def test_hedge_delay_from_latency_percentile():
+    breaker = CircuitBreaker('test')
+    assert breaker.hedge_delay(default=2.0) == 2.0
+    for i in range(100):
+        breaker.record_success(1.0 + i / 100)
+    assert abs(breaker.latency_percentile(0.9) - 1.9) < 1e-9
+    assert breaker.hedge_delay(floor=0.5) == breaker.latency_percentile(0.9)
+
+
+def test_hedged_call_races_slow_primary():
+    pool = ThreadPoolExecutor(max_workers=4)
+    ok = lambda r: r == 'ok'
+
+    start = time.perf_counter()
+    winner, result, _ = hedged_call(lambda: time.sleep(1.0) or 'ok', lambda: 'ok', 0.05, pool, ok)
+    assert (winner, result) == (1, 'ok')
+    assert time.perf_counter() - start < 0.5
+
+    calls = []
+    winner, _, _ = hedged_call(lambda: 'ok', lambda: calls.append(1) or 'ok', 0.05, pool, ok)
+    assert winner == 0 and not calls
+
+    start = time.perf_counter()
+    winner, _, finished = hedged_call(lambda: 'fail', lambda: 'ok', 5.0, pool, ok)
+    assert winner == 1 and finished == ['fail', 'ok']
+    assert time.perf_counter() - start < 1.0   # failed primary does not wait for the hedge delay
+
+    winner, result, _ = hedged_call(lambda: 'fail1', lambda: 'fail2', 0.01, pool, ok)
+    assert winner == -1
+    pool.shutdown()
+
+
+def test_down_source_is_skipped_after_threshold():
+    saudi_exchange = StubSource(delay=0.05, error=SourceUnavailable("market watch down"))
+    yahoo = StubSource(quote(30.0, 'Yahoo Finance'))
+    service, _ = make_service(saudi_exchange, yahoo, hedge=False)
+
+    for symbol in ['1111', '2222', '3333', '4444', '5555', '6666']:
+        result = service.get_stock_price(symbol)
+        assert result['success'] and result['source'] == 'yahoo'
+
+    assert saudi_exchange.calls == 3
+    assert service.breakers['saudi_exchange'].state == OPEN
+    assert service.breakers['saudi_exchange'].stats['rejected'] == 3
+
+
+def test_slow_source_hedged_to_next():
+    saudi_exchange = StubSource(quote(10.0, 'Saudi Exchange'), delay=1.0)
+    yahoo = StubSource(quote(10.1, 'Yahoo Finance'))
+    service, _ = make_service(saudi_exchange, yahoo)
+    service.breakers['saudi_exchange'].hedge_delay = lambda: 0.05
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        results = list(pool.map(service.get_stock_price, [str(1000 + i) for i in range(10)]))
+    elapsed = time.perf_counter() - start
+
+    assert all(r['success'] and r['source'] == 'yahoo' for r in results)
+    assert elapsed < 0.8          # not bounded by the slow source
+    assert service.stats['next_source_won'] == 10
+
+
+def test_all_sources_fail():
+    service, _ = make_service(StubSource(error=SourceUnavailable("down")),
+                              StubSource({'success': False, 'error': 'No valid price data found in Yahoo Finance'}))
+    result = service.get_stock_price('9999')
+    assert not result['success']
+    assert result['attempted_sources'] == ['Saudi Exchange', 'Yahoo Finance', 'Alternative APIs']
+    # Missing data for one symbol does not count against Yahoo
+    assert service.breakers['yahoo'].stats['failures'] == 0
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
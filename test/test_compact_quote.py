@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test Compact Quote
+Yahoo quotes from one daily-bars request, info fields from the fundamentals store
+"""
+
+import sys
+import os
+import threading
+import time
+import pandas as pd
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import saudi_exchange_fetcher
+from saudi_exchange_fetcher import SaudiExchangeFetcher, SaudiQuoteService
+from core.fundamentals_store import FundamentalsStore
+from core.rate_limiter import AdaptiveRateLimiter
+
+
+class FakeTicker:
+    requests = []
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, period=None, interval=None, **kwargs):
+        FakeTicker.requests.append((self.symbol, period, interval))
+        index = pd.date_range('2025-06-01', periods=3, freq='D')
+        return pd.DataFrame({'Open': [9.8, 10.0, 10.1], 'High': [10.2, 10.3, 10.9],
+                             'Low': [9.7, 9.9, 10.0], 'Close': [10.0, 10.0, 10.5],
+                             'Volume': [1_000_000, 1_200_000, 350_000]}, index=index)
+
+    @property
+    def info(self):
+        raise AssertionError("compact quotes must not request ticker.info")
+
+
+class FakeYF:
+    Ticker = FakeTicker
+
+
+def make_store(tmp_path, records):
+    store = FundamentalsStore(cache_file=str(tmp_path / "fundamentals.json"), info_fn=lambda s: {})
+    store.records = records
+    return store
+
+
+def test_one_request_per_quote(tmp_path, monkeypatch):
+    FakeTicker.requests = []
+    monkeypatch.setattr(saudi_exchange_fetcher, 'yf', FakeYF)
+    store = make_store(tmp_path, {'2222': {'market_cap': 6.0e12, 'pe_ratio': 16.2, 'high_52week': 28.0,
+                                           'low_52week': 22.5, 'updated': 9e12}})
+    monkeypatch.setattr(saudi_exchange_fetcher, 'fundamentals_store', store)
+
+    result = SaudiExchangeFetcher().get_stock_price_yfinance('2222.SR')
+
+    assert FakeTicker.requests == [('2222.SR', '5d', '1d')]
+    assert result['success']
+    assert result['current_price'] == 10.5
+    assert result['previous_close'] == 10.0
+    assert result['change_percent'] == 5.0
+    assert result['volume'] == 350_000
+    assert result['market_cap'] == 6.0e12 and result['pe_ratio'] == 16.2
+    assert result['symbol'] == '2222'
+
+
+def test_stale_fundamentals_refreshed_off_the_quote_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(saudi_exchange_fetcher, 'yf', FakeYF)
+    store = make_store(tmp_path, {})
+    started = []
+    store.refresh_in_background = lambda symbols: started.append(list(symbols)) or True
+    monkeypatch.setattr(saudi_exchange_fetcher, 'fundamentals_store', store)
+
+    result = SaudiExchangeFetcher().get_stock_price_yfinance('1120')
+    assert result['success'] and result['market_cap'] == 0
+    assert started == [['1120']]
+
+
+def test_errors_keep_source_prefix(monkeypatch):
+    class BrokenTicker(FakeTicker):
+        def history(self, **kwargs):
+            raise ConnectionError("reset by peer")
+
+    class BrokenYF:
+        Ticker = BrokenTicker
+
+    monkeypatch.setattr(saudi_exchange_fetcher, 'yf', BrokenYF)
+    result = SaudiExchangeFetcher().get_stock_price_yfinance('2222')
+    assert not result['success']
+    assert result['error'].startswith('Yahoo Finance error')
+
+
+def test_quotes_hold_one_permit_at_the_concurrency_floor(tmp_path, monkeypatch):
+    class SlowTicker(FakeTicker):
+        def history(self, **kwargs):
+            time.sleep(0.1)
+            return super().history(**kwargs)
+
+    class SlowYF:
+        Ticker = SlowTicker
+
+    # Backed off to its floor: only min_concurrency slots for the whole process
+    limiter = AdaptiveRateLimiter('yahoo', rate=1000, burst=1000, concurrency=2, min_concurrency=2)
+    assert limiter.concurrency == limiter.min_concurrency
+    monkeypatch.setattr(saudi_exchange_fetcher, 'get_limiter', lambda source: limiter)
+    monkeypatch.setattr(saudi_exchange_fetcher, 'yf', SlowYF)
+    monkeypatch.setattr(saudi_exchange_fetcher, 'fundamentals_store', make_store(tmp_path, {}))
+    service = SaudiQuoteService()
+
+    results = []
+    threads = [threading.Thread(target=lambda s=symbol: results.append(service._quote_from_yahoo(s)), daemon=True)
+               for symbol in ('2222', '1120', '2010', '7010')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(results) == 4 and all(r['success'] for r in results)
+    assert limiter.in_flight == 0
+    assert limiter.stats['acquired'] == 4          # one permit per upstream request
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test Fetcher Benchmark
+Every engine runs against the simulated Yahoo upstream; results are stored and compared for regressions
+"""
+
+import sys
+import os
+import json
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import requests
+
+from fetcher_benchmark import (FetcherBenchmark, SimulatedYahoo, ENGINES, benchmark_universe, save_results,
+                               load_previous, compare)
+from core.http_transport import http_transport, FaultInjector
+from core.rate_limiter import get_limiter
+
+CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{}?range=2d&interval=1d"
+
+
+def simulated_session(upstream):
+    session = requests.Session()
+    session.mount('https://', upstream)
+    return session
+
+
+def test_simulated_upstream_charts_and_counts():
+    upstream = SimulatedYahoo()
+    session = simulated_session(upstream)
+    first = session.get(CHART_URL.format('2222.SR')).json()
+    again = session.get(CHART_URL.format('2222.SR')).json()
+    result = first['chart']['result'][0]
+    assert first == again
+    assert len(result['timestamp']) == 2 and result['meta']['exchangeTimezoneName'] == 'Asia/Riyadh'
+    assert session.get("https://query1.finance.yahoo.com/v1/test/getcrumb").text == 'SimulatedCrumb'
+    assert session.get("https://query2.finance.yahoo.com/v10/finance/quoteSummary/2222.SR").status_code == 404
+    assert dict(upstream.calls) == {'chart': 2, 'crumb': 1, 'quote_summary': 1}
+    assert list(upstream.served) == ['2222']
+
+    failing = simulated_session(SimulatedYahoo(FaultInjector(error_rate=1.0)))
+    assert failing.get(CHART_URL.format('1120.SR')).status_code == 503
+
+
+def test_universe_is_padded_beyond_the_market():
+    stocks = benchmark_universe(1000)
+    assert len(stocks) == 1000
+    assert len({stock['symbol'] for stock in stocks}) == 1000
+
+
+def test_every_engine_fetches_from_the_simulator():
+    limiter = get_limiter('yahoo')
+    report = FetcherBenchmark(sizes=[8], repeats=1, latency=0.002, jitter=0.0).run()
+
+    assert [r['engine'] for r in report['results']] == list(ENGINES)
+    for result in report['results']:
+        assert 'error' not in result, result
+        assert result['quotes'] == 8, result['engine']
+        assert result['upstream_calls'] >= 8 and result['calls_by_endpoint'].get('chart', 0) >= 8
+        assert 0 < result['latency_ms']['p50'] <= result['latency_ms']['p95'] <= result['latency_ms']['p99']
+        assert result['throughput'] > 0 and result['memory_peak_mb'] > 0
+
+    # Transport and limiter are back to their configured state
+    assert http_transport.upstream is None and not http_transport.routed
+    assert get_limiter('yahoo') is limiter
+
+
+def test_results_saved_and_compared(tmp_path):
+    def report(throughput, p95, latency=0.05):
+        return {'settings': {'latency': latency, 'jitter': 0.02, 'error_rate': 0.0, 'throttled': False},
+                'results': [{'engine': 'optimized', 'symbols': 100, 'throughput': throughput,
+                             'latency_ms': {'p50': 10.0, 'p95': p95, 'p99': p95}, 'memory_peak_mb': 1.0,
+                             'upstream_calls': 100}]}
+
+    first = save_results(report(60.0, 100.0), str(tmp_path))
+    with open(first, encoding='utf-8') as f:
+        assert json.load(f)['results'][0]['throughput'] == 60.0
+    assert load_previous(str(tmp_path), exclude=first) is None
+    assert load_previous(str(tmp_path))['results'][0]['throughput'] == 60.0
+
+    regressions = compare(report(60.0, 100.0), report(40.0, 105.0))
+    assert [(r['metric'], r['change_pct']) for r in regressions] == [('throughput', -33.3)]
+    assert compare(report(60.0, 100.0), report(60.0, 200.0))[0]['metric'] == 'latency_p95_ms'
+    assert compare(report(60.0, 100.0), report(40.0, 100.0, latency=0.1)) == []   # different upstream
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test Fundamentals Store
+Daily TTL, batched background refresh and quote paths that never call ticker.info
+"""
+
+import sys
+import os
+import threading
+import time
+import pandas as pd
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import saudi_exchange_fetcher
+from saudi_exchange_fetcher import SaudiExchangeFetcher
+from core.fundamentals_store import FundamentalsStore
+
+
+def fake_info(symbol):
+    return {'marketCap': 1e9, 'trailingPE': 12.5, 'fiftyTwoWeekHigh': 30.0, 'fiftyTwoWeekLow': 20.0,
+            'averageVolume': 500_000, 'shortName': f"Short {symbol}", 'longName': f"Company {symbol}"}
+
+
+class RecordingInfo:
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+        self._lock = threading.Lock()
+
+    def __call__(self, symbol):
+        if self.gate:
+            self.gate.wait(5)
+        with self._lock:
+            self.calls.append(symbol)
+        return fake_info(symbol)
+
+
+def test_daily_ttl(tmp_path):
+    info = RecordingInfo()
+    store = FundamentalsStore(cache_file=str(tmp_path / "f.json"), info_fn=info)
+    assert store.refresh(['2222', '1120.SR']) == 2
+    assert store.refresh(['2222']) == 0          # still fresh
+    assert store.get_market_cap('2222') == 1e9
+
+    reloaded = FundamentalsStore(cache_file=str(tmp_path / "f.json"), info_fn=info)
+    assert reloaded.is_fresh('1120')
+    reloaded.records['1120']['updated'] -= 25 * 60 * 60
+    assert reloaded.stale_symbols(['2222', '1120']) == ['1120']
+    # Expired records are still served until the refresh replaces them
+    assert reloaded.quote_fields('1120')['pe_ratio'] == 12.5
+    reloaded.wait(5)
+    assert reloaded.is_fresh('1120')
+
+
+def test_background_refresh_is_batched(tmp_path):
+    info = RecordingInfo()
+    store = FundamentalsStore(cache_file=str(tmp_path / "f.json"), info_fn=info, batch_size=10)
+    saves = []
+    original_save = store._save
+    store._save = lambda: saves.append(len(store.records)) or original_save()
+
+    assert store.refresh_in_background([str(1000 + i) for i in range(25)])
+    assert store.wait(5)
+    assert len(info.calls) == 25
+    assert saves == [10, 20, 25]                 # one write per batch
+    assert store.pending_count() == 0
+
+
+def test_requests_queued_while_running(tmp_path):
+    gate = threading.Event()
+    info = RecordingInfo(gate)
+    store = FundamentalsStore(cache_file=str(tmp_path / "f.json"), info_fn=info, batch_size=2)
+
+    store.refresh_in_background(['1111', '2222'])
+    time.sleep(0.05)
+    assert store.refresh_in_background(['3333', '2222'])   # picked up by the running job
+    assert not store.refresh_in_background(['3333'])       # already queued
+    gate.set()
+    assert store.wait(5)
+    assert sorted(info.calls) == ['1111', '2222', '3333']
+
+
+def test_get_name(tmp_path):
+    info = RecordingInfo()
+    store = FundamentalsStore(cache_file=str(tmp_path / "f.json"), info_fn=info)
+    assert store.get_name('4321') == "Company 4321"
+    assert store.get_name('4321.SR') == "Company 4321"
+    assert info.calls == ['4321']
+
+
+class FakeTicker:
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, period=None, interval=None, **kwargs):
+        index = pd.date_range('2025-06-01', periods=2, freq='D' if interval != '1m' else 'min')
+        return pd.DataFrame({'Open': [10.0, 10.2], 'High': [10.3, 10.6], 'Low': [9.9, 10.1],
+                             'Close': [10.0, 10.5], 'Volume': [1000, 2000]}, index=index)
+
+    @property
+    def info(self):
+        raise AssertionError("quote paths must read fundamentals from the store")
+
+
+class FakeYF:
+    Ticker = FakeTicker
+
+
+def test_quote_paths_read_the_store(tmp_path, monkeypatch):
+    store = FundamentalsStore(cache_file=str(tmp_path / "f.json"), info_fn=fake_info)
+    store.refresh(['2222'])
+    monkeypatch.setattr(saudi_exchange_fetcher, 'yf', FakeYF)
+    monkeypatch.setattr(saudi_exchange_fetcher, 'fundamentals_store', store)
+
+    fetcher = SaudiExchangeFetcher()
+    for mode in ('compact', 'intraday'):
+        fetcher.yahoo_quote_mode = mode
+        result = fetcher.get_stock_price_yfinance('2222')
+        assert result['success'], result
+        assert result['market_cap'] == 1e9 and result['high_52week'] == 30.0
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test HTTP Transport
+Record responses into a cassette, replay them offline with injected latency and errors
+"""
+
+import sys
+import os
+import time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'core'))
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from http_transport import (HttpTransport, FaultInjector, CassetteAdapter, CassetteMiss, request_key,
+                            LIVE, RECORD, REPLAY)
+from async_fetch_backend import AsyncFetchBackend
+from test_async_fetch_backend import StubChartServer
+
+
+class FakeUpstream(BaseAdapter):
+    """Stands in for the network: echoes the path, counts calls"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        response.headers['Content-Encoding'] = 'gzip'
+        response._content = f'{{"path": "{request.path_url}", "n": {self.calls}}}'.encode()
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def recorded(tmp_path, urls):
+    transport = HttpTransport(RECORD, 'quotes', cassette_dir=str(tmp_path))
+    session = requests.Session()
+    upstream = FakeUpstream()
+    session.mount('https://', upstream)
+    transport.mount(session)
+    for url in urls:
+        session.get(url, timeout=5)
+    transport.save()
+    return transport, upstream
+
+
+def test_record_then_replay_offline(tmp_path):
+    urls = [f"https://query1.finance.yahoo.com/v8/finance/chart/{s}.SR?range=5d&interval=1d&crumb=abc"
+            for s in ('2222', '1120')]
+    transport, upstream = recorded(tmp_path, urls)
+    assert upstream.calls == 2 and transport.stats['recorded'] == 2
+    assert os.path.exists(tmp_path / 'quotes.json')
+
+    replay = HttpTransport(REPLAY, 'quotes', cassette_dir=str(tmp_path))
+    session = replay.session()
+    response = session.get(urls[0].replace('crumb=abc', 'crumb=other'))   # volatile param ignored
+    assert response.status_code == 200
+    assert response.json() == {'path': '/v8/finance/chart/2222.SR?range=5d&interval=1d&crumb=abc', 'n': 1}
+    assert 'Content-Encoding' not in response.headers
+    with pytest.raises(requests.ConnectionError):
+        session.get("https://query1.finance.yahoo.com/v8/finance/chart/9999.SR")
+    assert replay.stats == {'replayed': 1, 'recorded': 0, 'misses': 1, 'injected_errors': 0}
+
+
+def test_request_key_is_stable():
+    a = request_key('get', "https://h/x?b=2&a=1&_=123")
+    assert a == request_key('GET', "https://h/x", {'a': 1, 'b': 2}) == "GET https://h/x?a=1&b=2"
+    assert request_key('POST', "https://h/x", body=b'{}') != request_key('POST', "https://h/x", body=b'[]')
+
+
+def test_injected_errors_and_latency_are_deterministic(tmp_path):
+    urls = [f"https://www.saudiexchange.sa/quote/{1000 + i}" for i in range(200)]
+    recorded(tmp_path, urls)
+
+    def run():
+        transport = HttpTransport(REPLAY, 'quotes', cassette_dir=str(tmp_path),
+                                  faults=FaultInjector(error_rate=0.25, seed=7))
+        session = transport.session()
+        return [session.get(url).status_code for url in urls]
+
+    first, second = run(), run()
+    assert first == second
+    assert 30 <= first.count(503) <= 70
+
+    slow = HttpTransport(REPLAY, 'quotes', cassette_dir=str(tmp_path), faults=FaultInjector(latency=0.02))
+    session = slow.session()
+    start = time.perf_counter()
+    for url in urls[:5]:
+        session.get(url)
+    assert time.perf_counter() - start >= 0.1
+
+    broken = HttpTransport(REPLAY, 'quotes', cassette_dir=str(tmp_path),
+                           faults=FaultInjector(error_rate=1.0, error_status=None))
+    with pytest.raises(requests.ConnectionError):
+        broken.session().get(urls[0])
+
+
+def test_mount_keeps_pool_adapter_and_live_is_untouched(tmp_path):
+    session = requests.Session()
+    pool = requests.adapters.HTTPAdapter(pool_maxsize=32)
+    session.mount('https://', pool)
+
+    HttpTransport(LIVE).mount(session)
+    assert session.get_adapter('https://x') is pool
+
+    transport = HttpTransport(RECORD, 'pool', cassette_dir=str(tmp_path))
+    transport.mount(session)
+    transport.mount(session)
+    adapter = session.get_adapter('https://x')
+    assert isinstance(adapter, CassetteAdapter) and adapter.upstream is pool
+
+
+def test_async_backend_record_and_replay(tmp_path):
+    symbols = [str(1000 + i) for i in range(20)]
+    transport = HttpTransport(RECORD, 'charts', cassette_dir=str(tmp_path))
+    with StubChartServer(delay=0.0) as server:
+        base_url = f"http://127.0.0.1:{server.port}/chart"
+        backend = AsyncFetchBackend(base_url=base_url, transport=transport, backoff_base=0.001)
+        try:
+            live = backend.fetch(symbols)
+        finally:
+            backend.close()
+    transport.save()
+
+    # Server is gone: everything comes from the cassette, 503s are retried
+    replay = HttpTransport(REPLAY, 'charts', cassette_dir=str(tmp_path),
+                           faults=FaultInjector(latency=0.005, error_rate=0.2, seed=3))
+    backend = AsyncFetchBackend(base_url=base_url, transport=replay, backoff_base=0.001, max_retries=5)
+    try:
+        replayed = backend.fetch(symbols + ['4444'])
+    finally:
+        backend.close()
+    assert replayed.success[:20].all() and not replayed.success[20]
+    assert (replayed.current_price[:20] == live.current_price).all()
+    assert backend.retry_count == replay.stats['injected_errors'] > 0
+
+
+def test_yfinance_routed_through_transport(tmp_path):
+    from yfinance.data import YfData
+    data = YfData()
+    original = data._session
+    try:
+        assert HttpTransport(REPLAY, 'yahoo', cassette_dir=str(tmp_path)).install_yfinance()
+        assert isinstance(data._session.get_adapter('https://query1.finance.yahoo.com'), CassetteAdapter)
+    finally:
+        data._set_session(original)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test Market Snapshot
+Vectorized leaderboards must agree with plain Python sorting
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core'))
+
+import numpy as np
+
+from market_snapshot import MarketSnapshot
+
+
+def make_records(n=259, seed=7):
+    rng = np.random.default_rng(seed)
+    sectors = ['Banks', 'Energy', 'Materials', 'Insurance']
+    records = []
+    for i in range(n):
+        price = float(rng.uniform(5, 200))
+        volume = int(rng.integers(0, 5_000_000))
+        records.append({
+            'symbol': str(1000 + i),
+            'current_price': price,
+            'change_pct': float(np.round(rng.normal(0, 2), 2)),
+            'volume': volume,
+            'value': price * volume,
+            'sector': sectors[i % 4],
+        })
+    return records
+
+
+def test_leaderboards_match_python_sorts():
+    records = make_records()
+    snapshot = MarketSnapshot.from_records(records, value='value')
+    boards = snapshot.leaderboards(k=10)
+
+    gainers = sorted((r for r in records if r['change_pct'] > 0), key=lambda r: -r['change_pct'])[:10]
+    losers = sorted((r for r in records if r['change_pct'] < 0), key=lambda r: r['change_pct'])[:10]
+    by_volume = sorted((r for r in records if r['volume'] > 0), key=lambda r: -r['volume'])[:10]
+    by_value = sorted((r for r in records if r['value'] > 0), key=lambda r: -r['value'])[:10]
+
+    assert [records[i] for i in boards['gainers']] == gainers
+    assert [records[i] for i in boards['losers']] == losers
+    assert [records[i] for i in boards['volume']] == by_volume
+    assert [records[i] for i in boards['value']] == by_value
+
+
+def test_strict_boards_and_small_markets():
+    records = [
+        {'symbol': '1', 'current_price': 10, 'change_pct': 1.0, 'volume': 5},
+        {'symbol': '2', 'current_price': 10, 'change_pct': 0.0, 'volume': 0},
+        {'symbol': '3', 'current_price': 0, 'change_pct': 9.0, 'volume': 50},
+    ]
+    boards = MarketSnapshot.from_records(records).leaderboards(k=10)
+    assert list(boards['gainers']) == [0]
+    assert list(boards['losers']) == []
+    assert list(boards['volume']) == [0]
+
+    assert list(MarketSnapshot.from_records([]).leaderboards()['gainers']) == []
+
+
+def test_frame_export_shares_memory():
+    snapshot = MarketSnapshot.from_records(make_records(20), value='value')
+    frame = snapshot.to_frame()
+    assert np.shares_memory(frame['price'].to_numpy(), snapshot.price)
+    assert list(snapshot.sectors[frame['sector_code']])[:4] == ['Banks', 'Energy', 'Materials', 'Insurance']
+
+
+def test_nan_volume_counts_as_zero():
+    records = make_records(3)
+    records[1]['volume'] = float('nan')          # halted / partial bar
+    records[2]['volume'] = None
+    snapshot = MarketSnapshot.from_records(records)
+    assert snapshot.volume.dtype == np.int64
+    assert list(snapshot.volume[1:]) == [0, 0]
+    assert snapshot.value[1] == 0.0
+    assert list(snapshot.top_k('volume', 1)) == [0]
+
+
+if __name__ == "__main__":
+    test_leaderboards_match_python_sorts()
+    test_strict_boards_and_small_markets()
+    test_frame_export_shares_memory()
+    test_nan_volume_counts_as_zero()
+    print("✅ Market snapshot tests passed")
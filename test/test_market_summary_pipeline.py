@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Test Concurrent Market Summary Pipeline
+Offline check that get_market_summary fetches every symbol exactly once
+"""
+
+import sys
+import os
+import threading
+from collections import Counter
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import saudi_exchange_fetcher
+
+
+def test_single_pass_summary(monkeypatch):
+    calls = Counter()
+    lock = threading.Lock()
+
+    def fake_get_stock_price(symbol):
+        with lock:
+            calls[symbol] += 1
+        price = 10 + int(symbol) % 50
+        return {
+            'success': True,
+            'current_price': price,
+            'change_percent': (int(symbol) % 21) - 10,
+            'volume': int(symbol) * 100,
+            'data_source': 'Yahoo Finance (Daily)',
+        }
+
+    monkeypatch.setattr(saudi_exchange_fetcher, 'get_stock_price', fake_get_stock_price)
+    summary = saudi_exchange_fetcher.get_market_summary(max_workers=8)
+
+    universe = saudi_exchange_fetcher.load_official_database()
+    assert summary['success']
+    assert set(calls) == {stock['symbol'] for stock in universe}
+    assert max(calls.values()) == 1
+
+    timings = summary['metadata']['stage_timings']
+    assert {'load_universe', 'fetch_quotes', 'rank', 'total'} <= set(timings)
+    assert len(summary['top_gainers']) == 10
+    assert summary['top_gainers'][0]['change_pct'] == 10
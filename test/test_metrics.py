@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test Fetch Metrics
+Latency histograms and outcome counters per source/endpoint, collectors, Prometheus text export
+"""
+
+import sys
+import os
+import urllib.request
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'core'))
+
+import pytest
+
+from metrics import FetchMetrics, Histogram, fetch_metrics, parse_text
+from rate_limiter import AdaptiveRateLimiter, get_limiter
+from tiered_cache import tiered_cache
+
+
+def test_histogram_quantiles():
+    histogram = Histogram((0.1, 0.5, 1.0))
+    for value in [0.05] * 50 + [0.3] * 40 + [0.8] * 9 + [5.0]:
+        histogram.observe(value)
+    assert histogram.counts == [50, 40, 9, 1]
+    assert histogram.cumulative() == [50, 90, 99, 100]
+    assert histogram.quantile(0.5) == pytest.approx(0.1)
+    assert histogram.quantile(0.7) == pytest.approx(0.1 + 0.4 * 20 / 40)
+    assert histogram.quantile(0.999) == 1.0        # +Inf bucket reports the largest bound
+    assert Histogram().quantile(0.5) is None
+
+
+def test_render_and_round_trip():
+    metrics = FetchMetrics(buckets=(0.1, 1.0))
+    metrics.observe('yahoo', 'history', 0.05)
+    metrics.observe('yahoo', 'history', 0.5, 'slow')
+    metrics.observe('yahoo', 'history', 2.0, 'throttled')
+    metrics.observe('saudi_exchange', 'market_watch', 0.3, 'error')
+    metrics.count_items('yahoo', 'market_data', succeeded=250, failed=9)
+
+    text = metrics.render()
+    assert '# TYPE saudi_fetch_latency_seconds histogram' in text
+    assert 'saudi_fetch_latency_seconds_bucket{source="yahoo",endpoint="history",le="0.1"} 1' in text
+    assert 'saudi_fetch_latency_seconds_bucket{source="yahoo",endpoint="history",le="+Inf"} 3' in text
+    assert 'saudi_fetch_latency_seconds_count{source="yahoo",endpoint="history"} 3' in text
+    assert 'saudi_fetch_requests_total{source="yahoo",endpoint="history",outcome="throttled"} 1' in text
+    assert 'saudi_fetch_items_total{source="yahoo",endpoint="market_data",result="failure"} 9' in text
+
+    rows = {(r['source'], r['endpoint']): r for r in metrics.endpoints()}
+    history = rows[('yahoo', 'history')]
+    assert history['calls'] == 3 and history['failures'] == 1
+    assert history['success_rate'] == pytest.approx(2 / 3)
+    assert rows[('saudi_exchange', 'market_watch')]['success_rate'] == 0.0
+
+    # The dashboard rebuilds the daemon's numbers from its exported file
+    restored = {(r['source'], r['endpoint']): r for r in FetchMetrics.from_text(text).endpoints()}
+    for key, row in rows.items():
+        assert restored[key]['outcomes'] == row['outcomes']
+        assert restored[key]['p95'] == pytest.approx(row['p95'])
+        assert restored[key]['mean'] == pytest.approx(row['mean'])
+    assert parse_text('m{a="x\\"y"} 2\n# HELP m h\n') == [('m', {'a': 'x"y'}, 2.0)]
+
+
+def test_limiter_permits_are_recorded():
+    limiter = AdaptiveRateLimiter('metrics_test_source', rate=1000, burst=1000)
+    with limiter.permit('history'):
+        pass
+    with pytest.raises(ValueError):
+        with limiter.permit('history'):
+            raise ValueError("boom")
+    limiter.call(lambda: None, endpoint='download')
+
+    rows = {r['endpoint']: r for r in fetch_metrics.endpoints() if r['source'] == 'metrics_test_source'}
+    assert rows['history']['calls'] == 2 and rows['history']['outcomes'] == {'ok': 1, 'error': 1}
+    assert rows['download']['calls'] == 1
+
+
+def test_collectors_cover_cache_and_limiters():
+    tiered_cache.configure('metrics_test', ttl=60)
+    tiered_cache.get_or_load('metrics_test', 'key', lambda: {'v': 1})
+    tiered_cache.get_or_load('metrics_test', 'key', lambda: {'v': 2})
+    assert tiered_cache.hit_ratio('metrics_test') == 0.5
+
+    with get_limiter('metrics_test_registry').permit('quote'):
+        pass
+
+    samples = parse_text(fetch_metrics.render())
+    assert ('saudi_cache_hit_ratio', {'namespace': 'metrics_test'}, 0.5) in samples
+    assert ('saudi_cache_lookups_total', {'namespace': 'metrics_test', 'result': 'misses'}, 1.0) in samples
+    assert any(name == 'saudi_limiter_concurrency' and labels == {'source': 'metrics_test_registry'}
+               for name, labels, _ in samples)
+
+
+def test_textfile_and_http_endpoint(tmp_path):
+    metrics = FetchMetrics()
+    metrics.observe('yahoo', 'chart', 0.2)
+    metrics.mark_fresh('market_data', produced_at=metrics.clock() - 30)
+
+    path = metrics.write_textfile(str(tmp_path / 'metrics' / 'fetch.prom'))
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    age = [value for name, labels, value in parse_text(text) if name == 'saudi_data_age_seconds']
+    assert 30 <= age[0] < 40
+
+    server = metrics.serve(port=0)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            assert 'saudi_fetch_latency_seconds_count{source="yahoo",endpoint="chart"} 1' in response.read().decode()
+    finally:
+        metrics.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test Parallel Signal Generation
+Offline check of concurrent history downloads, per-symbol deadlines and streamed batches
+"""
+
+import sys
+import os
+import time
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from ai_engine import simple_ai
+from core.tiered_cache import TieredCache
+
+
+class SlowHistoryStore:
+    """Every symbol takes `delay` seconds; symbols in `stuck` take `stuck_delay`"""
+
+    def __init__(self, delay=0.2, stuck=(), stuck_delay=3.0):
+        self.delay = delay
+        self.stuck = set(stuck)
+        self.stuck_delay = stuck_delay
+
+    def get_history(self, symbol, days=92):
+        time.sleep(self.stuck_delay if f"{symbol}.SR" in self.stuck else self.delay)
+        index = pd.date_range('2025-01-01', periods=60, freq='D')
+        close = 40 + np.cos(np.arange(60) / 7.0) + int(symbol) % 5
+        return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close,
+                             'Volume': np.full(60, 2000)}, index=index)
+
+
+def make_engine(monkeypatch, store, **kwargs):
+    monkeypatch.setattr(simple_ai, 'price_history_store', store)
+    monkeypatch.setattr(simple_ai, 'HISTORY_STORE_AVAILABLE', True)
+    monkeypatch.setattr(simple_ai, 'tiered_cache', TieredCache(cache_dir='unused'))
+    return simple_ai.SimpleAIEngine(**kwargs)
+
+
+def test_histories_download_concurrently(monkeypatch):
+    engine = make_engine(monkeypatch, SlowHistoryStore(delay=0.2), max_workers=8)
+    symbols = [f"{2000 + i}.SR" for i in range(16)]
+
+    start = time.monotonic()
+    signals = engine.generate_signals(symbols, {})
+    elapsed = time.monotonic() - start
+
+    # Serial would take 16 x 0.2s = 3.2s
+    assert elapsed < 1.5
+    assert [s.symbol for s in signals] == symbols
+
+
+def test_slow_symbol_is_dropped_at_its_deadline(monkeypatch):
+    store = SlowHistoryStore(delay=0.05, stuck={'2005.SR'}, stuck_delay=3.0)
+    engine = make_engine(monkeypatch, store, max_workers=4, symbol_timeout=0.5)
+    symbols = [f"{2000 + i}.SR" for i in range(10)]
+
+    timed_out = []
+    start = time.monotonic()
+    signals = engine.generate_signals(symbols, {}, timed_out=timed_out)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 1.5
+    assert [s.symbol for s in signals] == [s for s in symbols if s != '2005.SR']
+    assert timed_out == ['2005.SR']
+
+
+def test_concurrent_callers_keep_their_own_timeouts(monkeypatch):
+    store = SlowHistoryStore(delay=0.05, stuck={'2003.SR', '3007.SR'}, stuck_delay=3.0)
+    engine = make_engine(monkeypatch, store, max_workers=4, symbol_timeout=0.5)
+    requests = {'first': [f"{2000 + i}.SR" for i in range(6)], 'second': [f"{3000 + i}.SR" for i in range(8)]}
+    timed_out = {name: [] for name in requests}
+
+    threads = [threading.Thread(target=engine.generate_signals, args=(symbols, {}),
+                                kwargs={'timed_out': timed_out[name]}) for name, symbols in requests.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert timed_out == {'first': ['2003.SR'], 'second': ['3007.SR']}
+    assert not hasattr(engine, 'timed_out_symbols')
+
+
+def test_fast_signals_stream_before_slow_ones(monkeypatch):
+    store = SlowHistoryStore(delay=0.02, stuck={'2001.SR'}, stuck_delay=1.0)
+    engine = make_engine(monkeypatch, store, max_workers=4, symbol_timeout=5.0)
+
+    start = time.monotonic()
+    arrivals = [(time.monotonic() - start, [s.symbol for s in batch])
+                for batch in engine.iter_signals(['2000.SR', '2001.SR', '2002.SR'], {}, batch_size=2)]
+
+    first_time, first_batch = arrivals[0]
+    assert first_time < 0.5
+    assert sorted(first_batch) == ['2000.SR', '2002.SR']
+    assert arrivals[-1][1] == ['2001.SR']
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test Price History Store
+Offline check that only bars newer than the last stored date are downloaded
+"""
+
+import sys
+import os
+import sqlite3
+from datetime import date, timedelta
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core'))
+
+import pandas as pd
+
+from price_history_store import PriceHistoryStore
+
+
+class FakeHistory:
+    """Serves daily bars for the last 120 days from `start`"""
+
+    def __init__(self):
+        self.starts = []
+
+    def __call__(self, symbol, start):
+        self.starts.append(start)
+        days = pd.date_range(start, date.today(), freq='D')
+        close = [100 + (d - pd.Timestamp(date.today())).days * 0.1 for d in days]
+        return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close,
+                             'Volume': [1000] * len(days)}, index=days)
+
+
+def test_incremental_refresh(tmp_path):
+    fake = FakeHistory()
+    store = PriceHistoryStore(db_path=str(tmp_path / 'history.db'), refresh_interval=0, history_fn=fake)
+
+    first = store.get_history('2222.SR', days=90)
+    assert fake.starts[0] == date.today() - timedelta(days=90)
+    assert len(first) == 91
+    assert list(first.columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+
+    # Second run only asks for bars from the last stored day
+    second = store.get_history('2222', days=90)
+    assert fake.starts[1] == date.today()
+    assert len(second) == len(first)
+
+    with sqlite3.connect(str(tmp_path / 'history.db')) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+
+def test_recent_fetch_is_served_from_disk(tmp_path):
+    fake = FakeHistory()
+    store = PriceHistoryStore(db_path=str(tmp_path / 'history.db'), refresh_interval=3600, history_fn=fake)
+
+    store.get_history('1120', days=30)
+    store.get_history('1120', days=30)
+    store.get_history('1120', days=30)
+    assert store.download_count == 1
+
+
+def test_longer_window_is_backfilled(tmp_path):
+    fake = FakeHistory()
+    store = PriceHistoryStore(db_path=str(tmp_path / 'history.db'), refresh_interval=3600, history_fn=fake)
+    store.max_history_days = 30
+
+    assert len(store.get_history('2010', days=30)) == 31
+    # A longer window than ever downloaded is fetched even within the refresh interval
+    assert len(store.get_history('2010', days=120)) == 121
+    assert fake.starts == [date.today() - timedelta(days=30), date.today() - timedelta(days=120)]
+    assert store.covered_from('2010') == date.today() - timedelta(days=120)
+
+    store.get_history('2010', days=90)
+    store.get_history('2010', days=120)
+    assert store.download_count == 2
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    with tempfile.TemporaryDirectory() as tmp:
+        test_incremental_refresh(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_recent_fetch_is_served_from_disk(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_longer_window_is_backfilled(Path(tmp))
+    print("✅ Price history store tests passed")
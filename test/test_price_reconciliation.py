@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test Price Reconciliation
+Whole-market vectorized reconciliation against the latest official snapshot, with provenance flags
+"""
+
+import sys
+import os
+import time
+from datetime import datetime
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'core'))
+
+import numpy as np
+
+from price_reconciliation import (PriceReconciler, SourceSnapshot, PRICE_CORRECTED, VOLUME_CORRECTED,
+                                  NO_REFERENCE, STALE_REFERENCE, OUTLIER, OFFICIAL)
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def official(symbol, price, change_pct, volume):
+    return {'success': True, 'current_price': price, 'change_percent': change_pct, 'volume': volume,
+            'data_source': 'Saudi Exchange (Market Watch)'}
+
+
+def yahoo(price, change_pct, volume=1000):
+    return {'success': True, 'current_price': price, 'change_percent': change_pct, 'volume': volume,
+            'data_source': 'Yahoo Finance (Daily)', 'source': 'yahoo'}
+
+
+def make_reconciler():
+    clock = Clock()
+    reconciler = PriceReconciler(clock=clock)
+    reconciler.set_reference({
+        '1835': official('1835', 58.80, 3.61, 500000),
+        '2222': official('2222', 23.74, 0.50, 115651627),
+        '1120': official('1120', 94.45, 0.75, 1714099),
+    }, as_of=clock.now)
+    return reconciler, clock
+
+
+def test_reconcile_blends_and_flags():
+    reconciler, _ = make_reconciler()
+    quotes = {
+        '1835': yahoo(57.25, 1.20, 480000),        # off by 1.55 SAR -> blended 80/20
+        '2222.SR': yahoo(23.70, 0.45, 15000000),   # price within tolerance, volume far off
+        '1120': yahoo(60.00, 0.75, 1714099),       # >15% gap -> reference taken outright
+        '4160': yahoo(40.96, 4.97),                # not in the official snapshot
+        '9999': {'success': False, 'error': 'not found'},
+    }
+    result = reconciler.reconcile_quotes(quotes)
+
+    tamkeen = result['1835']
+    assert tamkeen['tasi_corrected'] and tamkeen['original_price'] == 57.25
+    assert tamkeen['current_price'] == round(57.25 * 0.2 + 58.80 * 0.8, 2)
+    assert tamkeen['change_percent'] == round(1.20 * 0.2 + 3.61 * 0.8, 2)
+    assert tamkeen['data_source'] == 'Yahoo Finance (Daily) + TASI Price Correction'
+    assert tamkeen['reconciliation']['flags'] == ['price_corrected']
+    assert 'tasi_volume_corrected' not in tamkeen
+
+    aramco = result['2222.SR']
+    assert aramco['current_price'] == 23.70 and 'tasi_corrected' not in aramco
+    assert aramco['volume'] == int(round(15000000 * 0.3 + 115651627 * 0.7))
+    assert aramco['original_volume'] == 15000000
+
+    assert result['1120']['current_price'] == 94.45
+    assert result['1120']['reconciliation']['flags'] == ['price_corrected', 'outlier']
+    assert result['4160']['current_price'] == 40.96
+    assert result['4160']['reconciliation']['flags'] == ['no_reference']
+    assert result['9999'] == quotes['9999']
+    assert quotes['1835']['current_price'] == 57.25       # inputs untouched
+
+
+def test_official_quotes_and_stale_reference_left_alone():
+    reconciler, clock = make_reconciler()
+    quote = dict(official('1835', 57.00, 1.0, 1000), source='saudi_exchange')
+    assert reconciler.reconcile_quote('1835', quote)['current_price'] == 57.00
+
+    clock.now += reconciler.max_reference_age + 1
+    stale = reconciler.reconcile_quote('1835.SR', yahoo(57.25, 1.20))
+    assert stale['current_price'] == 57.25
+    assert stale['reconciliation']['flags'] == ['stale_reference']
+
+
+def test_reconcile_frame_columns():
+    reconciler, _ = make_reconciler()
+    observed = SourceSnapshot.from_quotes({'2222': yahoo(23.74, 0.50, 115651627),
+                                           '1835': yahoo(57.25, 1.2, 500000),
+                                           '1120': official('1120', 94.45, 0.75, 1)})
+    frame = reconciler.reconcile(observed).set_index('symbol')
+    assert frame.loc['2222', 'flags'] == 0
+    assert frame.loc['1835', 'flags'] == PRICE_CORRECTED
+    assert frame.loc['1835', 'price_weight'] == 0.8
+    assert abs(frame.loc['1835', 'price_discrepancy'] - 1.55) < 1e-9
+    assert frame.loc['1120', 'flags'] == OFFICIAL
+
+    no_reference = PriceReconciler().reconcile(observed)   # rows come back in symbol order
+    assert list(no_reference['symbol']) == ['1120', '1835', '2222']
+    assert list(no_reference['flags']) == [NO_REFERENCE | OFFICIAL, NO_REFERENCE, NO_REFERENCE]
+
+
+def test_whole_market_pass_is_vectorized():
+    symbols = [str(1000 + i) for i in range(5000)]
+    clock = Clock()
+    reconciler = PriceReconciler(clock=clock)
+    reconciler.set_reference({s: official(s, 50.0, 1.0, 100000) for s in symbols}, as_of=clock.now)
+    rng = np.random.default_rng(7)
+    prices = 50.0 + rng.normal(0, 1.0, len(symbols))
+    observed = SourceSnapshot(source='yahoo', symbols=np.array(symbols[::-1], dtype=object), price=prices,
+                              change_pct=np.ones(len(symbols)), volume=np.full(len(symbols), 100000.0))
+
+    start = time.perf_counter()
+    frame = reconciler.reconcile(observed)
+    elapsed = time.perf_counter() - start
+    assert elapsed < 0.1
+    corrected = (frame['flags'] & PRICE_CORRECTED) > 0
+    assert corrected.sum() == (np.abs(prices - 50.0) > 0.3).sum()
+    assert not (frame['flags'] & (VOLUME_CORRECTED | OUTLIER | STALE_REFERENCE)).any()
+
+
+def test_reference_from_archive(tmp_path):
+    from snapshot_archive import SnapshotArchive, PYARROW_AVAILABLE
+    if not PYARROW_AVAILABLE:
+        return
+    archive = SnapshotArchive(str(tmp_path))
+    snapshot_ts = datetime(2025, 9, 2, 15, 0)
+    archive.write([dict(official('1835', 58.80, 3.61, 500000), symbol='1835'),
+                   dict(yahoo(23.00, 0.1), symbol='2222', data_source='Yahoo Finance + TASI Price Correction')],
+                  snapshot_ts, source='daemon')
+
+    clock = Clock(snapshot_ts.timestamp() + 60)
+    reconciler = PriceReconciler(clock=clock)
+    assert reconciler.load_reference(archive) == 1
+    assert list(reconciler.reference.symbols) == ['1835']
+    assert reconciler.reconcile_quote('1835', yahoo(57.25, 1.2))['tasi_corrected']
+
+
+def test_quote_service_reconciles(monkeypatch):
+    sys.path.insert(0, ROOT)
+    import saudi_exchange_fetcher
+    from core import price_reconciliation
+
+    reconciler = price_reconciliation.PriceReconciler()
+    monkeypatch.setattr(saudi_exchange_fetcher, 'price_reconciler', reconciler)
+    service = saudi_exchange_fetcher.SaudiQuoteService(hedge=False)
+    monkeypatch.setattr(service.fetcher, 'fetch_market_watch_index',
+                        lambda: {'1835': official('1835', 58.80, 3.61, 500000)})
+    service.get_market_watch_index(force=True)
+    assert list(reconciler.reference.symbols) == ['1835']
+
+    monkeypatch.setattr(service, '_fetch_stock_price', lambda symbol: yahoo(57.25, 1.2))
+    assert service.get_raw_quote('1835')['current_price'] == 57.25
+    assert service.get_stock_price('1835')['tasi_corrected']
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test Saudi Quote Service
+Offline check that the market watch page is parsed once per refresh cycle
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from saudi_exchange_fetcher import SaudiQuoteService, parse_market_watch
+
+MARKET_WATCH_HTML = """
+<table>
+  <tr><th>Company</th><th>Symbol</th><th>Last Trade Price</th><th>Change</th><th>Change %</th><th>Volume Traded</th></tr>
+  <tr><td>SAUDI ARAMCO</td><td>2222</td><td>23.74</td><td>0.12</td><td>0.51%</td><td>115,651,627</td></tr>
+  <tr><td>ALRAJHI</td><td>1120</td><td>96.10</td><td>-0.40</td><td>-0.41%</td><td>3,200,000</td></tr>
+</table>
+"""
+
+
+class FakeResponse:
+    status_code = 200
+    text = MARKET_WATCH_HTML
+
+
+class CountingSession:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        return FakeResponse()
+
+
+def test_parse_market_watch():
+    index = parse_market_watch(MARKET_WATCH_HTML)
+    assert set(index) == {'2222', '1120'}
+    assert index['2222']['current_price'] == 23.74
+    assert index['2222']['volume'] == 115651627
+    assert index['1120']['change_percent'] == -0.41
+    assert index['1120']['previous_close'] == 96.5
+
+
+def test_one_page_fetch_per_cycle():
+    service = SaudiQuoteService(refresh_interval=60)
+    session = CountingSession()
+    service.fetcher.session = session
+
+    for symbol in ['2222', '1120', '2222.SR']:
+        result = service.fetcher.get_stock_price_saudi_exchange(symbol, index=service.get_market_watch_index())
+        assert result['success']
+
+    assert session.calls == 1
+
+    service.get_market_watch_index(force=True)
+    assert session.calls == 2
+
+
+if __name__ == "__main__":
+    test_parse_market_watch()
+    test_one_page_fetch_per_cycle()
+    print("✅ Quote service tests passed")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test Rate Limiter
+Token bucket pacing, concurrency cap and AIMD back-off/ramp-up per source
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'core'))
+
+from rate_limiter import (AdaptiveRateLimiter, _load_source_config, classify_exception,
+                          OK, THROTTLED, TIMEOUT, ERROR)
+
+CONFIG = os.path.join(ROOT, 'config', 'fetcher_config.json')
+
+
+class FakeHTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.response = type('Response', (), {'status_code': status})()
+
+
+def test_config_sources():
+    sources = _load_source_config(CONFIG)
+    assert sources['yahoo']['max_concurrency'] == 24
+    assert sources['saudi_exchange']['rate'] == 2.0
+    assert 'argaam' in sources  # defaults kept for sources missing from the config
+
+
+def test_token_bucket_paces_requests():
+    limiter = AdaptiveRateLimiter('test', rate=50, burst=5, concurrency=4)
+    start = time.perf_counter()
+    for _ in range(15):
+        limiter.acquire()
+        limiter.release(0.0, ERROR)  # no ramp-up during the measurement
+    elapsed = time.perf_counter() - start
+    # 5 from the burst, then 10 tokens at 50/s
+    assert 0.15 < elapsed < 0.6
+
+
+def test_concurrency_cap():
+    limiter = AdaptiveRateLimiter('test', rate=1000, burst=1000, concurrency=3, max_concurrency=3)
+    peak = []
+    lock = threading.Lock()
+
+    def call(_):
+        with limiter.permit():
+            with lock:
+                peak.append(limiter.in_flight)
+            time.sleep(0.02)
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        list(pool.map(call, range(30)))
+    assert max(peak) == 3
+    assert limiter.in_flight == 0
+
+
+def test_additive_increase_while_healthy():
+    limiter = AdaptiveRateLimiter('test', rate=10, burst=10, concurrency=4, max_concurrency=8)
+    for _ in range(30):
+        limiter.acquire()
+        limiter.release(0.1, OK)
+    assert limiter.concurrency > 4
+    assert limiter.rate > 10
+
+    # Slow calls do not ramp up
+    before = limiter.limit
+    for _ in range(10):
+        limiter.acquire(timeout=1)
+        limiter.release(10.0, OK)
+    assert limiter.limit == before
+
+
+def test_multiplicative_decrease_once_per_window():
+    now = [100.0]
+    limiter = AdaptiveRateLimiter('test', rate=10, burst=10, concurrency=16, min_concurrency=2,
+                                  max_concurrency=32, target_latency=2.0, clock=lambda: now[0])
+    limiter.in_flight = 3
+    limiter.release(0.5, THROTTLED)
+    limiter.release(0.5, THROTTLED)        # same congestion event
+    assert limiter.concurrency == 8 and limiter.rate == 5
+    now[0] += 2.5
+    limiter.release(0.5, TIMEOUT)
+    assert limiter.concurrency == 4
+    assert limiter.stats['backoffs'] == 2
+    assert limiter.stats['throttled'] == 2 and limiter.stats['timeouts'] == 1
+
+
+def test_floor_respected():
+    now = [0.0]
+    limiter = AdaptiveRateLimiter('test', concurrency=4, min_concurrency=2, target_latency=1.0,
+                                  clock=lambda: now[0])
+    for _ in range(10):
+        now[0] += 5
+        limiter.release(0.1, THROTTLED)
+    assert limiter.concurrency == 2
+    assert limiter.rate >= limiter.min_rate
+
+
+def test_permit_classifies_outcomes():
+    assert classify_exception(FakeHTTPError(429)) == THROTTLED
+    assert classify_exception(Exception("YFRateLimitError: Too Many Requests")) == THROTTLED
+    assert classify_exception(TimeoutError()) == TIMEOUT
+    assert classify_exception(ValueError("No price data")) == ERROR
+
+    limiter = AdaptiveRateLimiter('test', rate=100, burst=100)
+    try:
+        with limiter.permit():
+            raise FakeHTTPError(429)
+    except FakeHTTPError:
+        pass
+    with limiter.permit() as permit:
+        permit.check_result({'success': False, 'error': 'Yahoo Finance error: Too Many Requests. Rate limited.'})
+    with limiter.permit() as permit:
+        permit.check_response(type('Response', (), {'status_code': 200})())
+    assert limiter.stats['throttled'] == 2
+    assert limiter.in_flight == 0
+
+
+def test_acquire_timeout():
+    limiter = AdaptiveRateLimiter('test', rate=1, burst=1, concurrency=1)
+    assert limiter.acquire(timeout=0.1)
+    assert not limiter.acquire(timeout=0.1)
+    assert limiter.stats['rejected'] == 1
+
+
+def test_async_acquire_does_not_block_loop():
+    limiter = AdaptiveRateLimiter('test', rate=100, burst=2, concurrency=2, max_concurrency=2)
+
+    async def worker(results):
+        await limiter.acquire_async()
+        results.append(limiter.in_flight)
+        await asyncio.sleep(0.02)
+        limiter.release(0.02, ERROR)
+
+    async def main():
+        results = []
+        await asyncio.gather(*(worker(results) for _ in range(8)))
+        return results
+
+    assert max(asyncio.run(main())) <= 2
+
+
+if __name__ == "__main__":
+    test_config_sources()
+    test_token_bucket_paces_requests()
+    test_concurrency_cap()
+    test_additive_increase_while_healthy()
+    test_multiplicative_decrease_once_per_window()
+    test_floor_respected()
+    test_permit_classifies_outcomes()
+    test_acquire_timeout()
+    test_async_acquire_does_not_block_loop()
+    print("✅ Rate limiter tests passed")
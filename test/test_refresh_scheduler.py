@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test Refresh Scheduler
+Market phases, refresh cycles and after-hours freezing with a fixed clock
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'core'))
+
+from refresh_scheduler import MarketRefreshScheduler, PRE_OPEN, OPEN, POST_CLOSE, CLOSED
+
+CONFIG = os.path.join(ROOT, 'config', 'fetcher_config.json')
+RIYADH = timezone(timedelta(hours=3))
+
+
+class Clock:
+    def __init__(self, when):
+        self.when = when
+
+    def __call__(self):
+        return self.when.timestamp()
+
+
+def riyadh(day, hour, minute=0, second=0):
+    # 2025-06-01 is a Sunday
+    return datetime(2025, 6, day, hour, minute, second, tzinfo=RIYADH)
+
+
+def make_scheduler(when):
+    clock = Clock(when)
+    return MarketRefreshScheduler(config_path=CONFIG, clock=clock), clock
+
+
+def test_config_is_read():
+    scheduler, _ = make_scheduler(riyadh(1, 12))
+    assert scheduler.update_interval == 30
+    assert scheduler.max_retries == 3
+    assert scheduler.trading_days == {0, 1, 2, 3, 4}
+
+
+def test_phases_follow_sunday_to_thursday_session():
+    scheduler, _ = make_scheduler(riyadh(1, 12))
+    assert scheduler.phase(riyadh(1, 9, 50)) == PRE_OPEN       # Sunday
+    assert scheduler.phase(riyadh(1, 12)) == OPEN
+    assert scheduler.phase(riyadh(5, 14, 59)) == OPEN          # Thursday
+    assert scheduler.phase(riyadh(5, 15, 5)) == POST_CLOSE
+    assert scheduler.phase(riyadh(5, 18)) == CLOSED
+    assert scheduler.phase(riyadh(6, 12)) == CLOSED            # Friday
+    assert scheduler.phase(riyadh(7, 12)) == CLOSED            # Saturday
+
+
+def test_refresh_every_interval_during_session():
+    scheduler, clock = make_scheduler(riyadh(2, 11, 0, 10))
+    fetched_at = clock()
+    assert not scheduler.is_due(fetched_at)
+
+    clock.when = riyadh(2, 11, 0, 29)
+    assert not scheduler.is_due(fetched_at)
+    assert abs(scheduler.seconds_until_next_refresh() - 1) < 1e-6
+
+    clock.when = riyadh(2, 11, 0, 30)
+    assert scheduler.is_due(fetched_at)
+
+
+def test_closing_snapshot_frozen_over_the_weekend():
+    # Post-close pass on Thursday after the post-close window
+    scheduler, clock = make_scheduler(riyadh(5, 15, 16))
+    assert scheduler.is_due(riyadh(5, 15, 10).timestamp())
+    fetched_at = clock()
+
+    for when in [riyadh(5, 22), riyadh(6, 12), riyadh(7, 23, 59)]:
+        clock.when = when
+        assert not scheduler.is_due(fetched_at)
+        assert scheduler.fresh_for() > (when - riyadh(5, 15, 16)).total_seconds()
+
+    # Sunday pre-open warm-up pass
+    clock.when = riyadh(8, 9, 45)
+    assert scheduler.is_due(fetched_at)
+    assert scheduler.next_refresh() == riyadh(8, 10)
+
+
+def test_session_key_changes_per_cycle_only():
+    scheduler, clock = make_scheduler(riyadh(6, 9))
+    friday_key = scheduler.session_key()
+    clock.when = riyadh(7, 20)
+    assert scheduler.session_key() == friday_key
+
+    clock.when = riyadh(8, 10, 0, 5)
+    first = scheduler.session_key()
+    clock.when = riyadh(8, 10, 0, 25)
+    assert scheduler.session_key() == first
+    clock.when = riyadh(8, 10, 0, 35)
+    assert scheduler.session_key() != first
+
+
+if __name__ == "__main__":
+    test_config_is_read()
+    test_phases_follow_sunday_to_thursday_session()
+    test_refresh_every_interval_during_session()
+    test_closing_snapshot_frozen_over_the_weekend()
+    test_session_key_changes_per_cycle_only()
+    print("✅ Refresh scheduler tests passed")
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Test Shared Snapshot
+Seqlock publishing, zero-copy views and cross-process reads of the shared-memory block
+"""
+
+import sys
+import os
+import time
+import uuid
+import multiprocessing
+import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core'))
+
+import shared_snapshot
+from shared_snapshot import SharedMarketSnapshot, get_shared_reader
+
+
+def block_name():
+    return f"tasi_test_{uuid.uuid4().hex[:8]}"
+
+
+def publish_market(writer, offset=0.0, n=300):
+    symbols = [f"{1000 + i}" for i in range(n)][::-1]
+    price = np.arange(n, dtype=float)[::-1] + offset
+    return writer.publish(symbols, price, price / 100, np.arange(n)[::-1] * 10, price * 1000)
+
+
+def _child_read(name, queue):
+    reader = SharedMarketSnapshot.attach(name)
+    view = reader.read()
+    rows = view.lookup(['1007.SR', '1299'])
+    queue.put((view.version, float(view.price[rows['1007']]), float(view.price[rows['1299']])))
+    reader.close()
+
+
+def test_nothing_published_yet():
+    name = block_name()
+    writer = SharedMarketSnapshot.create(name, capacity=16)
+    try:
+        assert SharedMarketSnapshot.attach(name).read() is None
+        assert SharedMarketSnapshot.attach(block_name()) is None
+    finally:
+        writer.close()
+
+
+def test_publish_and_zero_copy_read():
+    name = block_name()
+    writer = SharedMarketSnapshot.create(name, capacity=512)
+    try:
+        assert publish_market(writer) == 1
+        reader = SharedMarketSnapshot.attach(name)
+        view = reader.read()
+
+        assert view.version == 1 and len(view) == 300
+        assert list(view.symbols[:3]) == [b'1000', b'1001', b'1002']  # sorted for lookups
+        rows = view.lookup(['1007', '1299.SR', '9999'])
+        assert set(rows) == {'1007', '1299'}
+        assert view.price[rows['1007']] == 7.0
+        assert view.volume[rows['1299']] == 2990
+        # Views point straight into the mapped block
+        assert np.shares_memory(view.price, reader._slots[1]['price'])
+        reader.close()
+    finally:
+        writer.close()
+
+
+def test_view_valid_until_its_slot_is_reused():
+    name = block_name()
+    writer = SharedMarketSnapshot.create(name, capacity=512)
+    try:
+        publish_market(writer)
+        reader = SharedMarketSnapshot.attach(name)
+        view = reader.read()
+
+        publish_market(writer, offset=100)          # other slot: view untouched
+        assert reader.still_valid(view)
+        assert view.price[view.lookup(['1007'])['1007']] == 7.0
+        assert reader.read().price[0] == 100.0
+
+        publish_market(writer, offset=200)          # same slot as the view
+        assert not reader.still_valid(view)
+        assert reader.read().version == 3
+        reader.close()
+    finally:
+        writer.close()
+
+
+def test_read_copy_is_private():
+    name = block_name()
+    writer = SharedMarketSnapshot.create(name, capacity=512)
+    try:
+        publish_market(writer)
+        reader = SharedMarketSnapshot.attach(name)
+        copied = reader.read_copy()
+        publish_market(writer, offset=100)
+        publish_market(writer, offset=200)
+        assert copied.price[0] == 0.0
+        reader.close()
+    finally:
+        writer.close()
+
+
+def test_capacity_is_enforced():
+    name = block_name()
+    writer = SharedMarketSnapshot.create(name, capacity=8)
+    try:
+        try:
+            publish_market(writer, n=9)
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+        assert writer.version == 0
+    finally:
+        writer.close()
+
+
+def test_other_process_reads_without_refetching():
+    name = block_name()
+    writer = SharedMarketSnapshot.create(name, capacity=512)
+    try:
+        publish_market(writer)
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_child_read, args=(name, queue))
+        process.start()
+        version, p1007, p1299 = queue.get(timeout=30)
+        process.join(timeout=30)
+        assert (version, p1007, p1299) == (1, 7.0, 299.0)
+    finally:
+        writer.close()
+
+
+def test_shared_reader_follows_a_restarted_writer(monkeypatch):
+    monkeypatch.setattr(shared_snapshot, 'REATTACH_INTERVAL', 0.0)
+    name = block_name()
+    writer = SharedMarketSnapshot.create(name, capacity=512)
+    publish_market(writer)
+    reader = get_shared_reader(name)
+    assert reader.read().price[0] == 0.0
+    assert get_shared_reader(name) is reader        # same block: mapping kept
+
+    writer.close()                                  # daemon stopped, block unlinked
+    assert get_shared_reader(name) is None
+
+    writer = SharedMarketSnapshot.create(name, capacity=512)   # daemon restarted
+    try:
+        publish_market(writer, offset=100)
+        restarted = get_shared_reader(name)
+        assert restarted is not reader
+        assert restarted.read().price[0] == 100.0
+
+        writer.close()                              # restarted again between two checks
+        writer = SharedMarketSnapshot.create(name, capacity=512)
+        publish_market(writer, offset=200)
+        assert get_shared_reader(name).read().price[0] == 200.0
+        get_shared_reader(name).close()
+    finally:
+        shared_snapshot._readers.pop(name, None)
+        writer.close()
+
+
+def test_reads_are_microseconds():
+    name = block_name()
+    writer = SharedMarketSnapshot.create(name, capacity=512)
+    try:
+        publish_market(writer)
+        reader = SharedMarketSnapshot.attach(name)
+        start = time.perf_counter()
+        for _ in range(1000):
+            view = reader.read()
+        elapsed = (time.perf_counter() - start) / 1000
+        print(f"⚡ read(): {elapsed * 1e6:.1f}µs for {len(view)} symbols")
+        assert elapsed < 0.001
+        reader.close()
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    test_nothing_published_yet()
+    test_publish_and_zero_copy_read()
+    test_view_valid_until_its_slot_is_reused()
+    test_read_copy_is_private()
+    test_capacity_is_enforced()
+    test_other_process_reads_without_refetching()
+    test_reads_are_microseconds()
+    print("✅ Shared snapshot tests passed")
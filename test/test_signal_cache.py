@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test AI Signal Cache
+Offline check that signals are recomputed only when a new bar arrives and the cache stays bounded
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from ai_engine import simple_ai
+from core.tiered_cache import TieredCache
+
+
+class FakeHistoryStore:
+    """Serves 60 daily bars per symbol; `advance()` appends a new bar"""
+
+    def __init__(self):
+        self.days = 60
+
+    def advance(self):
+        self.days += 1
+
+    def get_history(self, symbol, days=92):
+        index = pd.date_range('2025-01-01', periods=self.days, freq='D')
+        close = 50 + np.sin(np.arange(self.days) / 5.0)
+        return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close,
+                             'Volume': np.full(self.days, 1000)}, index=index)
+
+
+def make_engine(monkeypatch, store, max_entries=512):
+    monkeypatch.setattr(simple_ai, 'price_history_store', store)
+    monkeypatch.setattr(simple_ai, 'HISTORY_STORE_AVAILABLE', True)
+    monkeypatch.setattr(simple_ai, 'tiered_cache', TieredCache(cache_dir='unused'))
+    engine = simple_ai.SimpleAIEngine()
+    engine.signals_cache.configure('ai_signals', max_entries=max_entries)
+
+    calls = []
+    analyze = engine._analyze_batch
+    engine._analyze_batch = lambda histories, names: calls.extend(histories) or analyze(histories, names)
+    return engine, calls
+
+
+def test_signal_reused_until_new_bar(monkeypatch):
+    store = FakeHistoryStore()
+    engine, calls = make_engine(monkeypatch, store)
+
+    first = engine.generate_signals(['1120.SR'], {})[0]
+    second = engine.generate_signals(['1120.SR'], {})[0]
+    assert second is first
+    assert calls == ['1120.SR']
+
+    store.advance()
+    third = engine.generate_signals(['1120.SR'], {})[0]
+    assert third is not first
+    assert calls == ['1120.SR', '1120.SR']
+
+
+def test_signal_cache_is_bounded(monkeypatch):
+    engine, calls = make_engine(monkeypatch, FakeHistoryStore(), max_entries=5)
+    symbols = [f"{1000 + i}.SR" for i in range(20)]
+    engine.generate_signals(symbols, {})
+
+    cached = [key for key in engine.signals_cache._memory if key[0] == 'ai_signals']
+    assert len(cached) == 5
+    assert set(key[1] for key in cached) <= set(symbols)
+    assert engine.signals_cache.stats['evictions'] == 15
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
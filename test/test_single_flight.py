@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test Single Flight
+Concurrent identical fetches coalesced into one upstream call
+"""
+
+import sys
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'core'))
+
+from single_flight import SingleFlight, single_flight_stats
+from tiered_cache import TieredCache
+
+
+class SlowUpstream:
+    def __init__(self, delay=0.1):
+        self.calls = 0
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def __call__(self, symbol):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return {'symbol': symbol, 'success': True}
+
+
+def burst(fn, args, callers=20):
+    barrier = threading.Barrier(callers)
+
+    def call(arg):
+        barrier.wait()
+        return fn(arg)
+
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        return list(pool.map(call, [args[i % len(args)] for i in range(callers)]))
+
+
+def test_same_key_one_upstream_call():
+    flights = SingleFlight('test')
+    upstream = SlowUpstream()
+    results = burst(lambda s: flights.do(s, upstream, s), ['2222'])
+
+    assert upstream.calls == 1
+    assert all(r == {'symbol': '2222', 'success': True} for r in results)
+    assert flights.stats == {'calls': 20, 'upstream': 1, 'coalesced': 19}
+    assert flights.in_flight() == 0
+
+
+def test_different_keys_not_coalesced():
+    flights = SingleFlight('test')
+    upstream = SlowUpstream()
+    burst(lambda s: flights.do(s, upstream, s), ['2222', '1120'])
+    assert upstream.calls == 2
+
+
+def test_key_released_after_call():
+    flights = SingleFlight('test')
+    upstream = SlowUpstream(delay=0)
+    flights.do('2222', upstream, '2222')
+    flights.do('2222', upstream, '2222')
+    assert upstream.calls == 2
+
+
+def test_errors_shared_with_waiters():
+    flights = SingleFlight('test')
+
+    def failing(symbol):
+        time.sleep(0.1)
+        raise ConnectionError("upstream down")
+
+    def call(symbol):
+        try:
+            flights.do(symbol, failing, symbol)
+        except ConnectionError as e:
+            return str(e)
+
+    assert burst(call, ['2222'], callers=5) == ["upstream down"] * 5
+    assert flights.stats['upstream'] == 1
+
+
+def test_cache_misses_share_one_load(tmp_path):
+    cache = TieredCache(cache_dir=str(tmp_path))
+    upstream = SlowUpstream()
+    results = burst(lambda s: cache.get_or_load('quotes', s, lambda: upstream(s)), ['2222'])
+
+    assert upstream.calls == 1
+    assert len(results) == 20
+    assert single_flight_stats()['cache:quotes']['coalesced'] >= 19
+
+
+def test_quote_service_coalesces_same_symbol():
+    from saudi_exchange_fetcher import SaudiQuoteService
+    service = SaudiQuoteService(refresh_interval=60)
+    upstream = SlowUpstream()
+    service._fetch_stock_price = upstream
+
+    burst(service.get_stock_price, ['2222', '2222.SR'])
+    assert upstream.calls == 1
+    assert service._flights.stats['coalesced'] >= 19
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test Snapshot Archive
+Date-partitioned Parquet snapshots with date range / symbol / column reads
+"""
+
+import sys
+import os
+import json
+import time
+from datetime import datetime, timedelta
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'core'))
+
+import pytest
+
+import snapshot_archive
+from snapshot_archive import SnapshotArchive
+
+SYMBOLS = [str(1000 + i) for i in range(260)]
+
+
+def quotes(day_index, symbols=SYMBOLS):
+    return [{'symbol': f"{s}.SR", 'current_price': 10.0 + day_index + i / 100, 'change_pct': 0.5,
+             'volume': 1000 * (i + 1), 'value': 5e6, 'name': f"Company {s}", 'sector': 'Banks',
+             'success': True} for i, s in enumerate(symbols)]
+
+
+def test_write_and_read_back(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    ts = datetime(2025, 9, 2, 10, 30)
+    rows = quotes(0, SYMBOLS[:3]) + [{'symbol': '9999', 'success': False, 'error': 'not found'}]
+    path = archive.write(rows, ts, source='daemon')
+    assert os.path.basename(os.path.dirname(path)) == 'date=2025-09-02'
+
+    frame = archive.read()
+    assert list(frame['symbol']) == ['1000', '1001', '1002']       # failures skipped, .SR stripped
+    assert frame['change_percent'].tolist() == [0.5, 0.5, 0.5]   # change_pct alias
+    assert frame['value_traded'].iloc[0] == 5e6
+    assert frame['snapshot_ts'].iloc[0] == ts
+    assert frame['source'].iloc[0] == 'daemon'
+
+
+def test_range_symbols_and_projection(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    start = datetime(2025, 1, 1, 15, 0)
+    for d in range(10):
+        archive.write(quotes(d, SYMBOLS[:20]), start + timedelta(days=d))
+
+    frame = archive.read('2025-01-03', '2025-01-05', symbols=['1005', '1010.SR'], columns=['current_price'])
+    assert list(frame.columns) == ['snapshot_ts', 'symbol', 'current_price']
+    assert len(frame) == 6
+    assert sorted(set(frame['symbol'])) == ['1005', '1010']
+    assert frame['snapshot_ts'].dt.day.unique().tolist() == [3, 4, 5]
+
+    latest = archive.latest(symbols=['1000'])
+    assert latest['current_price'].iloc[0] == 19.0
+    assert archive.read('2024-01-01', '2024-12-31').empty
+
+
+def test_compaction_keeps_rows(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    base = datetime(2025, 3, 1, 10, 0)
+    for minute in range(5):
+        archive.write(quotes(minute, SYMBOLS[:10]), base + timedelta(minutes=minute))
+    archive.write(quotes(0, SYMBOLS[:10]), base + timedelta(days=1))
+
+    assert archive.compact_before('2025-03-02') == 5
+    assert os.listdir(tmp_path / 'date=2025-03-01') == ['part-0.parquet']
+    frame = archive.read('2025-03-01', '2025-03-01')
+    assert len(frame) == 50 and frame['snapshot_ts'].nunique() == 5
+    assert archive.compact('2025-03-01') == 0
+
+
+def test_interrupted_compaction_keeps_the_day(tmp_path, monkeypatch):
+    archive = SnapshotArchive(str(tmp_path))
+    base = datetime(2025, 3, 1, 10, 0)
+    for minute in range(3):
+        archive.write(quotes(minute, SYMBOLS[:10]), base + timedelta(minutes=minute))
+    archive.compact('2025-03-01')
+    for minute in range(3, 5):                       # late files next to part-0
+        archive.write(quotes(minute, SYMBOLS[:10]), base + timedelta(minutes=minute))
+
+    def killed(path):
+        raise OSError("killed mid-compaction")
+
+    monkeypatch.setattr(snapshot_archive.os, 'remove', killed)
+    with pytest.raises(OSError):
+        archive.compact('2025-03-01')
+    monkeypatch.undo()
+
+    frame = archive.read('2025-03-01', '2025-03-01')
+    assert frame['snapshot_ts'].nunique() == 5       # nothing lost, part-0 already merged
+    assert not any(name.endswith('.tmp') for name in os.listdir(tmp_path / 'date=2025-03-01'))
+
+
+def test_import_json_dump(tmp_path):
+    dump = tmp_path / 'saudi_market_data_20250902_141538.json'
+    dump.write_text(json.dumps([
+        {'symbol': '1120', 'current_price': 94.45, 'change_percent': 0.75, 'volume': 1714099,
+         'success': True, 'timestamp': '2025-09-02T14:15:05.361106'},
+        {'symbol': '2222', 'success': False, 'error': 'x'}]), encoding='utf-8')
+    archive = SnapshotArchive(str(tmp_path / 'archive'))
+    archive.import_json_dump(str(dump))
+    frame = archive.read(columns=['current_price', 'volume'])
+    assert frame.to_dict('records')[0]['volume'] == 1714099
+    assert archive.dates()[0].isoformat() == '2025-09-02'
+
+
+def test_year_lookback_is_fast(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    start = datetime(2024, 1, 1, 15, 0)
+    for d in range(250):
+        archive.write(quotes(d), start + timedelta(days=d))
+
+    began = time.perf_counter()
+    frame = archive.read('2024-01-01', '2024-12-31', symbols=['1120', '1150'], columns=['current_price', 'volume'])
+    elapsed = time.perf_counter() - began
+    assert len(frame) == 500
+    assert elapsed < 1.0
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
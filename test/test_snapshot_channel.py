@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test Snapshot Channel and Market Data Daemon
+One offline sweep published once, read by many sessions without upstream requests
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import market_data_daemon
+from core.snapshot_channel import SnapshotChannel
+
+
+class AlwaysDueScheduler:
+    update_interval = 30
+
+    def is_due(self, last_fetch, interval=None):
+        return True
+
+    def phase(self):
+        return 'open'
+
+    def seconds_until_next_refresh(self):
+        return 0
+
+
+def test_versions_are_published_atomically_and_pruned(tmp_path):
+    writer = SnapshotChannel(directory=str(tmp_path), keep=2)
+    reader = SnapshotChannel(directory=str(tmp_path))
+    assert reader.read_latest() is None
+
+    for i in range(1, 5):
+        assert writer.publish({'n': i}) == i
+
+    latest = reader.read_latest()
+    assert latest['version'] == 4 and latest['payload'] == {'n': 4}
+    assert sorted(f for f in os.listdir(tmp_path) if f.startswith('market-')) == \
+        ['market-00000003.json', 'market-00000004.json']
+    assert not [f for f in os.listdir(tmp_path) if f.endswith('.tmp')]
+
+
+def test_reader_parses_each_version_once(tmp_path, monkeypatch):
+    channel = SnapshotChannel(directory=str(tmp_path))
+    channel.publish({'n': 1})
+
+    first = channel.read_latest()
+    assert channel.read_latest() is first   # unchanged version -> cached object
+
+    channel.publish({'n': 2})
+    assert channel.read_latest()['payload'] == {'n': 2}
+
+    # Too old for the caller's freshness window
+    monkeypatch.setattr('core.snapshot_channel.time.time', lambda: first['published_at'] + 1000)
+    assert channel.read_latest(max_age=60) is None
+
+
+class QueueOnlyFundamentals:
+    def __init__(self):
+        self.queued = []
+
+    def refresh_in_background(self, symbols):
+        self.queued.extend(symbols)
+        return True
+
+    def wait(self, timeout=None):
+        return True
+
+
+def test_daemon_sweep_serves_many_readers(tmp_path, monkeypatch):
+    fetches = []
+
+    def fake_quotes(max_workers):
+        fetches.append(max_workers)
+        return {
+            '2222': {'success': True, 'current_price': 27.5, 'change_percent': 1.2, 'volume': 1000},
+            '9999': {'success': False, 'error': 'not found'},
+        }
+
+    monkeypatch.setattr(market_data_daemon, 'fetch_market_quotes', fake_quotes)
+    monkeypatch.setattr(market_data_daemon, 'get_market_summary',
+                        lambda quotes: {'success': True, 'all_stocks': list(quotes)})
+
+    channel = SnapshotChannel(directory=str(tmp_path))
+    fundamentals = QueueOnlyFundamentals()
+    daemon = market_data_daemon.MarketDataDaemon(channel=channel, scheduler=AlwaysDueScheduler(), max_workers=4,
+                                                 fundamentals=fundamentals, metrics_file=str(tmp_path / 'fetch.prom'))
+    daemon.run(once=True)
+
+    sessions = [SnapshotChannel(directory=str(tmp_path)) for _ in range(10)]
+    snapshots = [session.read_latest() for session in sessions]
+
+    assert fetches == [4]
+    assert fundamentals.queued == ['2222']
+    assert all(s['version'] == 1 for s in snapshots)
+    assert snapshots[0]['payload']['quotes'] == {
+        '2222': {'success': True, 'current_price': 27.5, 'change_percent': 1.2, 'volume': 1000}}
+    assert snapshots[0]['payload']['market_summary']['success']
+    assert 'saudi_fetch_items_total{source="daemon",endpoint="sweep",result="failure"}' in \
+        (tmp_path / 'fetch.prom').read_text(encoding='utf-8')
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test Stock Search
+Prefix trie + trigram index with Arabic normalisation and ranked fuzzy matches
+"""
+
+import sys
+import os
+import time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'core'))
+
+from stock_search import StockSearchIndex, normalize, get_search_index
+
+RECORDS = [
+    {'symbol': '1120', 'name': 'ALRAJHI', 'name_ar': 'مصرف الراجحي', 'sector': 'Banks'},
+    {'symbol': '8230', 'name': 'ALRAJHI TAKAFUL', 'name_ar': 'تكافل الراجحي', 'sector': 'Insurance'},
+    {'symbol': '2222', 'name': 'SAUDI ARAMCO', 'name_ar': 'أرامكو السعودية', 'sector': 'Energy'},
+    {'symbol': '1150', 'name': 'ALINMA', 'name_ar': 'مصرف الإنماء', 'sector': 'Banks'},
+    {'symbol': '2280', 'name': 'ALMARAI', 'name_ar': 'المراعي', 'sector': 'Food & Beverages'},
+    {'symbol': '2220', 'name': 'MAADANIYAH', 'name_ar': '', 'sector': 'Materials'},
+]
+
+
+def symbols(results):
+    return [r['symbol'] for r in results]
+
+
+def test_normalize_arabic_variants():
+    assert normalize('أرامكو') == normalize('ارامكو') == normalize('إرامكو')
+    assert normalize('الرَّاجِحِيّ') == 'الراجحي'
+    assert normalize('السعودية') == normalize('السعوديه')
+    assert normalize('مستشفى') == normalize('مستشفي')
+    assert normalize('Al-Rajhi  Bank') == 'al rajhi bank'
+
+
+def test_symbol_and_prefix_ranking():
+    index = StockSearchIndex(RECORDS)
+    assert symbols(index.search('2222')) == ['2222']
+    assert symbols(index.search('22'))[:2] == ['2220', '2222']
+    assert symbols(index.search('ara')) == ['2222']
+    assert symbols(index.search('rajhi'))[0] == '1120'
+    assert symbols(index.search('saudi aramco')) == ['2222']   # every token must match
+    assert index.search('') == []
+
+
+def test_arabic_search():
+    index = StockSearchIndex(RECORDS)
+    assert symbols(index.search('ارامكو')) == ['2222']
+    assert symbols(index.search('الراجحى')) == ['1120', '8230']
+    assert symbols(index.search('راجحي')) == ['1120', '8230']        # without the article
+    assert symbols(index.search('مصرف')) == ['1120', '1150']
+
+
+def test_fuzzy_matches_ranked_below_prefix():
+    index = StockSearchIndex(RECORDS)
+    scored = index.search_scored('almaray')
+    assert scored[0][1]['symbol'] == '2280'
+    assert symbols(index.search('aramko')) == ['2222']
+    exact = index.search_scored('almarai')[0][0]
+    assert scored[0][0] < exact
+
+
+def test_sector_search():
+    index = StockSearchIndex(RECORDS)
+    assert set(symbols(index.search('banks'))) == {'1120', '1150'}
+
+
+def test_typeahead_latency_large_universe():
+    words = ['saudi', 'arabian', 'national', 'gulf', 'united', 'holding', 'development', 'industrial',
+             'cement', 'insurance', 'reit', 'fund', 'growth', 'trading', 'services', 'petrochemical']
+    records = [{'symbol': str(1000 + i), 'name': f"{words[i % 16]} {words[(i // 16) % 16]} {i}",
+                'name_ar': 'شركة', 'sector': words[i % 7]} for i in range(5000)]
+    index = StockSearchIndex(records)
+    queries = ['s', 'sa', 'sau', 'saud', 'saudi', 'saudi g', 'saudi gro', '12', '1234', 'petrochemcal']
+    start = time.perf_counter()
+    for _ in range(20):
+        for query in queries:
+            index.search(query, limit=10)
+    per_query = (time.perf_counter() - start) / (20 * len(queries))
+    assert per_query < 0.01
+
+
+def test_shared_index_over_symbol_master():
+    index = get_search_index()
+    assert index is get_search_index()          # built once
+    assert symbols(index.search('2222', limit=1)) == ['2222']
+    assert '1120' in symbols(index.search('الراجحي'))
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test Symbol Master
+Official TSV parsed once, re-parsed on mtime change, O(1) lookups shared by the fetchers
+"""
+
+import sys
+import os
+import json
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.symbol_master import (SymbolMaster, parse_official_db, parse_json_db, parse_arabic_names, names_match,
+                                OFFICIAL_DB_PATH, JSON_DB_PATH, ARABIC_NAMES_PATH)
+from core.stock_search import StockSearchIndex
+
+HEADER = "Seq\t\tSymbol\t\tCompany Name\t    \tSector\n"
+
+
+def write_tsv(path, rows, mtime=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(HEADER)
+        for seq, symbol, name, sector in rows:
+            f.write(f"{seq}\t\t{symbol}\t\t{name}\t    \t{sector}\n")
+    if mtime:
+        os.utime(path, (mtime, mtime))
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_master(tmp_path, rows, json_records=None):
+    tsv = tmp_path / "official.db"
+    write_tsv(tsv, rows, mtime=1_000_000)
+    sources = [(str(tsv), parse_official_db)]
+    if json_records is not None:
+        json_path = tmp_path / "stocks.json"
+        json_path.write_text(json.dumps(json_records), encoding='utf-8')
+        sources.append((str(json_path), parse_json_db))
+    clock = Clock()
+    return SymbolMaster(sources=sources, check_interval=2.0, clock=clock), tsv, clock
+
+
+def test_official_file_parses():
+    stocks = parse_official_db(OFFICIAL_DB_PATH)
+    assert len(stocks) == 259
+    assert stocks[1] == {'symbol': '2222', 'name': 'SAUDI ARAMCO', 'sector': 'Energy', 'sequence': 2}
+
+
+def test_parsed_once(tmp_path, monkeypatch):
+    master, _, clock = make_master(tmp_path, [(1, '2222', 'SAUDI ARAMCO', 'Energy'), (2, '1120', 'ALRAJHI', 'Banks')])
+    parses = []
+    original = parse_official_db
+    master.sources = [(path, lambda p: parses.append(p) or original(p)) for path, _ in master.sources]
+
+    for _ in range(1000):
+        assert master.name('2222.SR') == 'SAUDI ARAMCO'
+        assert master.sector('1120') == 'Banks'
+        clock.now += 0.01
+    assert len(parses) == 1
+    assert master.version == 1
+    assert '9999' not in master and master.name('9999', 'n/a') == 'n/a'
+
+
+def test_mtime_invalidation(tmp_path):
+    master, tsv, clock = make_master(tmp_path, [(1, '2222', 'SAUDI ARAMCO', 'Energy')])
+    assert len(master) == 1
+
+    write_tsv(tsv, [(1, '2222', 'ARAMCO', 'Energy'), (2, '7010', 'STC', 'Telecommunication Services')],
+              mtime=1_000_100)
+    assert master.name('2222') == 'SAUDI ARAMCO'   # not re-checked within check_interval
+    clock.now += 3
+    assert master.name('2222') == 'ARAMCO'
+    assert len(master) == 2 and master.version == 2
+
+
+def test_json_enriches_without_adding_symbols(tmp_path):
+    master, _, _ = make_master(tmp_path, [(1, '2222', 'SAUDI ARAMCO', 'Energy')], json_records={
+        '2222': {'name_en': 'Saudi Arabian Oil Co', 'name_ar': 'أرامكو السعودية', 'sector': 'Oil'},
+        '9408': {'name': 'AlBilad Saudi Growth', 'sector': 'Diversified Financials'}})
+    record = master.get('2222')
+    assert record['name'] == 'SAUDI ARAMCO' and record['sector'] == 'Energy'
+    assert record['name_ar'] == 'أرامكو السعودية'
+    assert '9408' not in master
+
+
+def test_curated_arabic_names_only_merge_matching_companies():
+    master = SymbolMaster(sources=[(OFFICIAL_DB_PATH, parse_official_db), (JSON_DB_PATH, parse_json_db),
+                                   (ARABIC_NAMES_PATH, parse_arabic_names)])
+    records = master.as_dict()
+    # The curated list files Aramco's Arabic name under 2030 (SARCO) and 7010 (STC)
+    assert records['2030']['name_ar'] == '' and records['7010']['name_ar'] == ''
+    assert records['2310']['name_ar'] == 'سبكيم'
+
+    index = StockSearchIndex(records.values())
+    assert [r['symbol'] for r in index.search('سبكيم')] == ['2310']
+    assert [r['symbol'] for r in index.search('المواساة')] == ['4002']
+    assert not {'2030', '7010', '2320'} & {r['symbol'] for r in index.search('أرامكو')}
+    assert names_match('NAMA CHEMICALS', 'Nama Chemicals') and not names_match('SARCO', 'Saudi Arabian Oil Co')
+
+
+def test_column_arrays(tmp_path):
+    master, _, _ = make_master(tmp_path, [(1, '2222', 'SAUDI ARAMCO', 'Energy'), (2, '1120', 'ALRAJHI', 'Banks'),
+                                          (3, '1150', 'ALINMA', 'Banks')])
+    assert list(master.symbols_in_sector('Banks')) == ['1120', '1150']
+    assert len(master.symbols_in_sector('Media')) == 0
+    assert list(master.symbols) == ['1120', '1150', '2222']
+    assert [s['symbol'] for s in master.list_stocks()] == ['2222', '1120', '1150']   # file order
+
+
+def test_fetchers_share_the_master(tmp_path, monkeypatch):
+    import saudi_exchange_fetcher
+    master, _, _ = make_master(tmp_path, [(1, '2222', 'SAUDI ARAMCO', 'Energy')])
+    monkeypatch.setattr(saudi_exchange_fetcher, 'symbol_master', master)
+    assert saudi_exchange_fetcher.load_official_database()[0]['name'] == 'SAUDI ARAMCO'
+    assert saudi_exchange_fetcher.get_company_name_by_symbol('2222') == 'SAUDI ARAMCO'
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test Tiered Cache
+Offline checks for LRU bounds, the disk tier and stale-while-revalidate
+"""
+
+import sys
+import os
+import time
+import threading
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core'))
+
+from tiered_cache import TieredCache
+
+
+def make_cache(tmp_path, **kwargs):
+    namespaces = {
+        'quotes': {'ttl': 60, 'stale_ttl': 3600, 'disk': True},
+        'memory': {'ttl': 60, 'stale_ttl': 0, 'disk': False},
+    }
+    return TieredCache(cache_dir=str(tmp_path), namespaces=namespaces, **kwargs)
+
+
+def age_entry(cache, namespace, key, seconds):
+    """Pretend an entry was stored `seconds` ago"""
+    value, stored_at = cache._memory[(namespace, key)]
+    cache._memory[(namespace, key)] = (value, stored_at - seconds)
+
+
+def test_memory_tier_is_bounded_lru(tmp_path):
+    cache = make_cache(tmp_path, max_entries=3)
+    for key in ['a', 'b', 'c']:
+        cache.set('memory', key, key.upper())
+
+    assert cache.get('memory', 'a') == 'A'   # 'a' becomes most recently used
+    cache.set('memory', 'd', 'D')
+
+    assert cache.get('memory', 'b') is None  # least recently used was evicted
+    assert cache.get('memory', 'a') == 'A'
+    assert len(cache._memory) == 3
+    assert cache.stats['evictions'] == 1
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set('quotes', '1120', {'current_price': 90.5})
+    cache.set('memory', '1120', 'not persisted')
+
+    reopened = make_cache(tmp_path)
+    assert reopened.get('quotes', '1120') == {'current_price': 90.5}
+    assert reopened.stats['disk_hits'] == 1
+    assert reopened.get('memory', '1120') is None
+
+    reopened.invalidate('quotes')
+    assert make_cache(tmp_path).get('quotes', '1120') is None
+
+
+def test_stale_value_served_while_refreshing(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set('quotes', '2222', {'current_price': 27.0})
+    age_entry(cache, 'quotes', '2222', 120)
+
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return {'current_price': 28.0}
+
+    start = time.time()
+    assert cache.get_or_load('quotes', '2222', loader) == {'current_price': 27.0}
+    assert time.time() - start < 1.0
+    # A second reader during the refresh does not start another one
+    assert cache.get_or_load('quotes', '2222', loader) == {'current_price': 27.0}
+
+    release.set()
+    cache._executor.shutdown(wait=True)
+    assert len(calls) == 1
+    assert cache.get('quotes', '2222') == {'current_price': 28.0}
+    assert cache.stats['stale_hits'] == 2
+
+
+def test_expired_value_loads_synchronously_and_failures_not_cached(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set('memory', 'x', 'old')
+    age_entry(cache, 'memory', 'x', 120)
+
+    assert cache.get_or_load('memory', 'x', lambda: 'new') == 'new'
+
+    failed = {'success': False}
+    result = cache.get_or_load('memory', 'y', lambda: failed, should_cache=lambda v: v['success'])
+    assert result is failed
+    assert cache.get('memory', 'y') is None
+
+
+def test_failed_disk_write_leaves_no_temp_file(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set('quotes', '1120', {'fetched': object()})   # not JSON serialisable
+
+    leftovers = [name for _, _, files in os.walk(tmp_path) for name in files
+                 if name.endswith('.tmp')]
+    assert leftovers == []
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    for test in [test_memory_tier_is_bounded_lru, test_disk_tier_survives_new_instance,
+                 test_stale_value_served_while_refreshing,
+                 test_expired_value_loads_synchronously_and_failures_not_cached,
+                 test_failed_disk_write_leaves_no_temp_file]:
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
+    print("✅ Tiered cache tests passed")
@@ -21,6 +21,10 @@ import json
 import os
 from datetime import datetime, timedelta
 
+from core.symbol_master import symbol_master
+from core.rate_limiter import get_limiter
+from core.http_transport import http_transport  # noqa: F401 - yfinance goes through the configured transport
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -60,33 +64,13 @@ class UltraFastCorrectedFetcher:
         logger.info(f"📊 Official stocks loaded: {len(self.official_stocks)}")
     
     def _load_official_database(self) -> List[Dict]:
-        """Load official Saudi stocks database"""
-        try:
-            import sqlite3
-            db_path = "data/Saudi Stock Exchange (TASI) Sectors and Companies.db"
-            
-            if os.path.exists(db_path):
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM stocks")
-                rows = cursor.fetchall()
-                columns = [description[0] for description in cursor.description]
-                conn.close()
-                
-                stocks = []
-                for row in rows:
-                    stock_dict = dict(zip(columns, row))
-                    stocks.append(stock_dict)
-                
-                logger.info(f"✅ Loaded {len(stocks)} stocks from official database")
-                return stocks
-            else:
-                logger.warning("⚠️ Official database not found, using fallback")
-                return self._get_fallback_stocks()
-                
-        except Exception as e:
-            logger.error(f"❌ Error loading official database: {e}")
-            return self._get_fallback_stocks()
+        """Load official Saudi stocks database from the shared symbol master"""
+        stocks = symbol_master.list_stocks()
+        if stocks:
+            logger.info(f"✅ Loaded {len(stocks)} stocks from official database")
+            return stocks
+        logger.warning("⚠️ Official database not found, using fallback")
+        return self._get_fallback_stocks()
     
     def _get_fallback_stocks(self) -> List[Dict]:
         """Fallback stock list for major Saudi stocks"""
@@ -145,7 +129,8 @@ class UltraFastCorrectedFetcher:
         
         try:
             ticker = yf.Ticker(yahoo_symbol)
-            hist = ticker.history(period="2d", interval="1d")
+            with get_limiter('yahoo').permit('history'):
+                hist = ticker.history(period="2d", interval="1d")
             
             if hist.empty or len(hist) < 1:
                 return None